@@ -0,0 +1,67 @@
+"""add video and task query indexes
+
+Revision ID: 35b37077df3f
+Revises: 01add939ac7e
+Create Date: 2026-10-18 10:30:12.418205
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "35b37077df3f"
+down_revision: Union[str, None] = "01add939ac7e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 列舉欄位以名稱儲存（與 SQLAlchemy Enum 預設一致）
+VIDEO_IN_PROGRESS = "status NOT IN ('COMPLETED', 'FAILED')"
+TASK_PENDING = "status IN ('QUEUED', 'RETRY', 'RUNNING')"
+
+INDEXES = [
+    (
+        "ix_videos_user_created",
+        "videos",
+        [sa.text("user_id"), sa.text("created_at DESC"), sa.text("id DESC")],
+        None,
+    ),
+    ("ix_videos_user_status", "videos", ["user_id", "status"], None),
+    ("ix_videos_in_progress", "videos", ["status", "created_at"], VIDEO_IN_PROGRESS),
+    ("ix_processing_tasks_video_created", "processing_tasks", ["video_id", "created_at"], None),
+    ("ix_processing_tasks_pending", "processing_tasks", ["status", "created_at"], TASK_PENDING),
+]
+
+
+def upgrade() -> None:
+    """執行升級遷移"""
+    # PostgreSQL 上以 CONCURRENTLY 建立，避免鎖住寫入中的熱表
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                if_not_exists=True,
+                postgresql_concurrently=concurrently,
+                postgresql_where=sa.text(where) if where else None,
+                sqlite_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade() -> None:
+    """執行降級遷移"""
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=concurrently,
+            )
@@ -0,0 +1,52 @@
+"""add bulk upsert unique indexes
+
+Revision ID: 8c1d4e7a92b5
+Revises: 35b37077df3f
+Create Date: 2026-10-18 14:00:41.902317
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8c1d4e7a92b5"
+down_revision: Union[str, None] = "35b37077df3f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 批次 upsert 的衝突鍵；建立前需先清除既有的重複資料
+INDEXES = [
+    ("uq_trend_topics_category_title", "trend_topics", ["category", "title"]),
+]
+
+
+def upgrade() -> None:
+    """執行升級遷移"""
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=True,
+                if_not_exists=True,
+                postgresql_concurrently=concurrently,
+            )
+
+
+def downgrade() -> None:
+    """執行降級遷移"""
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=concurrently,
+            )
@@ -0,0 +1,89 @@
+"""Add log_metric_rollups table for per-minute log metrics
+
+Revision ID: 20261018_006
+Revises: 20250803_005
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261018_006"
+down_revision = "20250803_005"
+branch_labels = None
+depends_on = None
+
+# 與 log_rollups.LATENCY_BUCKETS_MS 一致（遷移需保持自身快照，不導入應用模組）
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+# 各資料庫把 created_at 截斷到分鐘（UTC）的表達式
+MINUTE_EXPRESSIONS = {
+    "postgresql": "date_trunc('minute', created_at AT TIME ZONE 'UTC')",
+    "sqlite": "strftime('%Y-%m-%d %H:%M:00.000000', created_at)",
+}
+
+
+def upgrade():
+    op.create_table(
+        "log_metric_rollups",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("metric", sa.String(length=50), nullable=False),
+        sa.Column("dimension", sa.String(length=200), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("bucket_start", "metric", "dimension", name="uq_log_metric_rollup"),
+    )
+    op.create_index(
+        "ix_log_metric_rollups_bucket_start", "log_metric_rollups", ["bucket_start"], unique=False
+    )
+    backfill_rollups()
+
+
+def backfill_rollups():
+    """由現有 system_logs 回填每分鐘彙總，與 log_rollups.compute_rollup_deltas 的規則一致
+
+    system_logs 的 resource_type / error_code 欄位長度都不超過 200，維度值不需雜湊。
+    """
+    minute = MINUTE_EXPRESSIONS.get(op.get_bind().dialect.name)
+    if minute is None:
+        return
+
+    level = "LOWER(CAST(level AS VARCHAR(20)))"
+    is_error = f"{level} IN ('error', 'critical')"
+    latency_bucket = (
+        "CASE "
+        + " ".join(f"WHEN duration_ms <= {bound} THEN '{bound}'" for bound in LATENCY_BUCKETS_MS)
+        + " ELSE '+Inf' END"
+    )
+
+    # (metric, dimension, total, 條件)
+    metrics = [
+        ("level", level, "0", "level IS NOT NULL"),
+        ("resource_type", "resource_type", "0", "level IS NOT NULL"),
+        ("error_resource", "resource_type", "0", is_error),
+        ("error_code", "error_code", "0", f"{is_error} AND error_code <> ''"),
+        (
+            "api_latency_ms",
+            latency_bucket,
+            "SUM(duration_ms)",
+            "action = 'api_request' AND duration_ms IS NOT NULL",
+        ),
+    ]
+    for metric, dimension, total, condition in metrics:
+        op.execute(f"""
+            INSERT INTO log_metric_rollups (bucket_start, metric, dimension, count, total)
+            SELECT {minute}, '{metric}', {dimension}, COUNT(*), {total}
+            FROM system_logs
+            WHERE created_at IS NOT NULL AND {condition}
+            GROUP BY {minute}, {dimension}
+            """)
+
+
+def downgrade():
+    op.drop_index("ix_log_metric_rollups_bucket_start", table_name="log_metric_rollups")
+    op.drop_table("log_metric_rollups")
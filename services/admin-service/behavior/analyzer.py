@@ -399,6 +399,14 @@ class BehaviorAnalyzer:
         if not page_views:
             return {"status": "no_data", "message": "指定時間範圍內沒有頁面瀏覽數據"}
 
+        # 每個會話的頁面瀏覽數（只有一次瀏覽的會話為跳出）
+        session_page_views = Counter(
+            action.session_id
+            for action in self.collector.actions.since(
+                datetime.utcnow() - timedelta(hours=hours), action_types=[ActionType.PAGE_VIEW]
+            )
+        )
+
         # 按頁面分組分析
         page_stats = defaultdict(
             lambda: {
@@ -419,12 +427,7 @@ class BehaviorAnalyzer:
             page_stats[url]["unique_users"].add(view.user_id)
 
             # 檢查是否是跳出（單頁面會話）
-            user_session_actions = [
-                a
-                for a in self.collector.actions
-                if a.session_id == view.session_id and a.action_type == ActionType.PAGE_VIEW
-            ]
-            if len(user_session_actions) == 1:
+            if session_page_views[view.session_id] == 1:
                 page_stats[url]["bounce_count"] += 1
 
             # 獲取頁面停留時間和加載時間
@@ -520,20 +523,14 @@ class BehaviorAnalyzer:
         current_time = datetime.utcnow()
         start_time = current_time - timedelta(hours=hours)
 
-        # 獲取當前和歷史數據進行比較
-        current_period_actions = [a for a in self.collector.actions if a.timestamp >= start_time]
-
         # 比較同期歷史數據（前一天或前一週的同一時段）
         historical_start = start_time - timedelta(days=7)
         historical_end = historical_start + timedelta(hours=hours)
 
-        historical_actions = [
-            a for a in self.collector.actions if historical_start <= a.timestamp <= historical_end
-        ]
-
         # 檢測流量異常
-        current_traffic = len(current_period_actions)
-        historical_traffic = len(historical_actions)
+        actions = self.collector.actions
+        current_traffic = actions.count_since(start_time)
+        historical_traffic = actions.count_since(historical_start, historical_end)
 
         if historical_traffic > 0:
             traffic_change = (current_traffic - historical_traffic) / historical_traffic
@@ -551,11 +548,9 @@ class BehaviorAnalyzer:
                 )
 
         # 檢測錯誤率異常
-        current_errors = len(
-            [a for a in current_period_actions if a.action_type == ActionType.ERROR]
-        )
-        historical_errors = len(
-            [a for a in historical_actions if a.action_type == ActionType.ERROR]
+        current_errors = actions.count_since(start_time, action_types=[ActionType.ERROR])
+        historical_errors = actions.count_since(
+            historical_start, historical_end, action_types=[ActionType.ERROR]
         )
 
         current_error_rate = current_errors / max(current_traffic, 1)
@@ -576,8 +571,8 @@ class BehaviorAnalyzer:
             )
 
         # 檢測用戶行為異常
-        current_users = len(set(a.user_id for a in current_period_actions))
-        historical_users = len(set(a.user_id for a in historical_actions))
+        current_users = actions.count_users_since(start_time)
+        historical_users = actions.count_users_since(historical_start, historical_end)
 
         if historical_users > 0:
             user_change = (current_users - historical_users) / historical_users
@@ -13,6 +13,7 @@ from typing import Any, Dict, List, Optional
 
 import geoip2.database
 
+from .event_store import BehaviorEventStore
 from .models import (
     ActionType,
     BehaviorSession,
@@ -40,7 +41,12 @@ class BehaviorCollector:
         # 內存存儲（生產環境應使用數據庫）
         self.sessions: Dict[str, BehaviorSession] = {}
         self.user_profiles: Dict[str, UserProfile] = {}
-        self.actions: deque = deque(maxlen=50000)  # 最近5萬個動作
+        # 按時間分區的列式事件存儲，超出內存上限的舊分區溢寫到磁盤
+        self.actions = BehaviorEventStore(
+            partition_minutes=self.config.get("event_partition_minutes", 60),
+            max_memory_events=self.config.get("max_memory_events", 1_000_000),
+            spill_dir=self.config.get("event_spill_dir"),
+        )
 
         # 實時會話跟蹤
         self.active_sessions: Dict[str, str] = {}  # user_id -> session_id
@@ -361,93 +367,39 @@ class BehaviorCollector:
         end_date: Optional[datetime] = None,
     ) -> List[UserAction]:
         """獲取用戶動作"""
-        actions = []
         action_type_enums = None
-
         if action_types:
             action_type_enums = [ActionType(at) for at in action_types]
 
-        for action in reversed(self.actions):  # 最新的在前
-            if action.user_id != user_id:
-                continue
-
-            if action_type_enums and action.action_type not in action_type_enums:
-                continue
-
-            if start_date and action.timestamp < start_date:
-                continue
-
-            if end_date and action.timestamp > end_date:
-                continue
-
-            actions.append(action)
-
-            if len(actions) >= limit:
-                break
-
-        return actions
+        return self.actions.user_actions(
+            user_id,
+            action_types=action_type_enums,
+            limit=limit,
+            start=start_date,
+            end=end_date,
+        )
 
     async def get_active_users_count(self, minutes: int = 30) -> int:
         """獲取活躍用戶數"""
         cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
-        active_users = set()
-
-        for action in reversed(self.actions):
-            if action.timestamp < cutoff_time:
-                break
-            active_users.add(action.user_id)
-
-        return len(active_users)
+        return self.actions.count_users_since(cutoff_time)
 
     async def get_page_views(
         self, hours: int = 24, page_url: Optional[str] = None
     ) -> List[UserAction]:
         """獲取頁面瀏覽數據"""
         cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-        page_views = []
-
-        for action in reversed(self.actions):
-            if action.timestamp < cutoff_time:
-                break
-
-            if action.action_type != ActionType.PAGE_VIEW:
-                continue
-
-            if page_url and action.page_url != page_url:
-                continue
-
-            page_views.append(action)
-
-        return page_views
+        return self.actions.actions_of_type(ActionType.PAGE_VIEW, cutoff_time, page_url=page_url)
 
     async def get_conversion_funnel(
         self, funnel_steps: List[Dict[str, Any]], time_window_hours: int = 24
     ) -> Dict[str, Any]:
-        """計算轉換漏斗"""
-        cutoff_time = datetime.utcnow() - timedelta(hours=time_window_hours)
-
-        # 獲取符合第一步條件的用戶
-        first_step = funnel_steps[0]
-        step_users = [set()]  # 每一步的用戶集合
-
-        for action in reversed(self.actions):
-            if action.timestamp < cutoff_time:
-                break
-
-            if self._action_matches_condition(action, first_step):
-                step_users[0].add(action.user_id)
+        """計算轉換漏斗
 
-        # 計算後續步驟的轉換
-        for i, step in enumerate(funnel_steps[1:], 1):
-            step_users.append(set())
-            prev_users = step_users[i - 1]
-
-            for action in reversed(self.actions):
-                if action.timestamp < cutoff_time:
-                    break
-
-                if action.user_id in prev_users and self._action_matches_condition(action, step):
-                    step_users[i].add(action.user_id)
+        單次按時間順序掃描窗口內的事件：用戶須先完成上一步，之後的匹配動作才計入下一步。
+        """
+        cutoff_time = datetime.utcnow() - timedelta(hours=time_window_hours)
+        step_users = self.actions.funnel(funnel_steps, cutoff_time)
 
         # 計算轉換率
         total_users = len(step_users[0]) if step_users else 0
@@ -470,26 +422,6 @@ class BehaviorCollector:
             "overall_conversion_rate": conversions[-1]["conversion_rate"] if conversions else 0,
         }
 
-    def _action_matches_condition(self, action: UserAction, condition: Dict[str, Any]) -> bool:
-        """檢查動作是否匹配條件"""
-        # 檢查動作類型
-        if "action_type" in condition:
-            if action.action_type.value != condition["action_type"]:
-                return False
-
-        # 檢查頁面URL
-        if "page_url" in condition:
-            page_pattern = condition["page_url"]
-            if not action.page_url or page_pattern not in action.page_url:
-                return False
-
-        # 檢查元素ID
-        if "element_id" in condition:
-            if action.element_id != condition["element_id"]:
-                return False
-
-        return True
-
     async def export_data(
         self,
         user_id: Optional[str] = None,
@@ -566,6 +498,7 @@ class BehaviorCollector:
                 "actions": len(self.actions),
                 "user_profiles": len(self.user_profiles),
             },
+            "event_store": self.actions.get_stats(),
         }
 
     async def _cleanup_loop(self):
@@ -595,7 +528,10 @@ class BehaviorCollector:
             if session_id not in self.sessions:
                 del self.active_sessions[user_id]
 
-        logger.info(f"清理了 {len(old_sessions)} 個舊會話")
+        # 清理過期的事件分區
+        dropped_actions = self.actions.drop_before(cutoff_time)
+
+        logger.info(f"清理了 {len(old_sessions)} 個舊會話, {dropped_actions} 個舊動作")
 
     async def close(self):
         """關閉收集器"""
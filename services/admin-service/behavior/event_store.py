@@ -0,0 +1,610 @@
+"""
+用戶行為事件存儲
+
+按時間分區的列式內存事件存儲，提供按用戶和動作類型的索引，
+超出內存上限的舊分區會溢寫到磁盤，查詢時按需加載。
+"""
+
+import json
+import logging
+import os
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .models import ActionType, UserAction
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+_ACTION_TYPES = list(ActionType)
+_ACTION_CODES = {action_type: code for code, action_type in enumerate(_ACTION_TYPES)}
+_NO_VALUE = -1
+
+
+def _to_micros(timestamp: datetime) -> int:
+    """將 naive UTC 時間轉換為自 epoch 起的微秒數"""
+    delta = timestamp - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_micros(micros: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(micros))
+
+
+class _Interner:
+    """字符串 <-> 整數編碼"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NO_VALUE
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: Optional[str]) -> Optional[int]:
+        if value is None:
+            return _NO_VALUE
+        return self.codes.get(value)
+
+    def decode(self, code: int) -> Optional[str]:
+        return None if code == _NO_VALUE else self.values[code]
+
+
+class EventPartition:
+    """單一時間分區（列式存儲）
+
+    數值欄位使用 array 存放以便零拷貝轉為 numpy；其餘欄位為列表。
+    分區內的事件按時間順序追加。
+    """
+
+    def __init__(self, key: int):
+        self.key = key
+        self.timestamps = array("q")
+        self.users = array("l")
+        self.action_types = array("h")
+        self.pages = array("l")
+        self.elements = array("l")
+        self.action_ids: List[str] = []
+        self.session_ids: List[str] = []
+        self.element_texts: List[Optional[str]] = []
+        self.coordinates: List[Optional[Dict[str, int]]] = []
+        self.durations: List[Optional[int]] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.context: List[Dict[str, Any]] = []
+
+        # 分區內索引：用戶 / 動作類型 -> 行號（遞增）
+        self.by_user: Dict[int, array] = {}
+        self.by_action: Dict[int, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def min_ts(self) -> int:
+        return self.timestamps[0]
+
+    @property
+    def max_ts(self) -> int:
+        return self.timestamps[-1]
+
+    def append(self, action: UserAction, user: int, page: int, element: int):
+        row = len(self.timestamps)
+        action_code = _ACTION_CODES[action.action_type]
+
+        self.timestamps.append(_to_micros(action.timestamp))
+        self.users.append(user)
+        self.action_types.append(action_code)
+        self.pages.append(page)
+        self.elements.append(element)
+        self.action_ids.append(action.action_id)
+        self.session_ids.append(action.session_id)
+        self.element_texts.append(action.element_text)
+        self.coordinates.append(action.coordinates)
+        self.durations.append(action.duration_ms)
+        self.metadata.append(action.metadata)
+        self.context.append(action.context)
+
+        self.by_user.setdefault(user, array("l")).append(row)
+        self.by_action.setdefault(action_code, array("l")).append(row)
+
+    def first_row_at_or_after(self, micros: int) -> int:
+        return bisect_left(self.timestamps, micros)
+
+    def user_column(self) -> np.ndarray:
+        return np.frombuffer(self.users, dtype=f"i{self.users.itemsize}")
+
+    def columns(self, start: int = 0) -> Dict[str, np.ndarray]:
+        """從 start 行起的編碼欄位（零拷貝 numpy 視圖）"""
+        return {
+            "users": self.user_column()[start:],
+            "action_types": np.frombuffer(self.action_types, dtype=np.int16)[start:],
+            "pages": np.frombuffer(self.pages, dtype=f"i{self.pages.itemsize}")[start:],
+            "elements": np.frombuffer(self.elements, dtype=f"i{self.elements.itemsize}")[start:],
+        }
+
+
+class BehaviorEventStore:
+    """按時間分區、帶索引的行為事件存儲
+
+    迭代（`for action in store`）只包含內存中的分區，按時間由舊到新，
+    與原本的 deque 行為一致；帶時間範圍的查詢會按需加載已溢寫的分區。
+    """
+
+    def __init__(
+        self,
+        partition_minutes: int = 60,
+        max_memory_events: int = 1_000_000,
+        spill_dir: Optional[str] = None,
+    ):
+        self.partition_micros = partition_minutes * 60 * 1_000_000
+        self.max_memory_events = max_memory_events
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+
+        self.users = _Interner()
+        self.pages = _Interner()
+        self.elements = _Interner()
+
+        self.partitions: Dict[int, EventPartition] = {}
+        # key -> {"path", "users", "count", "min_ts", "max_ts"}
+        self.spilled: Dict[int, Dict[str, Any]] = {}
+        self._memory_events = 0
+
+    # ------------------------------------------------------------------ 寫入
+
+    def append(self, action: UserAction):
+        """追加事件（事件應按時間順序到達）"""
+        micros = _to_micros(action.timestamp)
+        key = micros - micros % self.partition_micros
+
+        partition = self.partitions.get(key)
+        if partition is None:
+            partition = self.partitions[key] = EventPartition(key)
+
+        partition.append(
+            action,
+            self.users.encode(action.user_id),
+            self.pages.encode(action.page_url),
+            self.elements.encode(action.element_id),
+        )
+        self._memory_events += 1
+
+        if self._memory_events > self.max_memory_events:
+            self._spill_oldest()
+
+    def extend(self, actions: Iterable[UserAction]):
+        for action in actions:
+            self.append(action)
+
+    # ------------------------------------------------------------ 兼容接口
+
+    def __len__(self) -> int:
+        return self._memory_events
+
+    def __iter__(self) -> Iterator[UserAction]:
+        for key in sorted(self.partitions):
+            partition = self.partitions[key]
+            for row in range(len(partition)):
+                yield self._materialize(partition, row)
+
+    def __reversed__(self) -> Iterator[UserAction]:
+        for key in sorted(self.partitions, reverse=True):
+            partition = self.partitions[key]
+            for row in range(len(partition) - 1, -1, -1):
+                yield self._materialize(partition, row)
+
+    @property
+    def total_events(self) -> int:
+        return self._memory_events + sum(meta["count"] for meta in self.spilled.values())
+
+    # ---------------------------------------------------------------- 查詢
+
+    def recent(self, n: int) -> List[UserAction]:
+        """內存中最近的 n 個動作（由舊到新），等同原 deque 的 `list(actions)[-n:]`"""
+        results: List[UserAction] = []
+        for key in sorted(self.partitions, reverse=True):
+            partition = self.partitions[key]
+            take = min(n - len(results), len(partition))
+            for row in range(len(partition) - 1, len(partition) - 1 - take, -1):
+                results.append(self._materialize(partition, row))
+            if len(results) >= n:
+                break
+        results.reverse()
+        return results
+
+    def since(
+        self,
+        start: datetime,
+        end: Optional[datetime] = None,
+        action_types: Optional[List[ActionType]] = None,
+    ) -> List[UserAction]:
+        """時間窗口 [start, end) 內的動作（由舊到新）
+
+        以二分查找定位窗口邊界，指定動作類型時使用分區內的動作類型索引，
+        只有窗口內的行會被還原為 UserAction。
+        """
+        start_us, end_us, type_codes = self._window(start, end, action_types)
+        results = []
+        for partition in self._partitions_in_range(start_us, end_us):
+            for row in self._window_rows(partition, start_us, end_us, type_codes):
+                results.append(self._materialize(partition, row))
+        return results
+
+    def count_since(
+        self,
+        start: datetime,
+        end: Optional[datetime] = None,
+        action_types: Optional[List[ActionType]] = None,
+    ) -> int:
+        """時間窗口 [start, end) 內的動作數（不還原事件）"""
+        start_us, end_us, type_codes = self._window(start, end, action_types)
+        total = 0
+        for partition in self._partitions_in_range(start_us, end_us):
+            lo, hi = self._window_bounds(partition, start_us, end_us)
+            if type_codes is None:
+                total += hi - lo
+                continue
+            for code in type_codes:
+                rows = partition.by_action.get(code)
+                if rows:
+                    total += bisect_left(rows, hi) - bisect_left(rows, lo)
+        return total
+
+    def _window(
+        self,
+        start: datetime,
+        end: Optional[datetime],
+        action_types: Optional[List[ActionType]],
+    ) -> Tuple[int, Optional[int], Optional[List[int]]]:
+        type_codes = sorted({_ACTION_CODES[t] for t in action_types}) if action_types else None
+        return _to_micros(start), _to_micros(end) if end else None, type_codes
+
+    @staticmethod
+    def _window_bounds(
+        partition: EventPartition, start_us: int, end_us: Optional[int]
+    ) -> Tuple[int, int]:
+        lo = partition.first_row_at_or_after(start_us)
+        hi = len(partition) if end_us is None else partition.first_row_at_or_after(end_us)
+        return lo, hi
+
+    def _window_rows(
+        self,
+        partition: EventPartition,
+        start_us: int,
+        end_us: Optional[int],
+        type_codes: Optional[List[int]],
+    ) -> Iterable[int]:
+        lo, hi = self._window_bounds(partition, start_us, end_us)
+        if type_codes is None:
+            return range(lo, hi)
+
+        rows: List[int] = []
+        for code in type_codes:
+            index = partition.by_action.get(code)
+            if index:
+                rows.extend(index[bisect_left(index, lo) : bisect_left(index, hi)])
+        if len(type_codes) > 1:
+            rows.sort()
+        return rows
+
+    def user_actions(
+        self,
+        user_id: str,
+        action_types: Optional[List[ActionType]] = None,
+        limit: Optional[int] = 100,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[UserAction]:
+        """用戶動作（最新在前），使用分區內的用戶索引；limit 為 None 時不限數量"""
+        user = self.users.lookup(user_id)
+        if user is None:
+            return []
+
+        type_codes = {_ACTION_CODES[t] for t in action_types} if action_types else None
+        start_us = _to_micros(start) if start else None
+        end_us = _to_micros(end) if end else None
+
+        results = []
+        for partition in self._partitions_in_range(start_us, end_us, newest_first=True, user=user):
+            rows = partition.by_user.get(user)
+            if not rows:
+                continue
+            for row in reversed(rows):
+                ts = partition.timestamps[row]
+                if end_us is not None and ts > end_us:
+                    continue
+                if start_us is not None and ts < start_us:
+                    break
+                if type_codes and partition.action_types[row] not in type_codes:
+                    continue
+                results.append(self._materialize(partition, row))
+                if limit is not None and len(results) >= limit:
+                    return results
+        return results
+
+    def actions_of_type(
+        self,
+        action_type: ActionType,
+        since: datetime,
+        page_url: Optional[str] = None,
+    ) -> List[UserAction]:
+        """指定類型的動作（最新在前），使用分區內的動作類型索引"""
+        code = _ACTION_CODES[action_type]
+        page = None
+        if page_url is not None:
+            page = self.pages.lookup(page_url)
+            if page is None:
+                return []
+
+        since_us = _to_micros(since)
+        results = []
+        for partition in self._partitions_in_range(since_us, None, newest_first=True):
+            rows = partition.by_action.get(code)
+            if not rows:
+                continue
+            for row in reversed(rows):
+                if partition.timestamps[row] < since_us:
+                    break
+                if page is not None and partition.pages[row] != page:
+                    continue
+                results.append(self._materialize(partition, row))
+        return results
+
+    def distinct_users_since(self, since: datetime, until: Optional[datetime] = None) -> Set[str]:
+        """時間窗口 [since, until) 內出現過的用戶"""
+        return {self.users.decode(code) for code in self._user_codes_since(since, until)}
+
+    def count_users_since(self, since: datetime, until: Optional[datetime] = None) -> int:
+        """時間窗口 [since, until) 內出現過的用戶數（不解碼用戶ID）"""
+        return len(self._user_codes_since(since, until))
+
+    def _user_codes_since(self, since: datetime, until: Optional[datetime] = None) -> Set[int]:
+        since_us = _to_micros(since)
+        until_us = _to_micros(until) if until else None
+        codes: Set[int] = set()
+        for partition in self._partitions_in_range(since_us, until_us):
+            if partition.min_ts >= since_us and (until_us is None or partition.max_ts < until_us):
+                codes.update(partition.by_user.keys())
+            else:
+                lo, hi = self._window_bounds(partition, since_us, until_us)
+                codes.update(partition.users[lo:hi])
+        return codes
+
+    def funnel(self, steps: List[Dict[str, Any]], since: datetime) -> List[Set[str]]:
+        """有序漏斗：單次按時間順序掃描，每個用戶依序完成各步驟
+
+        只有在完成第 i-1 步之後發生的匹配動作才會計入第 i 步。
+        每個分區先以 numpy 計算各步驟的匹配遮罩，再只遍歷匹配任一步驟的行。
+        """
+        if not steps:
+            return []
+
+        since_us = _to_micros(since)
+        conditions = [self._compile_condition(step) for step in steps]
+
+        progress: Dict[int, int] = {}
+        reached: List[Set[int]] = [set() for _ in steps]
+        last_step = len(steps)
+
+        for partition in self._partitions_in_range(since_us, None):
+            start = partition.first_row_at_or_after(since_us)
+            columns = partition.columns(start)
+            masks = [condition(columns) for condition in conditions]
+
+            candidate_rows = np.flatnonzero(np.logical_or.reduce(masks))
+            if not len(candidate_rows):
+                continue
+
+            users = columns["users"][candidate_rows].tolist()
+            step_matches = [mask[candidate_rows].tolist() for mask in masks]
+
+            for i, user in enumerate(users):
+                step = progress.get(user, 0)
+                if step < last_step and step_matches[step][i]:
+                    reached[step].add(user)
+                    progress[user] = step + 1
+
+        return [{self.users.decode(code) for code in users} for users in reached]
+
+    def _compile_condition(
+        self, condition: Dict[str, Any]
+    ) -> Callable[[Dict[str, np.ndarray]], np.ndarray]:
+        """將漏斗條件編譯為作用於編碼欄位的向量化判斷函數"""
+        checks = []
+
+        if "action_type" in condition:
+            try:
+                code = _ACTION_CODES[ActionType(condition["action_type"])]
+            except ValueError:
+                return lambda columns: np.zeros(len(columns["users"]), dtype=bool)
+            checks.append(lambda columns: columns["action_types"] == code)
+
+        if "page_url" in condition:
+            pattern = condition["page_url"]
+            page_codes = np.array(
+                [code for code, value in enumerate(self.pages.values) if pattern in value],
+                dtype=np.int64,
+            )
+            checks.append(lambda columns: np.isin(columns["pages"], page_codes))
+
+        if "element_id" in condition:
+            element = self.elements.lookup(condition["element_id"])
+            if element is None:
+                return lambda columns: np.zeros(len(columns["users"]), dtype=bool)
+            checks.append(lambda columns: columns["elements"] == element)
+
+        def matches(columns: Dict[str, np.ndarray]) -> np.ndarray:
+            mask = np.ones(len(columns["users"]), dtype=bool)
+            for check in checks:
+                mask &= check(columns)
+            return mask
+
+        return matches
+
+    # ---------------------------------------------------------- 分區管理
+
+    def drop_before(self, cutoff: datetime) -> int:
+        """刪除整個早於 cutoff 的分區，返回刪除的事件數"""
+        cutoff_us = _to_micros(cutoff)
+        dropped = 0
+
+        for key in [k for k, p in self.partitions.items() if p.max_ts < cutoff_us]:
+            partition = self.partitions.pop(key)
+            self._memory_events -= len(partition)
+            dropped += len(partition)
+
+        for key in [k for k, m in self.spilled.items() if m["max_ts"] < cutoff_us]:
+            meta = self.spilled.pop(key)
+            dropped += meta["count"]
+            self._remove_spill_files(meta["path"])
+
+        return dropped
+
+    def _partitions_in_range(
+        self,
+        start_us: Optional[int],
+        end_us: Optional[int],
+        newest_first: bool = False,
+        user: Optional[int] = None,
+    ) -> Iterator[EventPartition]:
+        keys = set(self.partitions) | set(self.spilled)
+        for key in sorted(keys, reverse=newest_first):
+            if start_us is not None and key + self.partition_micros <= start_us:
+                continue
+            if end_us is not None and key > end_us:
+                continue
+
+            partition = self.partitions.get(key)
+            if partition is None:
+                # 溢寫分區保留用戶集合，無關分區不必從磁盤加載
+                if user is not None and user not in self.spilled[key]["users"]:
+                    continue
+                partition = self._load_spilled(key)
+            if len(partition):
+                yield partition
+
+    def _materialize(self, partition: EventPartition, row: int) -> UserAction:
+        return UserAction(
+            action_id=partition.action_ids[row],
+            user_id=self.users.decode(partition.users[row]),
+            session_id=partition.session_ids[row],
+            action_type=_ACTION_TYPES[partition.action_types[row]],
+            timestamp=_from_micros(partition.timestamps[row]),
+            page_url=self.pages.decode(partition.pages[row]),
+            element_id=self.elements.decode(partition.elements[row]),
+            element_text=partition.element_texts[row],
+            coordinates=partition.coordinates[row],
+            duration_ms=partition.durations[row],
+            metadata=partition.metadata[row],
+            context=partition.context[row],
+        )
+
+    # ---------------------------------------------------------------- 溢寫
+
+    def _spill_oldest(self):
+        """將最舊的分區溢寫到磁盤；未配置溢寫目錄時直接丟棄"""
+        while self._memory_events > self.max_memory_events and len(self.partitions) > 1:
+            key = min(self.partitions)
+            partition = self.partitions.pop(key)
+            self._memory_events -= len(partition)
+
+            if self.spill_dir is None:
+                logger.debug(f"丟棄行為事件分區 {key}（{len(partition)} 個事件）")
+                continue
+
+            try:
+                self.spilled[key] = self._write_spill(partition)
+            except OSError as e:
+                logger.warning(f"行為事件分區溢寫失敗 {key}: {e}")
+
+    def _write_spill(self, partition: EventPartition) -> Dict[str, Any]:
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        path = self.spill_dir / f"partition_{partition.key}"
+
+        np.savez(
+            f"{path}.npz",
+            timestamps=np.frombuffer(partition.timestamps, dtype=np.int64),
+            users=np.array(partition.users, dtype=np.int64),
+            action_types=np.array(partition.action_types, dtype=np.int16),
+            pages=np.array(partition.pages, dtype=np.int64),
+            elements=np.array(partition.elements, dtype=np.int64),
+        )
+        with open(f"{path}.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "action_ids": partition.action_ids,
+                    "session_ids": partition.session_ids,
+                    "element_texts": partition.element_texts,
+                    "coordinates": partition.coordinates,
+                    "durations": partition.durations,
+                    "metadata": partition.metadata,
+                    "context": partition.context,
+                },
+                f,
+                ensure_ascii=False,
+                default=str,
+            )
+
+        return {
+            "path": str(path),
+            "users": set(partition.by_user),
+            "count": len(partition),
+            "min_ts": partition.min_ts,
+            "max_ts": partition.max_ts,
+        }
+
+    def _load_spilled(self, key: int) -> EventPartition:
+        """從磁盤重建分區（不放回內存，避免反覆觸發溢寫）"""
+        path = self.spilled[key]["path"]
+        partition = EventPartition(key)
+
+        with np.load(f"{path}.npz") as columns:
+            partition.timestamps = array("q", columns["timestamps"].tolist())
+            partition.users = array("l", columns["users"].tolist())
+            partition.action_types = array("h", columns["action_types"].tolist())
+            partition.pages = array("l", columns["pages"].tolist())
+            partition.elements = array("l", columns["elements"].tolist())
+
+        with open(f"{path}.json", "r", encoding="utf-8") as f:
+            fields = json.load(f)
+        partition.action_ids = fields["action_ids"]
+        partition.session_ids = fields["session_ids"]
+        partition.element_texts = fields["element_texts"]
+        partition.coordinates = fields["coordinates"]
+        partition.durations = fields["durations"]
+        partition.metadata = fields["metadata"]
+        partition.context = fields["context"]
+
+        for row, (user, action_code) in enumerate(zip(partition.users, partition.action_types)):
+            partition.by_user.setdefault(user, array("l")).append(row)
+            partition.by_action.setdefault(action_code, array("l")).append(row)
+
+        return partition
+
+    @staticmethod
+    def _remove_spill_files(path: str):
+        for suffix in (".npz", ".json"):
+            try:
+                os.remove(f"{path}{suffix}")
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "memory_events": self._memory_events,
+            "spilled_events": sum(meta["count"] for meta in self.spilled.values()),
+            "memory_partitions": len(self.partitions),
+            "spilled_partitions": len(self.spilled),
+            "distinct_users": len(self.users.values),
+        }
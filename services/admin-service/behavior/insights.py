@@ -172,7 +172,7 @@ class InsightGenerator:
         cutoff_time = datetime.utcnow() - timedelta(days=days)
 
         # 計算轉換相關指標
-        recent_actions = [a for a in self.collector.actions if a.timestamp >= cutoff_time]
+        recent_actions = self.collector.actions.since(cutoff_time)
 
         conversion_actions = [a for a in recent_actions if a.metadata.get("is_conversion")]
         total_users = len(set(a.user_id for a in recent_actions))
@@ -258,15 +258,11 @@ class InsightGenerator:
 
         # 7天留存
         week_ago = now - timedelta(days=7)
-        users_week_ago = set(
-            a.user_ai
-            for a in self.collector.actions
-            if week_ago <= a.timestamp < week_ago + timedelta(days=1)
+        users_week_ago = self.collector.actions.distinct_users_since(
+            week_ago, week_ago + timedelta(days=1)
         )
 
-        users_still_active = set(
-            a.user_id for a in self.collector.actions if a.timestamp >= now - timedelta(days=1)
-        )
+        users_still_active = self.collector.actions.distinct_users_since(now - timedelta(days=1))
 
         if users_week_ago:
             retention_7d = len(users_week_ago & users_still_active) / len(users_week_ago)
@@ -308,21 +304,17 @@ class InsightGenerator:
         feature_usage = defaultdict(int)
         feature_users = defaultdict(set)
 
-        for action in self.collector.actions:
-            if action.timestamp < cutoff_time:
-                continue
-
-            if action.action_type == ActionType.FEATURE_USE:
-                feature_name = action.metadata.get("feature_name", "unknown")
-                feature_usage[feature_name] += 1
-                feature_users[feature_name].add(action.user_id)
+        for action in self.collector.actions.since(
+            cutoff_time, action_types=[ActionType.FEATURE_USE]
+        ):
+            feature_name = action.metadata.get("feature_name", "unknown")
+            feature_usage[feature_name] += 1
+            feature_users[feature_name].add(action.user_id)
 
         if not feature_usage:
             return insights
 
-        total_users = len(
-            set(a.user_id for a in self.collector.actions if a.timestamp >= cutoff_time)
-        )
+        total_users = self.collector.actions.count_users_since(cutoff_time)
 
         # 分析功能使用率
         feature_stats = []
@@ -478,12 +470,12 @@ class InsightGenerator:
         cutoff_time = datetime.utcnow() - timedelta(days=days)
 
         # 分析頁面加載時間
+        page_views = self.collector.actions.since(cutoff_time, action_types=[ActionType.PAGE_VIEW])
         page_load_times = []
-        for action in self.collector.actions:
-            if action.timestamp >= cutoff_time and action.action_type == ActionType.PAGE_VIEW:
-                load_time = action.metadata.get("load_time_ms")
-                if load_time:
-                    page_load_times.append(load_time)
+        for action in page_views:
+            load_time = action.metadata.get("load_time_ms")
+            if load_time:
+                page_load_times.append(load_time)
 
         if page_load_times:
             avg_load_time = statistics.mean(page_load_times)
@@ -502,14 +494,7 @@ class InsightGenerator:
                         description=f"平均頁面加載時間{avg_load_time/1000:.1f}秒，P95為{p95_load_time/1000:.1f}秒",
                         insight_type="risk",
                         priority="medium",
-                        affected_users=len(
-                            set(
-                                a.user_id
-                                for a in self.collector.actions
-                                if a.timestamp >= cutoff_time
-                                and a.action_type == ActionType.PAGE_VIEW
-                            )
-                        ),
+                        affected_users=len(set(a.user_id for a in page_views)),
                         potential_impact="慢加載影響用戶體驗和轉換率",
                         recommendations=[
                             "優化圖片和資源壓縮",
@@ -538,73 +523,64 @@ class InsightGenerator:
         previous_week_start = now - timedelta(days=14)
 
         # 當前週活動
-        current_week_actions = [
-            a for a in self.collector.actions if current_week_start <= a.timestamp <= now
-        ]
+        actions = self.collector.actions
+        current_count = actions.count_since(current_week_start)
 
         # 前一週活動
-        previous_week_actions = [
-            a
-            for a in self.collector.actions
-            if previous_week_start <= a.timestamp < current_week_start
-        ]
+        previous_count = actions.count_since(previous_week_start, current_week_start)
+
+        if previous_count > 0:
+            change_rate = (current_count - previous_count) / previous_count
 
-        if previous_week_actions:
-            current_count = len(current_week_actions)
-            previous_count = len(previous_week_actions)
-
-            if previous_count > 0:
-                change_rate = (current_count - previous_count) / previous_count
-
-                # 顯著增長
-                if change_rate > 0.2:  # 20%增長
-                    insights.append(
-                        BehaviorInsight(
-                            insight_id=f"activity_growth_{datetime.utcnow().date()}",
-                            title="用戶活動顯著增長",
-                            description=f"本週用戶活動比上週增長{change_rate:.1%}",
-                            insight_type="trend",
-                            priority="medium",
-                            affected_users=len(set(a.user_id for a in current_week_actions)),
-                            potential_impact="用戶活躍度提升，是積極的發展趨勢",
-                            recommendations=[
-                                "分析增長驅動因素並持續優化",
-                                "擴大成功策略的應用範圍",
-                                "準備應對更高的用戶負載",
-                            ],
-                            data_points={
-                                "current_week_actions": current_count,
-                                "previous_week_actions": previous_count,
-                                "growth_rate": change_rate,
-                            },
-                            confidence_level=0.7,
-                        )
+            # 顯著增長
+            if change_rate > 0.2:  # 20%增長
+                insights.append(
+                    BehaviorInsight(
+                        insight_id=f"activity_growth_{datetime.utcnow().date()}",
+                        title="用戶活動顯著增長",
+                        description=f"本週用戶活動比上週增長{change_rate:.1%}",
+                        insight_type="trend",
+                        priority="medium",
+                        affected_users=actions.count_users_since(current_week_start),
+                        potential_impact="用戶活躍度提升，是積極的發展趨勢",
+                        recommendations=[
+                            "分析增長驅動因素並持續優化",
+                            "擴大成功策略的應用範圍",
+                            "準備應對更高的用戶負載",
+                        ],
+                        data_points={
+                            "current_week_actions": current_count,
+                            "previous_week_actions": previous_count,
+                            "growth_rate": change_rate,
+                        },
+                        confidence_level=0.7,
                     )
+                )
 
-                # 顯著下降
-                elif change_rate < -0.2:  # 20%下降
-                    insights.append(
-                        BehaviorInsight(
-                            insight_id=f"activity_decline_{datetime.utcnow().date()}",
-                            title="用戶活動出現下降",
-                            description=f"本週用戶活動比上週下降{abs(change_rate):.1%}",
-                            insight_type="risk",
-                            priority="high",
-                            affected_users=len(set(a.user_id for a in current_week_actions)),
-                            potential_impact="用戶活躍度下降可能影響業務指標",
-                            recommendations=[
-                                "調查活動下降的根本原因",
-                                "檢查是否有技術問題或用戶體驗問題",
-                                "實施用戶重新激活策略",
-                            ],
-                            data_points={
-                                "current_week_actions": current_count,
-                                "previous_week_actions": previous_count,
-                                "decline_rate": abs(change_rate),
-                            },
-                            confidence_level=0.8,
-                        )
+            # 顯著下降
+            elif change_rate < -0.2:  # 20%下降
+                insights.append(
+                    BehaviorInsight(
+                        insight_id=f"activity_decline_{datetime.utcnow().date()}",
+                        title="用戶活動出現下降",
+                        description=f"本週用戶活動比上週下降{abs(change_rate):.1%}",
+                        insight_type="risk",
+                        priority="high",
+                        affected_users=actions.count_users_since(current_week_start),
+                        potential_impact="用戶活躍度下降可能影響業務指標",
+                        recommendations=[
+                            "調查活動下降的根本原因",
+                            "檢查是否有技術問題或用戶體驗問題",
+                            "實施用戶重新激活策略",
+                        ],
+                        data_points={
+                            "current_week_actions": current_count,
+                            "previous_week_actions": previous_count,
+                            "decline_rate": abs(change_rate),
+                        },
+                        confidence_level=0.8,
                     )
+                )
 
         return insights
 
@@ -61,10 +61,7 @@ class PatternDetector:
         # 按用戶和會話收集動作序列
         user_sequences = defaultdict(list)
 
-        for action in reversed(self.collector.actions):
-            if action.timestamp < cutoff_time:
-                break
-
+        for action in self.collector.actions.since(cutoff_time):
             sequence_key = f"{action.user_id}:{action.session_id}"
             user_sequences[sequence_key].append(action)
 
@@ -193,10 +190,7 @@ class PatternDetector:
         hourly_patterns = defaultdict(lambda: defaultdict(int))  # hour -> action_type -> count
         daily_patterns = defaultdict(lambda: defaultdict(int))  # weekday -> action_type -> count
 
-        for action in self.collector.actions:
-            if action.timestamp < cutoff_time:
-                continue
-
+        for action in self.collector.actions.since(cutoff_time):
             hour = action.timestamp.hour
             weekday = action.timestamp.weekday()
             action_type = action.action_type.value
@@ -286,12 +280,10 @@ class PatternDetector:
         # 收集用戶旅程數據
         user_journeys = defaultdict(list)  # user_id -> [page_urls]
 
-        for action in self.collector.actions:
-            if (
-                action.timestamp < cutoff_time
-                or action.action_type != ActionType.PAGE_VIEW
-                or not action.page_url
-            ):
+        for action in self.collector.actions.since(
+            cutoff_time, action_types=[ActionType.PAGE_VIEW]
+        ):
+            if not action.page_url:
                 continue
 
             user_journeys[action.user_id].append(action.page_url)
@@ -381,11 +373,9 @@ class PatternDetector:
             segment_users[segment].add(user_id)
 
             # 收集該用戶的動作
-            user_actions = [
-                a
-                for a in self.collector.actions
-                if a.user_id == user_id and a.timestamp >= cutoff_time
-            ]
+            user_actions = self.collector.actions.user_actions(
+                user_id, limit=None, start=cutoff_time
+            )
 
             for action in user_actions:
                 segment_behaviors[segment][action.action_type.value] += 1
@@ -425,8 +425,8 @@ class BehaviorTracker:
         user_actions = defaultdict(list)
         conversions = 0
 
-        for action in self.collector.actions:
-            if action.user_id in cohort_users and action.timestamp >= start_date:
+        for action in self.collector.actions.since(start_date):
+            if action.user_id in cohort_users:
                 user_actions[action.user_id].append(action)
                 cohort_stats["total_actions"] += 1
 
@@ -485,7 +485,7 @@ class BehaviorTracker:
             # 計算最近5分鐘的錯誤率
             recent_actions = [
                 a
-                for a in list(self.collector.actions)[-100:]  # 最近100個動作
+                for a in self.collector.actions.recent(100)  # 最近100個動作
                 if (datetime.utcnow() - a.timestamp).seconds <= 300  # 5分鐘內
             ]
 
@@ -520,21 +520,13 @@ class BehaviorTracker:
         one_hour_ago = now - timedelta(hours=1)
 
         # 計算每分鐘頁面瀏覽數
-        page_views = sum(
-            1
-            for action in self.collector.actions
-            if (action.action_type == ActionType.PAGE_VIEW and action.timestamp >= one_minute_ago)
+        page_views = self.collector.actions.count_since(
+            one_minute_ago, action_types=[ActionType.PAGE_VIEW]
         )
         self.real_time_stats["page_views_per_minute"].append(page_views)
 
         # 計算每小時唯一訪客數
-        unique_visitors = len(
-            set(
-                action.user_id
-                for action in self.collector.actions
-                if action.timestamp >= one_hour_ago
-            )
-        )
+        unique_visitors = self.collector.actions.count_users_since(one_hour_ago)
         self.real_time_stats["unique_visitors_per_hour"].append(unique_visitors)
 
     async def get_real_time_stats(self) -> Dict[str, Any]:
@@ -0,0 +1,202 @@
+"""
+日誌指標彙總
+將每批寫入的日誌增量彙總到每分鐘的 log_metric_rollups，儀表板只讀取彙總表
+"""
+
+import bisect
+import hashlib
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.engine import Connection
+
+from .models import LogLevel, LogMetricRollup
+
+# 指標名稱
+METRIC_LEVEL = "level"
+METRIC_RESOURCE = "resource_type"
+METRIC_ERROR_CODE = "error_code"
+METRIC_ERROR_RESOURCE = "error_resource"
+METRIC_API_LATENCY = "api_latency_ms"
+
+ERROR_LEVELS = (LogLevel.ERROR, LogLevel.CRITICAL)
+
+# API 延遲直方圖的桶上界（毫秒），最後一個桶為 +Inf
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+INF_BUCKET = "+Inf"
+
+# 與 log_metric_rollups.dimension 欄位長度一致
+DIMENSION_MAX_LENGTH = 200
+
+RollupKey = Tuple[datetime, str, str]
+
+
+def minute_bucket(timestamp: datetime) -> datetime:
+    """取時間所在分鐘的起始時間"""
+    return timestamp.replace(second=0, microsecond=0, tzinfo=None)
+
+
+def rollup_dimension(value: str) -> str:
+    """超長維度值保留前綴並附加雜湊，避免截斷後不同的值被合併到同一行"""
+    if len(value) <= DIMENSION_MAX_LENGTH:
+        return value
+    digest = hashlib.sha1(value.encode("utf-8")).hexdigest()[:16]
+    return f"{value[: DIMENSION_MAX_LENGTH - len(digest) - 1]}#{digest}"
+
+
+def latency_bucket(duration_ms: float) -> str:
+    """延遲值所屬的直方圖桶（以桶上界表示）"""
+    index = bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)
+    return str(LATENCY_BUCKETS_MS[index]) if index < len(LATENCY_BUCKETS_MS) else INF_BUCKET
+
+
+def compute_rollup_deltas(rows: Iterable[Dict[str, Any]]) -> Dict[RollupKey, List[float]]:
+    """計算一批日誌對彙總表的增量
+
+    Returns:
+        {(bucket_start, metric, dimension): [count, total]}
+    """
+    deltas: Dict[RollupKey, List[float]] = defaultdict(lambda: [0, 0.0])
+
+    for row in rows:
+        bucket = minute_bucket(row["created_at"])
+        level = row["level"]
+
+        resource_type = rollup_dimension(row["resource_type"])
+
+        deltas[(bucket, METRIC_LEVEL, level.value)][0] += 1
+        deltas[(bucket, METRIC_RESOURCE, resource_type)][0] += 1
+
+        if level in ERROR_LEVELS:
+            deltas[(bucket, METRIC_ERROR_RESOURCE, resource_type)][0] += 1
+            if row.get("error_code"):
+                deltas[(bucket, METRIC_ERROR_CODE, rollup_dimension(row["error_code"]))][0] += 1
+
+        duration_ms = row.get("duration_ms")
+        if row["action"] == "api_request" and duration_ms is not None:
+            delta = deltas[(bucket, METRIC_API_LATENCY, latency_bucket(duration_ms))]
+            delta[0] += 1
+            delta[1] += duration_ms
+
+    return deltas
+
+
+def upsert_rollups(conn: Connection, deltas: Dict[RollupKey, List[float]]):
+    """以 INSERT ... ON CONFLICT DO UPDATE 累加彙總（與日誌寫入在同一交易內）"""
+    if not deltas:
+        return
+
+    values = [
+        {
+            "bucket_start": bucket,
+            "metric": metric,
+            "dimension": dimension,
+            "count": int(count),
+            "total": float(total),
+        }
+        for (bucket, metric, dimension), (count, total) in deltas.items()
+    ]
+
+    table = LogMetricRollup.__table__
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        _upsert_rollups_generic(conn, values)
+        return
+
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["bucket_start", "metric", "dimension"],
+        set_={
+            "count": table.c.count + stmt.excluded.count,
+            "total": table.c.total + stmt.excluded.total,
+        },
+    )
+    conn.execute(stmt, values)
+
+
+def _upsert_rollups_generic(conn: Connection, values: List[Dict[str, Any]]):
+    """不支援 ON CONFLICT 的資料庫：逐筆先更新、無資料則插入"""
+    table = LogMetricRollup.__table__
+    for value in values:
+        result = conn.execute(
+            table.update()
+            .where(
+                table.c.bucket_start == value["bucket_start"],
+                table.c.metric == value["metric"],
+                table.c.dimension == value["dimension"],
+            )
+            .values(
+                count=table.c.count + value["count"],
+                total=table.c.total + value["total"],
+            )
+        )
+        if result.rowcount == 0:
+            conn.execute(table.insert(), value)
+
+
+def prune_rollups(conn, cutoff: datetime) -> int:
+    """刪除早於 cutoff 所在分鐘的彙總（與日誌清理使用相同的保留期）"""
+    table = LogMetricRollup.__table__
+    result = conn.execute(delete(table).where(table.c.bucket_start < minute_bucket(cutoff)))
+    return result.rowcount
+
+
+def load_rollups(db, metrics: Iterable[str], since: datetime) -> Dict[str, Dict[str, List[float]]]:
+    """讀取指定時間之後的彙總，按指標與維度合計
+
+    Returns:
+        {metric: {dimension: [count, total]}}
+    """
+    table = LogMetricRollup.__table__
+    rows = db.execute(
+        select(table.c.metric, table.c.dimension, table.c.count, table.c.total).where(
+            table.c.metric.in_(list(metrics)),
+            table.c.bucket_start >= minute_bucket(since),
+        )
+    )
+
+    totals: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(lambda: [0, 0.0]))
+    for metric, dimension, count, total in rows:
+        entry = totals[metric][dimension]
+        entry[0] += count
+        entry[1] += total
+    return totals
+
+
+def histogram_percentile(bucket_counts: Dict[str, float], quantile: float) -> Optional[float]:
+    """由延遲直方圖以桶內線性插值估算百分位數"""
+    counts = [bucket_counts.get(str(bound), 0) for bound in LATENCY_BUCKETS_MS]
+    counts.append(bucket_counts.get(INF_BUCKET, 0))
+    total = sum(counts)
+    if total == 0:
+        return None
+
+    rank = quantile * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if count and cumulative + count >= rank:
+            if index == len(LATENCY_BUCKETS_MS):
+                # +Inf 桶沒有上界，返回最後一個有限上界
+                return float(LATENCY_BUCKETS_MS[-1])
+            lower = LATENCY_BUCKETS_MS[index - 1] if index else 0
+            upper = LATENCY_BUCKETS_MS[index]
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+    return float(LATENCY_BUCKETS_MS[-1])
+
+
+def count_above(bucket_counts: Dict[str, float], threshold_ms: float) -> int:
+    """統計延遲超過門檻（需為桶上界）的請求數"""
+    return int(
+        sum(
+            count
+            for bucket, count in bucket_counts.items()
+            if bucket == INF_BUCKET or float(bucket) > threshold_ms
+        )
+    )
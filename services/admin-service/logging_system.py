@@ -2,15 +2,28 @@ import asyncio
 import inspect
 import json
 import logging
+import os
+import time
 import traceback
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import wraps
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from fastapi import Request
 
-from .database import SessionLocal
+from .database import SessionLocal, engine
+from .log_rollups import (
+    METRIC_API_LATENCY,
+    METRIC_ERROR_CODE,
+    METRIC_ERROR_RESOURCE,
+    compute_rollup_deltas,
+    count_above,
+    histogram_percentile,
+    load_rollups,
+    prune_rollups,
+    upsert_rollups,
+)
 from .models import LogLevel, SystemLog
 from .schemas import SystemLogCreate
 
@@ -19,7 +32,11 @@ logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     handlers=[
-        logging.FileHandler("/data/data/com.termux/files/home/myProject/logs/admin_system.log"),
+        logging.FileHandler(
+            os.getenv(
+                "ADMIN_LOG_FILE", "/data/data/com.termux/files/home/myProject/logs/admin_system.log"
+            )
+        ),
         logging.StreamHandler(),
     ],
 )
@@ -28,13 +45,41 @@ logger = logging.getLogger(__name__)
 
 
 class StructuredLogger:
-    """結構化日誌記錄器"""
+    """結構化日誌記錄器
+
+    日誌先放入有界隊列，由背景寫入任務在累積到 batch_size 或等待超過
+    flush_interval 秒時，以單條多行 INSERT 寫入資料庫。請求路徑只做 put_nowait，
+    從不等待資料庫；隊列滿時丟棄最舊的日誌並計數（ERROR/CRITICAL 會擠掉較舊的日誌）。
+    """
+
+    def __init__(self, queue_size: int = 10000, batch_size: int = 500, flush_interval: float = 1.0):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # 秒
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._urgent = None  # asyncio.Event，有 ERROR/CRITICAL 日誌時立即刷新
+        self._stopping = False
+
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+            "queue_high_water": 0,
+            "last_flush_ms": 0.0,
+        }
 
-    def __init__(self):
-        self.batch_logs = []
-        self.batch_size = 10
-        self.batch_timeout = 30  # 秒
-        self._last_batch_time = datetime.utcnow()
+    def start(self):
+        """啟動背景寫入任務（需在事件循環中調用）"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._urgent = asyncio.Event()
+        if self._writer_task is None or self._writer_task.done():
+            self._stopping = False
+            self._writer_task = asyncio.create_task(self._writer_loop())
 
     async def log(
         self,
@@ -77,19 +122,12 @@ class StructuredLogger:
                 stack_trace=stack_trace,
             )
 
-            # 立即記錄重要日誌
-            if level in [LogLevel.ERROR, LogLevel.CRITICAL]:
-                await self._write_log_to_db(log_entry)
-            else:
-                # 批量處理其他日誌
-                self.batch_logs.append(log_entry)
-
-                # 檢查是否需要批量寫入
-                if (
-                    len(self.batch_logs) >= self.batch_size
-                    or (datetime.utcnow() - self._last_batch_time).seconds >= self.batch_timeout
-                ):
-                    await self._flush_batch_logs()
+            # Core INSERT 需要模型層的 LogLevel 成員
+            row = log_entry.dict()
+            row["level"] = LogLevel(log_entry.level.value)
+            # 記錄產生時間而非寫入時間，彙總才能落在正確的分鐘桶
+            row["created_at"] = datetime.utcnow()
+            self._enqueue(row, urgent=row["level"] in (LogLevel.ERROR, LogLevel.CRITICAL))
 
             # 同時寫入標準日誌
             getattr(logging.getLogger(resource_type), level.value)(
@@ -102,45 +140,100 @@ class StructuredLogger:
             logger.error(f"記錄日誌失敗: {e}")
             return False
 
-    async def _write_log_to_db(self, log_entry: SystemLogCreate):
-        """寫入日誌到資料庫"""
-        db = SessionLocal()
-        try:
-            log_obj = SystemLog(**log_entry.dict())
-            db.add(log_obj)
-            db.commit()
-        except Exception as e:
-            logger.error(f"寫入日誌到資料庫失敗: {e}")
-            db.rollback()
-        finally:
-            db.close()
+    def _enqueue(self, row: Dict[str, Any], urgent: bool = False):
+        """非阻塞地放入隊列；隊列已滿時丟棄最舊的一條"""
+        self.start()
 
-    async def _flush_batch_logs(self):
-        """批量寫入日誌"""
-        if not self.batch_logs:
-            return
+        if self._queue.full():
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.stats["dropped"] += 1
+            except asyncio.QueueEmpty:
+                pass
+
+        self._queue.put_nowait(row)
+        self.stats["enqueued"] += 1
+        self.stats["queue_high_water"] = max(self.stats["queue_high_water"], self._queue.qsize())
+
+        if urgent or self._queue.qsize() >= self.batch_size:
+            self._urgent.set()
+
+    async def _writer_loop(self):
+        """背景寫入任務：按數量或時間觸發批量寫入"""
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._urgent.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._urgent.clear()
 
-        db = SessionLocal()
-        try:
-            for log_entry in self.batch_logs:
-                log_obj = SystemLog(**log_entry.dict())
-                db.add(log_obj)
+                while not self._queue.empty():
+                    await self._flush_batch_logs()
+
+            except Exception as e:
+                logger.error(f"日誌寫入任務異常: {e}")
+
+            # 先清空隊列再檢查停止標記：任務尚未開始運行就被 close() 時也不會丟失日誌
+            if self._stopping:
+                return
 
-            db.commit()
-            logger.info(f"批量寫入 {len(self.batch_logs)} 條日誌")
+    async def _flush_batch_logs(self):
+        """從隊列取出最多 batch_size 條日誌並批量寫入"""
+        batch: List[Dict[str, Any]] = []
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
 
-            self.batch_logs.clear()
-            self._last_batch_time = datetime.utcnow()
+        if not batch:
+            return
 
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._bulk_insert, batch)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
         except Exception as e:
+            self.stats["failed"] += len(batch)
             logger.error(f"批量寫入日誌失敗: {e}")
-            db.rollback()
         finally:
-            db.close()
+            self.stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            for _ in batch:
+                self._queue.task_done()
+
+    @staticmethod
+    def _bulk_insert(rows: List[Dict[str, Any]]):
+        """以單條多行 INSERT ... VALUES 寫入，並在同一交易內累加每分鐘彙總（在工作線程中執行）"""
+        with engine.begin() as conn:
+            conn.execute(SystemLog.__table__.insert(), rows)
+            upsert_rollups(conn, compute_rollup_deltas(rows))
 
     async def flush(self):
         """強制刷新所有待處理日誌"""
-        await self._flush_batch_logs()
+        if self._queue is None:
+            return
+        self.start()
+        self._urgent.set()
+        await self._queue.join()
+
+    async def close(self):
+        """刷新剩餘日誌並停止背景寫入任務"""
+        if self._writer_task is None:
+            return
+        # 以停止標記結束循環，而非 cancel()，確保退出前已清空隊列
+        self._stopping = True
+        self._urgent.set()
+        await self._writer_task
+        self._writer_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取寫入統計"""
+        return {
+            **self.stats,
+            "queue_size": self._queue.qsize() if self._queue else 0,
+            "queue_capacity": self.queue_size,
+            "writer_running": self._writer_task is not None and not self._writer_task.done(),
+        }
 
 
 # 全域日誌記錄器實例
@@ -423,106 +516,66 @@ def log_function_call(action: str = None, resource_type: str = "function"):
 
 
 class LogAnalyzer:
-    """日誌分析器"""
+    """日誌分析器
+
+    只讀取 log_metric_rollups 每分鐘彙總，查詢成本與時間窗內的分鐘數成正比，與日誌量無關。
+    """
 
     def __init__(self):
         pass
 
     async def get_error_statistics(self, hours: int = 24) -> Dict[str, Any]:
         """獲取錯誤統計"""
-        db = SessionLocal()
-
-        try:
-            start_time = datetime.utcnow() - timedelta(hours=hours)
-
-            # 錯誤總數
-            total_errors = (
-                db.query(SystemLog)
-                .filter(
-                    SystemLog.level.in_([LogLevel.ERROR, LogLevel.CRITICAL]),
-                    SystemLog.created_at >= start_time,
-                )
-                .count()
-            )
-
-            # 按錯誤類型分組
-            error_types = (
-                db.query(SystemLog.error_code, db.func.count(SystemLog.id).label("count"))
-                .filter(
-                    SystemLog.level.in_([LogLevel.ERROR, LogLevel.CRITICAL]),
-                    SystemLog.created_at >= start_time,
-                    SystemLog.error_code.isnot(None),
-                )
-                .group_by(SystemLog.error_code)
-                .all()
-            )
-
-            # 按資源類型分組
-            resource_errors = (
-                db.query(SystemLog.resource_type, db.func.count(SystemLog.id).label("count"))
-                .filter(
-                    SystemLog.level.in_([LogLevel.ERROR, LogLevel.CRITICAL]),
-                    SystemLog.created_at >= start_time,
-                )
-                .group_by(SystemLog.resource_type)
-                .all()
-            )
-
-            return {
-                "total_errors": total_errors,
-                "timeframe_hours": hours,
-                "error_types": [{"type": et.error_code, "count": et.count} for et in error_types],
-                "resource_errors": [
-                    {"resource": re.resource_type, "count": re.count} for re in resource_errors
-                ],
-            }
+        start_time = datetime.utcnow() - timedelta(hours=hours)
+        rollups = await asyncio.to_thread(
+            self._load_rollups, (METRIC_ERROR_CODE, METRIC_ERROR_RESOURCE), start_time
+        )
 
-        finally:
-            db.close()
+        error_types = rollups[METRIC_ERROR_CODE]
+        resource_errors = rollups[METRIC_ERROR_RESOURCE]
+
+        return {
+            # 每條錯誤日誌恰好計入一個資源類型
+            "total_errors": int(sum(count for count, _ in resource_errors.values())),
+            "timeframe_hours": hours,
+            "error_types": [
+                {"type": code, "count": int(count)} for code, (count, _) in error_types.items()
+            ],
+            "resource_errors": [
+                {"resource": resource, "count": int(count)}
+                for resource, (count, _) in resource_errors.items()
+            ],
+        }
 
     async def get_performance_metrics(self, hours: int = 24) -> Dict[str, Any]:
-        """獲取性能指標"""
-        db = SessionLocal()
+        """獲取性能指標（百分位數由延遲直方圖估算）"""
+        start_time = datetime.utcnow() - timedelta(hours=hours)
+        rollups = await asyncio.to_thread(self._load_rollups, (METRIC_API_LATENCY,), start_time)
+
+        latency = rollups[METRIC_API_LATENCY]
+        bucket_counts = {bucket: count for bucket, (count, _) in latency.items()}
+        request_count = int(sum(bucket_counts.values()))
+        total_ms = sum(total for _, total in latency.values())
+
+        def percentile(quantile: float) -> float:
+            value = histogram_percentile(bucket_counts, quantile)
+            return round(value, 2) if value is not None else 0
+
+        return {
+            "avg_response_time_ms": total_ms / request_count if request_count else 0,
+            "p50_response_time_ms": percentile(0.50),
+            "p95_response_time_ms": percentile(0.95),
+            "p99_response_time_ms": percentile(0.99),
+            "slow_requests": count_above(bucket_counts, 5000),  # 超過5秒
+            "total_requests": request_count,
+            "timeframe_hours": hours,
+        }
 
+    @staticmethod
+    def _load_rollups(metrics, start_time: datetime):
+        db = SessionLocal()
         try:
-            start_time = datetime.utcnow() - timedelta(hours=hours)
-
-            # 平均響應時間
-            avg_response_time = (
-                db.query(db.func.avg(SystemLog.duration_ms))
-                .filter(
-                    SystemLog.action == "api_request",
-                    SystemLog.created_at >= start_time,
-                    SystemLog.duration_ms.isnot(None),
-                )
-                .scalar()
-            )
-
-            # 慢請求數量
-            slow_requests = (
-                db.query(SystemLog)
-                .filter(
-                    SystemLog.action == "api_request",
-                    SystemLog.duration_ms > 5000,  # 超過5秒
-                    SystemLog.created_at >= start_time,
-                )
-                .count()
-            )
-
-            # 請求量統計
-            request_count = (
-                db.query(SystemLog)
-                .filter(SystemLog.action == "api_request", SystemLog.created_at >= start_time)
-                .count()
-            )
-
-            return {
-                "avg_response_time_ms": float(avg_response_time) if avg_response_time else 0,
-                "slow_requests": slow_requests,
-                "total_requests": request_count,
-                "timeframe_hours": hours,
-            }
-
+            return load_rollups(db, metrics, start_time)
         finally:
             db.close()
 
@@ -540,16 +593,22 @@ async def cleanup_old_logs(days: int = 30):
         cutoff_date = datetime.utcnow() - timedelta(days=days)
 
         deleted_count = db.query(SystemLog).filter(SystemLog.created_at < cutoff_date).delete()
+        # 彙總使用相同的保留期，儀表板不會統計到已刪除的日誌
+        pruned_rollups = prune_rollups(db, cutoff_date)
 
         db.commit()
 
-        logger.info(f"清理了 {deleted_count} 條超過 {days} 天的舊日誌")
+        logger.info(f"清理了 {deleted_count} 條超過 {days} 天的舊日誌, {pruned_rollups} 條彙總")
 
         await structured_logger.log(
             action="log_cleanup",
             resource_type="system",
             message=f"清理了 {deleted_count} 條舊日誌",
-            details={"days": days, "deleted_count": deleted_count},
+            details={
+                "days": days,
+                "deleted_count": deleted_count,
+                "pruned_rollups": pruned_rollups,
+            },
             level=LogLevel.INFO,
         )
 
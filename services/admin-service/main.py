@@ -90,10 +90,20 @@ security = HTTPBearer()
 # 初始化資料庫
 @app.on_event("startup")
 async def startup_event():
+    from .logging_system import structured_logger
+
     init_db()
+    structured_logger.start()
     logger.info("後台管理系統 API 啟動完成")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    from .logging_system import structured_logger
+
+    await structured_logger.close()
+
+
 # 依賴項：獲取當前用戶
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
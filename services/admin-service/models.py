@@ -6,11 +6,15 @@ from sqlalchemy import (
     Column,
     DateTime,
     Enum,
+    Float,
+    ForeignKey,
     Integer,
     String,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 Base = declarative_base()
@@ -221,6 +225,28 @@ class SystemLog(Base):
         return f"<SystemLog(action={self.action}, level={self.level}, user={self.username})>"
 
 
+class LogMetricRollup(Base):
+    """日誌指標每分鐘彙總表（由日誌寫入任務增量更新）"""
+
+    __tablename__ = "log_metric_rollups"
+    __table_args__ = (
+        UniqueConstraint("bucket_start", "metric", "dimension", name="uq_log_metric_rollup"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, nullable=False, index=True)  # 分鐘起始時間 (UTC)
+    metric = Column(String(50), nullable=False)  # level / error_code / api_latency_ms ...
+    dimension = Column(String(200), nullable=False)  # 維度值，延遲直方圖為桶上界
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)  # 數值總和（如延遲毫秒）
+
+    def __repr__(self):
+        return (
+            f"<LogMetricRollup(bucket={self.bucket_start}, metric={self.metric}, "
+            f"dimension={self.dimension}, count={self.count})>"
+        )
+
+
 class CrawlerResult(Base):
     """爬蟲結果表"""
 
@@ -5,6 +5,7 @@ API 安全防護 - 限流器
 
 import asyncio
 import logging
+import math
 import time
 from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
@@ -12,6 +13,7 @@ from enum import Enum
 from typing import Dict, Optional, Tuple
 
 import redis
+import redis.asyncio as aioredis
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
 
@@ -32,8 +34,9 @@ class WindowType(Enum):
     """時間窗口類型"""
 
     FIXED = "fixed"  # 固定窗口
-    SLIDING = "sliding"  # 滑動窗口
-    TOKEN_BUCKET = "token_bucket"  # 令牌桶
+    SLIDING = "sliding"  # 滑動窗口（前後兩個固定窗口加權的近似計數）
+    TOKEN_BUCKET = "token_bucket"  # 令牌桶（以 GCRA 實現）
+    GCRA = "gcra"  # 通用信元速率算法
 
 
 @dataclass
@@ -58,6 +61,103 @@ class RateLimitResult:
     retry_after: Optional[int] = None  # 重試間隔（秒）
 
 
+# 所有 Lua 腳本都以 Redis 伺服器時間計算，每次檢查只需一次原子往返，每個鍵只佔 O(1) 記憶體。
+# 浮點數以字串返回，避免被 Redis 截斷為整數。
+
+# GCRA：鍵只保存理論到達時間 (TAT)
+# ARGV: emission_interval, burst
+# 返回: {allowed, remaining, retry_after, reset_after}
+GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+
+local new_tat = tat + emission
+local allow_at = new_tat - emission * burst
+if allow_at > now then
+    return {0, 0, tostring(allow_at - now), tostring(tat - now)}
+end
+
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+local remaining = math.floor((now - allow_at) / emission)
+return {1, remaining, '0', tostring(new_tat - now)}
+"""
+
+# 近似滑動窗口：鍵為 hash {w: 當前窗口編號, c: 當前窗口計數, p: 前一窗口計數}
+# ARGV: window_seconds, limit
+# 返回: {allowed, remaining, retry_after, reset_after}
+SLIDING_WINDOW_SCRIPT = """
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local current_window = math.floor(now / window)
+local elapsed = now - current_window * window
+
+local state = redis.call('HMGET', KEYS[1], 'w', 'c', 'p')
+local stored_window = tonumber(state[1])
+local current = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+if stored_window ~= current_window then
+    if stored_window == current_window - 1 then
+        previous = current
+    else
+        previous = 0
+    end
+    current = 0
+end
+
+local weight = 1 - elapsed / window
+local estimate = previous * weight + current
+if estimate + 1 > limit then
+    local retry_after = window - elapsed
+    if current + 1 <= limit and previous > 0 then
+        retry_after = math.max(0, window * (1 - (limit - current - 1) / previous) - elapsed)
+    end
+    return {0, 0, tostring(retry_after), tostring(window - elapsed)}
+end
+
+current = current + 1
+redis.call('HSET', KEYS[1], 'w', current_window, 'c', current, 'p', previous)
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 2000))
+local remaining = math.floor(limit - (previous * weight + current))
+return {1, remaining, '0', tostring(window - elapsed)}
+"""
+
+# 固定窗口：鍵為 {key}，值為窗口編號與計數
+# ARGV: window_seconds, limit
+# 返回: {allowed, remaining, retry_after, reset_after}
+FIXED_WINDOW_SCRIPT = """
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local current_window = math.floor(now / window)
+local reset_after = (current_window + 1) * window - now
+
+local state = redis.call('HMGET', KEYS[1], 'w', 'c')
+local count = 0
+if tonumber(state[1]) == current_window then
+    count = tonumber(state[2]) or 0
+end
+
+if count + 1 > limit then
+    return {0, 0, tostring(reset_after), tostring(reset_after)}
+end
+
+count = count + 1
+redis.call('HSET', KEYS[1], 'w', current_window, 'c', count)
+redis.call('PEXPIRE', KEYS[1], math.ceil(reset_after * 1000))
+return {1, limit - count, '0', tostring(reset_after)}
+"""
+
+
 class RateLimiter:
     """限流器"""
 
@@ -68,15 +168,28 @@ class RateLimiter:
         Args:
             redis_url: Redis 連接 URL
         """
+        # 內存降級存儲：每個鍵只保存固定大小的狀態
+        self._memory_store: Dict[str, list] = {}
+        self._memory_checks = 0
+        self.memory_sweep_interval = 10000  # 每 N 次檢查清理一次過期鍵
+
         try:
+            # 同步客戶端只用於黑名單等管理操作；請求路徑使用異步客戶端
             self.redis_client = redis.from_url(redis_url, decode_responses=True)
             # 測試連接
             self.redis_client.ping()
+            self.async_redis = aioredis.from_url(redis_url, decode_responses=True)
+            self._scripts = {
+                WindowType.GCRA: self.async_redis.register_script(GCRA_SCRIPT),
+                WindowType.TOKEN_BUCKET: self.async_redis.register_script(GCRA_SCRIPT),
+                WindowType.SLIDING: self.async_redis.register_script(SLIDING_WINDOW_SCRIPT),
+                WindowType.FIXED: self.async_redis.register_script(FIXED_WINDOW_SCRIPT),
+            }
             logger.info("Rate limiter Redis 連接成功")
         except Exception as e:
             logger.warning(f"Rate limiter Redis 連接失敗，使用內存存儲: {e}")
             self.redis_client = None
-            self._memory_store = {}
+            self.async_redis = None
 
         # 預設限流配置
         self.default_limits = {
@@ -155,70 +268,41 @@ class RateLimiter:
 
         return ip, user_id, api_key
 
+    @staticmethod
+    def _script_args(limit: RateLimit) -> list:
+        """各算法 Lua 腳本的參數"""
+        if limit.window_type in (WindowType.GCRA, WindowType.TOKEN_BUCKET):
+            emission_interval = limit.window_seconds / limit.limit
+            return [emission_interval, limit.burst_limit or limit.limit]
+        return [limit.window_seconds, limit.limit]
+
+    @staticmethod
+    def _build_result(
+        limit: RateLimit, allowed: bool, remaining: int, retry_after: float, reset_after: float
+    ) -> RateLimitResult:
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit.limit,
+            remaining=max(0, int(remaining)),
+            reset_time=datetime.fromtimestamp(time.time() + reset_after),
+            retry_after=None if allowed else max(1, math.ceil(retry_after)),
+        )
+
+    async def _check_limit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        """按可用的存儲檢查限流"""
+        if self.async_redis:
+            return await self._check_limit_redis(key, limit)
+        return await self._check_limit_memory(key, limit)
+
     async def _check_limit_redis(self, key: str, limit: RateLimit) -> RateLimitResult:
-        """使用 Redis 檢查限流"""
+        """使用 Redis 檢查限流（單次原子 Lua 腳本往返）"""
         try:
-            pipe = self.redis_client.pipeline()
-            now = time.time()
-            window_start = now - limit.window_seconds
-
-            if limit.window_type == WindowType.SLIDING:
-                # 滑動窗口算法
-                pipe.zremrangebyscore(key, 0, window_start)  # 清理過期記錄
-                pipe.zcard(key)  # 獲取當前計數
-                pipe.zadd(key, {str(now): now})  # 添加當前請求
-                pipe.expire(key, limit.window_seconds)  # 設置過期時間
-
-                results = pipe.execute()
-                current_count = results[1] + 1  # +1 因為剛添加了當前請求
-
-            elif limit.window_type == WindowType.FIXED:
-                # 固定窗口算法
-                window_key = f"{key}:{int(now // limit.window_seconds)}"
-                pipe.incr(window_key)
-                pipe.expire(window_key, limit.window_seconds)
-                results = pipe.execute()
-                current_count = results[0]
-
-            elif limit.window_type == WindowType.TOKEN_BUCKET:
-                # 令牌桶算法
-                bucket_key = f"{key}:bucket"
-
-                # 獲取當前桶狀態
-                bucket_data = self.redis_client.hgetall(bucket_key)
-                if bucket_data:
-                    last_refill = float(bucket_data.get("last_refill", now))
-                    tokens = float(bucket_data.get("tokens", limit.limit))
-                else:
-                    last_refill = now
-                    tokens = limit.limit
-
-                # 計算需要添加的令牌數
-                time_passed = now - last_refill
-                tokens_to_add = time_passed * (limit.limit / limit.window_seconds)
-                tokens = min(limit.limit, tokens + tokens_to_add)
-
-                if tokens >= 1:
-                    tokens -= 1
-                    pipe.hset(bucket_key, mapping={"tokens": tokens, "last_refill": now})
-                    pipe.expire(bucket_key, limit.window_seconds * 2)
-                    pipe.execute()
-                    current_count = limit.limit - int(tokens)
-                else:
-                    current_count = limit.limit + 1  # 超過限制
-
-            # 計算結果
-            allowed = current_count <= limit.limit
-            remaining = max(0, limit.limit - current_count)
-            reset_time = datetime.fromtimestamp(now + limit.window_seconds)
-            retry_after = limit.window_seconds if not allowed else None
-
-            return RateLimitResult(
-                allowed=allowed,
-                limit=limit.limit,
-                remaining=remaining,
-                reset_time=reset_time,
-                retry_after=retry_after,
+            script = self._scripts[limit.window_type]
+            allowed, remaining, retry_after, reset_after = await script(
+                keys=[f"{key}:{limit.window_type.value}"], args=self._script_args(limit)
+            )
+            return self._build_result(
+                limit, bool(allowed), int(remaining), float(retry_after), float(reset_after)
             )
 
         except Exception as e:
@@ -232,42 +316,84 @@ class RateLimiter:
             )
 
     async def _check_limit_memory(self, key: str, limit: RateLimit) -> RateLimitResult:
-        """使用內存檢查限流"""
+        """使用內存檢查限流（與 Redis 腳本相同的算法，每個鍵 O(1) 狀態）"""
         now = time.time()
 
-        if key not in self._memory_store:
-            self._memory_store[key] = []
-
-        # 清理過期記錄
-        window_start = now - limit.window_seconds
-        self._memory_store[key] = [
-            timestamp for timestamp in self._memory_store[key] if timestamp > window_start
-        ]
-
-        # 檢查限制
-        current_count = len(self._memory_store[key])
-
-        if current_count < limit.limit:
-            self._memory_store[key].append(now)
-            allowed = True
-            remaining = limit.limit - current_count - 1
-        else:
-            allowed = False
-            remaining = 0
-
-        reset_time = datetime.fromtimestamp(
-            min(self._memory_store[key]) + limit.window_seconds
-            if self._memory_store[key]
-            else now + limit.window_seconds
-        )
-
-        return RateLimitResult(
-            allowed=allowed,
-            limit=limit.limit,
-            remaining=remaining,
-            reset_time=reset_time,
-            retry_after=limit.window_seconds if not allowed else None,
-        )
+        self._memory_checks += 1
+        if self._memory_checks % self.memory_sweep_interval == 0:
+            self._sweep_memory_store(now)
+
+        store_key = f"{key}:{limit.window_type.value}"
+        if limit.window_type in (WindowType.GCRA, WindowType.TOKEN_BUCKET):
+            return self._gcra_memory(store_key, limit, now)
+        if limit.window_type == WindowType.FIXED:
+            return self._fixed_window_memory(store_key, limit, now)
+        return self._sliding_window_memory(store_key, limit, now)
+
+    def _gcra_memory(self, key: str, limit: RateLimit, now: float) -> RateLimitResult:
+        emission_interval, burst = self._script_args(limit)
+        state = self._memory_store.get(key)
+        tat = max(state[0], now) if state else now
+
+        new_tat = tat + emission_interval
+        allow_at = new_tat - emission_interval * burst
+        if allow_at > now:
+            return self._build_result(limit, False, 0, allow_at - now, tat - now)
+
+        # [tat, expires_at]
+        self._memory_store[key] = [new_tat, new_tat]
+        remaining = math.floor((now - allow_at) / emission_interval)
+        return self._build_result(limit, True, remaining, 0, new_tat - now)
+
+    def _sliding_window_memory(self, key: str, limit: RateLimit, now: float) -> RateLimitResult:
+        window = limit.window_seconds
+        current_window = math.floor(now / window)
+        elapsed = now - current_window * window
+
+        # [window_id, current, previous, expires_at]
+        state = self._memory_store.get(key)
+        current = previous = 0
+        if state:
+            if state[0] == current_window:
+                current, previous = state[1], state[2]
+            elif state[0] == current_window - 1:
+                previous = state[1]
+
+        weight = 1 - elapsed / window
+        estimate = previous * weight + current
+        if estimate + 1 > limit.limit:
+            retry_after = window - elapsed
+            if current + 1 <= limit.limit and previous > 0:
+                retry_after = max(
+                    0, window * (1 - (limit.limit - current - 1) / previous) - elapsed
+                )
+            return self._build_result(limit, False, 0, retry_after, window - elapsed)
+
+        current += 1
+        self._memory_store[key] = [current_window, current, previous, now + window * 2]
+        remaining = math.floor(limit.limit - (previous * weight + current))
+        return self._build_result(limit, True, remaining, 0, window - elapsed)
+
+    def _fixed_window_memory(self, key: str, limit: RateLimit, now: float) -> RateLimitResult:
+        window = limit.window_seconds
+        current_window = math.floor(now / window)
+        reset_after = (current_window + 1) * window - now
+
+        # [window_id, count, expires_at]
+        state = self._memory_store.get(key)
+        count = state[1] if state and state[0] == current_window else 0
+        if count + 1 > limit.limit:
+            return self._build_result(limit, False, 0, reset_after, reset_after)
+
+        count += 1
+        self._memory_store[key] = [current_window, count, now + reset_after]
+        return self._build_result(limit, True, limit.limit - count, 0, reset_after)
+
+    def _sweep_memory_store(self, now: float):
+        """清理已過期的內存限流狀態（每個狀態的最後一項為過期時間）"""
+        expired = [key for key, state in self._memory_store.items() if state[-1] <= now]
+        for key in expired:
+            del self._memory_store[key]
 
     async def check_rate_limit(self, request: Request) -> Optional[RateLimitResult]:
         """
@@ -331,10 +457,7 @@ class RateLimiter:
 
             # 執行所有檢查
             for key, limit_config in checks:
-                if self.redis_client:
-                    result = await self._check_limit_redis(key, limit_config)
-                else:
-                    result = await self._check_limit_memory(key, limit_config)
+                result = await self._check_limit(key, limit_config)
 
                 if not result.allowed:
                     # 記錄限流事件
@@ -422,6 +545,7 @@ class RateLimiter:
             "whitelist_count": len(self.whitelist_ips),
             "blacklist_count": len(self.blacklist_ips),
             "redis_connected": self.redis_client is not None,
+            "memory_keys": len(self._memory_store),
         }
 
 
@@ -497,10 +621,7 @@ def rate_limit(limit: int, window_seconds: int, window_type: WindowType = Window
                 ip, _, _ = rate_limiter._get_client_identifier(request)
                 key = rate_limiter._get_key(LimitType.ENDPOINT, ip, endpoint_key)
 
-                if rate_limiter.redis_client:
-                    result = await rate_limiter._check_limit_redis(key, temp_limit)
-                else:
-                    result = await rate_limiter._check_limit_memory(key, temp_limit)
+                result = await rate_limiter._check_limit(key, temp_limit)
 
                 if not result.allowed:
                     raise HTTPException(
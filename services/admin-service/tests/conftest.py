@@ -0,0 +1,46 @@
+"""
+admin-service 測試設定
+
+服務目錄名稱含連字號，模組之間使用相對導入；這裡把服務目錄註冊為 admin_service 套件，
+並在導入前把資料庫與日誌文件指向測試環境。
+"""
+
+import os
+import sys
+import types
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("ADMIN_LOG_FILE", os.devnull)
+
+if "admin_service" not in sys.modules:
+    package = types.ModuleType("admin_service")
+    package.__path__ = [str(SERVICE_DIR)]
+    sys.modules["admin_service"] = package
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """以臨時 SQLite 資料庫替換 logging_system 的引擎與會話（僅建立 system_logs）"""
+    from admin_service import logging_system
+    from admin_service.models import SystemLog
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'admin.db'}")
+    SystemLog.__table__.create(engine)
+    monkeypatch.setattr(logging_system, "engine", engine)
+    monkeypatch.setattr(logging_system, "SessionLocal", sessionmaker(bind=engine))
+    return engine
+
+
+@pytest.fixture
+def rollup_table(engine):
+    from admin_service.models import LogMetricRollup
+
+    LogMetricRollup.__table__.create(engine)
+    return engine
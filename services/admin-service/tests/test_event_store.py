@@ -0,0 +1,123 @@
+"""
+行為事件存儲查詢測試
+
+覆蓋 recent / since / count_since 等窗口查詢，並以 100 萬事件驗證查詢不需全量掃描。
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from behavior.event_store import BehaviorEventStore
+from behavior.models import ActionType, UserAction
+
+BASE = datetime(2026, 10, 1)
+TYPES = [ActionType.PAGE_VIEW, ActionType.CLICK, ActionType.ERROR, ActionType.SCROLL]
+
+
+def make_action(i: int, seconds: float = 60) -> UserAction:
+    return UserAction(
+        action_id=f"a{i}",
+        user_id=f"user{i % 7}",
+        session_id=f"session{i % 11}",
+        action_type=TYPES[i % len(TYPES)],
+        timestamp=BASE + timedelta(seconds=i * seconds),
+        page_url=f"/page/{i % 5}",
+    )
+
+
+@pytest.fixture
+def store():
+    # 每分鐘一個事件、每 10 分鐘一個分區，共 60 個事件 / 6 個分區
+    store = BehaviorEventStore(partition_minutes=10)
+    store.extend(make_action(i) for i in range(60))
+    return store
+
+
+def test_recent_matches_deque_tail(store):
+    assert [a.action_id for a in store.recent(15)] == [f"a{i}" for i in range(45, 60)]
+    assert [a.action_id for a in store.recent(100)] == [a.action_id for a in store]
+    assert store.recent(0) == []
+
+
+def test_since_is_half_open_and_ordered(store):
+    window = store.since(BASE + timedelta(minutes=5), BASE + timedelta(minutes=25))
+    assert [a.action_id for a in window] == [f"a{i}" for i in range(5, 25)]
+    assert store.count_since(BASE + timedelta(minutes=5), BASE + timedelta(minutes=25)) == 20
+
+    assert [a.action_id for a in store.since(BASE + timedelta(minutes=58))] == ["a58", "a59"]
+    assert store.since(BASE + timedelta(hours=2)) == []
+    assert store.count_since(BASE - timedelta(days=1)) == 60
+
+
+def test_since_filters_by_action_type(store):
+    start, end = BASE + timedelta(minutes=3), BASE + timedelta(minutes=33)
+    expected = [
+        a.action_id
+        for a in store
+        if start <= a.timestamp < end and a.action_type in (ActionType.ERROR, ActionType.PAGE_VIEW)
+    ]
+
+    actions = store.since(start, end, action_types=[ActionType.ERROR, ActionType.PAGE_VIEW])
+    assert [a.action_id for a in actions] == expected
+    assert store.count_since(start, end, [ActionType.ERROR, ActionType.PAGE_VIEW]) == len(expected)
+    assert store.count_since(start, action_types=[ActionType.HOVER]) == 0
+
+
+def test_distinct_users_window(store):
+    # 第 0~2 分鐘只有 user0..user2
+    assert store.distinct_users_since(BASE, BASE + timedelta(minutes=3)) == {
+        "user0",
+        "user1",
+        "user2",
+    }
+    assert store.count_users_since(BASE + timedelta(minutes=30)) == 7
+    assert len(store.user_actions("user3", limit=None)) == 9
+
+
+def test_window_queries_load_spilled_partitions(tmp_path):
+    store = BehaviorEventStore(partition_minutes=10, max_memory_events=20, spill_dir=str(tmp_path))
+    store.extend(make_action(i) for i in range(60))
+    assert store.get_stats()["spilled_partitions"] == 4
+
+    # recent 只看內存分區，時間窗口查詢按需加載溢寫分區
+    assert [a.action_id for a in store.recent(3)] == ["a57", "a58", "a59"]
+    assert [a.action_id for a in store.since(BASE, BASE + timedelta(minutes=3))] == [
+        "a0",
+        "a1",
+        "a2",
+    ]
+    assert store.count_since(BASE, action_types=[ActionType.CLICK]) == 15
+
+
+@pytest.mark.slow
+@pytest.mark.performance
+def test_window_queries_stay_sub_millisecond_at_one_million_events():
+    store = BehaviorEventStore()
+    # 100ms 一個事件，約 28 小時 / 28 個分區
+    for i in range(1_000_000):
+        store.append(make_action(i, seconds=0.1))
+    assert len(store) == 1_000_000
+
+    end = BASE + timedelta(seconds=100_000)
+
+    def best_of(query, runs=20):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            result = query()
+            timings.append(time.perf_counter() - started)
+        return min(timings), result
+
+    elapsed, recent = best_of(lambda: store.recent(100))
+    assert len(recent) == 100 and elapsed < 0.001
+
+    elapsed, window = best_of(lambda: store.since(end - timedelta(seconds=5)))
+    assert len(window) == 50 and elapsed < 0.001
+
+    elapsed, count = best_of(lambda: store.count_since(end - timedelta(hours=24), end))
+    assert count == 864_000 and elapsed < 0.001
+
+    elapsed, errors = best_of(lambda: store.count_since(BASE, action_types=[ActionType.ERROR]))
+    assert errors == 250_000 and elapsed < 0.001
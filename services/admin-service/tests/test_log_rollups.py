@@ -0,0 +1,182 @@
+"""
+日誌每分鐘彙總測試
+
+覆蓋批量寫入時的彙總累加、儀表板查詢、保留期清理，以及遷移回填與增量彙總的一致性。
+"""
+
+import importlib.util
+from datetime import datetime, timedelta
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import select
+
+from admin_service import log_rollups, logging_system
+from admin_service.models import LogLevel, LogMetricRollup, SystemLog
+
+from .conftest import SERVICE_DIR
+
+MIGRATION = SERVICE_DIR / "alembic" / "versions" / "20261018_006_add_log_metric_rollups_table.py"
+
+
+def log_row(created_at, level=LogLevel.INFO, **fields):
+    row = {
+        "user_id": None,
+        "username": None,
+        "action": "user_action",
+        "resource_type": "voice_model",
+        "resource_id": None,
+        "level": level,
+        "message": "test",
+        "details": None,
+        "ip_address": None,
+        "user_agent": None,
+        "request_id": None,
+        "session_id": None,
+        "duration_ms": None,
+        "status_code": None,
+        "error_code": None,
+        "stack_trace": None,
+        "created_at": created_at,
+    }
+    row.update(fields)
+    return row
+
+
+def api_request(created_at, duration_ms, **fields):
+    return log_row(created_at, action="api_request", duration_ms=duration_ms, **fields)
+
+
+def rollup_rows(engine):
+    table = LogMetricRollup.__table__
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(
+                table.c.bucket_start,
+                table.c.metric,
+                table.c.dimension,
+                table.c.count,
+                table.c.total,
+            )
+        )
+        return {(bucket, metric, dim): [count, total] for bucket, metric, dim, count, total in rows}
+
+
+def test_long_dimensions_are_hashed_not_merged():
+    prefix = "resource/" * 30
+    first, second = prefix + "a", prefix + "b"
+
+    assert log_rollups.rollup_dimension("voice_model") == "voice_model"
+    hashed = {log_rollups.rollup_dimension(first), log_rollups.rollup_dimension(second)}
+    assert len(hashed) == 2
+    assert all(len(value) == log_rollups.DIMENSION_MAX_LENGTH for value in hashed)
+    assert log_rollups.rollup_dimension(first) == log_rollups.rollup_dimension(first)
+
+    minute = datetime(2026, 10, 18, 10, 0)
+    deltas = log_rollups.compute_rollup_deltas(
+        [log_row(minute, resource_type=first), log_row(minute, resource_type=second)]
+    )
+    resources = [dim for (_, metric, dim) in deltas if metric == log_rollups.METRIC_RESOURCE]
+    assert sorted(resources) == sorted(hashed)
+
+
+def test_bulk_insert_accumulates_rollups(rollup_table):
+    minute = datetime(2026, 10, 18, 10, 0)
+    batch = [
+        log_row(minute.replace(second=5)),
+        log_row(minute.replace(second=30), LogLevel.ERROR, error_code="E42"),
+        api_request(minute.replace(second=45), 120),
+    ]
+
+    logging_system.StructuredLogger._bulk_insert(batch)
+    logging_system.StructuredLogger._bulk_insert([api_request(minute.replace(second=59), 80)])
+
+    rollups = rollup_rows(rollup_table)
+    assert rollups[(minute, "level", "info")] == [3, 0.0]
+    assert rollups[(minute, "level", "error")] == [1, 0.0]
+    assert rollups[(minute, "error_code", "E42")] == [1, 0.0]
+    assert rollups[(minute, "error_resource", "voice_model")] == [1, 0.0]
+    assert rollups[(minute, "api_latency_ms", "250")] == [1, 120.0]
+    assert rollups[(minute, "api_latency_ms", "100")] == [1, 80.0]
+
+
+@pytest.mark.asyncio
+async def test_dashboard_queries_read_rollups(rollup_table):
+    now = datetime.utcnow()
+    logging_system.StructuredLogger._bulk_insert(
+        [api_request(now, duration) for duration in (20, 40, 90, 400, 7000)]
+        + [
+            log_row(now, LogLevel.ERROR, error_code="E1", resource_type="crawler"),
+            log_row(now, LogLevel.CRITICAL, error_code="E1", resource_type="auth"),
+            log_row(now, LogLevel.ERROR, resource_type="crawler"),
+            # 時間窗口之外
+            log_row(now - timedelta(hours=30), LogLevel.ERROR, error_code="E9"),
+            api_request(now - timedelta(hours=30), 50_000),
+        ]
+    )
+    analyzer = logging_system.LogAnalyzer()
+
+    errors = await analyzer.get_error_statistics(hours=24)
+    assert errors["total_errors"] == 3
+    assert errors["error_types"] == [{"type": "E1", "count": 2}]
+    assert sorted(errors["resource_errors"], key=lambda e: e["resource"]) == [
+        {"resource": "auth", "count": 1},
+        {"resource": "crawler", "count": 2},
+    ]
+
+    performance = await analyzer.get_performance_metrics(hours=24)
+    assert performance["total_requests"] == 5
+    assert performance["avg_response_time_ms"] == pytest.approx(7550 / 5)
+    assert performance["slow_requests"] == 1
+    assert 25 < performance["p50_response_time_ms"] <= 100
+    assert 5000 < performance["p99_response_time_ms"] <= 10000
+
+
+@pytest.mark.asyncio
+async def test_cleanup_prunes_rollups_with_log_retention(rollup_table, monkeypatch):
+    now = datetime.utcnow()
+    logging_system.StructuredLogger._bulk_insert(
+        [log_row(now - timedelta(days=40)), api_request(now - timedelta(days=31), 10)]
+        + [log_row(now - timedelta(days=1))]
+    )
+    writer = logging_system.StructuredLogger()
+    monkeypatch.setattr(logging_system, "structured_logger", writer)
+
+    await logging_system.cleanup_old_logs(days=30)
+    await writer.close()
+
+    buckets = {bucket for bucket, _, _ in rollup_rows(rollup_table)}
+    cutoff = now - timedelta(days=30)
+    assert buckets and all(bucket >= log_rollups.minute_bucket(cutoff) for bucket in buckets)
+    with rollup_table.connect() as conn:
+        log_times = conn.execute(select(SystemLog.__table__.c.created_at)).scalars().all()
+    assert all(created_at >= cutoff for created_at in log_times)
+
+
+def test_migration_backfills_rollups_from_existing_logs(engine):
+    minute = datetime(2026, 10, 18, 9, 30)
+    rows = [
+        log_row(minute.replace(second=1)),
+        log_row(minute.replace(second=2), LogLevel.WARNING, resource_type="crawler"),
+        log_row(minute.replace(second=3), LogLevel.CRITICAL, error_code="E7"),
+        log_row(minute + timedelta(minutes=1), LogLevel.ERROR, error_code=""),
+        api_request(minute.replace(second=4), 5),
+        api_request(minute.replace(second=5), 6),
+        api_request(minute + timedelta(minutes=2), 90_000),
+    ]
+    with engine.begin() as conn:
+        conn.execute(SystemLog.__table__.insert(), rows)
+
+    spec = importlib.util.spec_from_file_location("rollups_migration", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+
+    expected = {
+        key: [count, float(total)]
+        for key, (count, total) in log_rollups.compute_rollup_deltas(rows).items()
+    }
+    assert rollup_rows(engine) == expected
@@ -0,0 +1,112 @@
+"""
+StructuredLogger 背景批量寫入測試
+
+覆蓋有界隊列、隊列滿時丟棄最舊日誌、按 batch_size 以 executemany 批量寫入、
+close() 時刷新剩餘日誌，以及寫入統計。
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import event, select
+
+from admin_service import logging_system
+from admin_service.models import LogLevel, SystemLog
+
+
+def stored_messages(engine):
+    with engine.connect() as conn:
+        table = SystemLog.__table__
+        return conn.execute(select(table.c.message).order_by(table.c.id)).scalars().all()
+
+
+@pytest.fixture
+def inserts(rollup_table):
+    """記錄每次對 system_logs 的 INSERT：(是否 executemany, 行數)"""
+    calls = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO system_logs"):
+            calls.append((executemany, len(parameters) if executemany else 1))
+
+    event.listen(rollup_table, "before_cursor_execute", before_cursor_execute)
+    yield calls
+    event.remove(rollup_table, "before_cursor_execute", before_cursor_execute)
+
+
+async def log_messages(writer, count, level=LogLevel.INFO, start=0):
+    for i in range(start, start + count):
+        assert await writer.log("user_action", "voice_model", level=level, message=f"m{i}")
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest(rollup_table):
+    writer = logging_system.StructuredLogger(queue_size=3, batch_size=100, flush_interval=60)
+
+    # log() 不會讓出事件循環，背景任務在此期間無法寫入
+    await log_messages(writer, 5)
+    stats = writer.get_stats()
+    assert (stats["queue_size"], stats["queue_capacity"]) == (3, 3)
+    assert (stats["enqueued"], stats["dropped"], stats["queue_high_water"]) == (5, 2, 3)
+
+    await writer.close()
+    assert stored_messages(rollup_table) == ["m2", "m3", "m4"]
+
+
+@pytest.mark.asyncio
+async def test_writes_in_executemany_batches(rollup_table, inserts):
+    writer = logging_system.StructuredLogger(queue_size=100, batch_size=4, flush_interval=60)
+
+    await log_messages(writer, 10)
+    await writer.flush()
+
+    assert inserts == [(True, 4), (True, 4), (True, 2)]
+    assert writer.get_stats()["batches"] == 3
+    assert stored_messages(rollup_table) == [f"m{i}" for i in range(10)]
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_error_logs_flush_without_waiting_for_interval(rollup_table):
+    writer = logging_system.StructuredLogger(queue_size=100, batch_size=100, flush_interval=60)
+
+    await log_messages(writer, 2)
+    await log_messages(writer, 1, level=LogLevel.ERROR, start=2)
+    await asyncio.wait_for(writer._queue.join(), timeout=5)
+
+    assert stored_messages(rollup_table) == ["m0", "m1", "m2"]
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending_logs_and_stops_writer(rollup_table):
+    writer = logging_system.StructuredLogger(queue_size=100, batch_size=100, flush_interval=60)
+    await log_messages(writer, 5)
+    assert writer.get_stats()["writer_running"]
+    assert stored_messages(rollup_table) == []
+
+    await asyncio.wait_for(writer.close(), timeout=5)
+
+    assert stored_messages(rollup_table) == [f"m{i}" for i in range(5)]
+    stats = writer.get_stats()
+    assert (stats["written"], stats["queue_size"], stats["writer_running"]) == (5, 0, False)
+    # close() 可重複調用
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_batches_are_counted_and_drained(rollup_table, monkeypatch):
+    def fail(rows):
+        raise RuntimeError("database unavailable")
+
+    writer = logging_system.StructuredLogger(queue_size=100, batch_size=3, flush_interval=60)
+    monkeypatch.setattr(writer, "_bulk_insert", fail)
+
+    await log_messages(writer, 7)
+    await asyncio.wait_for(writer.flush(), timeout=5)
+
+    stats = writer.get_stats()
+    assert (stats["enqueued"], stats["written"], stats["failed"], stats["batches"]) == (7, 0, 7, 0)
+    assert stats["queue_size"] == 0 and stats["last_flush_ms"] >= 0
+    await writer.close()
+    assert stored_messages(rollup_table) == []
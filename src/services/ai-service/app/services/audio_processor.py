@@ -1,6 +1,9 @@
+import asyncio
 import os
+import sys
 import time
 import uuid
+from pathlib import Path
 from typing import Any, Dict
 
 import httpx
@@ -9,6 +12,16 @@ from fastapi import UploadFile
 
 from ..config import settings
 
+# 添加專案根目錄到Python路徑（本機為倉庫根目錄；映像內 src/shared 位於 /app，已在 PYTHONPATH）
+project_root = next(
+    (path for path in Path(__file__).resolve().parents if (path / "src" / "shared").is_dir()),
+    None,
+)
+if project_root and str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.shared.audio_probe import AudioProbeError, probe_audio  # noqa: E402
+
 logger = structlog.get_logger()
 
 
@@ -475,11 +488,15 @@ class AudioProcessor:
         return f"/storage/audio/{filename}"
 
     async def _get_audio_duration(self, audio_data: bytes) -> float:
-        """Get audio duration in seconds (placeholder implementation)"""
-        # This would use librosa or similar to get actual duration
-        # For now, estimate based on file size (rough approximation)
-        estimated_duration = len(audio_data) / (44100 * 2 * 2)  # Assume 44.1kHz, 16-bit stereo
-        return max(1.0, round(estimated_duration, 2))
+        """Get audio duration in seconds from the audio header"""
+        try:
+            info = await asyncio.to_thread(probe_audio, audio_data)
+            return round(info.duration, 2)
+        except AudioProbeError as e:
+            logger.warning("Audio header probe failed, estimating duration", error=str(e))
+            # Estimate based on data size, assuming 44.1kHz 16-bit stereo
+            estimated_duration = len(audio_data) / (44100 * 2 * 2)
+            return max(1.0, round(estimated_duration, 2))
 
     async def _analyze_voice_characteristics(self, audio_data: bytes) -> Dict[str, Any]:
         """Analyze voice characteristics for cloning"""
@@ -494,14 +511,25 @@ class AudioProcessor:
         }
 
     async def _analyze_audio_properties(self, audio_data: bytes) -> Dict[str, Any]:
-        """Analyze audio file properties"""
-        # This would use librosa or similar for actual analysis
+        """Analyze audio file properties from the audio header"""
+        try:
+            info = await asyncio.to_thread(probe_audio, audio_data)
+        except AudioProbeError as e:
+            logger.warning("Audio header probe failed, using defaults", error=str(e))
+            return {
+                "duration": await self._get_audio_duration(audio_data),
+                "format": "mp3",
+                "sample_rate": 44100,
+                "channels": 2,
+                "bitrate": 192,
+            }
+
         return {
-            "duration": await self._get_audio_duration(audio_data),
-            "format": "mp3",
-            "sample_rate": 44100,
-            "channels": 2,
-            "bitrate": 192,
+            "duration": round(info.duration, 2),
+            "format": info.format,
+            "sample_rate": info.sample_rate,
+            "channels": info.channels,
+            "bitrate": info.bitrate // 1000 if info.bitrate else None,
         }
 
     async def _calculate_similarity(self, reference: bytes, generated: bytes) -> float:
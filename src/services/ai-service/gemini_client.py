@@ -10,7 +10,7 @@ import json
 import logging
 import time
 from dataclasses import asdict, dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import aiohttp
 
@@ -80,29 +80,14 @@ class GeminiClient:
         if self.session:
             await self.session.close()
 
-    async def generate_content(
+    def _build_request_data(
         self,
         prompt: str,
-        model: str = "gemini-pro",
-        generation_config: GeminiGenerationConfig = None,
+        generation_config: GeminiGenerationConfig,
         system_instruction: str = None,
         images: List[bytes] = None,
-    ) -> GeminiResponse:
-        """生成內容"""
-        if not self.session:
-            raise RuntimeError("客戶端未初始化，請使用 async with")
-
-        if generation_config is None:
-            generation_config = GeminiGenerationConfig()
-
-        # 選擇模型
-        model_name = self.models.get(model, model)
-        if images and "vision" not in model_name:
-            model_name = self.models["gemini-pro-vision"]
-
-        logger.info(f"使用 Gemini 生成內容: {prompt[:50]}... (模型: {model_name})")
-
-        # 準備請求數據
+    ) -> Dict[str, Any]:
+        """準備 generateContent / streamGenerateContent 的請求數據"""
         contents = []
 
         # 系統指令
@@ -137,6 +122,34 @@ class GeminiClient:
             "generationConfig": asdict(generation_config),
         }
 
+        return request_data
+
+    async def generate_content(
+        self,
+        prompt: str,
+        model: str = "gemini-pro",
+        generation_config: GeminiGenerationConfig = None,
+        system_instruction: str = None,
+        images: List[bytes] = None,
+    ) -> GeminiResponse:
+        """生成內容"""
+        if not self.session:
+            raise RuntimeError("客戶端未初始化，請使用 async with")
+
+        if generation_config is None:
+            generation_config = GeminiGenerationConfig()
+
+        # 選擇模型
+        model_name = self.models.get(model, model)
+        if images and "vision" not in model_name:
+            model_name = self.models["gemini-pro-vision"]
+
+        logger.info(f"使用 Gemini 生成內容: {prompt[:50]}... (模型: {model_name})")
+
+        request_data = self._build_request_data(
+            prompt, generation_config, system_instruction, images
+        )
+
         start_time = time.time()
 
         try:
@@ -264,6 +277,73 @@ class GeminiClient:
                 error_message=str(e),
             )
 
+    async def stream_content(
+        self,
+        prompt: str,
+        model: str = "gemini-pro",
+        generation_config: GeminiGenerationConfig = None,
+        system_instruction: str = None,
+    ) -> AsyncIterator[str]:
+        """串流生成內容（streamGenerateContent, Server-Sent Events）
+
+        逐段產出模型輸出的文字；API 錯誤時拋出 RuntimeError。
+        """
+        if not self.session:
+            raise RuntimeError("客戶端未初始化，請使用 async with")
+
+        if generation_config is None:
+            generation_config = GeminiGenerationConfig()
+
+        model_name = self.models.get(model, model)
+        logger.info(f"使用 Gemini 串流生成內容: {prompt[:50]}... (模型: {model_name})")
+
+        request_data = self._build_request_data(prompt, generation_config, system_instruction)
+        url = f"{self.base_url}/models/{model_name}:streamGenerateContent"
+        params = {"key": self.api_key, "alt": "sse"}
+        start_time = time.time()
+        usage_metadata: Dict[str, Any] = {}
+
+        async with self.session.post(
+            url,
+            params=params,
+            json=request_data,
+            headers={"Content-Type": "application/json"},
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error(f"Gemini API 錯誤 {response.status}: {error_text}")
+                raise RuntimeError(f"API 錯誤: {response.status} - {error_text}")
+
+            # 每個事件為一行 "data: {...}"，內容與 generateContent 的回應相同
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+
+                chunk = json.loads(line[len("data:") :])
+                usage_metadata = chunk.get("usageMetadata", usage_metadata)
+                for candidate in chunk.get("candidates", [])[:1]:
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            yield part["text"]
+
+        if self._cost_tracker:
+            input_tokens = usage_metadata.get("promptTokenCount", 0)
+            output_tokens = usage_metadata.get("candidatesTokenCount", 0)
+            await self._cost_tracker.track_api_call(
+                provider="google",
+                model=model_name,
+                operation_type="text_generation",
+                tokens_used=usage_metadata.get("totalTokenCount", input_tokens + output_tokens),
+                success=True,
+                metadata={
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                    "duration": time.time() - start_time,
+                    "streamed": True,
+                },
+            )
+
     async def chat(
         self,
         messages: List[GeminiMessage],
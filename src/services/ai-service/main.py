@@ -5,6 +5,7 @@ AI Service - 真實的AI服務整合
 """
 
 import os
+import json
 import logging
 from datetime import datetime
 from typing import Optional, List
@@ -12,6 +13,7 @@ from typing import Optional, List
 import uvicorn
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 # 導入共享模組
@@ -43,6 +45,8 @@ except AttributeError:
 
 # 導入共享模組
 from src.shared.config import get_service_settings
+from src.shared.ai_service_client import ParagraphBuffer
+from src.shared.service_client import DeadlineMiddleware
 
 # 設置日誌
 logging.basicConfig(level=logging.INFO)
@@ -71,6 +75,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 繼承上游的請求截止時間，已逾時的請求直接返回 504
+app.add_middleware(DeadlineMiddleware)
+
 # API金鑰配置
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 SUNO_API_KEY = os.getenv("SUNO_API_KEY")
@@ -146,34 +153,21 @@ async def root():
     }
 
 
-# 腳本生成端點
-@app.post("/api/v1/generate/script")
-async def generate_script(request: ScriptGenerationRequest):
-    """使用Gemini Pro生成影片腳本"""
-    
-    if not GEMINI_API_KEY:
-        raise HTTPException(
-            status_code=503,
-            detail="Gemini API key not configured"
-        )
+def _script_system_instruction(request: ScriptGenerationRequest) -> str:
+    """根據平台和風格組成腳本生成的系統指令"""
+    platform_styles = {
+        "youtube": "創作適合YouTube的教育性內容，包含引人入勝的開場、清晰的結構和號召行動",
+        "tiktok": "創作適合TikTok的短影片內容，節奏快、抓住注意力、適合垂直螢幕",
+        "instagram": "創作適合Instagram的視覺導向內容，美觀、簡潔、適合方形格式"
+    }
     
-    logger.info(f"Generating script for topic: {request.topic}")
+    style_instructions = {
+        "educational": "採用教育性風格，清楚解釋概念，提供有價值的資訊",
+        "entertaining": "採用娛樂性風格，幽默風趣，讓觀眾感到愉快",
+        "promotional": "採用宣傳性風格，突出產品或服務的優勢，說服觀眾採取行動"
+    }
     
-    try:
-        # 根據平台和風格調整系統指令
-        platform_styles = {
-            "youtube": "創作適合YouTube的教育性內容，包含引人入勝的開場、清晰的結構和號召行動",
-            "tiktok": "創作適合TikTok的短影片內容，節奏快、抓住注意力、適合垂直螢幕",
-            "instagram": "創作適合Instagram的視覺導向內容，美觀、簡潔、適合方形格式"
-        }
-        
-        style_instructions = {
-            "educational": "採用教育性風格，清楚解釋概念，提供有價值的資訊",
-            "entertaining": "採用娛樂性風格，幽默風趣，讓觀眾感到愉快",
-            "promotional": "採用宣傳性風格，突出產品或服務的優勢，說服觀眾採取行動"
-        }
-        
-        system_instruction = f"""
+    return f"""
         你是專業的{request.platform}內容創作者。
         
         任務：為主題「{request.topic}」創作一個{request.style}風格的{request.duration}秒影片腳本。
@@ -188,6 +182,40 @@ async def generate_script(request: ScriptGenerationRequest):
         
         請以自然的說話方式撰寫，避免過於正式的書面語。
         """
+
+
+def _script_data(request: ScriptGenerationRequest, script: str, usage_metadata=None) -> dict:
+    """腳本生成結果"""
+    # 估算說話時間 (假設每分鐘150個中文字)
+    word_count = len(script)
+    estimated_duration = round((word_count / 150) * 60)
+    
+    return {
+        "script": script,
+        "word_count": word_count,
+        "estimated_duration_seconds": estimated_duration,
+        "platform": request.platform,
+        "style": request.style,
+        "generated_at": datetime.utcnow().isoformat(),
+        "usage_metadata": usage_metadata or {},
+    }
+
+
+# 腳本生成端點
+@app.post("/api/v1/generate/script")
+async def generate_script(request: ScriptGenerationRequest):
+    """使用Gemini Pro生成影片腳本"""
+    
+    if not GEMINI_API_KEY:
+        raise HTTPException(
+            status_code=503,
+            detail="Gemini API key not configured"
+        )
+    
+    logger.info(f"Generating script for topic: {request.topic}")
+    
+    try:
+        system_instruction = _script_system_instruction(request)
         
         # 調用Gemini API
         async with GeminiClient(api_key=GEMINI_API_KEY) as client:
@@ -207,21 +235,9 @@ async def generate_script(request: ScriptGenerationRequest):
                     detail=f"Script generation failed: {result.error_message}"
                 )
             
-            # 估算說話時間 (假設每分鐘150個中文字)
-            word_count = len(result.text)
-            estimated_duration = round((word_count / 150) * 60)
-            
             return {
                 "success": True,
-                "data": {
-                    "script": result.text,
-                    "word_count": word_count,
-                    "estimated_duration_seconds": estimated_duration,
-                    "platform": request.platform,
-                    "style": request.style,
-                    "generated_at": datetime.utcnow().isoformat(),
-                    "usage_metadata": result.usage_metadata,
-                }
+                "data": _script_data(request, result.text, result.usage_metadata)
             }
             
     except Exception as e:
@@ -232,6 +248,70 @@ async def generate_script(request: ScriptGenerationRequest):
         )
 
 
+# 串流腳本生成端點
+@app.post("/api/v1/generate/script/stream")
+async def generate_script_stream(request: ScriptGenerationRequest):
+    """串流生成影片腳本（NDJSON）
+
+    每完成一個段落輸出 {"type": "paragraph", "index": i, "text": ...}，
+    結束時輸出 {"type": "done", "data": ...}，失敗時輸出 {"type": "error", "message": ...}。
+    """
+    
+    if not GEMINI_API_KEY:
+        raise HTTPException(
+            status_code=503,
+            detail="Gemini API key not configured"
+        )
+    
+    logger.info(f"Streaming script for topic: {request.topic}")
+    system_instruction = _script_system_instruction(request)
+    
+    async def events():
+        buffer = ParagraphBuffer()
+        chunks = []
+        index = 0
+        
+        def paragraph_lines(paragraphs):
+            nonlocal index
+            for paragraph in paragraphs:
+                yield json.dumps(
+                    {"type": "paragraph", "index": index, "text": paragraph},
+                    ensure_ascii=False
+                ) + "\n"
+                index += 1
+        
+        try:
+            async with GeminiClient(api_key=GEMINI_API_KEY) as client:
+                async for text in client.stream_content(
+                    prompt=f"請為主題「{request.topic}」創作影片腳本",
+                    system_instruction=system_instruction,
+                    generation_config=GeminiGenerationConfig(
+                        temperature=0.7,
+                        max_output_tokens=1024,
+                        top_p=0.8
+                    )
+                ):
+                    chunks.append(text)
+                    for line in paragraph_lines(buffer.feed(text)):
+                        yield line
+            
+            for line in paragraph_lines(buffer.flush()):
+                yield line
+            yield json.dumps(
+                {"type": "done", "data": _script_data(request, "".join(chunks))},
+                ensure_ascii=False
+            ) + "\n"
+            
+        except Exception as e:
+            logger.error(f"Script streaming error: {e}")
+            yield json.dumps(
+                {"type": "error", "message": f"Script generation failed: {str(e)}"},
+                ensure_ascii=False
+            ) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 # 圖像生成端點
 @app.post("/api/v1/generate/image")
 async def generate_image(request: ImageGenerationRequest):
@@ -61,6 +61,25 @@ class Settings(BaseSettings):
     # Request Configuration
     service_timeout: int = int(os.getenv("SERVICE_TIMEOUT", "30"))
 
+    # Upstream connection pool (per service)
+    proxy_connect_timeout: float = float(os.getenv("PROXY_CONNECT_TIMEOUT", "5"))
+    proxy_max_connections: int = int(os.getenv("PROXY_MAX_CONNECTIONS", "200"))
+    proxy_max_keepalive_connections: int = int(os.getenv("PROXY_MAX_KEEPALIVE_CONNECTIONS", "50"))
+    proxy_keepalive_expiry: float = float(os.getenv("PROXY_KEEPALIVE_EXPIRY", "30"))
+
+    # Upstream load balancing
+    # Comma-separated instance URLs per service; empty means the single *_SERVICE_URL
+    auth_service_urls: str = os.getenv("AUTH_SERVICE_URLS", "")
+    data_service_urls: str = os.getenv("DATA_SERVICE_URLS", "")
+    inference_service_urls: str = os.getenv("INFERENCE_SERVICE_URLS", "")
+    proxy_load_balance_strategy: str = os.getenv("PROXY_LOAD_BALANCE_STRATEGY", "least_connections")
+    proxy_max_requests_per_upstream: int = int(os.getenv("PROXY_MAX_REQUESTS_PER_UPSTREAM", "100"))
+    proxy_outlier_consecutive_failures: int = int(
+        os.getenv("PROXY_OUTLIER_CONSECUTIVE_FAILURES", "5")
+    )
+    proxy_outlier_ejection_seconds: float = float(os.getenv("PROXY_OUTLIER_EJECTION_SECONDS", "30"))
+    proxy_health_check_interval: int = int(os.getenv("PROXY_HEALTH_CHECK_INTERVAL", "30"))
+
     # File Upload Limits
     max_upload_size_mb: int = int(os.getenv("MAX_UPLOAD_SIZE_MB", "100"))
     allowed_file_extensions: List[str] = os.getenv(
@@ -7,6 +7,7 @@ from slowapi.errors import RateLimitExceeded
 
 from .config import settings
 from .middleware import LoggingMiddleware
+from .proxy import proxy
 from .rate_limiter import custom_rate_limit_exceeded_handler, limiter
 from .routers import admin_router, auth_router, data_router, inference_router
 from .security import (
@@ -48,10 +49,14 @@ async def lifespan(app: FastAPI):
         if settings.ssl_enabled:
             raise
 
+    # Register upstream instances and start active health checks
+    await proxy.start()
+
     yield
 
     # Shutdown
     logger.info("Shutting down API Gateway")
+    await proxy.close()
 
 
 app = FastAPI(
@@ -1,24 +1,300 @@
-from typing import Any, Dict
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 
 import httpx
 import structlog
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
 from .config import settings
 
+# Make the shared library importable: the repository root locally, /app in the
+# image (which ships src/shared and already has /app on PYTHONPATH)
+project_root = next(
+    (path for path in Path(__file__).resolve().parents if (path / "src" / "shared").is_dir()),
+    None,
+)
+if project_root and str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.shared.service_discovery import (  # noqa: E402
+    LoadBalanceStrategy,
+    OutlierDetectionConfig,
+    ServiceDiscovery,
+    ServiceInstance,
+    ServiceStatus,
+)
+
 logger = structlog.get_logger()
 
+# Request headers forwarded to internal services
+FORWARDED_HEADERS = [
+    "authorization",
+    "content-type",
+    "user-agent",
+    "x-forwarded-for",
+    "x-real-ip",
+]
+
+# Additional request headers needed to pass a body through unchanged
+STREAM_FORWARDED_HEADERS = FORWARDED_HEADERS + [
+    "accept",
+    "accept-encoding",
+    "content-encoding",
+    "content-length",
+]
+
+# Hop-by-hop headers that must not be relayed back to the client
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+}
+
+
+def _filter_headers(headers, allowed) -> Dict[str, str]:
+    """Pick the allowed headers (case-insensitive) from a header mapping"""
+    if not headers:
+        return {}
+    lowered = {key.lower(): value for key, value in headers.items()}
+    return {header: lowered[header] for header in allowed if header in lowered}
+
+
+def _split_urls(urls: str, default: str) -> List[str]:
+    """Parse a comma-separated URL list, falling back to a single URL"""
+    parsed = [url.strip().rstrip("/") for url in urls.split(",") if url.strip()]
+    return parsed or [default.rstrip("/")]
+
 
 class ServiceProxy:
-    """Proxy requests to internal services"""
+    """Proxy requests to internal services
+
+    Upstream instances are registered with a ``ServiceDiscovery`` and each
+    request is routed to the instance picked by its load balancer. Instances
+    that keep returning 5xx responses or timing out are ejected for a while,
+    and an instance at its concurrency limit receives no new requests. Each
+    instance gets one long-lived ``httpx.AsyncClient`` so that TCP connections
+    are kept alive and reused.
+    """
 
     def __init__(self):
-        self.service_urls = {
-            "auth": settings.auth_service_url,
-            "data": settings.data_service_url,
-            "inference": settings.inference_service_url,
+        self.upstream_urls = {
+            "auth": _split_urls(settings.auth_service_urls, settings.auth_service_url),
+            "data": _split_urls(settings.data_service_urls, settings.data_service_url),
+            "inference": _split_urls(
+                settings.inference_service_urls, settings.inference_service_url
+            ),
         }
-        self.timeout = httpx.Timeout(settings.service_timeout)
+        self.timeout = httpx.Timeout(
+            settings.service_timeout, connect=settings.proxy_connect_timeout
+        )
+        self.limits = httpx.Limits(
+            max_connections=settings.proxy_max_connections,
+            max_keepalive_connections=settings.proxy_max_keepalive_connections,
+            keepalive_expiry=settings.proxy_keepalive_expiry,
+        )
+        self.discovery = ServiceDiscovery(
+            load_balance_strategy=LoadBalanceStrategy(settings.proxy_load_balance_strategy),
+            outlier_detection=OutlierDetectionConfig(
+                consecutive_failures=settings.proxy_outlier_consecutive_failures,
+                base_ejection_time=settings.proxy_outlier_ejection_seconds,
+            ),
+        )
+        self.discovery.health_checker.check_interval = settings.proxy_health_check_interval
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._registered = False
+
+    async def _register_upstreams(self):
+        """Register the configured upstream instances with service discovery"""
+        if self._registered:
+            return
+        self._registered = True
+
+        for service, urls in self.upstream_urls.items():
+            for url in urls:
+                parsed = urlparse(url)
+                # Static upstreams are routable until a health check says otherwise
+                await self.discovery.registry.register(
+                    ServiceInstance(
+                        service_name=service,
+                        host=parsed.hostname,
+                        port=parsed.port or (443 if parsed.scheme == "https" else 80),
+                        scheme=parsed.scheme or "http",
+                        status=ServiceStatus.HEALTHY,
+                        max_connections=settings.proxy_max_requests_per_upstream,
+                    )
+                )
+
+    async def start(self):
+        """Register upstreams and start active health checks"""
+        await self._register_upstreams()
+        await self.discovery.start()
+
+    def get_client(self, base_url: str) -> httpx.AsyncClient:
+        """Get the pooled client for an upstream instance, creating it on first use"""
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+            self._clients[base_url] = client
+        return client
+
+    async def close(self):
+        """Stop health checks and close all pooled clients"""
+        await self.discovery.stop()
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    async def _acquire(self, service: str) -> ServiceInstance:
+        """Pick an upstream instance for a service (counted as an active request)"""
+        if service not in self.upstream_urls:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Service '{service}' not found",
+            )
+
+        await self._register_upstreams()
+        instance = await self.discovery.get_service_instance(service)
+        if instance is None:
+            logger.warning("No upstream available", service=service)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Service {service} is at capacity",
+            )
+        return instance
+
+    async def _send(
+        self,
+        service: str,
+        method: str,
+        path: str,
+        stream: bool = False,
+        **kwargs,
+    ) -> Tuple[httpx.Response, ServiceInstance]:
+        """Send a request to a load-balanced upstream and report the outcome
+
+        5xx responses, timeouts and connection errors count as failures for
+        outlier detection. The instance is released on every path, including
+        cancellation, except a successful ``stream`` send: streaming callers
+        must release it once the body is consumed.
+        """
+        instance = await self._acquire(service)
+        client = self.get_client(instance.url)
+        start = time.perf_counter()
+        handed_off = False
+
+        try:
+            try:
+                response = await client.send(
+                    client.build_request(method, path, **kwargs), stream=stream
+                )
+            except httpx.RequestError:
+                await self.discovery.report_result(instance, False, time.perf_counter() - start)
+                raise
+
+            await self.discovery.report_result(
+                instance, response.status_code < 500, time.perf_counter() - start
+            )
+            handed_off = stream
+            return response, instance
+        finally:
+            if not handed_off:
+                await self.discovery.release_connection(instance)
+
+    async def stream_request(
+        self,
+        service: str,
+        path: str,
+        request: Request,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> StreamingResponse:
+        """Stream a request body to an internal service and its response back
+
+        Neither body is buffered or decoded; the upstream connection is
+        returned to the pool once the client has received the response.
+        """
+        try:
+            response, instance = await self._send(
+                service,
+                request.method,
+                path,
+                stream=True,
+                headers=_filter_headers(request.headers, STREAM_FORWARDED_HEADERS),
+                params=params if params is not None else request.query_params,
+                content=request.stream(),
+            )
+        except httpx.TimeoutException:
+            logger.error(
+                "Service request timeout",
+                service=service,
+                path=path,
+                timeout=settings.service_timeout,
+            )
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=f"Service '{service}' request timed out",
+            )
+        except httpx.RequestError as e:
+            logger.error(
+                "Service request error",
+                service=service,
+                path=path,
+                error=str(e),
+            )
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Service {service} is unavailable",
+            )
+
+        logger.info(
+            "Service request",
+            service=service,
+            upstream=instance.url,
+            method=request.method,
+            path=path,
+            status_code=response.status_code,
+            streamed=True,
+        )
+
+        released = False
+
+        async def release():
+            nonlocal released
+            if not released:
+                released = True
+                await response.aclose()
+                await self.discovery.release_connection(instance)
+
+        async def body():
+            try:
+                async for chunk in response.aiter_raw():
+                    yield chunk
+            finally:
+                await release()
+
+        return StreamingResponse(
+            body(),
+            status_code=response.status_code,
+            headers={
+                key: value
+                for key, value in response.headers.items()
+                if key.lower() not in HOP_BY_HOP_HEADERS
+            },
+            background=BackgroundTask(release),
+        )
 
     async def forward_request(
         self,
@@ -30,69 +306,52 @@ class ServiceProxy:
         json_data: Dict[str, Any] = None,
         files: Dict[str, Any] = None,
         content: bytes = None,
+        timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
-        """Forward request to internal service"""
+        """Forward request to internal service and decode the response"""
 
-        if service not in self.service_urls:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Service '{service}' not found"
-            )
-
-        service_url = self.service_urls[service]
-        full_url = f"{service_url}{path}"
-
-        # Prepare headers
-        request_headers = {}
-        if headers:
-            # Forward specific headers
-            forwarded_headers = [
-                "authorization",
-                "content-type",
-                "user-agent",
-                "x-forwarded-for",
-                "x-real-ip",
-            ]
-            for header in forwarded_headers:
-                if header in headers:
-                    request_headers[header] = headers[header]
+        request_headers = _filter_headers(headers, FORWARDED_HEADERS)
+        request_timeout = httpx.Timeout(timeout) if timeout is not None else self.timeout
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.request(
-                    method=method,
-                    url=full_url,
-                    headers=request_headers,
-                    params=params,
-                    json=json_data,
-                    files=files,
-                    content=content,
-                )
+            response, instance = await self._send(
+                service,
+                method,
+                path,
+                headers=request_headers,
+                params=params,
+                json=json_data,
+                files=files,
+                content=content,
+                timeout=request_timeout,
+            )
 
-                # Log the request
-                logger.info(
-                    "Service request",
-                    service=service,
-                    method=method,
-                    path=path,
-                    status_code=response.status_code,
-                    response_time=response.elapsed.total_seconds(),
-                )
+            # Log the request
+            logger.info(
+                "Service request",
+                service=service,
+                upstream=instance.url,
+                method=method,
+                path=path,
+                status_code=response.status_code,
+                response_time=response.elapsed.total_seconds(),
+            )
 
-                # Handle different response types
-                if response.status_code == 204:
-                    return {"status": "success", "data": None}
+            # Handle different response types
+            if response.status_code == 204:
+                return {"status": "success", "data": None}
 
-                try:
-                    response_data = response.json()
-                except Exception:
-                    response_data = {"message": response.text}
+            try:
+                response_data = response.json()
+            except Exception:
+                response_data = {"message": response.text}
 
-                return {
-                    "status_code": response.status_code,
-                    "data": response_data,
-                    "headers": dict(response.headers),
-                }
+            return {
+                "status_code": response.status_code,
+                "data": response_data,
+                "headers": dict(response.headers),
+                "response_time": response.elapsed.total_seconds(),
+            }
 
         except httpx.TimeoutException:
             logger.error(
@@ -119,17 +378,30 @@ class ServiceProxy:
             )
 
     async def health_check_service(self, service: str) -> bool:
-        """Check if service is healthy"""
-        if service not in self.service_urls:
+        """Check if any instance of the service is healthy"""
+        if service not in self.upstream_urls:
             return False
 
-        try:
-            service_url = self.service_urls[service]
-            async with httpx.AsyncClient(timeout=httpx.Timeout(5.0)) as client:
-                response = await client.get(f"{service_url}/health")
-                return response.status_code == 200
-        except Exception:
-            return False
+        await self._register_upstreams()
+        healthy = False
+        for instance in await self.discovery.registry.get_all_instances(service):
+            try:
+                client = self.get_client(instance.url)
+                response = await client.get("/health", timeout=httpx.Timeout(5.0))
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+            instance.status = ServiceStatus.HEALTHY if ok else ServiceStatus.UNHEALTHY
+            healthy = healthy or ok
+        return healthy
+
+    async def get_upstream_stats(self) -> Dict[str, Any]:
+        """Per-instance load, latency and ejection state for every service"""
+        await self._register_upstreams()
+        return {
+            service: await self.discovery.get_service_stats(service)
+            for service in self.upstream_urls
+        }
 
     async def forward_file_request(
         self,
@@ -141,60 +413,44 @@ class ServiceProxy:
     ) -> Dict[str, Any]:
         """Forward file upload request to internal service"""
 
-        if service not in self.service_urls:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Service '{service}' not found"
-            )
-
-        service_url = self.service_urls[service]
-        full_url = f"{service_url}{path}"
-
         # Prepare headers (remove content-type for multipart)
-        request_headers = {}
-        if headers:
-            forwarded_headers = [
-                "authorization",
-                "user-agent",
-                "x-forwarded-for",
-                "x-real-ip",
-            ]
-            for header in forwarded_headers:
-                if header in headers:
-                    request_headers[header] = headers[header]
+        request_headers = _filter_headers(
+            headers, [header for header in FORWARDED_HEADERS if header != "content-type"]
+        )
 
         try:
             # Prepare file for forwarding
             files = {"file": (file.filename, file.file, file.content_type)}
 
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.request(
-                    method=method,
-                    url=full_url,
-                    headers=request_headers,
-                    files=files,
-                )
+            response, instance = await self._send(
+                service,
+                method,
+                path,
+                headers=request_headers,
+                files=files,
+            )
 
-                logger.info(
-                    "File upload request",
-                    service=service,
-                    method=method,
-                    path=path,
-                    filename=file.filename,
-                    status_code=response.status_code,
-                    response_time=response.elapsed.total_seconds(),
-                )
+            logger.info(
+                "File upload request",
+                service=service,
+                upstream=instance.url,
+                method=method,
+                path=path,
+                filename=file.filename,
+                status_code=response.status_code,
+                response_time=response.elapsed.total_seconds(),
+            )
 
-                try:
-                    response_data = response.json()
-                except Exception:
-                    response_data = {"message": response.text}
+            try:
+                response_data = response.json()
+            except Exception:
+                response_data = {"message": response.text}
 
-                return {
-                    "status_code": response.status_code,
-                    "data": response_data,
-                    "headers": dict(response.headers),
-                }
+            return {
+                "status_code": response.status_code,
+                "data": response_data,
+                "headers": dict(response.headers),
+            }
 
         except httpx.TimeoutException:
             logger.error(
@@ -224,4 +480,4 @@ class ServiceProxy:
 
 
 # Global proxy instance
-proxy = ServiceProxy()
\ No newline at end of file
+proxy = ServiceProxy()
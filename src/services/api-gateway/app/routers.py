@@ -77,16 +77,7 @@ async def get_profile(
     request: Request, current_user: dict = Depends(get_current_user)
 ):
     """Get current user profile"""
-    result = await proxy.forward_request(
-        service="auth",
-        path="/api/v1/me",
-        method="GET",
-        headers=dict(request.headers),
-    )
-
-    return JSONResponse(
-        status_code=result["status_code"], content=result["data"]
-    )
+    return await proxy.stream_request("auth", "/api/v1/me", request)
 
 
 @auth_router.put("/me")
@@ -95,18 +86,7 @@ async def update_profile(
     request: Request, current_user: dict = Depends(get_current_user)
 ):
     """Update user profile"""
-    body = await request.json()
-    result = await proxy.forward_request(
-        service="auth",
-        path="/api/v1/me",
-        method="PUT",
-        headers=dict(request.headers),
-        json_data=body,
-    )
-
-    return JSONResponse(
-        status_code=result["status_code"], content=result["data"]
-    )
+    return await proxy.stream_request("auth", "/api/v1/me", request)
 
 
 # Data processing routes
@@ -116,19 +96,8 @@ async def upload_data(
     request: Request, current_user: dict = Depends(get_current_user)
 ):
     """Upload data for processing"""
-    # Handle file upload
-    form = await request.form()
-    result = await proxy.forward_request(
-        service="data",
-        path="/api/v1/upload",
-        method="POST",
-        headers=dict(request.headers),
-        form_data=form,
-    )
-
-    return JSONResponse(
-        status_code=result["status_code"], content=result["data"]
-    )
+    # Stream the multipart body through without parsing the form
+    return await proxy.stream_request("data", "/api/v1/upload", request)
 
 
 @data_router.get("/status/{task_id}")
@@ -137,16 +106,7 @@ async def get_processing_status(
     task_id: str, request: Request, current_user: dict = Depends(get_current_user)
 ):
     """Get processing status"""
-    result = await proxy.forward_request(
-        service="data",
-        path=f"/api/v1/status/{task_id}",
-        method="GET",
-        headers=dict(request.headers),
-    )
-
-    return JSONResponse(
-        status_code=result["status_code"], content=result["data"]
-    )
+    return await proxy.stream_request("data", f"/api/v1/status/{task_id}", request)
 
 
 # Inference routes
@@ -156,18 +116,7 @@ async def generate_content(
     request: Request, current_user: dict = Depends(get_current_user)
 ):
     """Generate content using AI models"""
-    body = await request.json()
-    result = await proxy.forward_request(
-        service="inference",
-        path="/api/v1/generate",
-        method="POST",
-        headers=dict(request.headers),
-        json_data=body,
-    )
-
-    return JSONResponse(
-        status_code=result["status_code"], content=result["data"]
-    )
+    return await proxy.stream_request("inference", "/api/v1/generate", request)
 
 
 @inference_router.get("/models")
@@ -176,16 +125,7 @@ async def list_models(
     request: Request, current_user: dict = Depends(get_current_user)
 ):
     """List available AI models"""
-    result = await proxy.forward_request(
-        service="inference",
-        path="/api/v1/models",
-        method="GET",
-        headers=dict(request.headers),
-    )
-
-    return JSONResponse(
-        status_code=result["status_code"], content=result["data"]
-    )
+    return await proxy.stream_request("inference", "/api/v1/models", request)
 
 
 # Admin routes
@@ -242,6 +182,7 @@ async def admin_stats(
                 "total_requests": 0,
                 "active_users": 0,
                 "system_load": "low"
-            }
+            },
+            "upstreams": await proxy.get_upstream_stats(),
         }
     )
\ No newline at end of file
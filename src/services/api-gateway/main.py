@@ -26,11 +26,12 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.shared.database.connection import get_db
+from src.shared.database.connection import get_db, get_pool_stats, get_read_db
 from src.shared.database.models import User, Video, VideoStatus, ProcessingTask, TaskStatus
+from src.shared.database.pagination import InvalidCursorError, keyset_page, keyset_paginate
 from src.shared.config import get_service_settings
 from src.shared.security import verify_password, get_password_hash, create_access_token
-from src.shared.ai_service_client import get_ai_client
+from src.shared.ai_service_client import close_ai_client, get_ai_client
 
 # 導入路由模組
 from routers.mock_data import router as mock_data_router
@@ -153,6 +154,12 @@ async def get_current_user(
     return user
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """關閉AI服務客戶端的連線池"""
+    await close_ai_client()
+
+
 # 健康檢查端點
 @app.get("/health")
 async def health_check():
@@ -165,6 +172,15 @@ async def health_check():
     }
 
 
+@app.get("/metrics/database")
+async def database_metrics():
+    """資料庫連接池統計（取得等待時間、持有時間、逾時次數）"""
+    return {
+        "success": True,
+        "data": get_pool_stats(),
+    }
+
+
 @app.get("/")
 async def root():
     """根端點"""
@@ -322,13 +338,29 @@ async def get_current_user_info(
 async def list_videos(
     limit: int = 10,
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """獲取用戶影片列表"""
-    videos = db.query(Video).filter(
-        Video.user_id == current_user.id
-    ).offset(offset).limit(limit).all()
+    """獲取用戶影片列表（新到舊）
+
+    以 next_cursor 取得下一頁（keyset 分頁，使用 ix_videos_user_created 索引）；
+    offset 僅為舊客戶端保留。
+    """
+    query = db.query(Video).filter(Video.user_id == current_user.id)
+    sort_columns = [Video.created_at, Video.id]
+    next_cursor = None
+    
+    if offset and not cursor:
+        videos = query.order_by(
+            Video.created_at.desc(), Video.id.desc()
+        ).offset(offset).limit(limit).all()
+    else:
+        try:
+            rows = keyset_paginate(query, sort_columns, cursor, limit).all()
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        videos, next_cursor = keyset_page(rows, sort_columns, limit)
     
     total_count = db.query(Video).filter(
         Video.user_id == current_user.id
@@ -353,8 +385,10 @@ async def list_videos(
         "data": {
             "videos": video_responses,
             "total": total_count,
-            "page": offset // limit + 1,
+            # 以游標翻頁時沒有頁碼
+            "page": None if cursor else offset // limit + 1,
             "per_page": limit,
+            "next_cursor": next_cursor,
         }
     }
 
@@ -464,7 +498,7 @@ async def get_video(
 async def get_dashboard_analytics(
     period: str = "7d",
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """獲取儀表板分析數據"""
     
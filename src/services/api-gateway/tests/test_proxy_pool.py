@@ -0,0 +1,383 @@
+"""
+測試 proxy 模組（服務連線池與串流轉發）
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from app.config import settings
+from app.proxy import ServiceProxy
+from fastapi import FastAPI, HTTPException, Request
+
+
+class _Body(httpx.AsyncByteStream):
+    """未預先讀取的回應內容，行為與真實連線相同"""
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    async def __aiter__(self):
+        yield self.content
+
+
+def _response(status_code: int, content: bytes = b"", headers=None) -> httpx.Response:
+    return httpx.Response(status_code, stream=_Body(content), headers=headers)
+
+
+def _mock_client(handler, base_url: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=base_url)
+
+
+def _proxy(**upstreams) -> ServiceProxy:
+    """建立以模擬傳輸取代各上游實例連線的 proxy
+
+    upstreams: 服務名稱 -> {實例 URL: handler}
+    """
+    service_proxy = ServiceProxy()
+    for service, handlers in upstreams.items():
+        service_proxy.upstream_urls[service] = list(handlers)
+        for url, handler in handlers.items():
+            service_proxy._clients[url] = _mock_client(handler, url)
+    return service_proxy
+
+
+def _gateway_app(service_proxy: ServiceProxy) -> FastAPI:
+    """僅含一個串流轉發路由的最小閘道"""
+    app = FastAPI()
+
+    @app.api_route("/proxy/{path:path}", methods=["GET", "POST", "PUT"])
+    async def forward(path: str, request: Request):
+        return await service_proxy.stream_request("auth", f"/{path}", request)
+
+    return app
+
+
+AUTH_1 = "http://auth-1:8001"
+AUTH_2 = "http://auth-2:8001"
+
+
+class TestServiceProxyPool:
+    @pytest.mark.asyncio
+    async def test_client_is_reused_per_upstream(self):
+        service_proxy = ServiceProxy()
+        try:
+            client = service_proxy.get_client(AUTH_1)
+            assert service_proxy.get_client(AUTH_1) is client
+            assert service_proxy.get_client(AUTH_2) is not client
+            assert client.timeout.connect == service_proxy.timeout.connect
+        finally:
+            await service_proxy.close()
+
+        assert service_proxy._clients == {}
+
+    @pytest.mark.asyncio
+    async def test_unknown_service(self):
+        with pytest.raises(HTTPException) as exc_info:
+            await ServiceProxy().forward_request("billing", "/", "GET")
+        assert exc_info.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_forward_request_uses_pooled_client(self):
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append((str(request.url), request.headers.get("authorization")))
+            return _response(200, b'{"ok": true}', {"content-type": "application/json"})
+
+        service_proxy = _proxy(auth={AUTH_1: handler})
+        for _ in range(3):
+            result = await service_proxy.forward_request(
+                "auth", "/api/v1/me", "GET", headers={"Authorization": "Bearer t", "Host": "x"}
+            )
+            assert result["status_code"] == 200
+            assert result["data"] == {"ok": True}
+        await service_proxy.close()
+
+        assert seen == [(f"{AUTH_1}/api/v1/me", "Bearer t")] * 3
+
+    @pytest.mark.asyncio
+    async def test_stream_request_passes_bodies_through(self):
+        received = {}
+        upstream_body = b'{"id": 1,   "name": "unchanged"}'
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            received["body"] = await request.aread()
+            received["headers"] = request.headers
+            received["url"] = str(request.url)
+            return _response(
+                201,
+                upstream_body,
+                {"content-type": "application/json", "x-request-id": "abc"},
+            )
+
+        service_proxy = _proxy(auth={AUTH_1: handler})
+        transport = httpx.ASGITransport(app=_gateway_app(service_proxy))
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+            response = await client.post(
+                "/proxy/api/v1/me?verbose=1",
+                content=b"\x00raw-bytes\xff",
+                headers={
+                    "content-type": "application/octet-stream",
+                    "authorization": "Bearer t",
+                    "cookie": "session=secret",
+                },
+            )
+        stats = await service_proxy.get_upstream_stats()
+        await service_proxy.close()
+
+        assert response.status_code == 201
+        assert response.content == upstream_body
+        assert response.headers["x-request-id"] == "abc"
+        assert received["body"] == b"\x00raw-bytes\xff"
+        assert received["url"] == f"{AUTH_1}/api/v1/me?verbose=1"
+        assert received["headers"]["authorization"] == "Bearer t"
+        assert "cookie" not in received["headers"]
+        # 串流結束後釋放上游實例
+        assert stats["auth"]["instances"][0]["connections"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_request_timeout(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        service_proxy = _proxy(auth={AUTH_1: handler})
+        transport = httpx.ASGITransport(app=_gateway_app(service_proxy))
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+            response = await client.get("/proxy/api/v1/me")
+        await service_proxy.close()
+
+        assert response.status_code == 504
+
+    @pytest.mark.asyncio
+    async def test_health_check_service(self):
+        service_proxy = _proxy(
+            auth={AUTH_1: lambda request: httpx.Response(200)},
+            data={"http://data-1:8002": lambda request: httpx.Response(503)},
+        )
+
+        assert await service_proxy.health_check_service("auth") is True
+        assert await service_proxy.health_check_service("data") is False
+        assert await service_proxy.health_check_service("billing") is False
+        await service_proxy.close()
+
+
+def _counting_handler(hits: dict, name: str, status_code: int = 200, latency: float = 0.0):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        hits[name] = hits.get(name, 0) + 1
+        await asyncio.sleep(latency)
+        return _response(status_code, b"{}", {"content-type": "application/json"})
+
+    return handler
+
+
+class TestUpstreamLoadBalancing:
+    @pytest.mark.asyncio
+    async def test_least_connections_spreads_concurrent_requests(self):
+        hits = {}
+        service_proxy = _proxy(
+            auth={
+                AUTH_1: _counting_handler(hits, "a", latency=0.02),
+                AUTH_2: _counting_handler(hits, "b", latency=0.02),
+            }
+        )
+        await asyncio.gather(
+            *(service_proxy.forward_request("auth", "/api/v1/me", "GET") for _ in range(20))
+        )
+        await service_proxy.close()
+
+        assert hits == {"a": 10, "b": 10}
+
+    @pytest.mark.asyncio
+    async def test_failing_upstream_is_ejected(self, monkeypatch):
+        monkeypatch.setattr(settings, "proxy_outlier_consecutive_failures", 3)
+        hits = {}
+        service_proxy = _proxy(
+            auth={
+                AUTH_1: _counting_handler(hits, "bad", status_code=500),
+                AUTH_2: _counting_handler(hits, "good"),
+            }
+        )
+        statuses = [
+            (await service_proxy.forward_request("auth", "/api/v1/me", "GET"))["status_code"]
+            for _ in range(10)
+        ]
+        stats = await service_proxy.get_upstream_stats()
+        await service_proxy.close()
+
+        # 順序請求時最少連線數相同，先選第一個實例直到它被剔除
+        assert statuses == [500] * 3 + [200] * 7
+        assert hits == {"bad": 3, "good": 7}
+        assert [i["ejected"] for i in stats["auth"]["instances"]] == [True, False]
+
+    @pytest.mark.asyncio
+    async def test_timeouts_count_towards_ejection(self, monkeypatch):
+        monkeypatch.setattr(settings, "proxy_outlier_consecutive_failures", 2)
+        hits = {}
+
+        def timing_out(request: httpx.Request) -> httpx.Response:
+            hits["slow"] = hits.get("slow", 0) + 1
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        service_proxy = _proxy(auth={AUTH_1: timing_out, AUTH_2: _counting_handler(hits, "ok")})
+        for _ in range(2):
+            with pytest.raises(HTTPException) as exc_info:
+                await service_proxy.forward_request("auth", "/api/v1/me", "GET")
+            assert exc_info.value.status_code == 504
+        result = await service_proxy.forward_request("auth", "/api/v1/me", "GET")
+        await service_proxy.close()
+
+        assert result["status_code"] == 200
+        assert hits == {"slow": 2, "ok": 1}
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_per_upstream(self, monkeypatch):
+        monkeypatch.setattr(settings, "proxy_max_requests_per_upstream", 2)
+        hits = {}
+        service_proxy = _proxy(auth={AUTH_1: _counting_handler(hits, "a", latency=0.05)})
+
+        results = await asyncio.gather(
+            *(service_proxy.forward_request("auth", "/api/v1/me", "GET") for _ in range(3)),
+            return_exceptions=True,
+        )
+        await service_proxy.close()
+
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        assert len(rejected) == 1
+        assert rejected[0].status_code == 503
+        assert hits == {"a": 2}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_and_failed_sends_release_the_upstream(self, monkeypatch):
+        monkeypatch.setattr(settings, "proxy_max_requests_per_upstream", 3)
+        hits = {}
+        service_proxy = _proxy(auth={AUTH_1: _counting_handler(hits, "a", latency=10)})
+
+        # 用戶端中斷連線時請求任務被取消
+        tasks = [
+            asyncio.create_task(service_proxy.forward_request("auth", "/api/v1/me", "GET"))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0.05)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        async def connections():
+            stats = await service_proxy.get_upstream_stats()
+            return stats["auth"]["instances"][0]["connections"]
+
+        assert await connections() == 0
+
+        # 非 httpx.RequestError 的例外同樣釋放連線數
+        def broken(request: httpx.Request) -> httpx.Response:
+            raise RuntimeError("transport bug")
+
+        service_proxy._clients[AUTH_1] = _mock_client(broken, AUTH_1)
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await service_proxy.forward_request("auth", "/api/v1/me", "GET")
+        assert await connections() == 0
+
+        service_proxy._clients[AUTH_1] = _mock_client(_counting_handler(hits, "a"), AUTH_1)
+        result = await service_proxy.forward_request("auth", "/api/v1/me", "GET")
+        await service_proxy.close()
+        assert result["status_code"] == 200
+
+    @pytest.mark.asyncio
+    async def test_ewma_latency_prefers_faster_upstream(self, monkeypatch):
+        monkeypatch.setattr(settings, "proxy_load_balance_strategy", "ewma_latency")
+        hits = {}
+        service_proxy = _proxy(
+            auth={
+                AUTH_1: _counting_handler(hits, "slow", latency=0.02),
+                AUTH_2: _counting_handler(hits, "fast", latency=0.001),
+            }
+        )
+        for _ in range(30):
+            await service_proxy.forward_request("auth", "/api/v1/me", "GET")
+        await service_proxy.close()
+
+        assert hits["fast"] > hits["slow"]
+        assert hits["slow"] <= 3
+
+
+async def _keepalive_server(body: bytes):
+    """以 asyncio 實作的極簡 HTTP/1.1 keep-alive 服務，並記錄建立的連線數"""
+    connections = []
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connections.append(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, connections
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+async def test_pooled_proxy_requests_per_second():
+    """每次請求建立新客戶端 vs. 長連線池的每秒請求數"""
+    server, connections = await _keepalive_server(b'{"status": "ok"}')
+    base_url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    total, concurrency = 300, 20
+
+    async def run(send) -> float:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                await send()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return total / (time.perf_counter() - start)
+
+    async def per_call_client():
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.get(f"{base_url}/api/v1/me")
+            response.json()
+
+    service_proxy = ServiceProxy()
+    service_proxy.upstream_urls["auth"] = [base_url]
+
+    async def pooled():
+        await service_proxy.forward_request("auth", "/api/v1/me", "GET")
+
+    try:
+        per_call_rps = await run(per_call_client)
+        per_call_connections = len(connections)
+        connections.clear()
+
+        pooled_rps = await run(pooled)
+        pooled_connections = len(connections)
+    finally:
+        await service_proxy.close()
+        server.close()
+        await server.wait_closed()
+
+    print(
+        f"\nper-call client: {per_call_rps:.0f} req/s, {per_call_connections} connections | "
+        f"pooled: {pooled_rps:.0f} req/s, {pooled_connections} connections"
+    )
+    assert per_call_connections == total
+    assert pooled_connections <= concurrency
+    assert pooled_rps > per_call_rps
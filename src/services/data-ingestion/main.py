@@ -10,13 +10,32 @@ content generation:
 
 import asyncio
 import logging
+import os
+import sys
 from datetime import datetime
+from pathlib import Path
 from typing import Any, Dict, List
 
 from fastapi import BackgroundTasks, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+# 添加專案根目錄（含 src/shared）到路徑；映像內為 /app，已在 PYTHONPATH 中
+project_root = next(
+    (path for path in Path(__file__).resolve().parents if (path / "src" / "shared").is_dir()),
+    None,
+)
+if project_root and str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+# 批次寫入使用 batch 連接池設定檔
+os.environ.setdefault("SERVICE_NAME", "data-ingestion")
+
+# 需要在 sys.path 修改後導入的模組
+from src.shared.database.bulk import bulk_upsert  # noqa: E402
+from src.shared.database.connection import async_engine  # noqa: E402
+from src.shared.database.models import TrendTopic  # noqa: E402
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -245,18 +264,77 @@ async def analyze_keyword_performance(keywords: List[str]) -> Dict[str, Any]:
     return metrics
 
 
-async def store_trends_in_database(platform: str, trends: List[TrendData]):
-    """Store trends in database"""
+def competition_level(competition: float) -> str:
+    """Map a 0-1 competition score to the TrendTopic competition level"""
+
+    if competition < 0.33:
+        return "low"
+    if competition > 0.66:
+        return "high"
+    return "medium"
+
+
+def trend_topic_rows(platform: str, trends: List[TrendData]) -> List[Dict[str, Any]]:
+    """One TrendTopic row per (platform, keyword); later trends win for duplicates"""
+
+    return [
+        {
+            "category": platform,
+            "title": keyword,
+            "keywords": trend.keywords,
+            "search_volume": trend.engagement_metrics.get("views", 0),
+            "platform_data": {
+                platform: {
+                    "source": trend.source,
+                    "engagement_metrics": trend.engagement_metrics,
+                }
+            },
+            "peak_time": trend.timestamp,
+        }
+        for trend in trends
+        for keyword in trend.keywords
+    ]
+
+
+def keyword_topic_rows(platform: str, keyword_metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """TrendTopic rows carrying keyword performance metrics"""
+
+    return [
+        {
+            "category": platform,
+            "title": keyword,
+            "search_volume": metrics.get("search_volume", 0),
+            "trending_score": metrics.get("trend_score", 0.0),
+            "competition_level": competition_level(metrics.get("competition", 0.5)),
+        }
+        for keyword, metrics in keyword_metrics.items()
+    ]
+
+
+async def store_trends_in_database(platform: str, trends: List[TrendData]) -> int:
+    """Upsert trends into trend_topics (COPY + ON CONFLICT on PostgreSQL)"""
 
-    # Placeholder - would use database connection
-    logger.info(f"Storing {len(trends)} trends for {platform} in database")
+    count = await bulk_upsert(
+        async_engine,
+        TrendTopic,
+        trend_topic_rows(platform, trends),
+        conflict_columns=["category", "title"],
+    )
+    logger.info(f"Stored {count} trend topics for {platform} in database")
+    return count
 
 
-async def store_keywords_in_database(platform: str, keyword_metrics: Dict[str, Any]):
-    """Store keyword metrics in database"""
+async def store_keywords_in_database(platform: str, keyword_metrics: Dict[str, Any]) -> int:
+    """Upsert keyword metrics into trend_topics"""
 
-    # Placeholder - would use database connection
-    logger.info(f"Storing keyword metrics for {platform} in database")
+    count = await bulk_upsert(
+        async_engine,
+        TrendTopic,
+        keyword_topic_rows(platform, keyword_metrics),
+        conflict_columns=["category", "title"],
+    )
+    logger.info(f"Stored metrics for {count} keywords for {platform} in database")
+    return count
 
 
 async def fetch_trends_from_database(platform: str, limit: int) -> List[Dict[str, Any]]:
@@ -0,0 +1,57 @@
+"""
+測試趨勢與關鍵字的批次寫入
+"""
+
+from datetime import datetime
+
+import main
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.shared.database.models import Base, TrendTopic
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ingestion.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(main, "async_engine", engine)
+    yield engine
+    await engine.dispose()
+
+
+def _trend(keywords, views):
+    return main.TrendData(
+        platform="tiktok",
+        keywords=keywords,
+        engagement_metrics={"views": views, "likes": 1},
+        timestamp=datetime(2026, 10, 1),
+        source="api",
+    )
+
+
+@pytest.mark.asyncio
+async def test_trends_and_keywords_upsert_one_topic_per_keyword(engine):
+    trends = [_trend(["ai video", "editing"], 100), _trend(["ai video"], 300)]
+    assert await main.store_trends_in_database("tiktok", trends) == 2
+
+    metrics = await main.analyze_keyword_performance(["ai video", "viral content"])
+    assert await main.store_keywords_in_database("tiktok", metrics) == 2
+
+    async with AsyncSession(engine) as session:
+        topics = {
+            topic.title: topic
+            for topic in await session.scalars(select(TrendTopic).order_by(TrendTopic.title))
+        }
+
+    assert sorted(topics) == ["ai video", "editing", "viral content"]
+    ai_video = topics["ai video"]
+    assert ai_video.search_volume == 1000
+    assert ai_video.trending_score == 0.8
+    assert ai_video.competition_level == "medium"
+    assert ai_video.platform_data["tiktok"]["engagement_metrics"]["views"] == 300
+    assert ai_video.updated_at is not None
+    assert topics["editing"].search_volume == 100
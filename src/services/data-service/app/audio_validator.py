@@ -1,14 +1,24 @@
+import asyncio
 import os
+import sys
 from pathlib import Path
 from typing import Any, Dict
 
-import librosa
 import magic
-import soundfile as sf
 import structlog
 from app.config import settings
 from app.schemas import FileValidationError
 
+# 添加專案根目錄到Python路徑（本機為倉庫根目錄；映像內 src/shared 位於 /app，已在 PYTHONPATH）
+project_root = next(
+    (path for path in Path(__file__).resolve().parents if (path / "src" / "shared").is_dir()),
+    None,
+)
+if project_root and str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.shared.audio_probe import AudioProbeError, analyze_content, probe_audio  # noqa: E402
+
 logger = structlog.get_logger(__name__)
 
 
@@ -94,63 +104,49 @@ class AudioValidator:
             raise FileValidationError(error="Validation failed", details={"error": str(e)})
 
     async def _analyze_audio(self, file_path: str) -> Dict[str, Any]:
-        """Analyze audio file properties using librosa"""
+        """Read audio properties from the file header, then run sampled content checks
+
+        Neither step decodes the whole file, so validation time does not depend on
+        the audio length.
+        """
         try:
-            # Load audio file
-            y, sr = librosa.load(file_path, sr=None)
-
-            # Calculate basic properties
-            duration = len(y) / sr
-            channels = 1 if y.ndim == 1 else y.shape[0]
-
-            # Audio quality analysis
-            rms_energy = float(librosa.feature.rms(y=y).mean())
-            spectral_centroid = float(librosa.feature.spectral_centroid(y=y, sr=sr).mean())
-            zero_crossing_rate = float(librosa.feature.zero_crossing_rate(y).mean())
-
-            # Silence detection
-            silence_threshold = 0.01
-            silence_ratio = float((librosa.util.normalize(y) < silence_threshold).mean())
-
-            return {
-                "duration": duration,
-                "sample_rate": sr,
-                "channels": channels,
-                "rms_energy": rms_energy,
-                "spectral_centroid": spectral_centroid,
-                "zero_crossing_rate": zero_crossing_rate,
-                "silence_ratio": silence_ratio,
-                "audio_analysis_success": True,
-            }
+            info = await asyncio.to_thread(probe_audio, file_path)
+        except AudioProbeError as e:
+            logger.error("Audio header probe failed", file_path=file_path, error=str(e))
+            raise FileValidationError(
+                error="Unable to analyze audio file",
+                details={"error": str(e)},
+            )
 
-        except Exception as e:
+        metadata = {
+            "duration": info.duration,
+            "sample_rate": info.sample_rate,
+            "channels": info.channels,
+            "codec": info.codec,
+            "bitrate": info.bitrate,
+        }
+
+        try:
+            stats = await asyncio.to_thread(
+                analyze_content, file_path, max_blocks=settings.content_check_max_blocks
+            )
+        except AudioProbeError as e:
             logger.warning(
-                "Audio analysis failed, using basic file info",
+                "Audio content analysis failed, using header info",
                 file_path=file_path,
                 error=str(e),
             )
+            return {**metadata, "audio_analysis_success": False, "analysis_error": str(e)}
 
-            # Fallback to basic file info
-            try:
-                with sf.SoundFile(file_path) as f:
-                    duration = len(f) / f.samplerate
-                    return {
-                        "duration": duration,
-                        "sample_rate": f.samplerate,
-                        "channels": f.channels,
-                        "audio_analysis_success": False,
-                        "analysis_error": str(e),
-                    }
-            except Exception as fallback_error:
-                logger.error(
-                    "Both librosa and soundfile analysis failed",
-                    file_path=file_path,
-                    error=str(fallback_error),
-                )
-                raise FileValidationError(
-                    error="Unable to analyze audio file",
-                    details={"error": str(fallback_error)},
-                )
+        return {
+            **metadata,
+            "rms_energy": stats.rms_energy,
+            "peak": stats.peak,
+            "zero_crossing_rate": stats.zero_crossing_rate,
+            "silence_ratio": stats.silence_ratio,
+            "clipping_ratio": stats.clipping_ratio,
+            "audio_analysis_success": True,
+        }
 
     def _validate_audio_properties(self, audio_metadata: Dict[str, Any]) -> None:
         """Validate audio properties against requirements"""
@@ -182,9 +178,10 @@ class AudioValidator:
                 details={"silence_ratio": silence_ratio},
             )
 
-        # Check for very low energy (likely corrupt or empty)
-        rms_energy = audio_metadata.get("rms_energy", 0)
-        if rms_energy < 0.001:
+        # Check for very low energy (likely corrupt or empty); skipped when content
+        # analysis was unavailable and only header info is known
+        rms_energy = audio_metadata.get("rms_energy")
+        if rms_energy is not None and rms_energy < 0.001:
             raise FileValidationError(
                 error="Audio has very low energy, may be corrupt",
                 details={"rms_energy": rms_energy},
@@ -27,6 +27,8 @@ class Settings(BaseSettings):
     target_channels: int = 1
     min_duration: float = 1.0  # seconds
     max_duration: float = 600.0  # 10 minutes
+    # Content checks sample at most this many 1-second blocks per file
+    content_check_max_blocks: int = 30
 
     # Service settings
     debug: bool = False
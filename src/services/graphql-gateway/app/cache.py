@@ -0,0 +1,267 @@
+"""
+GraphQL 快取
+持久化查詢 (Automatic Persisted Queries) 與正規化的實體快取
+"""
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from graphql import GraphQLError
+from strawberry.extensions import SchemaExtension
+
+from .config import get_settings
+
+# 各類型的欄位 TTL（秒），未列出的欄位使用 "_default"，再退回 settings.CACHE_TTL
+FIELD_TTLS: Dict[str, Dict[str, float]] = {
+    "User": {"_default": 300},
+    "VideoProject": {
+        "_default": 120,
+        # 處理中的專案狀態與產出會頻繁變動
+        "status": 10,
+        "duration": 10,
+        "thumbnail_url": 10,
+        "video_url": 10,
+        "updated_at": 10,
+    },
+    "AIScript": {"_default": 600, "sentiment_score": 120, "readability_score": 120},
+    "TrendAnalysis": {"_default": 300, "trend_score": 60, "search_volume": 60},
+}
+
+_CAMEL_BOUNDARY = re.compile(r"(?<!^)(?=[A-Z])")
+
+
+def query_hash(query: str) -> str:
+    """持久化查詢使用的 SHA-256 雜湊"""
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+def requested_fields(info, strawberry_type) -> Set[str]:
+    """當前欄位選取的、屬於 strawberry_type 資料欄位的子欄位（轉為 snake_case，展開片段）
+
+    帶解析器的欄位（如 VideoProject.owner）由各自的載入器處理，不計入。
+    """
+    data_fields = {
+        field.python_name
+        for field in strawberry_type.__strawberry_definition__.fields
+        if field.base_resolver is None
+    }
+    fields: Set[str] = set()
+
+    def collect(selections):
+        for selection in selections:
+            name = getattr(selection, "name", None)
+            if name is None or not hasattr(selection, "arguments"):
+                # InlineFragment / FragmentSpread
+                collect(getattr(selection, "selections", []))
+            elif not name.startswith("__"):
+                fields.add(_CAMEL_BOUNDARY.sub("_", name).lower())
+
+    for field in info.selected_fields:
+        collect(field.selections)
+    return fields & data_fields
+
+
+class PersistedQueryStore:
+    """持久化查詢儲存（雜湊 -> 查詢字串，LRU 淘汰）"""
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._queries: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, sha256_hash: str) -> Optional[str]:
+        query = self._queries.get(sha256_hash)
+        if query is not None:
+            self._queries.move_to_end(sha256_hash)
+        return query
+
+    def register(self, query: str) -> str:
+        """登記查詢並返回其雜湊"""
+        sha256_hash = query_hash(query)
+        self._queries[sha256_hash] = query
+        self._queries.move_to_end(sha256_hash)
+        while len(self._queries) > self.max_entries:
+            self._queries.popitem(last=False)
+        return sha256_hash
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+
+class EntityCache:
+    """正規化實體快取
+
+    實體以 (類型, ID) 為鍵，每個欄位各自記錄過期時間；列表查詢只保存實體 ID，
+    讀取時要求所選欄位全部未過期。變更操作透過標籤使相關列表失效。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        list_ttl: float = 60,
+        field_ttls: Optional[Dict[str, Dict[str, float]]] = None,
+        default_ttl: float = 300,
+    ):
+        self.max_entries = max_entries
+        self.list_ttl = list_ttl
+        self.field_ttls = field_ttls if field_ttls is not None else FIELD_TTLS
+        self.default_ttl = default_ttl
+
+        # (typename, id) -> {field: (value, expires_at)}
+        self._entities: "OrderedDict[Tuple[str, str], Dict[str, Tuple[Any, float]]]" = OrderedDict()
+        # list_key -> (typename, [ids], expires_at)
+        self._lists: Dict[Hashable, Tuple[str, List[str], float]] = {}
+        self._tags: Dict[str, Set[Hashable]] = {}
+
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _ttl(self, typename: str, field: str) -> float:
+        ttls = self.field_ttls.get(typename, {})
+        return ttls.get(field, ttls.get("_default", self.default_ttl))
+
+    def put(self, typename: str, data: Dict[str, Any]):
+        """寫入（或合併）實體欄位"""
+        now = time.monotonic()
+        key = (typename, str(data["id"]))
+        entity = self._entities.get(key, {})
+        for field, value in data.items():
+            entity[field] = (value, now + self._ttl(typename, field))
+
+        self._entities[key] = entity
+        self._entities.move_to_end(key)
+        while len(self._entities) > self.max_entries:
+            self._entities.popitem(last=False)
+
+    def _fresh(
+        self, typename: str, entity_id: str, fields: Optional[Iterable[str]], now: float
+    ) -> Optional[Dict[str, Any]]:
+        entity = self._entities.get((typename, str(entity_id)))
+        if entity is None:
+            return None
+
+        # 未指定欄位時要求整個實體未過期；所選欄位若從未快取過也視為未命中
+        check = entity.keys() if fields is None else fields
+        for field in check:
+            cached = entity.get(field)
+            if cached is None or cached[1] <= now:
+                return None
+
+        self._entities.move_to_end((typename, str(entity_id)))
+        return {field: value for field, (value, _) in entity.items()}
+
+    def get(
+        self, typename: str, entity_id: str, fields: Optional[Iterable[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """讀取實體；所選欄位有任一過期則返回 None"""
+        data = self._fresh(typename, entity_id, fields, time.monotonic())
+        self.stats["hits" if data is not None else "misses"] += 1
+        return data
+
+    def put_list(
+        self,
+        list_key: Hashable,
+        typename: str,
+        items: List[Dict[str, Any]],
+        tags: Iterable[str] = (),
+    ):
+        """快取列表查詢結果（實體正規化存放，列表只保存 ID）"""
+        for item in items:
+            self.put(typename, item)
+        ids = [str(item["id"]) for item in items]
+        self._lists[list_key] = (typename, ids, time.monotonic() + self.list_ttl)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(list_key)
+
+    def get_list(
+        self, list_key: Hashable, fields: Optional[Iterable[str]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """讀取列表查詢；列表或任一實體的所選欄位過期則返回 None"""
+        now = time.monotonic()
+        cached = self._lists.get(list_key)
+        if cached is None or cached[2] <= now:
+            self.stats["misses"] += 1
+            return None
+
+        typename, ids, _ = cached
+        fields = list(fields) if fields is not None else None
+        items = []
+        for entity_id in ids:
+            data = self._fresh(typename, entity_id, fields, now)
+            if data is None:
+                self.stats["misses"] += 1
+                return None
+            items.append(data)
+
+        self.stats["hits"] += 1
+        return items
+
+    def invalidate(self, typename: str, entity_id: str):
+        """使單一實體失效"""
+        if self._entities.pop((typename, str(entity_id)), None) is not None:
+            self.stats["invalidations"] += 1
+
+    def invalidate_tag(self, tag: str):
+        """使帶有該標籤的所有列表查詢失效"""
+        for list_key in self._tags.pop(tag, set()):
+            if self._lists.pop(list_key, None) is not None:
+                self.stats["invalidations"] += 1
+
+    def clear(self):
+        self._entities.clear()
+        self._lists.clear()
+        self._tags.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "entities": len(self._entities), "lists": len(self._lists)}
+
+
+class PersistedQueryExtension(SchemaExtension):
+    """Automatic Persisted Queries (APQ)
+
+    客戶端以 extensions.persistedQuery.sha256Hash 傳送查詢雜湊：
+    已登記的雜湊直接換成查詢字串；未登記時返回 PersistedQueryNotFound，
+    客戶端再連同完整查詢重送一次以完成登記。
+    """
+
+    def on_operation(self):
+        context = self.execution_context
+        persisted = (context.operation_extensions or {}).get("persistedQuery")
+
+        if persisted:
+            if persisted.get("version", 1) != 1:
+                raise GraphQLError(
+                    "PersistedQueryNotSupported",
+                    extensions={"code": "PERSISTED_QUERY_NOT_SUPPORTED"},
+                )
+
+            sha256_hash = persisted.get("sha256Hash")
+            if context.query:
+                if query_hash(context.query) != sha256_hash:
+                    raise GraphQLError(
+                        "provided sha does not match query",
+                        extensions={"code": "PERSISTED_QUERY_HASH_MISMATCH"},
+                    )
+                persisted_queries.register(context.query)
+            else:
+                query = persisted_queries.get(sha256_hash) if sha256_hash else None
+                if query is None:
+                    raise GraphQLError(
+                        "PersistedQueryNotFound",
+                        extensions={"code": "PERSISTED_QUERY_NOT_FOUND"},
+                    )
+                context.query = query
+
+        yield
+
+
+_settings = get_settings()
+
+# 全域快取實例
+persisted_queries = PersistedQueryStore(max_entries=_settings.PERSISTED_QUERY_MAX_ENTRIES)
+entity_cache = EntityCache(
+    max_entries=_settings.ENTITY_CACHE_MAX_ENTRIES,
+    list_ttl=_settings.ENTITY_LIST_TTL,
+    default_ttl=_settings.CACHE_TTL,
+)
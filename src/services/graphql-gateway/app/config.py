@@ -34,6 +34,19 @@ class Settings(BaseSettings):
     MAX_QUERY_COMPLEXITY: int = 1000
     CACHE_TTL: int = 300  # 5 分鐘
 
+    # 後端 HTTP 連線池設定
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    DATALOADER_MAX_BATCH_SIZE: int = 100
+
+    # 持久化查詢與實體快取設定
+    PERSISTED_QUERY_MAX_ENTRIES: int = 5000
+    ENTITY_CACHE_ENABLED: bool = os.getenv("ENTITY_CACHE_ENABLED", "true").lower() == "true"
+    ENTITY_CACHE_MAX_ENTRIES: int = 10000
+    ENTITY_LIST_TTL: int = 60
+
     # Redis 快取設定
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://redis:6379/0")
 
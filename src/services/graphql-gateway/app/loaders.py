@@ -0,0 +1,170 @@
+"""
+GraphQL 資料載入器
+共用連線池的 HTTP 客戶端，以及每個請求獨立的 DataLoader（批次與去重後端呼叫）
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+
+import httpx
+import structlog
+from strawberry.dataloader import DataLoader
+
+from .cache import EntityCache, entity_cache
+from .config import get_settings
+
+logger = structlog.get_logger()
+
+# 全域 HTTP 客戶端（keep-alive 連線池）
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+
+        return True
+    except ImportError:
+        return False
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """獲取共用的 HTTP 客戶端（單例模式，安裝 h2 時啟用 HTTP/2）"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        settings = get_settings()
+        _http_client = httpx.AsyncClient(
+            http2=_http2_available(),
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """關閉共用的 HTTP 客戶端"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class Loaders:
+    """單一 GraphQL 請求的 DataLoader 集合
+
+    同一事件循環迭代內對同一服務的 load() 會合併為一次批次呼叫，
+    重複的鍵只會請求一次，結果在請求範圍內快取；跨請求則先查詢實體快取。
+    """
+
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[EntityCache] = None,
+    ):
+        self.client = client or get_http_client()
+        self.settings = get_settings()
+        if cache is None and self.settings.ENTITY_CACHE_ENABLED:
+            cache = entity_cache
+        self.cache = cache
+        self.backend_calls = 0
+
+        self.user = DataLoader(self._load_users)
+        self.script = DataLoader(
+            self._load_scripts, max_batch_size=self.settings.DATALOADER_MAX_BATCH_SIZE
+        )
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """透過共用客戶端發送 GET 請求並計入後端呼叫次數"""
+        self.backend_calls += 1
+        return await self.client.get(url, **kwargs)
+
+    async def _cached_batch(
+        self,
+        typename: str,
+        ids: List[str],
+        fetch: Callable[[List[str]], Awaitable[List[Optional[Dict[str, Any]]]]],
+    ) -> List[Optional[Dict[str, Any]]]:
+        """先從實體快取取得，僅向後端請求快取未命中的鍵"""
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        missing = []
+        for key in ids:
+            cached = self.cache.get(typename, key) if self.cache else None
+            if cached is not None:
+                results[key] = cached
+            else:
+                missing.append(key)
+
+        if missing:
+            for key, data in zip(missing, await fetch(missing)):
+                if data is not None and self.cache:
+                    self.cache.put(typename, data)
+                results[key] = data
+
+        return [results.get(key) for key in ids]
+
+    async def _load_users(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return await self._cached_batch("User", ids, self._fetch_users)
+
+    async def _load_scripts(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return await self._cached_batch("AIScript", ids, self._fetch_scripts)
+
+    async def _fetch_users(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """批次載入用戶
+
+        認證服務沒有按 ID 批次查詢的端點，因此在共用連線上並行請求去重後的 ID。
+        """
+
+        async def fetch(user_id: str) -> Optional[Dict[str, Any]]:
+            try:
+                response = await self.get(f"{self.settings.AUTH_SERVICE_URL}/users/{user_id}")
+                if response.status_code == 200:
+                    return response.json()
+                return None
+            except Exception as e:
+                logger.error("獲取用戶失敗", user_id=user_id, error=str(e))
+                return None
+
+        return list(await asyncio.gather(*(fetch(user_id) for user_id in ids)))
+
+    async def _fetch_scripts(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """以一次 /scripts?ids=... 請求批次載入 AI 腳本"""
+        try:
+            response = await self.get(
+                f"{self.settings.AI_SERVICE_URL}/scripts",
+                params={"ids": ",".join(str(script_id) for script_id in ids)},
+            )
+            if response.status_code != 200:
+                return [None] * len(ids)
+            scripts = response.json().get("scripts", [])
+        except Exception as e:
+            logger.error("批次獲取 AI 腳本失敗", count=len(ids), error=str(e))
+            return [None] * len(ids)
+
+        return _order_by_keys(ids, scripts)
+
+
+def _order_by_keys(
+    keys: Sequence[str], items: Iterable[Dict[str, Any]]
+) -> List[Optional[Dict[str, Any]]]:
+    """按 DataLoader 的鍵順序排列批次結果，缺少的鍵返回 None"""
+    by_id = {str(item["id"]): item for item in items}
+    return [by_id.get(str(key)) for key in keys]
+
+
+def get_loaders(info) -> Loaders:
+    """從 GraphQL 上下文取得本次請求的 DataLoader（無上下文時建立新的）"""
+    context = info.context
+    if isinstance(context, dict):
+        if "loaders" not in context:
+            context["loaders"] = Loaders()
+        return context["loaders"]
+    return Loaders()
+
+
+async def get_context() -> Dict[str, Any]:
+    """GraphQL 請求上下文（每個請求建立新的 DataLoader）"""
+    return {"loaders": Loaders()}
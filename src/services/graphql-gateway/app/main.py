@@ -13,6 +13,7 @@ from strawberry.fastapi import GraphQLRouter
 
 from .auth import get_current_user
 from .config import get_settings
+from .loaders import close_http_client, get_context
 from .middleware import PrometheusMiddleware
 from .schema import schema
 
@@ -58,6 +59,7 @@ def create_app() -> FastAPI:
     graphql_app = GraphQLRouter(
         schema,
         path="/graphql",
+        context_getter=get_context,
         dependencies=[Depends(get_current_user)] if not settings.DEBUG else [],
     )
 
@@ -67,6 +69,11 @@ def create_app() -> FastAPI:
     metrics_app = make_asgi_app()
     app.mount("/metrics", metrics_app)
 
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        """關閉共用的後端 HTTP 連線池"""
+        await close_http_client()
+
     @app.get("/health")
     async def health_check():
         """健康檢查端點"""
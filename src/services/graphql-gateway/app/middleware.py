@@ -84,9 +84,7 @@ class CacheMiddleware(BaseHTTPMiddleware):
         # 快取成功回應
         if response.status_code == 200:
             try:
-                response_body = b""
-                async for chunk in response.body_iterator:
-                    response_body += chunk
+                response_body = b"".join([chunk async for chunk in response.body_iterator])
 
                 await self.cache_client.setex(
                     cache_key,
@@ -5,11 +5,12 @@ GraphQL Schema 定義
 
 from typing import List, Optional
 
-import httpx
 import strawberry
 import structlog
 
+from .cache import PersistedQueryExtension, requested_fields
 from .config import get_settings
+from .loaders import get_loaders
 from .types import AIScript, TrendAnalysis, User, VideoProject
 
 logger = structlog.get_logger()
@@ -20,23 +21,15 @@ class Query:
     """GraphQL 查詢類型"""
 
     @strawberry.field
-    async def user(self, id: strawberry.ID) -> Optional[User]:
+    async def user(self, info: strawberry.Info, id: strawberry.ID) -> Optional[User]:
         """獲取單一用戶資訊"""
-        settings = get_settings()
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{settings.AUTH_SERVICE_URL}/users/{id}")
-                if response.status_code == 200:
-                    data = response.json()
-                    return User(**data)
-                return None
-            except Exception as e:
-                logger.error("獲取用戶失敗", user_id=id, error=str(e))
-                return None
+        data = await get_loaders(info).user.load(str(id))
+        return User(**data) if data else None
 
     @strawberry.field
     async def video_projects(
         self,
+        info: strawberry.Info,
         user_id: strawberry.ID,
         limit: int = 10,
         offset: int = 0,
@@ -44,59 +37,95 @@ class Query:
     ) -> List[VideoProject]:
         """獲取影片專案列表"""
         settings = get_settings()
-        async with httpx.AsyncClient() as client:
-            try:
-                params = {"user_id": user_id, "limit": limit, "offset": offset}
-                if status:
-                    params["status"] = status
-
-                response = await client.get(f"{settings.VIDEO_SERVICE_URL}/projects", params=params)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return [VideoProject(**item) for item in data.get("projects", [])]
-                return []
-            except Exception as e:
-                logger.error("獲取影片專案失敗", user_id=user_id, error=str(e))
-                return []
+        loaders = get_loaders(info)
+        cache_key = ("videoProjects", str(user_id), limit, offset, status)
+        if loaders.cache:
+            cached = loaders.cache.get_list(cache_key, requested_fields(info, VideoProject))
+            if cached is not None:
+                return [VideoProject(**item) for item in cached]
+
+        try:
+            params = {"user_id": user_id, "limit": limit, "offset": offset}
+            if status:
+                params["status"] = status
+
+            response = await loaders.get(f"{settings.VIDEO_SERVICE_URL}/projects", params=params)
+
+            if response.status_code == 200:
+                data = response.json()
+                projects = data.get("projects", [])
+                if loaders.cache:
+                    loaders.cache.put_list(
+                        cache_key, "VideoProject", projects, tags=[f"VideoProject:user:{user_id}"]
+                    )
+                return [VideoProject(**item) for item in projects]
+            return []
+        except Exception as e:
+            logger.error("獲取影片專案失敗", user_id=user_id, error=str(e))
+            return []
 
     @strawberry.field
-    async def ai_scripts(self, user_id: strawberry.ID, limit: int = 10) -> List[AIScript]:
+    async def ai_scripts(
+        self, info: strawberry.Info, user_id: strawberry.ID, limit: int = 10
+    ) -> List[AIScript]:
         """獲取 AI 腳本列表"""
         settings = get_settings()
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"{settings.AI_SERVICE_URL}/scripts",
-                    params={"user_id": user_id, "limit": limit},
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return [AIScript(**item) for item in data.get("scripts", [])]
-                return []
-            except Exception as e:
-                logger.error("獲取 AI 腳本失敗", user_id=user_id, error=str(e))
-                return []
+        loaders = get_loaders(info)
+        cache_key = ("aiScripts", str(user_id), limit)
+        if loaders.cache:
+            cached = loaders.cache.get_list(cache_key, requested_fields(info, AIScript))
+            if cached is not None:
+                return [AIScript(**item) for item in cached]
+
+        try:
+            response = await loaders.get(
+                f"{settings.AI_SERVICE_URL}/scripts",
+                params={"user_id": user_id, "limit": limit},
+            )
+
+            if response.status_code == 200:
+                data = response.json()
+                scripts = data.get("scripts", [])
+                # 預先填入腳本載入器，之後的巢狀欄位不必再請求
+                for item in scripts:
+                    loaders.script.prime(str(item["id"]), item)
+                if loaders.cache:
+                    loaders.cache.put_list(
+                        cache_key, "AIScript", scripts, tags=[f"AIScript:user:{user_id}"]
+                    )
+                return [AIScript(**item) for item in scripts]
+            return []
+        except Exception as e:
+            logger.error("獲取 AI 腳本失敗", user_id=user_id, error=str(e))
+            return []
 
     @strawberry.field
-    async def trending_topics(self, limit: int = 10) -> List[TrendAnalysis]:
+    async def trending_topics(self, info: strawberry.Info, limit: int = 10) -> List[TrendAnalysis]:
         """獲取趨勢主題"""
         settings = get_settings()
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"{settings.TREND_SERVICE_URL}/trending",
-                    params={"limit": limit},
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return [TrendAnalysis(**item) for item in data.get("trends", [])]
-                return []
-            except Exception as e:
-                logger.error("獲取趨勢主題失敗", error=str(e))
-                return []
+        loaders = get_loaders(info)
+        cache_key = ("trendingTopics", limit)
+        if loaders.cache:
+            cached = loaders.cache.get_list(cache_key, requested_fields(info, TrendAnalysis))
+            if cached is not None:
+                return [TrendAnalysis(**item) for item in cached]
+
+        try:
+            response = await loaders.get(
+                f"{settings.TREND_SERVICE_URL}/trending",
+                params={"limit": limit},
+            )
+
+            if response.status_code == 200:
+                data = response.json()
+                trends = data.get("trends", [])
+                if loaders.cache:
+                    loaders.cache.put_list(cache_key, "TrendAnalysis", trends)
+                return [TrendAnalysis(**item) for item in trends]
+            return []
+        except Exception as e:
+            logger.error("獲取趨勢主題失敗", error=str(e))
+            return []
 
 
 @strawberry.type
@@ -106,33 +135,41 @@ class Mutation:
     @strawberry.field
     async def create_video_project(
         self,
+        info: strawberry.Info,
         user_id: strawberry.ID,
         title: str,
         description: Optional[str] = None,
     ) -> Optional[VideoProject]:
         """建立新的影片專案"""
         settings = get_settings()
-        async with httpx.AsyncClient() as client:
-            try:
-                payload = {
-                    "user_id": user_id,
-                    "title": title,
-                    "description": description,
-                }
-
-                response = await client.post(f"{settings.VIDEO_SERVICE_URL}/projects", json=payload)
-
-                if response.status_code == 201:
-                    data = response.json()
-                    return VideoProject(**data)
-                return None
-            except Exception as e:
-                logger.error("建立影片專案失敗", user_id=user_id, error=str(e))
-                return None
+        loaders = get_loaders(info)
+        try:
+            payload = {
+                "user_id": user_id,
+                "title": title,
+                "description": description,
+            }
+
+            response = await loaders.client.post(
+                f"{settings.VIDEO_SERVICE_URL}/projects", json=payload
+            )
+
+            if response.status_code == 201:
+                data = response.json()
+                if loaders.cache:
+                    # 新專案使該用戶的專案列表失效
+                    loaders.cache.invalidate_tag(f"VideoProject:user:{user_id}")
+                    loaders.cache.put("VideoProject", data)
+                return VideoProject(**data)
+            return None
+        except Exception as e:
+            logger.error("建立影片專案失敗", user_id=user_id, error=str(e))
+            return None
 
     @strawberry.field
     async def generate_ai_script(
         self,
+        info: strawberry.Info,
         user_id: strawberry.ID,
         topic: str,
         platform: str = "youtube",
@@ -140,27 +177,30 @@ class Mutation:
     ) -> Optional[AIScript]:
         """生成 AI 腳本"""
         settings = get_settings()
-        async with httpx.AsyncClient() as client:
-            try:
-                payload = {
-                    "user_id": user_id,
-                    "topic": topic,
-                    "platform": platform,
-                    "duration": duration,
-                }
-
-                response = await client.post(
-                    f"{settings.AI_SERVICE_URL}/generate-script", json=payload
-                )
-
-                if response.status_code == 201:
-                    data = response.json()
-                    return AIScript(**data)
-                return None
-            except Exception as e:
-                logger.error("生成 AI 腳本失敗", user_id=user_id, error=str(e))
-                return None
+        loaders = get_loaders(info)
+        try:
+            payload = {
+                "user_id": user_id,
+                "topic": topic,
+                "platform": platform,
+                "duration": duration,
+            }
+
+            response = await loaders.client.post(
+                f"{settings.AI_SERVICE_URL}/generate-script", json=payload
+            )
+
+            if response.status_code == 201:
+                data = response.json()
+                if loaders.cache:
+                    loaders.cache.invalidate_tag(f"AIScript:user:{user_id}")
+                    loaders.cache.put("AIScript", data)
+                return AIScript(**data)
+            return None
+        except Exception as e:
+            logger.error("生成 AI 腳本失敗", user_id=user_id, error=str(e))
+            return None
 
 
 # 建立 GraphQL Schema
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+schema = strawberry.Schema(query=Query, mutation=Mutation, extensions=[PersistedQueryExtension])
@@ -9,6 +9,8 @@ from typing import List, Optional
 
 import strawberry
 
+from .loaders import get_loaders
+
 
 @strawberry.enum
 class ProjectStatus(Enum):
@@ -62,12 +64,18 @@ class VideoProject:
     updated_at: datetime
 
     @strawberry.field
-    async def script(self) -> Optional["AIScript"]:
-        """關聯的 AI 腳本"""
+    async def owner(self, info: strawberry.Info) -> Optional[User]:
+        """專案擁有者（經由 DataLoader 批次並去重）"""
+        data = await get_loaders(info).user.load(str(self.user_id))
+        return User(**data) if data else None
+
+    @strawberry.field
+    async def script(self, info: strawberry.Info) -> Optional["AIScript"]:
+        """關聯的 AI 腳本（經由 DataLoader 批次載入）"""
         if not self.script_id:
             return None
-        # 這裡會調用 AI 服務獲取腳本詳情
-        return None
+        data = await get_loaders(info).script.load(str(self.script_id))
+        return AIScript(**data) if data else None
 
     @strawberry.field
     async def voice_synthesis(self) -> Optional["VoiceSynthesis"]:
@@ -0,0 +1,145 @@
+"""
+測試 cache 模組（持久化查詢與正規化實體快取）
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from app.cache import EntityCache, persisted_queries, query_hash
+from app.loaders import Loaders
+from app.schema import schema
+
+from tests.test_loaders import NESTED_QUERY, FakeBackend
+
+STATUS_QUERY = """
+query {
+    videoProjects(userId: "u1", limit: 50) { id status }
+}
+"""
+
+TITLE_QUERY = """
+query {
+    videoProjects(userId: "u1", limit: 50) { id title }
+}
+"""
+
+CREATE_MUTATION = """
+mutation {
+    createVideoProject(userId: "u1", title: "New") { id }
+}
+"""
+
+
+class MutableBackend(FakeBackend):
+    """支援建立專案的模擬後端"""
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "POST" and request.url.path == "/projects":
+            self.calls.append("POST /projects")
+            project = {**self.projects[0], "id": f"p{len(self.projects)}", "title": "New"}
+            self.projects.append(project)
+            return httpx.Response(201, json=project)
+        return await super().handler(request)
+
+
+@pytest.fixture(autouse=True)
+def backend_urls(monkeypatch):
+    from app import config
+
+    settings = config.get_settings()
+    monkeypatch.setattr(settings, "AUTH_SERVICE_URL", "http://auth")
+    monkeypatch.setattr(settings, "VIDEO_SERVICE_URL", "http://video")
+    monkeypatch.setattr(settings, "AI_SERVICE_URL", "http://ai")
+
+
+async def _execute(query, client, cache, **kwargs):
+    return await schema.execute(
+        query, context_value={"loaders": Loaders(client, cache=cache)}, **kwargs
+    )
+
+
+class TestEntityCache:
+    @pytest.mark.asyncio
+    async def test_repeated_dashboard_query_skips_backends(self):
+        backend = FakeBackend(projects=50)
+        cache = EntityCache()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(backend.handler)) as client:
+            first = await _execute(NESTED_QUERY, client, cache)
+            calls_after_first = len(backend.calls)
+            second = await _execute(NESTED_QUERY, client, cache)
+
+        assert second.errors is None
+        assert second.data == first.data
+        assert calls_after_first == 3
+        assert len(backend.calls) == calls_after_first
+
+    @pytest.mark.asyncio
+    async def test_field_level_ttl(self):
+        backend = FakeBackend(projects=5)
+        cache = EntityCache(field_ttls={"VideoProject": {"_default": 60, "status": 0.05}})
+        async with httpx.AsyncClient(transport=httpx.MockTransport(backend.handler)) as client:
+            await _execute(STATUS_QUERY, client, cache)
+            await asyncio.sleep(0.1)
+
+            # 只選取長 TTL 欄位時仍命中快取
+            await _execute(TITLE_QUERY, client, cache)
+            assert backend.calls.count("/projects") == 1
+
+            # 選取已過期的 status 時重新請求
+            await _execute(STATUS_QUERY, client, cache)
+            assert backend.calls.count("/projects") == 2
+
+    @pytest.mark.asyncio
+    async def test_mutation_invalidates_project_list(self):
+        backend = MutableBackend(projects=2)
+        cache = EntityCache()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(backend.handler)) as client:
+            before = await _execute(TITLE_QUERY, client, cache)
+            await _execute(CREATE_MUTATION, client, cache)
+            after = await _execute(TITLE_QUERY, client, cache)
+
+        assert len(before.data["videoProjects"]) == 2
+        assert len(after.data["videoProjects"]) == 3
+        assert backend.calls.count("/projects") == 2
+        assert cache.stats["invalidations"] == 1
+
+    def test_lru_eviction(self):
+        cache = EntityCache(max_entries=2)
+        for i in range(3):
+            cache.put("User", {"id": f"u{i}", "username": f"user{i}"})
+
+        assert cache.get("User", "u0") is None
+        assert cache.get("User", "u2")["username"] == "user2"
+
+
+class TestPersistedQueries:
+    @pytest.mark.asyncio
+    async def test_unknown_hash_then_register_then_hash_only(self):
+        backend = FakeBackend(projects=3)
+        cache = EntityCache()
+        sha256_hash = query_hash(TITLE_QUERY)
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": sha256_hash}}
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(backend.handler)) as client:
+            missing = await _execute(None, client, cache, operation_extensions=extensions)
+            registered = await _execute(TITLE_QUERY, client, cache, operation_extensions=extensions)
+            by_hash = await _execute(None, client, cache, operation_extensions=extensions)
+
+        assert missing.errors[0].message == "PersistedQueryNotFound"
+        assert registered.errors is None
+        assert by_hash.errors is None
+        assert by_hash.data == registered.data
+        assert persisted_queries.get(sha256_hash) == TITLE_QUERY
+
+    @pytest.mark.asyncio
+    async def test_hash_mismatch_is_rejected(self):
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": "0" * 64}}
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(FakeBackend().handler)
+        ) as client:
+            result = await _execute(
+                TITLE_QUERY, client, EntityCache(), operation_extensions=extensions
+            )
+
+        assert result.errors[0].message == "provided sha does not match query"
@@ -0,0 +1,192 @@
+"""
+測試 loaders 模組（DataLoader 批次與共用連線池）
+"""
+
+import asyncio
+import time
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import numpy as np
+import pytest
+from app.loaders import Loaders
+from app.schema import schema
+
+NESTED_QUERY = """
+query {
+    videoProjects(userId: "u1", limit: 50) {
+        id
+        title
+        owner { username }
+        script { topic }
+    }
+}
+"""
+
+
+class FakeBackend:
+    """模擬認證、影片與 AI 服務，記錄每次後端呼叫"""
+
+    def __init__(self, projects: int = 50, latency: float = 0.0):
+        self.latency = latency
+        self.calls = []
+        self.projects = [
+            {
+                "id": f"p{i}",
+                "user_id": "u1",
+                "title": f"Project {i}",
+                "status": "draft",
+                "platform": "youtube",
+                "script_id": f"s{i % 25}",
+                "created_at": "2024-01-01T00:00:00",
+                "updated_at": "2024-01-01T00:00:00",
+            }
+            for i in range(projects)
+        ]
+
+    def script(self, script_id: str) -> dict:
+        return {
+            "id": script_id,
+            "user_id": "u1",
+            "topic": f"topic-{script_id}",
+            "content": "...",
+            "platform": "youtube",
+            "target_duration": 60,
+            "keywords": [],
+            "created_at": "2024-01-01T00:00:00",
+        }
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request.url.path)
+        await asyncio.sleep(self.latency)
+
+        path = request.url.path
+        query = parse_qs(urlparse(str(request.url)).query)
+        if path == "/projects":
+            return httpx.Response(200, json={"projects": self.projects})
+        if path.startswith("/users/"):
+            user_id = path.rsplit("/", 1)[1]
+            return httpx.Response(
+                200,
+                json={
+                    "id": user_id,
+                    "username": f"user-{user_id}",
+                    "email": "user@example.com",
+                    "created_at": "2024-01-01T00:00:00",
+                },
+            )
+        if path == "/scripts" and "ids" in query:
+            ids = query["ids"][0].split(",")
+            return httpx.Response(200, json={"scripts": [self.script(i) for i in ids]})
+        if path.startswith("/scripts/"):
+            return httpx.Response(200, json=self.script(path.rsplit("/", 1)[1]))
+        return httpx.Response(404)
+
+
+@pytest.fixture(autouse=True)
+def backend_urls(monkeypatch):
+    from app import config
+
+    settings = config.get_settings()
+    monkeypatch.setattr(settings, "AUTH_SERVICE_URL", "http://auth")
+    monkeypatch.setattr(settings, "VIDEO_SERVICE_URL", "http://video")
+    monkeypatch.setattr(settings, "AI_SERVICE_URL", "http://ai")
+    # 只測試單一請求內的批次行為，不經過跨請求實體快取
+    monkeypatch.setattr(settings, "ENTITY_CACHE_ENABLED", False)
+
+
+def _client(backend: FakeBackend) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(backend.handler))
+
+
+async def _execute(loaders: Loaders):
+    result = await schema.execute(NESTED_QUERY, context_value={"loaders": loaders})
+    assert result.errors is None
+    return result.data["videoProjects"]
+
+
+class TestLoaders:
+    @pytest.mark.asyncio
+    async def test_nested_query_batches_backend_calls(self):
+        backend = FakeBackend(projects=50)
+        async with _client(backend) as client:
+            loaders = Loaders(client)
+            projects = await _execute(loaders)
+
+        assert len(projects) == 50
+        assert projects[7]["owner"]["username"] == "user-u1"
+        assert projects[7]["script"]["topic"] == "topic-s7"
+        # 1 次專案列表 + 1 次用戶（去重）+ 1 次批次腳本
+        assert sorted(backend.calls) == ["/projects", "/scripts", "/users/u1"]
+        assert loaders.backend_calls == 3
+
+    @pytest.mark.asyncio
+    async def test_script_batches_respect_max_batch_size(self, monkeypatch):
+        from app import config
+
+        monkeypatch.setattr(config.get_settings(), "DATALOADER_MAX_BATCH_SIZE", 10)
+        backend = FakeBackend(projects=50)
+        async with _client(backend) as client:
+            await _execute(Loaders(client))
+
+        # 25 個不同的腳本 ID，每批最多 10 個
+        assert backend.calls.count("/scripts") == 3
+
+    @pytest.mark.asyncio
+    async def test_missing_script_resolves_to_none(self):
+        backend = FakeBackend(projects=1)
+
+        async def handler(request):
+            if request.url.path == "/scripts":
+                return httpx.Response(200, json={"scripts": []})
+            return await backend.handler(request)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            projects = await _execute(Loaders(client))
+
+        assert projects[0]["script"] is None
+
+    @pytest.mark.performance
+    @pytest.mark.asyncio
+    async def test_nested_query_backend_calls_and_p95(self):
+        """50 個專案的巢狀查詢：DataLoader 與逐欄位請求 (N+1) 的後端呼叫數與 p95 延遲"""
+
+        class PerFieldLoaders(Loaders):
+            """不批次、不快取，相當於每個欄位各自請求後端"""
+
+            def __init__(self, client):
+                super().__init__(client)
+                self.user.max_batch_size = 1
+                self.user.cache = False
+
+                async def load_script(ids):
+                    response = await self.get(f"{self.settings.AI_SERVICE_URL}/scripts/{ids[0]}")
+                    return [response.json()]
+
+                self.script.load_fn = load_script
+                self.script.max_batch_size = 1
+                self.script.cache = False
+
+        async def measure(loader_cls, runs: int = 20):
+            backend = FakeBackend(projects=50, latency=0.002)
+            durations = []
+            async with httpx.AsyncClient(
+                transport=httpx.MockTransport(backend.handler),
+                limits=httpx.Limits(max_connections=10),
+            ) as client:
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    await _execute(loader_cls(client))
+                    durations.append(time.perf_counter() - start)
+            return len(backend.calls) // runs, np.percentile(durations, 95) * 1000
+
+        naive_calls, naive_p95 = await measure(PerFieldLoaders)
+        batched_calls, batched_p95 = await measure(Loaders)
+
+        print(
+            f"\nN+1: {naive_calls} backend calls, p95 {naive_p95:.1f}ms | "
+            f"DataLoader: {batched_calls} backend calls, p95 {batched_p95:.1f}ms"
+        )
+        assert naive_calls == 101
+        assert batched_calls == 3
+        assert batched_p95 < naive_p95
@@ -51,6 +51,20 @@ class Settings(BaseSettings):
     synthesis_timeout: int = int(os.getenv("SYNTHESIS_TIMEOUT", "60"))  # 60 seconds
     model_load_timeout: int = int(os.getenv("MODEL_LOAD_TIMEOUT", "120"))  # 2 minutes
 
+    # Dynamic micro-batching
+    synthesis_batching_enabled: bool = (
+        os.getenv("SYNTHESIS_BATCHING_ENABLED", "true").lower() == "true"
+    )
+    synthesis_batch_max_size: int = int(os.getenv("SYNTHESIS_BATCH_MAX_SIZE", "16"))
+    synthesis_batch_max_wait_ms: float = float(os.getenv("SYNTHESIS_BATCH_MAX_WAIT_MS", "5"))
+
+    # Content-addressed audio cache
+    audio_cache_enabled: bool = os.getenv("AUDIO_CACHE_ENABLED", "true").lower() == "true"
+    audio_cache_dir: str = os.getenv("AUDIO_CACHE_DIR", "cache/audio")
+    audio_cache_max_bytes: int = int(
+        os.getenv("AUDIO_CACHE_MAX_BYTES", str(1024 * 1024 * 1024))
+    )  # 1 GB
+
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -286,6 +286,13 @@ async def get_synthesis_audio(job_id: int, current_user: dict = Depends(get_curr
         )
 
 
+@router.get("/synthesize/stats")
+async def get_synthesis_stats(current_user: dict = Depends(get_current_user)):
+    """Get synthesis engine statistics, including batch size and latency histograms"""
+
+    return await synthesis_engine.get_synthesis_stats()
+
+
 @router.get("/jobs", response_model=List[SynthesisResponse])
 async def get_synthesis_jobs(
     current_user: dict = Depends(get_current_user),
@@ -0,0 +1,154 @@
+import asyncio
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import structlog
+
+from ..config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+class AudioCache:
+    """Content-addressed on-disk audio cache with LRU eviction by bytes.
+
+    Entries are stored as ``<cache_dir>/<key[:2]>/<key>.wav`` where ``key`` is
+    the synthesis job hash. Recency is tracked in memory and mirrored to the
+    file mtime so the LRU order survives a restart.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.wav"
+
+    def _load_index(self):
+        """Rebuild the LRU index from files already on disk"""
+        self._loaded = True
+        if not self.cache_dir.exists():
+            return
+
+        files = []
+        for path in self.cache_dir.glob("*/*.wav"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+
+        self._evict()
+        logger.info(
+            "Audio cache index loaded",
+            entries=len(self._entries),
+            total_bytes=self._total_bytes,
+        )
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._load_index()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return cached audio for ``key`` or ``None``"""
+        self._ensure_loaded()
+        if key not in self._entries:
+            self.misses += 1
+            return None
+
+        try:
+            data = await asyncio.to_thread(self._read, self._path(key))
+        except OSError:
+            # File vanished underneath us (e.g. cleaned by another worker)
+            self._forget(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return data
+
+    async def put(self, key: str, data: bytes):
+        """Store audio under ``key``, evicting least recently used entries"""
+        self._ensure_loaded()
+        if len(data) > self.max_bytes:
+            return
+
+        try:
+            await asyncio.to_thread(self._write, self._path(key), data)
+        except OSError as e:
+            logger.warning("Failed to write audio cache entry", key=key, error=str(e))
+            return
+
+        self._forget(key)
+        self._entries[key] = len(data)
+        self._total_bytes += len(data)
+        self._evict()
+
+    def _forget(self, key: str):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _read(path: Path) -> bytes:
+        data = path.read_bytes()
+        os.utime(path)  # Persist recency for the next index rebuild
+        return data
+
+    @staticmethod
+    def _write(path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        """Remove every cached entry"""
+        self._ensure_loaded()
+        for key in list(self._entries):
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "total_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+# Global audio cache instance
+audio_cache = AudioCache(settings.audio_cache_dir, settings.audio_cache_max_bytes)
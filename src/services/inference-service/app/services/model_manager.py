@@ -1,6 +1,8 @@
 import asyncio
+import io
 import time
-from typing import Any, Dict
+import wave
+from typing import Any, Dict, List
 
 import numpy as np
 import structlog
@@ -21,6 +23,8 @@ class MockVoiceModel:
         self.config = config
         self.loaded_at = time.time()
 
+    sample_rate = 22050
+
     async def synthesize(self, text: str, **kwargs) -> bytes:
         """Synthesize speech from text - mock implementation"""
         # Simulate processing time
@@ -28,26 +32,47 @@ class MockVoiceModel:
         await asyncio.sleep(min(processing_time, 2.0))  # Cap at 2 seconds
 
         # Generate mock audio data (simple sine wave)
-        sample_rate = 22050
         duration = max(len(text) * 0.1, 1.0)  # Minimum 1 second
-        t = np.linspace(0, duration, int(sample_rate * duration))
+        t = np.linspace(0, duration, int(self.sample_rate * duration))
 
         # Create a simple sine wave with varying frequency
         frequency = 440 + (hash(text) % 200)  # Base frequency with text-based variation
         audio = np.sin(2 * np.pi * frequency * t) * 0.3
 
+        return self._encode_wav(audio)
+
+    async def synthesize_batch(self, texts: List[str], **kwargs) -> List[bytes]:
+        """Synthesize several texts in one vectorized pass - mock implementation
+
+        A real model pays its per-call overhead once per batch, so the
+        simulated processing time follows the longest text rather than the sum.
+        """
+        if not texts:
+            return []
+
+        processing_time = max(len(text) for text in texts) * 0.01
+        await asyncio.sleep(min(processing_time, 2.0))
+
+        durations = np.array([max(len(text) * 0.1, 1.0) for text in texts])
+        lengths = (durations * self.sample_rate).astype(int)
+        frequencies = np.array([440 + (hash(text) % 200) for text in texts], dtype=float)
+
+        # One padded (batch, samples) matrix instead of a waveform per call
+        steps = np.arange(lengths.max())[None, :] * (durations / (lengths - 1))[:, None]
+        audio = np.sin(2 * np.pi * frequencies[:, None] * steps) * 0.3
+
+        return [self._encode_wav(audio[i, :length]) for i, length in enumerate(lengths)]
+
+    def _encode_wav(self, audio: np.ndarray) -> bytes:
+        """Encode float audio as 16-bit mono WAV bytes"""
         # Convert to 16-bit PCM
         audio_int16 = (audio * 32767).astype(np.int16)
 
-        # Convert to WAV format bytes (simplified)
-        import io
-        import wave
-
         buffer = io.BytesIO()
         with wave.open(buffer, "wb") as wav_file:
             wav_file.setnchannels(1)  # Mono
             wav_file.setsampwidth(2)  # 16-bit
-            wav_file.setframerate(sample_rate)
+            wav_file.setframerate(self.sample_rate)
             wav_file.writeframes(audio_int16.tobytes())
 
         return buffer.getvalue()
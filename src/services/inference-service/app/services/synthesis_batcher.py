@@ -0,0 +1,189 @@
+import asyncio
+import bisect
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import structlog
+
+from ..config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+BATCH_SIZE_BUCKETS: Tuple[float, ...] = (1, 2, 4, 8, 16, 32, 64)
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus-style cumulative buckets on export)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "avg": self.total / self.count if self.count else 0.0,
+            "buckets": buckets,
+        }
+
+
+@dataclass
+class _PendingRequest:
+    text: str
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class _PendingBatch:
+    model: Any
+    params: Dict[str, Any]
+    requests: List[_PendingRequest] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class SynthesisBatcher:
+    """Collects synthesis requests per model and runs them as one batch.
+
+    Requests are grouped by ``(model_id, synthesis_params)`` because a batch
+    can only share a single parameter set. A group is flushed when it reaches
+    ``max_batch_size`` or ``max_wait_ms`` after its first request arrived,
+    whichever comes first.
+    """
+
+    def __init__(self, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: Dict[Tuple[int, Tuple], _PendingBatch] = {}
+        self._inflight: set[asyncio.Task] = set()
+        self.batch_size_histogram = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_latency_histogram = Histogram(LATENCY_BUCKETS_MS)
+        self.batch_latency_histogram = Histogram(LATENCY_BUCKETS_MS)
+        self.batches_run = 0
+
+    @staticmethod
+    def _batch_key(model_id: int, params: Dict[str, Any]) -> Tuple[int, Tuple]:
+        return model_id, tuple(sorted((k, repr(v)) for k, v in params.items()))
+
+    async def submit(self, model: Any, model_id: int, text: str, params: Dict[str, Any]) -> bytes:
+        """Queue ``text`` for synthesis and wait for its share of the batch"""
+        loop = asyncio.get_running_loop()
+        key = self._batch_key(model_id, params)
+
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _PendingBatch(model=model, params=dict(params))
+            batch.timer = loop.call_later(self.max_wait, self._flush, key)
+            self._pending[key] = batch
+
+        request = _PendingRequest(text=text, future=loop.create_future())
+        batch.requests.append(request)
+
+        if len(batch.requests) >= self.max_batch_size:
+            self._flush(key)
+
+        return await request.future
+
+    def _flush(self, key: Tuple[int, Tuple]):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch: _PendingBatch):
+        requests = [r for r in batch.requests if not r.future.done()]
+        if not requests:
+            return
+
+        started = time.perf_counter()
+        for request in requests:
+            self.queue_latency_histogram.observe((started - request.enqueued_at) * 1000)
+        self.batch_size_histogram.observe(len(requests))
+        self.batches_run += 1
+
+        texts = [r.text for r in requests]
+        try:
+            if hasattr(batch.model, "synthesize_batch"):
+                results = await batch.model.synthesize_batch(texts, **batch.params)
+            else:
+                results = await asyncio.gather(
+                    *(batch.model.synthesize(text, **batch.params) for text in texts),
+                    return_exceptions=True,
+                )
+        except Exception as e:
+            logger.error("Batched synthesis failed", batch_size=len(texts), error=str(e))
+            results = [e] * len(texts)
+
+        self.batch_latency_histogram.observe((time.perf_counter() - started) * 1000)
+
+        results = list(results)
+        if len(results) != len(requests):
+            logger.error(
+                "Batched synthesis returned wrong number of results",
+                batch_size=len(requests),
+                results=len(results),
+            )
+            # Never leave a waiter hanging: requests without a result fail
+            missing = RuntimeError(
+                f"Batched synthesis returned {len(results)} results for {len(requests)} requests"
+            )
+            results.extend([missing] * (len(requests) - len(results)))
+
+        for request, result in zip(requests, results):
+            if request.future.done():
+                continue
+            if isinstance(result, BaseException):
+                request.future.set_exception(result)
+            else:
+                request.future.set_result(result)
+
+    async def drain(self):
+        """Flush every pending group and wait for in-flight batches"""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batch size and latency histograms"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches_run": self.batches_run,
+            "pending_groups": len(self._pending),
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "queue_latency_ms": self.queue_latency_histogram.snapshot(),
+            "batch_latency_ms": self.batch_latency_histogram.snapshot(),
+        }
+
+
+# Global synthesis batcher instance
+synthesis_batcher = SynthesisBatcher(
+    max_batch_size=settings.synthesis_batch_max_size,
+    max_wait_ms=settings.synthesis_batch_max_wait_ms,
+)
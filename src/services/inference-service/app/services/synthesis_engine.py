@@ -6,7 +6,9 @@ from typing import Any, Dict, Optional
 import structlog
 
 from ..config import get_settings
+from .audio_cache import audio_cache
 from .model_manager import model_manager
+from .synthesis_batcher import synthesis_batcher
 
 logger = structlog.get_logger()
 settings = get_settings()
@@ -17,6 +19,7 @@ class SynthesisEngine:
 
     def __init__(self):
         self.active_syntheses: Dict[str, asyncio.Task] = {}
+        self.coalesced_requests = 0
 
     async def synthesize_speech(
         self,
@@ -61,36 +64,52 @@ class SynthesisEngine:
 
         start_time = time.time()
 
-        try:
-            # Load the model
-            model = await model_manager.get_model(model_id, model_config)
-
-            # Perform synthesis
-            audio_data = await asyncio.wait_for(
-                model.synthesize(text, **synthesis_params),
-                timeout=settings.synthesis_timeout,
+        # Identical requests (retries, re-renders) are served from the
+        # content-addressed cache keyed on the job hash
+        if settings.audio_cache_enabled:
+            cached_audio = await audio_cache.get(job_id)
+            if cached_audio is not None:
+                logger.info("Voice synthesis cache hit", job_id=job_id, user_id=user_id)
+                return self._build_result(
+                    job_id,
+                    cached_audio,
+                    time.time() - start_time,
+                    synthesis_params,
+                    model_id,
+                    text,
+                    cache_hit=True,
+                )
+
+        # Concurrent duplicates share one in-flight synthesis
+        task = self.active_syntheses.get(job_id)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._run_synthesis(job_id, text, model_id, model_config, synthesis_params)
             )
+            self.active_syntheses[job_id] = task
+            task.add_done_callback(lambda t: self._release_synthesis(job_id, t))
+        else:
+            self.coalesced_requests += 1
+            logger.info("Joining in-flight synthesis", job_id=job_id, user_id=user_id)
+
+        try:
+            # Shield so a cancelled caller doesn't cancel the shared work
+            audio_data = await asyncio.shield(task)
 
             processing_time = time.time() - start_time
-            audio_duration = self._estimate_audio_duration(audio_data)
+            result = self._build_result(
+                job_id, audio_data, processing_time, synthesis_params, model_id, text
+            )
 
             logger.info(
                 "Voice synthesis completed",
                 job_id=job_id,
                 processing_time=processing_time,
-                audio_duration=audio_duration,
+                audio_duration=result["audio_duration"],
                 audio_size=len(audio_data),
             )
 
-            return {
-                "job_id": job_id,
-                "audio_data": audio_data,
-                "audio_duration": audio_duration,
-                "processing_time": processing_time,
-                "synthesis_params": synthesis_params,
-                "model_id": model_id,
-                "text_length": len(text),
-            }
+            return result
 
         except asyncio.TimeoutError:
             logger.error(
@@ -110,6 +129,62 @@ class SynthesisEngine:
             )
             raise RuntimeError(f"Synthesis failed: {str(e)}")
 
+    async def _run_synthesis(
+        self,
+        job_id: str,
+        text: str,
+        model_id: int,
+        model_config: Dict[str, Any],
+        synthesis_params: Dict[str, Any],
+    ) -> bytes:
+        """Load the model, synthesize and populate the audio cache"""
+
+        # Load the model
+        model = await model_manager.get_model(model_id, model_config)
+
+        # Perform synthesis, coalescing concurrent requests for the same
+        # model into a single batched call when batching is enabled
+        if settings.synthesis_batching_enabled:
+            synthesis = synthesis_batcher.submit(model, model_id, text, synthesis_params)
+        else:
+            synthesis = model.synthesize(text, **synthesis_params)
+
+        audio_data = await asyncio.wait_for(synthesis, timeout=settings.synthesis_timeout)
+
+        if settings.audio_cache_enabled:
+            await audio_cache.put(job_id, audio_data)
+
+        return audio_data
+
+    def _release_synthesis(self, job_id: str, task: asyncio.Task):
+        """Drop a finished task from the in-flight map"""
+        if self.active_syntheses.get(job_id) is task:
+            del self.active_syntheses[job_id]
+        if not task.cancelled():
+            # Retrieve the exception so an unawaited failure isn't logged as lost
+            task.exception()
+
+    def _build_result(
+        self,
+        job_id: str,
+        audio_data: bytes,
+        processing_time: float,
+        synthesis_params: Dict[str, Any],
+        model_id: int,
+        text: str,
+        cache_hit: bool = False,
+    ) -> Dict[str, Any]:
+        return {
+            "job_id": job_id,
+            "audio_data": audio_data,
+            "audio_duration": self._estimate_audio_duration(audio_data),
+            "processing_time": processing_time,
+            "synthesis_params": synthesis_params,
+            "model_id": model_id,
+            "text_length": len(text),
+            "cache_hit": cache_hit,
+        }
+
     async def batch_synthesize(
         self,
         texts: list[str],
@@ -200,9 +275,14 @@ class SynthesisEngine:
         """Get synthesis engine statistics"""
         return {
             "active_syntheses": len(self.active_syntheses),
+            "coalesced_requests": self.coalesced_requests,
             "max_text_length": settings.max_text_length,
             "synthesis_timeout": settings.synthesis_timeout,
             "max_audio_duration": settings.max_audio_duration,
+            "batching_enabled": settings.synthesis_batching_enabled,
+            "batching": synthesis_batcher.get_stats(),
+            "audio_cache_enabled": settings.audio_cache_enabled,
+            "audio_cache": audio_cache.get_stats(),
         }
 
 
@@ -0,0 +1,107 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from app.services.audio_cache import AudioCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AudioCache(str(tmp_path / "audio"), max_bytes=100)
+
+
+class TestAudioCache:
+    @pytest.mark.asyncio
+    async def test_miss_then_hit(self, cache):
+        assert await cache.get("ab12") is None
+
+        await cache.put("ab12", b"RIFF-data")
+
+        assert await cache.get("ab12") == b"RIFF-data"
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["total_bytes"] == len(b"RIFF-data")
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used_by_bytes(self, cache):
+        await cache.put("aa01", b"x" * 40)
+        await cache.put("bb02", b"y" * 40)
+        await cache.get("aa01")  # aa01 becomes most recent
+        await cache.put("cc03", b"z" * 40)
+
+        assert await cache.get("bb02") is None
+        assert await cache.get("aa01") == b"x" * 40
+        assert await cache.get("cc03") == b"z" * 40
+        assert cache.get_stats()["evictions"] == 1
+        assert not cache._path("bb02").exists()
+
+    @pytest.mark.asyncio
+    async def test_oversized_entry_is_not_cached(self, cache):
+        await cache.put("dd04", b"x" * 101)
+
+        assert await cache.get("dd04") is None
+
+    @pytest.mark.asyncio
+    async def test_index_survives_restart(self, tmp_path):
+        first = AudioCache(str(tmp_path / "audio"), max_bytes=100)
+        await first.put("ee05", b"persisted")
+
+        second = AudioCache(str(tmp_path / "audio"), max_bytes=100)
+
+        assert await second.get("ee05") == b"persisted"
+
+    @pytest.mark.asyncio
+    async def test_missing_file_is_treated_as_miss(self, cache):
+        await cache.put("ff06", b"data")
+        cache._path("ff06").unlink()
+
+        assert await cache.get("ff06") is None
+        assert cache.get_stats()["entries"] == 0
+
+
+class TestSynthesisDeduplication:
+    @pytest.fixture
+    def engine(self, tmp_path):
+        pytest.importorskip("torch")
+        from app.services import synthesis_engine as engine_module
+
+        async def synthesize(text, **kwargs):
+            await asyncio.sleep(0.05)
+            return b"audio"
+
+        model = AsyncMock()
+        model.synthesize.side_effect = synthesize
+        cache = AudioCache(str(tmp_path / "audio"), max_bytes=1024)
+
+        with (
+            patch.object(engine_module, "audio_cache", cache),
+            patch.object(engine_module.model_manager, "get_model", AsyncMock(return_value=model)),
+            patch.object(engine_module.settings, "synthesis_batching_enabled", False),
+        ):
+            yield engine_module.SynthesisEngine(), model
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_share_one_synthesis(self, engine):
+        synthesis_engine, model = engine
+
+        results = await asyncio.gather(
+            *(synthesis_engine.synthesize_speech("Hello", 1, {}) for _ in range(5))
+        )
+
+        assert model.synthesize.call_count == 1
+        assert len({r["job_id"] for r in results}) == 1
+        assert synthesis_engine.coalesced_requests == 4
+        assert synthesis_engine.active_syntheses == {}
+
+    @pytest.mark.asyncio
+    async def test_repeat_request_is_served_from_cache(self, engine):
+        synthesis_engine, model = engine
+
+        first = await synthesis_engine.synthesize_speech("Hello", 1, {})
+        second = await synthesis_engine.synthesize_speech("Hello", 1, {})
+
+        assert model.synthesize.call_count == 1
+        assert first["cache_hit"] is False
+        assert second["cache_hit"] is True
+        assert second["audio_data"] == first["audio_data"]
@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+import pytest
+from app.services.synthesis_batcher import Histogram, SynthesisBatcher
+
+
+class FakeBatchModel:
+    """Model that records how it was called"""
+
+    def __init__(self, per_call_overhead: float = 0.0):
+        self.per_call_overhead = per_call_overhead
+        self.batch_calls = []
+
+    async def synthesize(self, text, **kwargs):
+        await asyncio.sleep(self.per_call_overhead)
+        return text.encode()
+
+    async def synthesize_batch(self, texts, **kwargs):
+        self.batch_calls.append(list(texts))
+        await asyncio.sleep(self.per_call_overhead)
+        return [text.encode() for text in texts]
+
+
+class FailingBatchModel:
+    async def synthesize_batch(self, texts, **kwargs):
+        raise RuntimeError("model crashed")
+
+
+class ShortBatchModel:
+    """Returns one result fewer than it was given"""
+
+    async def synthesize_batch(self, texts, **kwargs):
+        return [text.encode() for text in texts[:-1]]
+
+
+class TestHistogram:
+    def test_cumulative_buckets(self):
+        histogram = Histogram((1, 10, 100))
+        for value in (0.5, 5, 5, 50, 500):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        assert snapshot["count"] == 5
+        assert snapshot["buckets"] == {"1": 1, "10": 3, "100": 4, "+Inf": 5}
+        assert snapshot["avg"] == pytest.approx(112.1)
+
+
+class TestSynthesisBatcher:
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_batch(self):
+        batcher = SynthesisBatcher(max_batch_size=8, max_wait_ms=20)
+        model = FakeBatchModel()
+
+        results = await asyncio.gather(
+            *(batcher.submit(model, 1, f"line {i}", {"speed": 1.0}) for i in range(5))
+        )
+
+        assert results == [f"line {i}".encode() for i in range(5)]
+        assert model.batch_calls == [[f"line {i}" for i in range(5)]]
+        assert batcher.get_stats()["batch_size"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_flushes_when_max_batch_size_reached(self):
+        batcher = SynthesisBatcher(max_batch_size=4, max_wait_ms=10_000)
+        model = FakeBatchModel()
+
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(model, 1, str(i), {}) for i in range(8))),
+            timeout=1.0,
+        )
+
+        assert len(results) == 8
+        assert [len(call) for call in model.batch_calls] == [4, 4]
+
+    @pytest.mark.asyncio
+    async def test_different_params_are_not_mixed(self):
+        batcher = SynthesisBatcher(max_batch_size=8, max_wait_ms=5)
+        model = FakeBatchModel()
+
+        await asyncio.gather(
+            batcher.submit(model, 1, "a", {"speed": 1.0}),
+            batcher.submit(model, 1, "b", {"speed": 1.5}),
+            batcher.submit(model, 2, "c", {"speed": 1.0}),
+        )
+
+        assert sorted(model.batch_calls) == [["a"], ["b"], ["c"]]
+
+    @pytest.mark.asyncio
+    async def test_batch_failure_propagates_to_every_waiter(self):
+        batcher = SynthesisBatcher(max_batch_size=8, max_wait_ms=5)
+        model = FailingBatchModel()
+
+        results = await asyncio.gather(
+            batcher.submit(model, 1, "a", {}),
+            batcher.submit(model, 1, "b", {}),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_missing_results_fail_unmatched_waiters(self):
+        batcher = SynthesisBatcher(max_batch_size=8, max_wait_ms=5)
+        model = ShortBatchModel()
+
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                *(batcher.submit(model, 1, text, {}) for text in "abc"),
+                return_exceptions=True,
+            ),
+            timeout=1.0,
+        )
+
+        assert results[:2] == [b"a", b"b"]
+        assert isinstance(results[2], RuntimeError)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_break_batch(self):
+        batcher = SynthesisBatcher(max_batch_size=8, max_wait_ms=20)
+        model = FakeBatchModel()
+
+        cancelled = asyncio.ensure_future(batcher.submit(model, 1, "gone", {}))
+        kept = asyncio.ensure_future(batcher.submit(model, 1, "kept", {}))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        assert await kept == b"kept"
+        assert model.batch_calls == [["kept"]]
+
+    @pytest.mark.performance
+    @pytest.mark.asyncio
+    async def test_batching_amortizes_per_call_overhead(self):
+        """50 concurrent lines with 20ms overhead per model call"""
+        model = FakeBatchModel(per_call_overhead=0.02)
+        texts = [f"narration line {i}" for i in range(50)]
+
+        sequential_start = time.perf_counter()
+        for text in texts:
+            await model.synthesize(text)
+        sequential = time.perf_counter() - sequential_start
+
+        batcher = SynthesisBatcher(max_batch_size=16, max_wait_ms=5)
+        batched_start = time.perf_counter()
+        await asyncio.gather(*(batcher.submit(model, 1, text, {}) for text in texts))
+        batched = time.perf_counter() - batched_start
+
+        stats = batcher.get_stats()
+        assert stats["batches_run"] == 4
+        assert stats["batch_size"]["avg"] == pytest.approx(12.5)
+        assert batched < sequential / 4
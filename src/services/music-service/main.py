@@ -1,9 +1,13 @@
+import hmac
 import os
 from contextlib import asynccontextmanager
+from typing import Any, Optional
 
 import structlog
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, Query
 from pydantic import BaseModel
+from suno_client import MusicGenerationRequest as SunoGenerationRequest
+from suno_client import SunoClient
 
 # Configure structured logging
 structlog.configure(
@@ -30,9 +34,24 @@ class MusicGenerationRequest(BaseModel):
 async def lifespan(app: FastAPI):
     # Startup
     app.state.suno_api_key = os.getenv("SUNO_API_KEY")
+    app.state.suno_client = None
+    if app.state.suno_api_key:
+        # 未設定 SUNO_CALLBACK_TOKEN 時 webhook 一律拒絕，不請 Suno 回呼
+        callback_url = os.getenv("SUNO_CALLBACK_URL")
+        if callback_url and not os.getenv("SUNO_CALLBACK_TOKEN"):
+            logger.warning("SUNO_CALLBACK_URL ignored: SUNO_CALLBACK_TOKEN is not set")
+            callback_url = None
+        # 共用一個客戶端，所有進行中的生成由同一個輪詢器批次查詢
+        app.state.suno_client = await SunoClient(
+            api_key=app.state.suno_api_key,
+            base_url=os.getenv("SUNO_BASE_URL", "https://api.sunoai.com"),
+            callback_url=callback_url,
+        ).__aenter__()
     logger.info("Music service started")
     yield
     # Shutdown
+    if app.state.suno_client:
+        await app.state.suno_client.__aexit__(None, None, None)
     logger.info("Music service stopped")
 
 
@@ -60,7 +79,25 @@ async def generate_music(request: MusicGenerationRequest):
             style=request.style,
         )
 
-        # 模擬音樂生成
+        client = app.state.suno_client
+        if client:
+            result = await client.generate_music(
+                SunoGenerationRequest(
+                    prompt=request.prompt, duration=request.duration, style=request.style
+                )
+            )
+            if result.status != "completed":
+                raise HTTPException(status_code=502, detail=result.error_message)
+            return {
+                "status": "success",
+                "music_id": result.id,
+                "prompt": request.prompt,
+                "duration": result.duration or request.duration,
+                "style": request.style,
+                "url": result.audio_url,
+            }
+
+        # 未設定 SUNO_API_KEY 時模擬音樂生成
         return {
             "status": "success",
             "music_id": f"music_{hash(request.prompt)}",
@@ -69,11 +106,31 @@ async def generate_music(request: MusicGenerationRequest):
             "style": request.style,
             "url": "https://example.com/generated-music.mp3",
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Music generation failed", error=str(e))
         raise HTTPException(status_code=500, detail="Music generation failed")
 
 
+@app.post("/callbacks/suno")
+async def suno_callback(payload: Any = Body(...), token: Optional[str] = Query(None)):
+    """Suno 生成完成的 webhook，直接完成等待中的生成而不必等下一次輪詢
+
+    未設定 SUNO_CALLBACK_TOKEN 時拒絕所有回呼，避免任何人偽造完成狀態與音檔網址。
+    """
+    expected = os.getenv("SUNO_CALLBACK_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Suno callbacks are disabled")
+    if not hmac.compare_digest(token or "", expected):
+        raise HTTPException(status_code=401, detail="Invalid callback token")
+
+    client = app.state.suno_client
+    resolved = client.handle_callback(payload) if client else 0
+    logger.info("Suno callback received", resolved=resolved)
+    return {"status": "ok", "resolved": resolved}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -7,14 +7,18 @@ Suno.ai 音樂生成客戶端
 import asyncio
 import logging
 import time
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
 
 import aiohttp
 
 logger = logging.getLogger(__name__)
 
+# 生成已結束（成功或失敗）的狀態
+TERMINAL_STATUSES = ("complete", "error")
+
 
 @dataclass
 class MusicGenerationRequest:
@@ -44,13 +48,219 @@ class MusicGenerationResult:
     error_message: Optional[str] = None
 
 
+@dataclass
+class SunoPollingConfig:
+    """生成狀態輪詢配置"""
+
+    batch_size: int = 50  # 單次 /api/get 查詢的 ID 數量上限
+    initial_delay: float = 10.0  # 尚無完成時間統計時，第一次檢查前的等待（秒）
+    min_interval: float = 2.0
+    max_interval: float = 15.0
+    timeout: float = 300.0
+    history_size: int = 200  # 保留最近幾次的完成時間
+    min_history: int = 5  # 完成時間樣本達到此數量後才依分佈排程
+    window_quantiles: tuple = (0.1, 0.9)  # 密集輪詢的完成時間區間
+    clock: Callable[[], float] = field(default=time.monotonic)  # 單調時鐘（秒），測試可替換
+
+
+@dataclass
+class _PendingGeneration:
+    future: asyncio.Future
+    started_at: float
+    next_check: float
+
+
+class SunoStatusPoller:
+    """集中輪詢所有進行中的生成狀態
+
+    所有等待中的生成 ID 由單一背景任務合併成 /api/get?ids=a,b,c 批次查詢，
+    等待者透過 future 取得結果。檢查間隔依最近的完成時間分佈調整：大多數生成
+    完成前不查詢，在常見的完成區間內密集查詢，超過後逐漸拉長間隔。
+    webhook 回呼可透過 handle_callback 直接完成等待中的 future。
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        base_url: str,
+        config: Optional[SunoPollingConfig] = None,
+    ):
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.config = config or SunoPollingConfig()
+        self._pending: Dict[str, _PendingGeneration] = {}
+        self._completion_times: Deque[float] = deque(maxlen=self.config.history_size)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.requests_made = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def completion_window(self) -> Optional[tuple]:
+        """最近完成時間的 (低, 高) 分位數；樣本不足時為 None"""
+        if len(self._completion_times) < self.config.min_history:
+            return None
+        times = sorted(self._completion_times)
+        low_q, high_q = self.config.window_quantiles
+        return (
+            times[int(low_q * (len(times) - 1))],
+            times[int(high_q * (len(times) - 1))],
+        )
+
+    def next_delay(self, age: float) -> float:
+        """已等待 age 秒的生成下一次檢查前的延遲"""
+        config = self.config
+        window = self.completion_window()
+        if window is None:
+            # 尚無統計：先等 initial_delay，之後間隔隨等待時間拉長
+            if age < config.initial_delay:
+                return max(config.initial_delay - age, config.min_interval)
+            overdue = age - config.initial_delay
+        else:
+            low, high = window
+            if age < low:
+                return max(low - age, config.min_interval)
+            if age <= high:
+                return config.min_interval
+            overdue = age - high
+        return min(config.max_interval, max(config.min_interval, overdue / 2))
+
+    async def wait(self, generation_id: str) -> Optional[Dict[str, Any]]:
+        """等待生成結束，回傳 /api/get 的項目；逾時回傳 None"""
+        entry = self._pending.get(generation_id)
+        if entry is None:
+            now = self.config.clock()
+            entry = _PendingGeneration(
+                future=asyncio.get_running_loop().create_future(),
+                started_at=now,
+                next_check=now + self.next_delay(0.0),
+            )
+            self._pending[generation_id] = entry
+            self._wakeup.set()
+            if self._task is None:
+                self._task = asyncio.create_task(self._run())
+        # 多個等待者共用同一個 future，其中一個取消不影響其他等待者
+        return await asyncio.shield(entry.future)
+
+    def resolve(self, item: Dict[str, Any]) -> bool:
+        """以已結束的項目完成等待中的 future"""
+        entry = self._pending.pop(item.get("id"), None)
+        if entry is None:
+            return False
+        self._completion_times.append(self.config.clock() - entry.started_at)
+        if not entry.future.done():
+            entry.future.set_result(item)
+        self._wakeup.set()
+        return True
+
+    def handle_callback(self, payload: Any) -> int:
+        """處理 webhook 回呼，回傳完成的等待數量
+
+        payload 可為單一項目、項目列表或 {"data": [...]}，項目格式與 /api/get 相同。
+        """
+        items = payload.get("data", payload) if isinstance(payload, dict) else payload
+        if isinstance(items, dict):
+            items = [items]
+        return sum(
+            self.resolve(item)
+            for item in items or []
+            if isinstance(item, dict) and item.get("status") in TERMINAL_STATUSES
+        )
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for entry in self._pending.values():
+            entry.future.cancel()
+        self._pending.clear()
+
+    async def _run(self) -> None:
+        try:
+            while self._pending:
+                now = self.config.clock()
+                self._expire(now)
+                # 即將到期的 ID 一併查詢，湊成較大的批次
+                horizon = now + self.config.min_interval / 2
+                due = [gid for gid, entry in self._pending.items() if entry.next_check <= horizon]
+                if due:
+                    size = self.config.batch_size
+                    await asyncio.gather(
+                        *(self._check(due[i : i + size]) for i in range(0, len(due), size))
+                    )
+                    continue
+                if not self._pending:
+                    break
+
+                delay = min(entry.next_check for entry in self._pending.values()) - now
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._task = None
+
+    def _expire(self, now: float) -> None:
+        expired = [
+            gid
+            for gid, entry in self._pending.items()
+            if now - entry.started_at >= self.config.timeout
+        ]
+        for gid in expired:
+            entry = self._pending.pop(gid)
+            if not entry.future.done():
+                entry.future.set_result(None)
+
+    async def _check(self, generation_ids: List[str]) -> None:
+        items: Iterable[Dict[str, Any]] = []
+        try:
+            self.requests_made += 1
+            async with self.session.get(
+                f"{self.base_url}/api/get?ids={','.join(generation_ids)}"
+            ) as response:
+                if response.status == 200:
+                    items = await response.json() or []
+                else:
+                    logger.warning(f"檢查生成狀態失敗: HTTP {response.status}")
+        except Exception as e:
+            logger.error(f"檢查生成狀態失敗: {e}")
+
+        by_id = {item.get("id"): item for item in items}
+        now = self.config.clock()
+        for gid in generation_ids:
+            entry = self._pending.get(gid)
+            if entry is None:
+                # 等待期間已由 webhook 完成
+                continue
+            item = by_id.get(gid)
+            if item and item.get("status") in TERMINAL_STATUSES:
+                self.resolve(item)
+            else:
+                entry.next_check = now + self.next_delay(now - entry.started_at)
+
+
 class SunoClient:
     """Suno.ai API 客戶端"""
 
-    def __init__(self, api_key: str = None, base_url: str = "https://api.sunoai.com"):
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = "https://api.sunoai.com",
+        callback_url: Optional[str] = None,
+        polling: Optional[SunoPollingConfig] = None,
+    ):
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
+        self.callback_url = callback_url
+        self.polling = polling or SunoPollingConfig()
         self.session = None
+        self.poller: Optional[SunoStatusPoller] = None
         self._cost_tracker = None
 
         # 初始化成本追蹤
@@ -69,12 +279,21 @@ class SunoClient:
             },
             timeout=aiohttp.ClientTimeout(total=300),
         )
+        self.poller = SunoStatusPoller(self.session, self.base_url, self.polling)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.poller:
+            await self.poller.close()
         if self.session:
             await self.session.close()
 
+    def handle_callback(self, payload: Any) -> int:
+        """處理 Suno webhook 回呼，回傳完成的等待數量"""
+        if not self.poller:
+            return 0
+        return self.poller.handle_callback(payload)
+
     async def generate_music(self, request: MusicGenerationRequest) -> MusicGenerationResult:
         """生成音樂"""
         if not self.session:
@@ -95,6 +314,8 @@ class SunoClient:
             data["mv"] = "chirp-v3-5" if request.duration <= 60 else "chirp-v3-0"
         if request.title:
             data["title"] = request.title
+        if self.callback_url:
+            data["callback_url"] = self.callback_url
 
         start_time = time.time()
 
@@ -149,89 +370,61 @@ class SunoClient:
     async def _poll_generation_status(
         self, generation_id: str, start_time: float
     ) -> MusicGenerationResult:
-        """輪詢生成狀態"""
-        max_attempts = 60  # 最多等待 5 分鐘
-        attempt = 0
+        """等待集中輪詢器（或 webhook）回報生成結束"""
+        item = await self.poller.wait(generation_id)
+
+        if item is None:
+            logger.error("音樂生成輪詢超時")
+            return MusicGenerationResult(
+                id=generation_id, status="timeout", error_message="生成輪詢超時"
+            )
+
+        if item.get("status") == "complete":
+            duration = time.time() - start_time
+
+            # 記錄成功的 API 呼叫
+            if self._cost_tracker:
+                self._calculate_cost(item)
+                await self._cost_tracker.track_api_call(
+                    provider="suno",
+                    model="chirp-v3",
+                    operation_type="music_generation",
+                    success=True,
+                    metadata={
+                        "duration": duration,
+                        "audio_duration": item.get("duration", 0),
+                        "title": item.get("title", ""),
+                    },
+                )
+
+            return MusicGenerationResult(
+                id=generation_id,
+                status="completed",
+                audio_url=item.get("audio_url"),
+                video_url=item.get("video_url"),
+                title=item.get("title"),
+                tags=(item.get("tags", "").split(",") if item.get("tags") else None),
+                duration=item.get("duration"),
+                created_at=item.get("created_at"),
+            )
+
+        error_msg = item.get("error_message", "生成失敗")
+        logger.error(f"音樂生成失敗: {error_msg}")
+
+        # 記錄失敗的 API 呼叫
+        if self._cost_tracker:
+            await self._cost_tracker.track_api_call(
+                provider="suno",
+                model="chirp-v3",
+                operation_type="music_generation",
+                success=False,
+                metadata={"error": error_msg},
+            )
 
-        while attempt < max_attempts:
-            try:
-                async with self.session.get(
-                    f"{self.base_url}/api/get?ids={generation_id}"
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data and len(data) > 0:
-                            item = data[0]
-                            status = item.get("status", "")
-
-                            if status == "complete":
-                                duration = time.time() - start_time
-
-                                # 記錄成功的 API 呼叫
-                                if self._cost_tracker:
-                                    self._calculate_cost(item)
-                                    await self._cost_tracker.track_api_call(
-                                        provider="suno",
-                                        model="chirp-v3",
-                                        operation_type="music_generation",
-                                        success=True,
-                                        metadata={
-                                            "duration": duration,
-                                            "audio_duration": item.get("duration", 0),
-                                            "title": item.get("title", ""),
-                                        },
-                                    )
-
-                                return MusicGenerationResult(
-                                    id=generation_id,
-                                    status="completed",
-                                    audio_url=item.get("audio_url"),
-                                    video_url=item.get("video_url"),
-                                    title=item.get("title"),
-                                    tags=(
-                                        item.get("tags", "").split(",")
-                                        if item.get("tags")
-                                        else None
-                                    ),
-                                    duration=item.get("duration"),
-                                    created_at=item.get("created_at"),
-                                )
-
-                            elif status == "error":
-                                error_msg = item.get("error_message", "生成失敗")
-                                logger.error(f"音樂生成失敗: {error_msg}")
-
-                                # 記錄失敗的 API 呼叫
-                                if self._cost_tracker:
-                                    await self._cost_tracker.track_api_call(
-                                        provider="suno",
-                                        model="chirp-v3",
-                                        operation_type="music_generation",
-                                        success=False,
-                                        metadata={"error": error_msg},
-                                    )
-
-                                return MusicGenerationResult(
-                                    id=generation_id,
-                                    status="failed",
-                                    error_message=error_msg,
-                                )
-
-                            # 仍在處理中
-                            logger.info(f"音樂生成進行中... (嘗試 {attempt + 1}/{max_attempts})")
-
-                await asyncio.sleep(5)  # 等待 5 秒後重試
-                attempt += 1
-
-            except Exception as e:
-                logger.error(f"檢查生成狀態失敗: {e}")
-                await asyncio.sleep(5)
-                attempt += 1
-
-        # 超時
-        logger.error("音樂生成輪詢超時")
         return MusicGenerationResult(
-            id=generation_id, status="timeout", error_message="生成輪詢超時"
+            id=generation_id,
+            status="failed",
+            error_message=error_msg,
         )
 
     def _calculate_cost(self, result_data: Dict[str, Any]) -> float:
@@ -0,0 +1,47 @@
+"""
+Suno webhook 驗證測試
+"""
+
+import main
+import pytest
+from fastapi.testclient import TestClient
+
+COMPLETE = {"id": "gen-1", "status": "complete", "audio_url": "https://evil.example/a.mp3"}
+
+
+class FakeClient:
+    def __init__(self):
+        self.callbacks = []
+
+    def handle_callback(self, payload):
+        self.callbacks.append(payload)
+        return 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.delenv("SUNO_API_KEY", raising=False)
+    with TestClient(main.app) as client:
+        main.app.state.suno_client = FakeClient()
+        yield client
+        main.app.state.suno_client = None
+
+
+def test_callbacks_rejected_without_token(client, monkeypatch):
+    monkeypatch.delenv("SUNO_CALLBACK_TOKEN", raising=False)
+
+    response = client.post("/callbacks/suno", json=COMPLETE)
+
+    assert response.status_code == 403
+    assert main.app.state.suno_client.callbacks == []
+
+
+def test_callbacks_require_matching_token(client, monkeypatch):
+    monkeypatch.setenv("SUNO_CALLBACK_TOKEN", "secret")
+
+    assert client.post("/callbacks/suno", json=COMPLETE).status_code == 401
+    assert client.post("/callbacks/suno?token=wrong", json=COMPLETE).status_code == 401
+    response = client.post("/callbacks/suno?token=secret", json=COMPLETE)
+
+    assert response.json() == {"status": "ok", "resolved": 1}
+    assert main.app.state.suno_client.callbacks == [COMPLETE]
@@ -0,0 +1,234 @@
+"""
+Suno 生成狀態集中輪詢測試（本機假 Suno 伺服器）
+"""
+
+import asyncio
+import random
+import time
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from suno_client import (
+    MusicGenerationRequest,
+    SunoClient,
+    SunoPollingConfig,
+    SunoStatusPoller,
+)
+
+FAST_POLLING = SunoPollingConfig(
+    initial_delay=0.2, min_interval=0.05, max_interval=0.3, timeout=5.0, min_history=5
+)
+
+
+class FakeClock:
+    """手動推進的單調時鐘"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class FakeSuno:
+    """依 ID 預先決定完成時間的假 Suno API"""
+
+    def __init__(
+        self,
+        durations=lambda: random.uniform(0.3, 0.8),
+        fail=(),
+        never=(),
+        clock=time.monotonic,
+    ):
+        self.durations = durations
+        self.clock = clock
+        self.fail = set(fail)
+        self.never = set(never)
+        self.created = {}
+        self.get_requests = 0
+        self.max_batch = 0
+        self.callbacks = []
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/api/generate", self.generate)
+        app.router.add_get("/api/get", self.get)
+        return app
+
+    async def generate(self, request):
+        body = await request.json()
+        generation_id = f"gen-{len(self.created)}"
+        self.created[generation_id] = (self.clock(), self.durations())
+        if body.get("callback_url"):
+            self.callbacks.append(body["callback_url"])
+        return web.json_response([{"id": generation_id, "status": "submitted"}])
+
+    def item(self, generation_id):
+        created, duration = self.created[generation_id]
+        if generation_id in self.fail:
+            return {"id": generation_id, "status": "error", "error_message": "bad prompt"}
+        if generation_id in self.never or self.clock() - created < duration:
+            return {"id": generation_id, "status": "streaming"}
+        return {
+            "id": generation_id,
+            "status": "complete",
+            "audio_url": f"https://cdn.example.com/{generation_id}.mp3",
+            "duration": 30,
+            "tags": "upbeat,electronic",
+        }
+
+    async def get(self, request):
+        ids = request.query["ids"].split(",")
+        self.get_requests += 1
+        self.max_batch = max(self.max_batch, len(ids))
+        return web.json_response([self.item(gid) for gid in ids if gid in self.created])
+
+
+@pytest_asyncio.fixture
+async def serve():
+    servers = []
+
+    async def start(fake):
+        server = TestServer(fake.app())
+        await server.start_server()
+        servers.append(server)
+        return str(server.make_url("")).rstrip("/")
+
+    yield start
+    for server in servers:
+        await server.close()
+
+
+def _request(i):
+    return MusicGenerationRequest(prompt=f"background track {i}", duration=30)
+
+
+async def settle(poller):
+    """喚醒輪詢任務並等待它處理完所有已到期的 ID"""
+    poller._wakeup.set()
+    horizon = poller.config.clock() + poller.config.min_interval / 2
+    while any(entry.next_check <= horizon for entry in poller._pending.values()):
+        await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_hundreds_of_generations_share_batched_polls(serve):
+    # 時鐘由測試推進，請求次數只取決於輪詢排程，與機器負載無關
+    clock = FakeClock()
+    durations = iter([0.3 + 0.5 * i / 299 for i in range(300)])
+    fake = FakeSuno(durations=lambda: next(durations), clock=clock)
+    base_url = await serve(fake)
+    polling = SunoPollingConfig(**{**FAST_POLLING.__dict__, "batch_size": 100, "clock": clock})
+
+    async with SunoClient(api_key="test", base_url=base_url, polling=polling) as client:
+        tasks = [asyncio.create_task(client.generate_music(_request(i))) for i in range(300)]
+        while client.poller.pending_count < 300:
+            await asyncio.sleep(0.01)
+        assert fake.get_requests == 0
+
+        steps = 0
+        while client.poller.pending_count:
+            clock.advance(polling.min_interval)
+            await settle(client.poller)
+            steps += 1
+        results = await asyncio.gather(*tasks)
+        window = client.poller.completion_window()
+
+    assert [r.status for r in results] == ["completed"] * 300
+    assert len({r.id for r in results}) == 300
+    assert results[0].tags == ["upbeat", "electronic"]
+    assert fake.max_batch == 100
+    # 每一步最多 3 個批次（300 / 100）；每個生成各自輪詢至少需要 300 次請求
+    assert steps <= 20
+    assert fake.get_requests <= 3 * steps
+    assert fake.get_requests < 100
+    # 完成時間分佈落在假伺服器的 0.3–0.8 秒內（加上一個輪詢間隔）
+    assert 0.3 <= window[0] < window[1] <= 0.8 + polling.min_interval
+
+
+@pytest.mark.asyncio
+async def test_errors_and_timeouts_resolve_their_waiters(serve):
+    fake = FakeSuno(durations=lambda: 0.1, fail={"gen-1"}, never={"gen-2"})
+    base_url = await serve(fake)
+    polling = SunoPollingConfig(**{**FAST_POLLING.__dict__, "timeout": 0.6})
+
+    async with SunoClient(api_key="test", base_url=base_url, polling=polling) as client:
+        results = []
+        for i in range(3):
+            results.append(asyncio.create_task(client.generate_music(_request(i))))
+            await asyncio.sleep(0.01)  # 固定 ID 順序
+        done, failed, timed_out = await asyncio.gather(*results)
+
+    assert done.status == "completed"
+    assert (failed.status, failed.error_message) == ("failed", "bad prompt")
+    assert timed_out.status == "timeout"
+
+
+@pytest.mark.asyncio
+async def test_webhook_resolves_without_polling(serve):
+    fake = FakeSuno(never={"gen-0"})
+    base_url = await serve(fake)
+    polling = SunoPollingConfig(**{**FAST_POLLING.__dict__, "initial_delay": 60.0})
+    callback_url = "https://music.example.com/callbacks/suno"
+
+    async with SunoClient(
+        api_key="test", base_url=base_url, callback_url=callback_url, polling=polling
+    ) as client:
+        task = asyncio.create_task(client.generate_music(_request(0)))
+        while not client.poller.pending_count:
+            await asyncio.sleep(0.01)
+
+        # 非結束狀態的回呼不影響等待
+        assert client.handle_callback({"data": [{"id": "gen-0", "status": "streaming"}]}) == 0
+        payload = {"id": "gen-0", "status": "complete", "audio_url": "https://cdn/x.mp3"}
+        assert client.handle_callback([payload]) == 1
+        result = await asyncio.wait_for(task, 1.0)
+
+    assert result.audio_url == "https://cdn/x.mp3"
+    assert fake.callbacks == [callback_url]
+    assert fake.get_requests == 0
+
+
+@pytest.mark.asyncio
+async def test_waiters_for_same_id_share_one_future(serve):
+    fake = FakeSuno(durations=lambda: 0.1)
+    base_url = await serve(fake)
+
+    async with SunoClient(api_key="test", base_url=base_url, polling=FAST_POLLING) as client:
+        await client.generate_music(_request(0))
+        first = asyncio.create_task(client.poller.wait("gen-0"))
+        second = asyncio.create_task(client.poller.wait("gen-0"))
+        await asyncio.sleep(0)
+        first.cancel()
+        item = await asyncio.wait_for(second, 1.0)
+
+    assert item["status"] == "complete"
+
+
+def test_schedule_follows_completion_time_distribution():
+    config = SunoPollingConfig(
+        initial_delay=10.0, min_interval=2.0, max_interval=15.0, min_history=5
+    )
+    poller = SunoStatusPoller(session=None, base_url="http://suno", config=config)
+
+    # 尚無統計：先等 initial_delay，之後間隔隨等待時間拉長
+    assert poller.completion_window() is None
+    assert poller.next_delay(0) == 10.0
+    assert poller.next_delay(11) == 2.0
+    assert poller.next_delay(30) == 10.0
+    assert poller.next_delay(200) == 15.0
+
+    poller._completion_times.extend([40, 45, 50, 55, 60, 65, 70, 120])
+    low, high = poller.completion_window()
+    assert (low, high) == (40, 70)
+    # 常見完成時間之前不查詢，區間內密集查詢，之後逐漸放慢
+    assert poller.next_delay(5) == 35
+    assert poller.next_delay(39) == 2.0
+    assert poller.next_delay(50) == 2.0
+    assert poller.next_delay(80) == 5.0
+    assert poller.next_delay(120) == 15.0
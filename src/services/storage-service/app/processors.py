@@ -1,6 +1,8 @@
 import asyncio
 import os
+import sys
 from abc import ABC, abstractmethod
+from pathlib import Path
 from typing import Any, Dict, Optional
 
 import structlog
@@ -8,6 +10,16 @@ from PIL import Image, ImageOps
 
 from .config import settings
 
+# 添加專案根目錄到Python路徑（本機為倉庫根目錄；映像內 src/shared 位於 /app，已在 PYTHONPATH）
+project_root = next(
+    (path for path in Path(__file__).resolve().parents if (path / "src" / "shared").is_dir()),
+    None,
+)
+if project_root and str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from src.shared.audio_probe import AudioProbeError, probe_audio  # noqa: E402
+
 logger = structlog.get_logger()
 
 
@@ -193,44 +205,10 @@ class AudioProcessor(FileProcessor):
             raise
 
     def get_metadata(self, file_path: str) -> Dict[str, Any]:
-        """Extract audio metadata using ffprobe"""
+        """Extract audio metadata from the file header"""
         try:
-            import json
-            import subprocess
-
-            cmd = [
-                "ffprobe",
-                "-v",
-                "quiet",
-                "-print_format",
-                "json",
-                "-show_format",
-                "-show_streams",
-                file_path,
-            ]
-
-            result = subprocess.run(cmd, capture_output=True, text=True)
-
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
-                audio_stream = next(
-                    (s for s in data["streams"] if s["codec_type"] == "audio"),
-                    None,
-                )
-
-                if audio_stream:
-                    return {
-                        "duration": float(data["format"].get("duration", 0)),
-                        "bitrate": int(data["format"].get("bit_rate", 0)),
-                        "sample_rate": int(audio_stream.get("sample_rate", 0)),
-                        "channels": int(audio_stream.get("channels", 0)),
-                        "codec": audio_stream.get("codec_name"),
-                        "format": data["format"].get("format_name"),
-                    }
-
-            return {}
-
-        except Exception as e:
+            info = probe_audio(file_path)
+        except AudioProbeError as e:
             logger.error(
                 "Failed to extract audio metadata",
                 error=str(e),
@@ -238,6 +216,15 @@ class AudioProcessor(FileProcessor):
             )
             return {}
 
+        return {
+            "duration": info.duration,
+            "bitrate": info.bitrate or 0,
+            "sample_rate": info.sample_rate,
+            "channels": info.channels,
+            "codec": info.codec,
+            "format": info.format,
+        }
+
 
 class VideoProcessor(FileProcessor):
     """Video processing and optimization"""
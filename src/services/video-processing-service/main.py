@@ -27,7 +27,13 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 # 導入影片處理器
-from src.shared.video_processor import VideoProcessor, VideoQuality, create_simple_video
+from src.shared.video_processor import (
+    RenderCancelledError,
+    RenderProgress,
+    VideoProcessor,
+    VideoQuality,
+    create_simple_video,
+)
 from src.shared.config import get_service_settings
 
 # 設置日誌
@@ -90,7 +96,7 @@ class AudioMergeRequest(BaseModel):
 
 class ProcessingStatus(BaseModel):
     task_id: str
-    status: str  # "pending", "processing", "completed", "failed"
+    status: str  # "pending", "processing", "completed", "failed", "cancelled"
     progress: float  # 0-100
     message: str
     output_path: Optional[str] = None
@@ -99,6 +105,8 @@ class ProcessingStatus(BaseModel):
 
 # 全域任務狀態儲存（實際應用中應使用資料庫或Redis）
 processing_tasks = {}
+# 任務ID -> 取消事件，設定後執行中的FFmpeg會被終止
+cancel_events = {}
 
 def get_quality_enum(quality_str: str) -> VideoQuality:
     """轉換品質字串為枚舉"""
@@ -121,6 +129,20 @@ async def update_task_status(task_id: str, status: str, progress: float, message
             "updated_at": datetime.utcnow()
         })
 
+def render_progress_reporter(task_id: str, start: float, end: float, label: str):
+    """將FFmpeg渲染進度映射到任務進度區間 [start, end]"""
+    async def report(progress: RenderProgress):
+        if progress.percent is None:
+            value = start
+            message = f"{label}: {progress.out_time:.1f}s rendered"
+        else:
+            value = start + (end - start) * progress.percent / 100
+            message = f"{label}: {progress.percent:.0f}%"
+        if progress.speed:
+            message += f" ({progress.speed:.1f}x)"
+        await update_task_status(task_id, "processing", round(value, 1), message)
+    return report
+
 # 健康檢查端點
 @app.get("/health")
 async def health_check():
@@ -176,6 +198,8 @@ async def create_video(
         "request": request.dict()
     }
     
+    cancel_events[task_id] = asyncio.Event()
+    
     # 添加背景任務
     background_tasks.add_task(process_video_creation, task_id, request)
     
@@ -233,7 +257,9 @@ async def process_video_creation(task_id: str, request: VideoCreationRequest):
             duration_per_image=request.duration_per_image,
             transition_duration=request.transition_duration,
             background_music=background_music_path,
-            quality=quality
+            quality=quality,
+            on_progress=render_progress_reporter(task_id, 60.0, 90.0, "Rendering video"),
+            cancel_event=cancel_events.get(task_id)
         )
         
         await update_task_status(task_id, "processing", 90.0, "Finalizing video")
@@ -249,9 +275,13 @@ async def process_video_creation(task_id: str, request: VideoCreationRequest):
             output_path
         )
         
+    except RenderCancelledError:
+        await update_task_status(task_id, "cancelled", 0.0, "Video creation cancelled")
     except Exception as e:
         logger.error(f"Video creation failed for task {task_id}: {e}")
         await update_task_status(task_id, "failed", 0.0, f"Video creation failed: {str(e)}")
+    finally:
+        cancel_events.pop(task_id, None)
 
 @app.get("/api/v1/process/status/{task_id}")
 async def get_processing_status(task_id: str):
@@ -335,6 +365,7 @@ async def add_subtitle(
         "request": request.dict()
     }
     
+    cancel_events[task_id] = asyncio.Event()
     background_tasks.add_task(process_subtitle_addition, task_id, request)
     
     return {
@@ -359,7 +390,9 @@ async def process_subtitle_addition(task_id: str, request: SubtitleRequest):
             output_filename=output_filename,
             font_size=request.font_size,
             font_color=request.font_color,
-            background_color=request.background_color
+            background_color=request.background_color,
+            on_progress=render_progress_reporter(task_id, 30.0, 99.0, "Adding subtitles"),
+            cancel_event=cancel_events.get(task_id)
         )
         
         await update_task_status(
@@ -370,9 +403,13 @@ async def process_subtitle_addition(task_id: str, request: SubtitleRequest):
             output_path
         )
         
+    except RenderCancelledError:
+        await update_task_status(task_id, "cancelled", 0.0, "Subtitle addition cancelled")
     except Exception as e:
         logger.error(f"Subtitle addition failed for task {task_id}: {e}")
         await update_task_status(task_id, "failed", 0.0, f"Subtitle addition failed: {str(e)}")
+    finally:
+        cancel_events.pop(task_id, None)
 
 @app.post("/api/v1/process/merge-audio")
 async def merge_audio(
@@ -406,6 +443,7 @@ async def merge_audio(
         "request": request.dict()
     }
     
+    cancel_events[task_id] = asyncio.Event()
     background_tasks.add_task(process_audio_merge, task_id, request)
     
     return {
@@ -429,7 +467,9 @@ async def process_audio_merge(task_id: str, request: AudioMergeRequest):
             audio_path=request.audio_path,
             output_filename=output_filename,
             video_volume=request.video_volume,
-            audio_volume=request.audio_volume
+            audio_volume=request.audio_volume,
+            on_progress=render_progress_reporter(task_id, 40.0, 99.0, "Merging audio"),
+            cancel_event=cancel_events.get(task_id)
         )
         
         await update_task_status(
@@ -440,9 +480,13 @@ async def process_audio_merge(task_id: str, request: AudioMergeRequest):
             output_path
         )
         
+    except RenderCancelledError:
+        await update_task_status(task_id, "cancelled", 0.0, "Audio merge cancelled")
     except Exception as e:
         logger.error(f"Audio merge failed for task {task_id}: {e}")
         await update_task_status(task_id, "failed", 0.0, f"Audio merge failed: {str(e)}")
+    finally:
+        cancel_events.pop(task_id, None)
 
 @app.get("/api/v1/process/info/{task_id}")
 async def get_video_info(task_id: str):
@@ -469,6 +513,30 @@ async def get_video_info(task_id: str):
         "data": video_info
     }
 
+@app.post("/api/v1/process/cancel/{task_id}")
+async def cancel_task(task_id: str):
+    """取消尚未完成的處理任務"""
+    
+    if task_id not in processing_tasks:
+        raise HTTPException(
+            status_code=404,
+            detail="Task not found"
+        )
+    
+    cancel_event = cancel_events.get(task_id)
+    if cancel_event is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Task already finished"
+        )
+    
+    cancel_event.set()
+    
+    return {
+        "success": True,
+        "message": "Cancellation requested"
+    }
+
 @app.delete("/api/v1/process/{task_id}")
 async def delete_video(task_id: str):
     """删除影片檔案"""
@@ -481,6 +549,10 @@ async def delete_video(task_id: str):
     
     task_info = processing_tasks[task_id]
     
+    # 仍在執行的任務先停止FFmpeg
+    if task_id in cancel_events:
+        cancel_events[task_id].set()
+    
     if task_info["output_path"] and Path(task_info["output_path"]).exists():
         Path(task_info["output_path"]).unlink()
     
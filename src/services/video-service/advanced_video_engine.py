@@ -5,6 +5,7 @@
 """
 
 import os
+import sys
 import logging
 import tempfile
 import asyncio
@@ -45,6 +46,11 @@ except ImportError:
     OPENCV_AVAILABLE = False
     logging.warning("OpenCV not available. Some advanced features disabled.")
 
+# 添加專案根目錄到路徑
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from src.shared.encoder_profiles import get_encoder_registry  # noqa: E402
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -58,8 +64,20 @@ class VideoConfig:
     bitrate: str = "8M"
     codec: str = "libx264"
     audio_codec: str = "aac"
-    preset: str = "medium"  # ultrafast, fast, medium, slow, slower
-    crf: int = 18  # 質量參數 (0-51, 越低越好)
+    preset: Optional[str] = None  # ultrafast, fast, medium, slow, slower；未指定時由編碼器設定檔決定
+    crf: Optional[int] = None  # 質量參數 (0-51, 越低越好)；未指定時由品質等級決定
+    quality: str = "high"  # low, medium, high, ultra
+    platform: Optional[str] = None  # youtube, tiktok, instagram
+    
+    def __post_init__(self):
+        if self.preset is None or self.crf is None:
+            profile = get_encoder_registry().profile(
+                self.quality, self.platform, width=self.width, height=self.height, fps=self.fps
+            )
+            if self.preset is None:
+                self.preset = profile.preset
+            if self.crf is None:
+                self.crf = profile.crf
     
 @dataclass 
 class TransitionConfig:
@@ -49,8 +49,10 @@ class VideoConfigModel(BaseModel):
     duration: int = Field(default=15, ge=1, le=300)
     bitrate: str = Field(default="8M")
     codec: str = Field(default="libx264")
-    preset: str = Field(default="medium")
-    crf: int = Field(default=18, ge=0, le=51)
+    preset: Optional[str] = Field(default=None, description="x264 preset; defaults to the encoder profile")
+    crf: Optional[int] = Field(default=None, ge=0, le=51)
+    quality: str = Field(default="high", description="low, medium, high, ultra")
+    platform: Optional[str] = Field(default=None, description="youtube, tiktok, instagram")
 
 class SceneModel(BaseModel):
     """場景模型"""
@@ -0,0 +1,245 @@
+"""
+音頻特徵擷取與快取
+
+所有頻譜特徵共用同一次 STFT：節拍與音符開始點共用同一條 onset 強度曲線，
+頻譜質心與色度直接由 STFT 幅度計算。結果以檔案內容雜湊為鍵存成 .npz，
+快取目錄放在共享儲存上時，同一段音樂在任何 worker 分析過一次後即可直接讀取。
+快取總大小超過上限時刪除最久未使用的檔案。
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import librosa
+
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 特徵計算方式改變時遞增，使舊快取失效
+FEATURE_VERSION = 1
+
+DEFAULT_SAMPLE_RATE = 22050
+# 低取樣率模式：節拍、能量等同步用特徵仍然準確，解碼與 STFT 約快一倍
+FAST_SAMPLE_RATE = 11025
+N_FFT = 2048
+HOP_LENGTH = 512
+
+# 特徵快取預設的大小上限，可用 AUDIO_FEATURE_CACHE_MAX_BYTES 覆寫
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB
+# 記憶體中保留的 (路徑, 修改時間, 大小) -> 內容雜湊 筆數
+MAX_HASH_ENTRIES = 4096
+
+
+def resolve_sample_rate(value: Union[int, str, None]) -> Optional[int]:
+    """分析取樣率設定值：0 或 "native" 表示使用檔案原始取樣率（None）"""
+    if value is None or str(value).strip().lower() == "native":
+        return None
+    return int(value) or None
+
+
+@dataclass
+class AudioFeatures:
+    """音頻特徵（時間軸以 HOP_LENGTH 為一幀）"""
+
+    duration: float
+    sample_rate: int
+    tempo: float
+    beat_times: np.ndarray
+    onset_frames: np.ndarray
+    onset_times: np.ndarray
+    spectral_centroid: np.ndarray
+    rms_energy: np.ndarray
+    zero_crossing_rate: np.ndarray
+    chroma: np.ndarray
+
+
+def extract_features(audio_path: str, sample_rate: Optional[int] = DEFAULT_SAMPLE_RATE):
+    """解碼一次、計算一次 STFT，產生所有特徵
+
+    sample_rate 為 None 時使用檔案原始取樣率。
+    """
+    if not LIBROSA_AVAILABLE:
+        raise RuntimeError("librosa is required for audio feature extraction")
+
+    y, sr = librosa.load(audio_path, sr=sample_rate, mono=True)
+    magnitude = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    power = magnitude**2
+
+    # 與 librosa 預設的 onset 強度相同（log-mel 頻譜通量），節拍追蹤與 onset 偵測共用
+    mel = librosa.feature.melspectrogram(S=power, sr=sr)
+    onset_envelope = librosa.onset.onset_strength(
+        S=librosa.power_to_db(mel), sr=sr, hop_length=HOP_LENGTH
+    )
+    tempo, beat_frames = librosa.beat.beat_track(
+        onset_envelope=onset_envelope, sr=sr, hop_length=HOP_LENGTH
+    )
+    onset_frames = librosa.onset.onset_detect(
+        onset_envelope=onset_envelope, sr=sr, hop_length=HOP_LENGTH
+    )
+
+    return AudioFeatures(
+        duration=len(y) / sr,
+        sample_rate=sr,
+        tempo=float(np.atleast_1d(tempo)[0]),
+        beat_times=librosa.frames_to_time(beat_frames, sr=sr, hop_length=HOP_LENGTH),
+        onset_frames=onset_frames,
+        onset_times=librosa.frames_to_time(onset_frames, sr=sr, hop_length=HOP_LENGTH),
+        spectral_centroid=librosa.feature.spectral_centroid(S=magnitude, sr=sr)[0],
+        # RMS 與過零率是時域的逐幀計算，不經過 STFT
+        rms_energy=librosa.feature.rms(y=y, frame_length=N_FFT, hop_length=HOP_LENGTH)[0],
+        zero_crossing_rate=librosa.feature.zero_crossing_rate(
+            y, frame_length=N_FFT, hop_length=HOP_LENGTH
+        )[0],
+        chroma=librosa.feature.chroma_stft(S=power, sr=sr),
+    )
+
+
+def content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """檔案內容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """以內容雜湊為鍵的磁碟特徵快取，可供多個 worker 共用同一目錄
+
+    各 worker 在記憶體中維護 LRU 索引（啟動時依檔案修改時間由磁碟重建，命中時
+    更新修改時間），寫入後總大小超過 max_bytes 即刪除最久未使用的檔案。其他
+    worker 新寫入的檔案在重建索引前不計入，上限為近似值。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if max_bytes is None:
+            max_bytes = int(os.getenv("AUDIO_FEATURE_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES))
+        self.max_bytes = max_bytes
+        # (路徑, 修改時間, 大小) -> 內容雜湊，避免同一程序重複讀檔計算雜湊
+        self._hashes: "OrderedDict[Tuple[str, float, int], str]" = OrderedDict()
+        self._entries: "OrderedDict[Path, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _hash(self, audio_path: str) -> str:
+        stat = os.stat(audio_path)
+        key = (os.path.abspath(audio_path), stat.st_mtime, stat.st_size)
+        if key in self._hashes:
+            self._hashes.move_to_end(key)
+        else:
+            self._hashes[key] = content_hash(audio_path)
+            if len(self._hashes) > MAX_HASH_ENTRIES:
+                self._hashes.popitem(last=False)
+        return self._hashes[key]
+
+    def _load_index(self) -> None:
+        """由磁碟上已有的快取檔重建 LRU 索引"""
+        self._loaded = True
+        files = []
+        for path in self.cache_dir.glob("*/*.npz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, str(path), stat.st_size))
+
+        for _, path, size in sorted(files):
+            self._entries[Path(path)] = size
+            self._total_bytes += size
+
+    def _record(self, path: Path) -> None:
+        """記錄快取檔剛被使用，並刪除超出上限的最久未使用檔案"""
+        if not self._loaded:
+            self._load_index()
+        size = self._entries.pop(path, None)
+        if size is not None:
+            self._total_bytes -= size
+        try:
+            size = path.stat().st_size
+            os.utime(path)  # 保存使用順序，供下次重建索引
+        except OSError:
+            return
+        self._entries[path] = size
+        self._total_bytes += size
+
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                oldest.unlink()
+            except OSError:
+                pass
+
+    def path_for(self, audio_path: str, sample_rate: Optional[int]) -> Path:
+        rate = sample_rate or "native"
+        name = f"{self._hash(audio_path)}-{rate}-v{FEATURE_VERSION}.npz"
+        return self.cache_dir / name[:2] / name
+
+    def load(self, path: Path) -> Optional[AudioFeatures]:
+        try:
+            with np.load(path) as data:
+                values = {field.name: data[field.name] for field in fields(AudioFeatures)}
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # 損毀或舊格式的快取檔視同未命中，重新計算後覆寫
+            logger.warning(f"Ignoring unreadable feature cache {path}: {e}")
+            return None
+
+        values["duration"] = float(values["duration"])
+        values["sample_rate"] = int(values["sample_rate"])
+        values["tempo"] = float(values["tempo"])
+        return AudioFeatures(**values)
+
+    def store(self, path: Path, features: AudioFeatures) -> None:
+        """先寫入暫存檔再原子性改名，並行寫入同一鍵的 worker 不會讀到半份檔案"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f, **{field.name: getattr(features, field.name) for field in fields(features)}
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get_or_compute(
+        self, audio_path: str, sample_rate: Optional[int] = DEFAULT_SAMPLE_RATE
+    ) -> AudioFeatures:
+        """讀取快取，未命中時擷取特徵並寫入快取"""
+        path = self.path_for(audio_path, sample_rate)
+        features = self.load(path)
+        if features is not None:
+            self.hits += 1
+            self._record(path)
+            return features
+
+        self.misses += 1
+        features = extract_features(audio_path, sample_rate)
+        try:
+            self.store(path, features)
+        except OSError as e:
+            logger.warning(f"Failed to write feature cache {path}: {e}")
+        else:
+            self._record(path)
+        return features
@@ -8,7 +8,7 @@ import os
 import logging
 import numpy as np
 import math
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Union
 from dataclasses import dataclass
 import asyncio
 from pathlib import Path
@@ -31,6 +31,11 @@ except ImportError:
     LIBROSA_AVAILABLE = False
     logging.warning("librosa not available. Advanced audio analysis disabled.")
 
+try:
+    from .audio_features import DEFAULT_SAMPLE_RATE, FeatureCache, resolve_sample_rate
+except ImportError:
+    from audio_features import DEFAULT_SAMPLE_RATE, FeatureCache, resolve_sample_rate
+
 try:
     from scipy import signal
     from scipy.ndimage import gaussian_filter1d
@@ -77,10 +82,25 @@ class SyncConfig:
 class AudioVideoSyncEngine:
     """智能音視頻同步引擎"""
     
-    def __init__(self, cache_dir: str = "./cache/audio"):
+    def __init__(
+        self,
+        cache_dir: str = "./cache/audio",
+        feature_cache_dir: Optional[str] = None,
+        analysis_sample_rate: Union[int, str, None] = None
+    ):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.audio_cache = {}
+        # 特徵快取目錄指向共享儲存時，所有 worker 共用分析結果
+        self.feature_cache = FeatureCache(
+            feature_cache_dir
+            or os.getenv("AUDIO_FEATURE_CACHE_DIR")
+            or str(self.cache_dir / "features")
+        )
+        # 較低的分析取樣率（例如 11025）可加快解碼與 STFT；0 或 "native" 使用原始取樣率
+        if analysis_sample_rate is None:
+            analysis_sample_rate = os.getenv("AUDIO_ANALYSIS_SAMPLE_RATE", DEFAULT_SAMPLE_RATE)
+        self.analysis_sample_rate = resolve_sample_rate(analysis_sample_rate)
         
     async def analyze_audio(self, audio_path: str) -> AudioAnalysis:
         """分析音頻特徵"""
@@ -95,43 +115,22 @@ class AudioVideoSyncEngine:
         
         try:
             if LIBROSA_AVAILABLE:
-                # 使用librosa進行高級音頻分析
-                y, sr = librosa.load(audio_path)
-                duration = len(y) / sr
-                
-                # 節拍檢測
-                tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
-                beat_times = librosa.times_like(beats)
-                
-                # 音符開始點檢測
-                onset_frames = librosa.onset.onset_detect(
-                    y=y, sr=sr, units='frames'
+                # 使用librosa進行高級音頻分析（共用一次 STFT，結果依內容雜湊快取於磁碟）
+                features = await asyncio.to_thread(
+                    self.feature_cache.get_or_compute, audio_path, self.analysis_sample_rate
                 )
-                onset_times = librosa.frames_to_time(onset_frames, sr=sr)
-                
-                # 頻譜質心
-                spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-                
-                # RMS能量
-                rms_energy = librosa.feature.rms(y=y)[0]
-                
-                # 過零率
-                zero_crossing_rate = librosa.feature.zero_crossing_rate(y)[0]
-                
-                # 色度特徵
-                chroma = librosa.feature.chroma_stft(y=y, sr=sr)
                 
                 analysis = AudioAnalysis(
-                    duration=duration,
-                    tempo=float(tempo),
-                    beats=beat_times.tolist(),
-                    onset_frames=onset_frames.tolist(),
-                    onset_times=onset_times.tolist(),
-                    spectral_centroid=spectral_centroid,
-                    rms_energy=rms_energy,
-                    zero_crossing_rate=zero_crossing_rate,
-                    chroma=chroma,
-                    sample_rate=sr
+                    duration=features.duration,
+                    tempo=features.tempo,
+                    beats=features.beat_times.tolist(),
+                    onset_frames=features.onset_frames.tolist(),
+                    onset_times=features.onset_times.tolist(),
+                    spectral_centroid=features.spectral_centroid,
+                    rms_energy=features.rms_energy,
+                    zero_crossing_rate=features.zero_crossing_rate,
+                    chroma=features.chroma,
+                    sample_rate=features.sample_rate
                 )
                 
             else:
@@ -39,6 +39,7 @@ from src.shared.services.message_queue import (  # noqa: E402
     get_message_queue,
     publish_video_event,
 )
+from src.shared.service_client import DeadlineMiddleware  # noqa: E402
 from src.shared.services.service_discovery import (  # noqa: E402
     get_service_registry,
 )
@@ -138,6 +139,9 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type"],
 )
 
+# 繼承上游的請求截止時間，已逾時的請求直接返回 504
+app.add_middleware(DeadlineMiddleware)
+
 # Include routers
 app.include_router(video_generation.router, prefix="/api/v1/video", tags=["video-generation"])
 app.include_router(social_media.router, prefix="/api/v1/social", tags=["social-media"])
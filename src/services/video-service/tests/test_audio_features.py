@@ -0,0 +1,179 @@
+"""
+音頻特徵擷取與內容雜湊快取測試
+"""
+
+import shutil
+import time
+
+import audio_features
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+from audio_features import (
+    FAST_SAMPLE_RATE,
+    HOP_LENGTH,
+    N_FFT,
+    AudioFeatures,
+    FeatureCache,
+    extract_features,
+    resolve_sample_rate,
+)
+
+
+def _write_click_track(path, seconds=12.0, bpm=120, sr=44100):
+    """固定節拍的鼓點加上和弦，足以驗證節拍、onset 與色度"""
+    t = np.arange(int(seconds * sr)) / sr
+    chord = sum(0.1 * np.sin(2 * np.pi * f * t) for f in (261.6, 329.6, 392.0))
+    clicks = np.zeros_like(t)
+    for beat in np.arange(0, seconds, 60 / bpm):
+        start = int(beat * sr)
+        burst = np.exp(-np.arange(2000) / 200) * np.sin(2 * np.pi * 1000 * np.arange(2000) / sr)
+        clicks[start : start + 2000] += burst[: len(clicks) - start]
+    sf.write(path, (chord + clicks).astype(np.float32), sr)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def track(tmp_path_factory):
+    return _write_click_track(tmp_path_factory.mktemp("audio") / "bed.wav")
+
+
+def test_shared_stft_matches_separate_passes(track):
+    features = extract_features(track)
+
+    y, sr = librosa.load(track, sr=22050)
+    hop = {"hop_length": HOP_LENGTH}
+    np.testing.assert_allclose(
+        features.spectral_centroid, librosa.feature.spectral_centroid(y=y, sr=sr, **hop)[0]
+    )
+    np.testing.assert_allclose(
+        features.rms_energy, librosa.feature.rms(y=y, frame_length=N_FFT, **hop)[0], rtol=1e-4
+    )
+    np.testing.assert_allclose(
+        features.chroma, librosa.feature.chroma_stft(y=y, sr=sr, **hop), atol=1e-5
+    )
+    np.testing.assert_array_equal(
+        features.onset_frames, librosa.onset.onset_detect(y=y, sr=sr, **hop)
+    )
+
+    assert features.sample_rate == 22050
+    assert features.duration == pytest.approx(12.0, abs=0.01)
+    assert features.tempo == pytest.approx(120, rel=0.05)
+    # 節拍為實際時間（秒），間隔約 0.5 秒
+    assert features.beat_times.max() <= features.duration
+    assert np.median(np.diff(features.beat_times)) == pytest.approx(0.5, abs=0.03)
+
+
+def test_fast_mode_keeps_sync_features(track):
+    fast = extract_features(track, sample_rate=FAST_SAMPLE_RATE)
+    assert fast.sample_rate == FAST_SAMPLE_RATE
+    assert fast.tempo == pytest.approx(120, rel=0.05)
+    assert fast.duration == pytest.approx(12.0, abs=0.01)
+
+
+def test_cache_is_keyed_by_content(track, tmp_path):
+    cache = FeatureCache(tmp_path / "cache")
+    first = cache.get_or_compute(track)
+
+    # 另一個 worker、另一個路徑，只要內容相同即命中
+    copy = shutil.copy(track, tmp_path / "copy.wav")
+    other_worker = FeatureCache(tmp_path / "cache")
+    cached = other_worker.get_or_compute(copy)
+
+    assert (cache.misses, other_worker.hits, other_worker.misses) == (1, 1, 0)
+    assert cached.tempo == first.tempo
+    np.testing.assert_array_equal(cached.chroma, first.chroma)
+    np.testing.assert_array_equal(cached.beat_times, first.beat_times)
+
+    # 不同分析取樣率分開快取
+    other_worker.get_or_compute(copy, sample_rate=FAST_SAMPLE_RATE)
+    assert other_worker.misses == 1
+    assert len(list((tmp_path / "cache").rglob("*.npz"))) == 2
+    assert not list((tmp_path / "cache").rglob("*.tmp"))
+
+
+def test_corrupt_cache_entry_is_recomputed(track, tmp_path):
+    cache = FeatureCache(tmp_path)
+    path = cache.path_for(track, 22050)
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"not an npz")
+
+    features = cache.get_or_compute(track)
+    assert cache.misses == 1
+    assert FeatureCache(tmp_path).load(path).tempo == features.tempo
+
+
+def test_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    empty = np.zeros(64)
+    features = AudioFeatures(1.0, 22050, 120.0, *([empty] * 7))
+    monkeypatch.setattr(audio_features, "extract_features", lambda path, sr: features)
+    clips = []
+    for name in "abcd":
+        clips.append(tmp_path / f"{name}.wav")
+        clips[-1].write_bytes(name.encode())
+
+    probe = FeatureCache(tmp_path / "probe")
+    probe.get_or_compute(str(clips[0]))
+    entry_size = next((tmp_path / "probe").rglob("*.npz")).stat().st_size
+
+    cache = FeatureCache(tmp_path / "cache", max_bytes=entry_size * 2)
+    a, b, c, d = (str(clip) for clip in clips)
+    cache.get_or_compute(a)
+    cache.get_or_compute(b)
+    cache.get_or_compute(a)  # a 變為最近使用，寫入 c 時淘汰 b
+    cache.get_or_compute(c)
+
+    assert cache.evictions == 1
+    assert not cache.path_for(b, 22050).exists()
+    assert cache.path_for(a, 22050).exists() and cache.path_for(c, 22050).exists()
+
+    # 另一個 worker 由檔案修改時間重建使用順序
+    restarted = FeatureCache(tmp_path / "cache", max_bytes=entry_size * 2)
+    restarted.get_or_compute(d)
+    assert not restarted.path_for(a, 22050).exists()
+    assert len(list((tmp_path / "cache").rglob("*.npz"))) == 2
+
+
+def test_resolve_sample_rate():
+    assert resolve_sample_rate(FAST_SAMPLE_RATE) == FAST_SAMPLE_RATE
+    assert resolve_sample_rate("11025") == FAST_SAMPLE_RATE
+    # 0 或 "native" 表示原始取樣率，而不是退回預設的 22050
+    assert resolve_sample_rate(0) is None
+    assert resolve_sample_rate("0") is None
+    assert resolve_sample_rate("Native") is None
+    assert resolve_sample_rate(None) is None
+
+
+@pytest.mark.performance
+def test_cached_analysis_is_nearly_free(tmp_path):
+    """60 秒音樂：逐項計算 vs 共用 STFT vs 快取命中"""
+    track = _write_click_track(tmp_path / "long.wav", seconds=60.0)
+
+    def separate_passes():
+        y, sr = librosa.load(track)
+        librosa.beat.beat_track(y=y, sr=sr)
+        librosa.onset.onset_detect(y=y, sr=sr)
+        librosa.feature.spectral_centroid(y=y, sr=sr)
+        librosa.feature.rms(y=y)
+        librosa.feature.zero_crossing_rate(y)
+        librosa.feature.chroma_stft(y=y, sr=sr)
+
+    def timed(fn):
+        started = time.perf_counter()
+        fn()
+        return time.perf_counter() - started
+
+    separate_passes()  # 預熱 numba 編譯
+    separate = timed(separate_passes)
+    cache = FeatureCache(tmp_path / "cache")
+    single = timed(lambda: cache.get_or_compute(track))
+    fast = timed(lambda: extract_features(track, sample_rate=FAST_SAMPLE_RATE))
+    cached = timed(lambda: FeatureCache(tmp_path / "cache").get_or_compute(track))
+
+    print(
+        f"\nseparate passes {separate * 1000:.0f}ms, shared STFT {single * 1000:.0f}ms, "
+        f"fast mode {fast * 1000:.0f}ms, cache hit {cached * 1000:.1f}ms"
+    )
+    assert single < separate
+    assert cached * 10 < single
@@ -10,12 +10,19 @@ import json
 import logging
 import os
 import shutil
+import sys
 import tempfile
 from datetime import datetime
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel
 
+# Add the project root so the shared encoder profiles are importable
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from src.shared.encoder_profiles import get_encoder_registry  # noqa: E402
+
 logger = logging.getLogger(__name__)
 
 
@@ -250,6 +257,8 @@ class VideoComposer:
         """Create preview video with lower quality for quick review"""
 
         settings = self.platform_settings[target_platform]
+        # Preview renders at 24 fps with the low quality profile
+        profile = get_encoder_registry().profile("low", target_platform, fps=24)
         preview_path = os.path.join(self.temp_dir, f"{composition_id}_preview.mp4")
 
         # Create FFmpeg filter complex for preview
@@ -278,12 +287,7 @@ class VideoComposer:
             [
                 "-filter_complex",
                 filter_complex,
-                "-c:v",
-                "libx264",
-                "-preset",
-                "fast",  # Fast preset for preview
-                "-cr",
-                "28",  # Lower quality for preview
+                *profile.video_args(),
                 "-c:a",
                 "aac",
                 "-b:a",
@@ -321,15 +325,8 @@ class VideoComposer:
 
         final_path = os.path.join(self.output_dir, f"{composition_id}_final.mp4")
 
-        # Quality settings
-        quality_settings = {
-            "low": {"cr": "28", "preset": "fast"},
-            "medium": {"cr": "23", "preset": "medium"},
-            "high": {"cr": "18", "preset": "slow"},
-            "ultra": {"cr": "15", "preset": "veryslow"},
-        }
-
-        settings = quality_settings.get(quality, quality_settings["high"])
+        # Quality settings come from the shared encoder profiles
+        profile = get_encoder_registry().profile(quality, composition_data["target_platform"])
         platform_settings = self.platform_settings[composition_data["target_platform"]]
 
         # Build comprehensive FFmpeg command for final render
@@ -356,12 +353,7 @@ class VideoComposer:
             [
                 "-filter_complex",
                 filter_complex,
-                "-c:v",
-                "libx264",
-                "-preset",
-                settings["preset"],
-                "-cr",
-                settings["cr"],
+                *profile.video_args(),
                 "-c:a",
                 "aac",
                 "-b:a",
@@ -110,6 +110,44 @@ async def synthesize_emotion_speech(
         raise HTTPException(status_code=500, detail=f"語音合成失敗: {str(e)}")
 
 
+@router.post(
+    "/synthesize/stream",
+    summary="串流情感語音合成",
+    description="逐塊進行情感後處理並串流輸出 WAV，適用於長篇旁白",
+)
+async def synthesize_emotion_speech_stream(
+    request: EmotionSynthesisRequest,
+    current_user: dict = Depends(get_current_user),
+):
+    """串流情感語音合成"""
+    if not emotion_synthesizer:
+        raise HTTPException(status_code=503, detail="情感合成器未初始化")
+
+    logger.info(
+        "收到串流情感語音合成請求",
+        user_id=current_user.get("id"),
+        emotion=request.emotion,
+        language=request.language,
+    )
+
+    from fastapi.responses import StreamingResponse
+
+    return StreamingResponse(
+        emotion_synthesizer.synthesize_with_emotion_stream(
+            text=request.text,
+            emotion=request.emotion,
+            intensity=request.intensity,
+            language=request.language,
+            voice_speed=request.voice_speed,
+            voice_pitch=request.voice_pitch,
+        ),
+        media_type="audio/wav",
+        headers={
+            "Content-Disposition": f"attachment; filename=emotion_speech_{request.emotion}.wav"
+        },
+    )
+
+
 @router.post(
     "/analyze",
     response_model=EmotionAnalysisResponse,
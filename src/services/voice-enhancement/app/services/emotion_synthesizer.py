@@ -3,8 +3,11 @@ Emotion-aware Speech Synthesis
 實現具有情感表達能力的語音合成
 """
 
+import asyncio
 import io
-from typing import Dict, List
+import struct
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional
 
 import librosa
 import numpy as np
@@ -16,6 +19,101 @@ from TTS.api import TTS
 
 logger = structlog.get_logger()
 
+# 效果器假設的取樣率（與整段處理路徑一致）
+EFFECT_SAMPLE_RATE = 22050
+# 短於此長度的視窗在變調/變速前補零（librosa 預設 n_fft）
+MIN_WINDOW_SAMPLES = 2048
+
+
+@lru_cache(maxsize=16)
+def _lowpass_coefficients(order: int, cutoff: float):
+    """快取低通濾波器係數 (b, a)"""
+    from scipy import signal
+
+    return signal.butter(order, cutoff, "low")
+
+
+@lru_cache(maxsize=16)
+def _lowpass_sos(order: int, cutoff: float):
+    """快取低通濾波器的二階節係數（串流濾波用）"""
+    from scipy import signal
+
+    return signal.butter(order, cutoff, "low", output="sos")
+
+
+def _wav_stream_header(sample_rate: int, channels: int = 1, sample_width: int = 2) -> bytes:
+    """產生長度未知的串流 WAV 標頭（RIFF/data 大小填 0xFFFFFFFF）"""
+    byte_rate = sample_rate * channels * sample_width
+    return (
+        b"RIFF"
+        + struct.pack("<I", 0xFFFFFFFF)
+        + b"WAVEfmt "
+        + struct.pack(
+            "<IHHIIHH",
+            16,
+            1,  # PCM
+            channels,
+            sample_rate,
+            byte_rate,
+            channels * sample_width,
+            sample_width * 8,
+        )
+        + b"data"
+        + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
+def _encode_pcm16(audio: np.ndarray) -> bytes:
+    """將浮點音訊編碼為 16-bit PCM"""
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+class _StreamingEmotionEffects:
+    """跨區塊保留狀態的情感效果器
+
+    與 `_apply_emotion_effects` 對應：回聲保留延遲線、低通濾波保留濾波器狀態、
+    顫音以絕對樣本位置計算相位，因此逐塊處理的結果可無縫接合。
+    """
+
+    def __init__(self, emotion: str, intensity: float):
+        self.effect = None
+        if emotion == "happy" and intensity > 1.2:
+            self.effect = "echo"
+            self.delay_samples = int(0.1 * EFFECT_SAMPLE_RATE)
+            self.history = np.zeros(self.delay_samples)
+        elif emotion == "sad" and intensity > 1.0:
+            self.effect = "lowpass"
+            self.sos = _lowpass_sos(4, 0.3)
+            self.zi = None
+        elif emotion == "angry" and intensity > 1.3:
+            self.effect = "distortion"
+        elif emotion == "fear" and intensity > 1.1:
+            self.effect = "tremolo"
+        self.offset = 0
+
+    def process(self, audio: np.ndarray) -> np.ndarray:
+        if self.effect == "echo":
+            extended = np.concatenate([self.history, audio])
+            self.history = extended[-self.delay_samples :]
+            audio = audio + extended[: len(audio)] * 0.3
+
+        elif self.effect == "lowpass":
+            from scipy import signal
+
+            if self.zi is None:
+                self.zi = signal.sosfilt_zi(self.sos) * (audio[0] if len(audio) else 0.0)
+            audio, self.zi = signal.sosfilt(self.sos, audio, zi=self.zi)
+
+        elif self.effect == "distortion":
+            audio = np.tanh(audio * 1.1)
+
+        elif self.effect == "tremolo":
+            t = (self.offset + np.arange(len(audio))) / EFFECT_SAMPLE_RATE
+            audio = audio * (1 + 0.3 * np.sin(2 * np.pi * 6.0 * t))
+
+        self.offset += len(audio)
+        return audio
+
 
 class EmotionSynthesizer:
     """情感語音合成器"""
@@ -137,30 +235,8 @@ class EmotionSynthesizer:
                 language=language,
             )
 
-            # 驗證參數
-            if emotion not in self.supported_emotions:
-                emotion = "neutral"
-
-            if language not in self.supported_languages:
-                language = "zh-TW"
-
-            # 根據情感調整文字
-            enhanced_text = self._enhance_text_for_emotion(text, emotion, intensity)
-
-            # 選擇合適的 TTS 模型
-            tts_model = self.tts_models.get(language)
-            if not tts_model:
-                # 使用默認模型
-                tts_model = next(iter(self.tts_models.values()))
-
-            # 生成基礎語音
-            with io.BytesIO() as audio_buffer:
-                tts_model.tts_to_file(
-                    text=enhanced_text,
-                    file_path=audio_buffer,
-                    emotion=(emotion if hasattr(tts_model, "emotions") else None),
-                )
-                base_audio = audio_buffer.getvalue()
+            emotion, language = self._validate_emotion_and_language(emotion, language)
+            base_audio = self._generate_base_audio(text, emotion, intensity, language)
 
             # 應用情感後處理
             enhanced_audio = await self._apply_emotion_processing(
@@ -174,6 +250,81 @@ class EmotionSynthesizer:
             logger.error("情感語音合成失敗", error=str(e))
             raise
 
+    async def synthesize_with_emotion_stream(
+        self,
+        text: str,
+        emotion: str = "neutral",
+        intensity: float = 1.0,
+        language: str = "zh-TW",
+        voice_speed: float = 1.0,
+        voice_pitch: float = 1.0,
+        chunk_seconds: float = 2.0,
+    ) -> AsyncIterator[bytes]:
+        """
+        串流合成具有情感的語音
+
+        與 `synthesize_with_emotion` 參數相同，但情感後處理以重疊視窗逐塊進行，
+        先輸出 WAV 標頭，之後每處理完一塊即輸出對應的 PCM 數據。
+
+        Yields:
+            WAV 標頭與後續的 16-bit PCM 區塊
+        """
+        logger.info(
+            "開始串流情感語音合成",
+            text=text[:50],
+            emotion=emotion,
+            language=language,
+        )
+
+        emotion, language = self._validate_emotion_and_language(emotion, language)
+        base_audio = await asyncio.to_thread(
+            self._generate_base_audio, text, emotion, intensity, language
+        )
+
+        async for chunk in self.stream_emotion_processing(
+            base_audio,
+            emotion,
+            intensity,
+            voice_speed,
+            voice_pitch,
+            chunk_seconds=chunk_seconds,
+        ):
+            yield chunk
+
+        logger.info("串流情感語音合成完成")
+
+    def _validate_emotion_and_language(self, emotion: str, language: str):
+        """驗證參數，不支援的值回退為預設值"""
+        if emotion not in self.supported_emotions:
+            emotion = "neutral"
+
+        if language not in self.supported_languages:
+            language = "zh-TW"
+
+        return emotion, language
+
+    def _generate_base_audio(
+        self, text: str, emotion: str, intensity: float, language: str
+    ) -> bytes:
+        """使用 TTS 生成未經後處理的基礎語音"""
+        # 根據情感調整文字
+        enhanced_text = self._enhance_text_for_emotion(text, emotion, intensity)
+
+        # 選擇合適的 TTS 模型
+        tts_model = self.tts_models.get(language)
+        if not tts_model:
+            # 使用默認模型
+            tts_model = next(iter(self.tts_models.values()))
+
+        # 生成基礎語音
+        with io.BytesIO() as audio_buffer:
+            tts_model.tts_to_file(
+                text=enhanced_text,
+                file_path=audio_buffer,
+                emotion=(emotion if hasattr(tts_model, "emotions") else None),
+            )
+            return audio_buffer.getvalue()
+
     def _enhance_text_for_emotion(self, text: str, emotion: str, intensity: float) -> str:
         """根據情感增強文字"""
 
@@ -242,6 +393,89 @@ class EmotionSynthesizer:
             sf.write(output, audio_array, sample_rate, format="WAV")
             return output.getvalue()
 
+    async def stream_emotion_processing(
+        self,
+        audio_data: bytes,
+        emotion: str,
+        intensity: float,
+        speed: float,
+        pitch: float,
+        chunk_seconds: float = 2.0,
+        overlap_seconds: float = 0.05,
+    ) -> AsyncIterator[bytes]:
+        """
+        以重疊視窗串流應用情感後處理
+
+        每個視窗依序經過變調、變速、音量與情感效果，相鄰視窗的重疊部分以線性
+        交叉淡化接合。輸入只解碼目前視窗，輸出為 16-bit 單聲道串流 WAV。
+        低通濾波在串流模式下為因果濾波（保留濾波器狀態），而非整段的零相位濾波。
+        """
+        emotion_params = self._get_emotion_parameters(emotion, intensity)
+        pitch_factor = pitch * emotion_params.get("pitch_factor", 1.0)
+        speed_factor = speed * emotion_params.get("speed_factor", 1.0)
+        volume_factor = emotion_params.get("volume_factor", 1.0)
+        effects = _StreamingEmotionEffects(emotion, intensity)
+
+        with sf.SoundFile(io.BytesIO(audio_data)) as source:
+            sample_rate = source.samplerate
+            chunk_samples = max(int(chunk_seconds * sample_rate), MIN_WINDOW_SAMPLES)
+            overlap_samples = int(overlap_seconds * sample_rate)
+
+            yield _wav_stream_header(sample_rate)
+
+            pending_tail: Optional[np.ndarray] = None
+            for window in source.blocks(
+                blocksize=chunk_samples + overlap_samples,
+                overlap=overlap_samples,
+                dtype="float64",
+                always_2d=True,
+            ):
+                window = window.mean(axis=1)
+                processed = await asyncio.to_thread(
+                    self._process_emotion_window,
+                    window,
+                    sample_rate,
+                    pitch_factor,
+                    speed_factor,
+                )
+
+                if pending_tail is not None:
+                    fade = min(len(pending_tail), len(processed))
+                    ramp = np.linspace(0.0, 1.0, fade, endpoint=False)
+                    processed = processed.copy()
+                    processed[:fade] = pending_tail[:fade] * (1 - ramp) + processed[:fade] * ramp
+
+                # 保留尾端重疊區，與下一個視窗的開頭交叉淡化
+                tail_samples = min(int(round(overlap_samples / speed_factor)), len(processed))
+                body_end = len(processed) - tail_samples
+                pending_tail = processed[body_end:]
+
+                if body_end > 0:
+                    yield _encode_pcm16(effects.process(processed[:body_end] * volume_factor))
+
+            if pending_tail is not None and len(pending_tail):
+                yield _encode_pcm16(effects.process(pending_tail * volume_factor))
+
+    def _process_emotion_window(
+        self,
+        window: np.ndarray,
+        sample_rate: int,
+        pitch_factor: float,
+        speed_factor: float,
+    ) -> np.ndarray:
+        """對單一視窗變調與變速"""
+        length = len(window)
+        if length < MIN_WINDOW_SAMPLES:
+            window = np.pad(window, (0, MIN_WINDOW_SAMPLES - length))
+
+        if pitch_factor != 1.0:
+            window = librosa.effects.pitch_shift(window, sr=sample_rate, n_steps=pitch_factor * 12)
+
+        if speed_factor != 1.0:
+            window = librosa.effects.time_stretch(window, rate=speed_factor)
+
+        return window[: int(round(length / speed_factor))]
+
     def _get_emotion_parameters(self, emotion: str, intensity: float) -> Dict:
         """獲取情感參數"""
 
@@ -329,7 +563,7 @@ class EmotionSynthesizer:
         """應用低通濾波器"""
         from scipy import signal
 
-        b, a = signal.butter(4, 0.3, "low")
+        b, a = _lowpass_coefficients(4, 0.3)
         return signal.filtfilt(b, a, audio)
 
     def _add_distortion(self, audio: np.ndarray, factor: float) -> np.ndarray:
@@ -1,12 +1,12 @@
-f"
+"""
 Voice Cloning Service
 實現高品質語音克隆功能，可以模仿特定人物的聲音特徵
-"
+"""
 
 import io
 import pickle
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import librosa
 import numpy as np
@@ -14,23 +14,27 @@ import soundfile as sf
 import structlog
 from resemblyzer import VoiceEncoder, preprocess_wav
 
+from .voice_index import VoiceEmbeddingIndex, pairwise_consistency
+
 logger = structlog.get_logger()
 
 
 class VoiceCloner:
-    f"語音克隆器"
+    """語音克隆器"""
 
-def __init__(self):
+    def __init__(self):
         self.voice_encoder = None
         self.speaker_embeddings = {}  # 儲存說話者嵌入
-        self.cloned_voices = {}  # 儲存已克隆的語音模型
+        self.cloned_voices = {}  # 儲存已克隆的語音模型（中繼資料）
+        self.voice_index = VoiceEmbeddingIndex("voices/index")  # 所有語音的嵌入矩陣
         self.min_samples_for_cloning = 5  # 最少需要的語音樣本數
         self.max_sample_duration = 30  # 最大樣本長度（秒）
+        self.same_speaker_threshold = 0.75  # 判定為同一說話者的相似度門檻
 
-async def initialize(self):
-        f"初始化語音克隆器"
+    async def initialize(self):
+        """初始化語音克隆器"""
         try:
-            logger.info(f"初始化語音克隆器)
+            logger.info("初始化語音克隆器")
 
             # 載入語音編碼器
             self.voice_encoder = VoiceEncoder()
@@ -38,30 +42,47 @@ async def initialize(self):
             # 檢查已存在的語音模型
             await self._load_existing_voices()
 
-            logger.info(語音克隆器初始化完成")
+            logger.info("語音克隆器初始化完成")
 
         except Exception as e:
-            logger.error(f"語音克隆器初始化失敗, error=str(e))
+            logger.error("語音克隆器初始化失敗", error=str(e))
             raise
 
-async def _load_existing_voices(self):
-        "載入已存在的語音模型f"
+    async def _load_existing_voices(self):
+        """載入已存在的語音模型"""
         try:
-            voices_dir = Path("voicesf")
-            if voices_dir.exists():
-                for voice_file in voices_dir.glob(*.pkl):
-                    voice_name = voice_file.stem
-                    with open(voice_file, "rbf") as f:
-                        voice_data = pickle.load(f)
-                        self.cloned_voices[voice_name] = voice_data
-                    logger.info(f已載入語音模型: {voice_name})
+            if not self.voice_index.exists():
+                await self._migrate_legacy_profiles()
+
+            self.voice_index.load()
+            self.cloned_voices = {
+                profile["name"]: profile for profile in self.voice_index.profiles
+            }
+            logger.info("已載入語音模型", count=len(self.cloned_voices))
         except Exception as e:
-            logger.warning("載入已存在語音模型失敗f", error=str(e))
+            logger.warning("載入已存在語音模型失敗", error=str(e))
+
+    async def _migrate_legacy_profiles(self):
+        """將舊版逐檔 pickle 語音檔案一次性匯入嵌入索引"""
+        voices_dir = Path("voices")
+        if not voices_dir.exists():
+            return
+
+        for voice_file in voices_dir.glob("*.pkl"):
+            try:
+                with open(voice_file, "rb") as f:
+                    voice_data = pickle.load(f)  # nosec B301 - 僅讀取本服務自行寫入的檔案
+                embedding = voice_data.pop("embedding")
+                self.voice_index.add(voice_file.stem, embedding, voice_data)
+                voice_file.unlink()
+                logger.info(f"已匯入語音模型: {voice_file.stem}")
+            except Exception as e:
+                logger.warning(f"匯入語音模型失敗: {voice_file.stem}", error=str(e))
 
-async def create_voice_profile(
-self, voice_name: str, audio_samples: List[bytes], user_id: str
+    async def create_voice_profile(
+        self, voice_name: str, audio_samples: List[bytes], user_id: str
     ) -> Dict:
-        "
+        """
         創建語音檔案
 
         Args:
@@ -71,19 +92,17 @@ self, voice_name: str, audio_samples: List[bytes], user_id: str
 
         Returns:
             創建結果
-        f"
+        """
         try:
             logger.info(
-                "開始創建語音檔案f",
+                "開始創建語音檔案",
                 voice_name=voice_name,
                 samples_count=len(audio_samples),
             )
 
             # 驗證樣本數量
             if len(audio_samples) < self.min_samples_for_cloning:
-                raise ValueError(
-                    f至少需要 {self.min_samples_for_cloning} 個語音樣本
-                )
+                raise ValueError(f"至少需要 {self.min_samples_for_cloning} 個語音樣本")
 
             # 處理音訊樣本
             processed_samples = []
@@ -99,14 +118,14 @@ self, voice_name: str, audio_samples: List[bytes], user_id: str
                     embedding = self._extract_voice_embedding(processed_audio)
                     embeddings.append(embedding)
 
-                    logger.info(f"處理樣本 {i + 1}/{len(audio_samples)} 完成f")
+                    logger.info(f"處理樣本 {i + 1}/{len(audio_samples)} 完成")
 
                 except Exception as e:
-                    logger.warning(f處理樣本 {i + 1} 失敗, error=str(e))
+                    logger.warning(f"處理樣本 {i + 1} 失敗", error=str(e))
                     continue
 
             if len(embeddings) < self.min_samples_for_cloning:
-                raise ValueError("可用的語音樣本不足f")
+                raise ValueError("可用的語音樣本不足")
 
             # 計算平均嵌入向量
             mean_embedding = np.mean(embeddings, axis=0)
@@ -116,42 +135,39 @@ self, voice_name: str, audio_samples: List[bytes], user_id: str
 
             # 創建語音檔案
             voice_profile = {
-                name: voice_name,
-                "user_idf": user_id,
-                embedding: mean_embedding,
-                "consistencyf": consistency,
-                sample_count: len(embeddings),
-                "quality_scoref": self._calculate_quality_score(
-                    embeddings, processed_samples
+                "name": voice_name,
+                "user_id": user_id,
+                "consistency": consistency,
+                "sample_count": len(embeddings),
+                "quality_score": self._calculate_quality_score(
+                    embeddings, processed_samples, consistency
                 ),
-                created_at: np.datetime64("nowf").astype(str),
+                "created_at": np.datetime64("now").astype(str),
             }
 
             # 儲存語音檔案
-            await self._save_voice_profile(voice_name, voice_profile)
-
-            self.cloned_voices[voice_name] = voice_profile
+            await self._save_voice_profile(voice_name, voice_profile, mean_embedding)
 
             logger.info(
-                語音檔案創建完成,
+                "語音檔案創建完成",
                 voice_name=voice_name,
-                quality_score=voice_profile["quality_scoref"],
+                quality_score=voice_profile["quality_score"],
             )
 
             return {
-                voice_name: voice_name,
-                "quality_scoref": voice_profile[quality_score],
-                "consistencyf": consistency,
-                sample_count: len(embeddings),
-                "statusf": success,
+                "voice_name": voice_name,
+                "quality_score": voice_profile["quality_score"],
+                "consistency": consistency,
+                "sample_count": len(embeddings),
+                "status": "success",
             }
 
         except Exception as e:
-            logger.error("語音檔案創建失敗f", error=str(e))
+            logger.error("語音檔案創建失敗", error=str(e))
             raise
 
-async def _preprocess_audio(self, audio_data: bytes) -> np.ndarray:
-        "預處理音訊數據f"
+    async def _preprocess_audio(self, audio_data: bytes) -> np.ndarray:
+        """預處理音訊數據"""
         # 將 bytes 轉換為 numpy array
         audio_array, sample_rate = sf.read(io.BytesIO(audio_data))
 
@@ -161,9 +177,7 @@ async def _preprocess_audio(self, audio_data: bytes) -> np.ndarray:
 
         # 重採樣到 16kHz（Resemblyzer 要求）
         if sample_rate != 16000:
-            audio_array = librosa.resample(
-                audio_array, orig_sr=sample_rate, target_sr=16000
-            )
+            audio_array = librosa.resample(audio_array, orig_sr=sample_rate, target_sr=16000)
 
         # 正規化音量
         audio_array = audio_array / np.max(np.abs(audio_array))
@@ -173,42 +187,31 @@ async def _preprocess_audio(self, audio_data: bytes) -> np.ndarray:
 
         return processed_audio
 
-def _extract_voice_embedding(self, audio: np.ndarray) -> np.ndarray:
-        "提取語音嵌入向量f"
+    def _extract_voice_embedding(self, audio: np.ndarray) -> np.ndarray:
+        """提取語音嵌入向量"""
         if self.voice_encoder is None:
-            raise RuntimeError("語音編碼器未初始化f")
+            raise RuntimeError("語音編碼器未初始化")
 
         # 使用 Resemblyzer 提取嵌入
         embedding = self.voice_encoder.embed_utterance(audio)
         return embedding
 
-def _calculate_embedding_consistency(
-self, embeddings: List[np.ndarray]
-    ) -> float:
-        "計算嵌入向量的一致性f"
-        if len(embeddings) < 2:
-            return 1.0
-
-        # 計算所有嵌入向量間的餘弦相似度
-        similarities = []
-        for i in range(len(embeddings)):
-            for j in range(i + 1, len(embeddings)):
-                sim = np.dot(embeddings[i], embeddings[j]) / (
-                    np.linalg.norm(embeddings[i])
-                    * np.linalg.norm(embeddings[j])
-                )
-                similarities.append(sim)
+    def _calculate_embedding_consistency(self, embeddings: List[np.ndarray]) -> float:
+        """計算嵌入向量的一致性（所有向量兩兩餘弦相似度的平均）"""
+        return pairwise_consistency(embeddings)
 
-        return float(np.mean(similarities))
-
-def _calculate_quality_score(
-self, embeddings: List[np.ndarray], audio_samples: List[np.ndarray]
+    def _calculate_quality_score(
+        self,
+        embeddings: List[np.ndarray],
+        audio_samples: List[np.ndarray],
+        consistency: Optional[float] = None,
     ) -> float:
-        "計算語音品質分數f"
+        """計算語音品質分數"""
         scores = []
 
         # 嵌入一致性分數
-        consistency = self._calculate_embedding_consistency(embeddings)
+        if consistency is None:
+            consistency = self._calculate_embedding_consistency(embeddings)
         scores.append(consistency * 0.4)
 
         # 音訊品質分數
@@ -228,23 +231,21 @@ self, embeddings: List[np.ndarray], audio_samples: List[np.ndarray]
 
         return float(sum(scores))
 
-async def _save_voice_profile(self, voice_name: str, voice_profile: Dict):
-        "儲存語音檔案f"
-        voices_dir = Path("voicesf")
-        voices_dir.mkdir(exist_ok=True)
+    async def _save_voice_profile(
+        self, voice_name: str, voice_profile: Dict, embedding: np.ndarray
+    ):
+        """儲存語音檔案至嵌入索引"""
+        self.voice_index.add(voice_name, embedding, voice_profile)
+        self.cloned_voices[voice_name] = self.voice_index.get(voice_name)
 
-        voice_file = voices_dir / f{voice_name}.pkl
-        with open(voice_file, "wbf") as f:
-            pickle.dump(voice_profile, f)
-
-async def clone_voice(
-self,
+    async def clone_voice(
+        self,
         target_voice: str,
         text: str,
-        emotion: str = neutral,
-        language: str = "zh-TWf",
+        emotion: str = "neutral",
+        language: str = "zh-TW",
     ) -> bytes:
-        "
+        """
         使用指定語音克隆合成語音
 
         Args:
@@ -255,18 +256,15 @@ self,
 
         Returns:
             合成的音訊數據
-        f"
+        """
         try:
-            logger.info(
-                "開始語音克隆合成", target_voice=target_voice, text=text[:50]
-            )
+            logger.info("開始語音克隆合成", target_voice=target_voice, text=text[:50])
 
             # 檢查語音模型是否存在
             if target_voice not in self.cloned_voices:
-                raise ValueError(f"語音模型 {target_voice} 不存在")f"'
+                raise ValueError(f"語音模型 {target_voice} 不存在")
 
-            voice_profile = self.cloned_voices[target_voice]
-            target_embedding = voice_profile[embedding]
+            target_embedding = self.voice_index.get_embedding(target_voice)
 
             # 這裡需要整合實際的語音合成模型
             # 由於這是示例實現，我們使用基礎的 TTS 並嘗試調整音色
@@ -277,27 +275,27 @@ self,
                 language=language,
             )
 
-            logger.info("語音克隆合成完成f")
+            logger.info("語音克隆合成完成")
             return synthesized_audio
 
         except Exception as e:
-            logger.error(語音克隆合成失敗, error=str(e))
+            logger.error("語音克隆合成失敗", error=str(e))
             raise
 
-async def _synthesize_with_voice_transfer(
-self,
+    async def _synthesize_with_voice_transfer(
+        self,
         text: str,
         target_embedding: np.ndarray,
         emotion: str,
         language: str,
     ) -> bytes:
-        "使用語音轉換進行合成f"
+        """使用語音轉換進行合成"""
         # 這是一個簡化的實現
         # 實際應用中需要整合如 Real-Time Voice Cloning 或 SV2TTS 等模型
 
         try:
             # 1. 首先使用標準 TTS 生成基礎語音
-from .emotion_synthesizer import EmotionSynthesizer
+            from .emotion_synthesizer import EmotionSynthesizer
 
             emotion_synth = EmotionSynthesizer()
             await emotion_synth.initialize()
@@ -308,21 +306,19 @@ from .emotion_synthesizer import EmotionSynthesizer
 
             # 2. 應用語音轉換（簡化實現）
             # 實際應用中這裡會使用更複雜的語音轉換模型
-            enhanced_audio = await self._apply_voice_conversion(
-                base_audio, target_embedding
-            )
+            enhanced_audio = await self._apply_voice_conversion(base_audio, target_embedding)
 
             return enhanced_audio
 
         except Exception as e:
-            logger.error("語音轉換失敗f", error=str(e))
+            logger.error("語音轉換失敗", error=str(e))
             # 回退到基礎合成
             return base_audio
 
-async def _apply_voice_conversion(
-self, audio_data: bytes, target_embedding: np.ndarray
+    async def _apply_voice_conversion(
+        self, audio_data: bytes, target_embedding: np.ndarray
     ) -> bytes:
-        "應用語音轉換（簡化實現）f"
+        """應用語音轉換（簡化實現）"""
         # 這是一個基礎實現，實際應用中需要使用專業的語音轉換模型
 
         # 將 bytes 轉換為音訊數組
@@ -345,25 +341,25 @@ self, audio_data: bytes, target_embedding: np.ndarray
 
         # 轉換回 bytes
         with io.BytesIO() as output:
-            sf.write(output, audio_array, sample_rate, format="WAVf")
+            sf.write(output, audio_array, sample_rate, format="WAV")
             return output.getvalue()
 
-def _embedding_to_pitch_shift(self, embedding: np.ndarray) -> float:
-        "將嵌入向量轉換為音調偏移f"
+    def _embedding_to_pitch_shift(self, embedding: np.ndarray) -> float:
+        """將嵌入向量轉換為音調偏移"""
         # 簡化實現：使用嵌入向量的某些維度來決定音調
         pitch_components = embedding[:10]  # 使用前10個維度
         pitch_shift = np.mean(pitch_components) * 12  # 轉換為半音
         return float(np.clip(pitch_shift, -6, 6))  # 限制在合理範圍
 
-def _embedding_to_formant_shift(self, embedding: np.ndarray) -> float:
-        "將嵌入向量轉換為共振峰偏移f"
+    def _embedding_to_formant_shift(self, embedding: np.ndarray) -> float:
+        """將嵌入向量轉換為共振峰偏移"""
         # 簡化實現：使用嵌入向量的其他維度來決定共振峰
         formant_components = embedding[10:20]  # 使用10-20維度
         formant_shift = np.mean(formant_components) * 2
         return float(np.clip(formant_shift, -1, 1))
 
-def _adjust_formants(self, audio: np.ndarray, shift: float) -> np.ndarray:
-        "調整共振峰（簡化實現）f"
+    def _adjust_formants(self, audio: np.ndarray, shift: float) -> np.ndarray:
+        """調整共振峰（簡化實現）"""
         # 這是一個非常簡化的共振峰調整
         # 實際實現需要使用專業的語音處理算法
 
@@ -377,10 +373,8 @@ def _adjust_formants(self, audio: np.ndarray, shift: float) -> np.ndarray:
 
         return audio_shifted
 
-async def analyze_voice_similarity(
-self, voice1_data: bytes, voice2_data: bytes
-    ) -> Dict:
-        "分析兩個語音的相似度f"
+    async def analyze_voice_similarity(self, voice1_data: bytes, voice2_data: bytes) -> Dict:
+        """分析兩個語音的相似度"""
         try:
             # 預處理音訊
             audio1 = await self._preprocess_audio(voice1_data)
@@ -396,71 +390,111 @@ self, voice1_data: bytes, voice2_data: bytes
             )
 
             return {
-                "similarityf": float(similarity),
-                is_same_speaker: similarity > 0.75,
-                "confidencef": float(abs(similarity - 0.5) * 2),
+                "similarity": float(similarity),
+                "is_same_speaker": bool(similarity > self.same_speaker_threshold),
+                "confidence": float(abs(similarity - 0.5) * 2),
             }
 
         except Exception as e:
-            logger.error(語音相似度分析失敗, error=str(e))
+            logger.error("語音相似度分析失敗", error=str(e))
             raise
 
-async def get_voice_profiles(self, user_id: str) -> List[Dict]:
-        "獲取用戶的語音檔案列表f"
+    async def identify_voices(
+        self,
+        audio_clips: List[bytes],
+        top_k: int = 5,
+        user_id: str = None,
+    ) -> List[Dict]:
+        """
+        辨識音訊片段屬於哪個已知語音
+
+        所有片段的嵌入以一次矩陣乘法與索引中的所有語音檔案比對。
+
+        Args:
+            audio_clips: 待辨識的音訊片段列表
+            top_k: 每個片段返回的候選語音數
+            user_id: 僅比對該用戶的語音檔案
+
+        Returns:
+            每個片段的候選語音（依相似度排序）與最佳匹配
+        """
+        try:
+            embeddings = []
+            for audio_data in audio_clips:
+                audio = await self._preprocess_audio(audio_data)
+                embeddings.append(self._extract_voice_embedding(audio))
+
+            matches = self.voice_index.search(np.stack(embeddings), top_k=top_k, user_id=user_id)
+
+            results = []
+            for candidates in matches:
+                best = candidates[0] if candidates else None
+                is_known = best is not None and best["similarity"] > self.same_speaker_threshold
+                results.append(
+                    {
+                        "candidates": candidates,
+                        "best_match": best["name"] if is_known else None,
+                        "similarity": best["similarity"] if best else 0.0,
+                    }
+                )
+            return results
+
+        except Exception as e:
+            logger.error("語音辨識失敗", error=str(e))
+            raise
+
+    async def get_voice_profiles(self, user_id: str) -> List[Dict]:
+        """獲取用戶的語音檔案列表"""
         profiles = []
         for name, profile in self.cloned_voices.items():
-            if profile.get("user_idf") == user_id:
+            if profile.get("user_id") == user_id:
                 profiles.append(
                     {
-                        name: name,
-                        "quality_scoref": profile[quality_score],
-                        "consistencyf": profile[consistency],
-                        "sample_countf": profile[sample_count],
-                        "created_atf": profile[created_at],
+                        "name": name,
+                        "quality_score": profile["quality_score"],
+                        "consistency": profile["consistency"],
+                        "sample_count": profile["sample_count"],
+                        "created_at": profile["created_at"],
                     }
                 )
         return profiles
 
-async def delete_voice_profile(
-self, voice_name: str, user_id: str
-    ) -> bool:
-        "刪除語音檔案f"
+    async def delete_voice_profile(self, voice_name: str, user_id: str) -> bool:
+        """刪除語音檔案"""
         try:
             if voice_name not in self.cloned_voices:
                 return False
 
             profile = self.cloned_voices[voice_name]
-            if profile.get("user_idf") != user_id:
+            if profile.get("user_id") != user_id:
                 return False
 
-            # 刪除檔案
-            voice_file = Path(voices) / f"{voice_name}.pklf"
-            if voice_file.exists():
-                voice_file.unlink()
+            # 從索引中刪除
+            self.voice_index.remove(voice_name)
 
             # 從記憶體中移除
             del self.cloned_voices[voice_name]
 
-            logger.info(語音檔案已刪除, voice_name=voice_name)
+            logger.info("語音檔案已刪除", voice_name=voice_name)
             return True
 
         except Exception as e:
-            logger.error("刪除語音檔案失敗f", error=str(e))
+            logger.error("刪除語音檔案失敗", error=str(e))
             return False
 
-def get_cloning_requirements(self) -> Dict:
-        "獲取語音克隆要求f"
+    def get_cloning_requirements(self) -> Dict:
+        """獲取語音克隆要求"""
         return {
-            "min_samplesf": self.min_samples_for_cloning,
-            max_sample_duration: self.max_sample_duration,
-            "recommended_samplesf": 10,
-            audio_format: ["wavf", mp3, "m4af"],
-            sample_rate: "16kHzf",
-            requirements: [
-                "清晰的語音，無背景噪音f",
-                每個樣本 3-30 秒,
-                "涵蓋不同情感和語調f",
-                相同說話者的聲音,
+            "min_samples": self.min_samples_for_cloning,
+            "max_sample_duration": self.max_sample_duration,
+            "recommended_samples": 10,
+            "audio_format": ["wav", "mp3", "m4a"],
+            "sample_rate": "16kHz",
+            "requirements": [
+                "清晰的語音，無背景噪音",
+                "每個樣本 3-30 秒",
+                "涵蓋不同情感和語調",
+                "相同說話者的聲音",
                 "高品質音訊（無壓縮失真）",
             ],
         }
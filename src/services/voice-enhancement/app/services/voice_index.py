@@ -0,0 +1,183 @@
+"""
+Voice Embedding Index
+以單一記憶體映射矩陣儲存所有語音檔案的正規化嵌入向量，支援批次餘弦相似度搜尋
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import structlog
+
+logger = structlog.get_logger()
+
+
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """將嵌入向量正規化為單位長度（支援單一向量或矩陣）"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def pairwise_consistency(embeddings: List[np.ndarray]) -> float:
+    """以一次矩陣乘法計算所有嵌入向量兩兩之間的平均餘弦相似度"""
+    if len(embeddings) < 2:
+        return 1.0
+
+    normalized = normalize_embeddings(np.stack(embeddings))
+    similarities = normalized @ normalized.T
+    upper = np.triu_indices(len(normalized), k=1)
+    return float(similarities[upper].mean())
+
+
+class VoiceEmbeddingIndex:
+    """語音嵌入索引
+
+    檔案結構：
+        <index_dir>/embeddings.npy  float32 (N, D) 正規化嵌入矩陣，以 mmap 載入
+        <index_dir>/profiles.json   與矩陣列順序一致的語音檔案中繼資料
+
+    載入時間只取決於這兩個檔案，與語音檔案數量無關。
+    """
+
+    EMBEDDINGS_FILE = "embeddings.npy"
+    PROFILES_FILE = "profiles.json"
+
+    def __init__(self, index_dir: str = "voices/index"):
+        self.index_dir = Path(index_dir)
+        self.embeddings: Optional[np.ndarray] = None
+        self.profiles: List[Dict] = []
+        self._rows: Dict[str, int] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.profiles)
+
+    def exists(self) -> bool:
+        return (self.index_dir / self.PROFILES_FILE).exists()
+
+    def load(self):
+        """載入索引（嵌入矩陣以唯讀 mmap 開啟）"""
+        profiles_path = self.index_dir / self.PROFILES_FILE
+        if not profiles_path.exists():
+            return
+
+        with open(profiles_path, "r", encoding="utf-8") as f:
+            self.profiles = json.load(f)
+
+        if self.profiles:
+            self.embeddings = np.load(self.index_dir / self.EMBEDDINGS_FILE, mmap_mode="r")
+        else:
+            self.embeddings = None
+
+        self._rows = {profile["name"]: i for i, profile in enumerate(self.profiles)}
+        logger.info("已載入語音嵌入索引", profiles=self.size)
+
+    def add(self, name: str, embedding: np.ndarray, metadata: Dict):
+        """新增或覆寫語音檔案"""
+        embedding = np.asarray(embedding, dtype=np.float32)
+        row = normalize_embeddings(embedding)[None, :]
+        profile = {**metadata, "name": name, "norm": float(np.linalg.norm(embedding))}
+
+        if name in self._rows:
+            index = self._rows[name]
+            embeddings = np.array(self.embeddings)
+            embeddings[index] = row
+            self.profiles[index] = profile
+        elif self.embeddings is None:
+            embeddings = row
+            self.profiles.append(profile)
+        else:
+            embeddings = np.concatenate([self.embeddings, row])
+            self.profiles.append(profile)
+
+        self._persist(embeddings)
+
+    def remove(self, name: str) -> bool:
+        """刪除語音檔案"""
+        if name not in self._rows:
+            return False
+
+        index = self._rows[name]
+        embeddings = np.delete(np.asarray(self.embeddings), index, axis=0)
+        del self.profiles[index]
+        self._persist(embeddings)
+        return True
+
+    def get(self, name: str) -> Optional[Dict]:
+        """獲取語音檔案中繼資料"""
+        index = self._rows.get(name)
+        return None if index is None else self.profiles[index]
+
+    def get_embedding(self, name: str) -> Optional[np.ndarray]:
+        """還原語音檔案原始（未正規化）的嵌入向量"""
+        index = self._rows.get(name)
+        if index is None:
+            return None
+        return np.array(self.embeddings[index]) * self.profiles[index]["norm"]
+
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        user_id: Optional[str] = None,
+    ) -> List[List[Dict]]:
+        """批次餘弦相似度 top-k 搜尋
+
+        Args:
+            queries: 單一嵌入向量 (D,) 或批次矩陣 (Q, D)
+            top_k: 每個查詢返回的結果數
+            user_id: 僅搜尋該用戶的語音檔案
+
+        Returns:
+            每個查詢的結果列表，依相似度遞減排序
+        """
+        queries = normalize_embeddings(np.atleast_2d(queries))
+        if self.embeddings is None or self.size == 0:
+            return [[] for _ in range(len(queries))]
+
+        scores = queries @ np.asarray(self.embeddings).T
+
+        if user_id is not None:
+            allowed = np.array([p.get("user_id") == user_id for p in self.profiles])
+            scores = np.where(allowed[None, :], scores, -np.inf)
+            candidates = int(allowed.sum())
+        else:
+            candidates = self.size
+
+        k = min(top_k, candidates)
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [
+            [
+                {"name": self.profiles[i]["name"], "similarity": float(score)}
+                for i, score in zip(rows, row_scores)
+            ]
+            for rows, row_scores in zip(top, top_scores)
+        ]
+
+    def _persist(self, embeddings: np.ndarray):
+        """原子性寫入索引並重新以 mmap 開啟"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+        if len(self.profiles):
+            tmp_embeddings = self.index_dir / f"{self.EMBEDDINGS_FILE}.tmp"
+            with open(tmp_embeddings, "wb") as f:
+                np.save(f, np.ascontiguousarray(embeddings, dtype=np.float32))
+            os.replace(tmp_embeddings, self.index_dir / self.EMBEDDINGS_FILE)
+
+        tmp_profiles = self.index_dir / f"{self.PROFILES_FILE}.tmp"
+        with open(tmp_profiles, "w", encoding="utf-8") as f:
+            json.dump(self.profiles, f, ensure_ascii=False)
+        os.replace(tmp_profiles, self.index_dir / self.PROFILES_FILE)
+
+        self.load()
@@ -0,0 +1,139 @@
+"""
+測試情感後處理的串流模式
+"""
+
+import importlib.util
+import io
+import sys
+import time
+import tracemalloc
+import types
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+
+def _model_library_stubs() -> dict:
+    """模型套件只在 initialize() 載入模型時使用；未安裝者以空模組代替（串流後處理不需要）"""
+    stubs = {}
+    for name, attributes in {
+        "TTS": [],
+        "TTS.api": ["TTS"],
+        "speechemotionrecognition": ["SpeechEmotionRecognition"],
+        "transformers": ["Wav2Vec2Model", "Wav2Vec2Processor"],
+    }.items():
+        if importlib.util.find_spec(name.split(".")[0]) is None:
+            stubs[name] = types.ModuleType(name)
+            stubs[name].__dict__.update(dict.fromkeys(attributes))
+    return stubs
+
+
+# 只在匯入期間替換，離開後還原 sys.modules，不影響其他測試檔
+with patch.dict(sys.modules, _model_library_stubs()):
+    from app.services.emotion_synthesizer import (
+        EmotionSynthesizer,
+        _lowpass_coefficients,
+    )
+
+
+def _narration_wav(seconds: float, sample_rate: int = 22050) -> bytes:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    audio = 0.3 * np.sin(2 * np.pi * 220 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sample_rate, format="WAV")
+    return buffer.getvalue()
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def _decode_stream(chunks) -> np.ndarray:
+    pcm = b"".join(chunks[1:])
+    return np.frombuffer(pcm, dtype="<i2").astype(np.float64) / 32767
+
+
+@pytest.fixture
+def synthesizer():
+    return EmotionSynthesizer()
+
+
+class TestStreamingEmotionProcessing:
+    @pytest.mark.asyncio
+    async def test_stream_starts_with_wav_header(self, synthesizer):
+        chunks = await _collect(
+            synthesizer.stream_emotion_processing(
+                _narration_wav(3), "neutral", 1.0, 1.0, 1.0, chunk_seconds=1.0
+            )
+        )
+
+        assert chunks[0][:4] == b"RIFF"
+        assert chunks[0][8:16] == b"WAVEfmt "
+        assert len(chunks) > 2
+
+    @pytest.mark.asyncio
+    async def test_passthrough_matches_input(self, synthesizer):
+        source = _narration_wav(3)
+        expected, _ = sf.read(io.BytesIO(source))
+
+        chunks = await _collect(
+            synthesizer.stream_emotion_processing(
+                source, "neutral", 1.0, 1.0, 1.0, chunk_seconds=0.5
+            )
+        )
+        streamed = _decode_stream(chunks)
+
+        assert len(streamed) == len(expected)
+        np.testing.assert_allclose(streamed, expected, atol=1e-3)
+
+    @pytest.mark.asyncio
+    async def test_time_stretch_length_matches_full_path(self, synthesizer):
+        source = _narration_wav(4)
+        full, _ = sf.read(
+            io.BytesIO(await synthesizer._apply_emotion_processing(source, "sad", 1.0, 1.0, 1.0))
+        )
+
+        chunks = await _collect(synthesizer.stream_emotion_processing(source, "sad", 1.0, 1.0, 1.0))
+        streamed = _decode_stream(chunks)
+
+        assert abs(len(streamed) - len(full)) < 0.01 * len(full)
+
+    def test_lowpass_coefficients_are_cached(self):
+        _lowpass_coefficients.cache_clear()
+        first = _lowpass_coefficients(4, 0.3)
+        second = _lowpass_coefficients(4, 0.3)
+
+        assert first is second
+        assert _lowpass_coefficients.cache_info().hits == 1
+
+    @pytest.mark.performance
+    @pytest.mark.asyncio
+    async def test_time_to_first_byte_and_peak_memory(self, synthesizer):
+        """60 秒旁白：串流模式的首個音訊區塊與峰值記憶體應低於整段處理"""
+        source = _narration_wav(60)
+        args = (source, "fear", 1.5, 1.1, 1.0)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        await synthesizer._apply_emotion_processing(*args)
+        full_ttfb = time.perf_counter() - start
+        _, full_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        stream_ttfb = None
+        async for chunk in synthesizer.stream_emotion_processing(*args):
+            if stream_ttfb is None and len(chunk) > 44:
+                stream_ttfb = time.perf_counter() - start
+        _, stream_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(
+            f"\nfull: ttfb={full_ttfb:.3f}s peak={full_peak / 1e6:.1f}MB | "
+            f"stream: ttfb={stream_ttfb:.3f}s peak={stream_peak / 1e6:.1f}MB"
+        )
+        assert stream_ttfb < full_ttfb / 5
+        assert stream_peak < full_peak / 2
@@ -0,0 +1,85 @@
+"""
+測試 voice_index 語音嵌入索引
+"""
+
+import numpy as np
+import pytest
+from app.services.voice_index import VoiceEmbeddingIndex, pairwise_consistency
+
+
+@pytest.fixture
+def index(tmp_path):
+    return VoiceEmbeddingIndex(str(tmp_path / "index"))
+
+
+def _random_embeddings(count: int, dim: int = 256, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+
+class TestPairwiseConsistency:
+    def test_matches_double_loop(self):
+        embeddings = list(_random_embeddings(6, dim=16))
+
+        expected = []
+        for i in range(len(embeddings)):
+            for j in range(i + 1, len(embeddings)):
+                expected.append(
+                    np.dot(embeddings[i], embeddings[j])
+                    / (np.linalg.norm(embeddings[i]) * np.linalg.norm(embeddings[j]))
+                )
+
+        assert pairwise_consistency(embeddings) == pytest.approx(np.mean(expected), abs=1e-5)
+
+    def test_single_embedding_is_fully_consistent(self):
+        assert pairwise_consistency(list(_random_embeddings(1))) == 1.0
+
+
+class TestVoiceEmbeddingIndex:
+    def test_search_finds_nearest_profile(self, index):
+        embeddings = _random_embeddings(20)
+        for i, embedding in enumerate(embeddings):
+            index.add(f"voice-{i}", embedding, {"user_id": "u1"})
+
+        noisy = embeddings[[3, 17]] + 0.01 * _random_embeddings(2, seed=1)
+        results = index.search(noisy, top_k=3)
+
+        assert [r[0]["name"] for r in results] == ["voice-3", "voice-17"]
+        assert all(len(r) == 3 for r in results)
+        assert results[0][0]["similarity"] >= results[0][1]["similarity"]
+
+    def test_search_filters_by_user(self, index):
+        embeddings = _random_embeddings(3)
+        index.add("mine", embeddings[0], {"user_id": "u1"})
+        index.add("theirs", embeddings[1], {"user_id": "u2"})
+
+        results = index.search(embeddings[1], top_k=5, user_id="u1")
+
+        assert [r["name"] for r in results[0]] == ["mine"]
+
+    def test_persists_and_reloads_as_mmap(self, index, tmp_path):
+        embedding = _random_embeddings(1)[0] * 3.0
+        index.add("narrator", embedding, {"user_id": "u1", "quality_score": 0.9})
+
+        reloaded = VoiceEmbeddingIndex(str(tmp_path / "index"))
+        reloaded.load()
+
+        assert isinstance(reloaded.embeddings, np.memmap)
+        assert reloaded.get("narrator")["quality_score"] == 0.9
+        np.testing.assert_allclose(reloaded.get_embedding("narrator"), embedding, rtol=1e-5)
+
+    def test_overwrite_and_remove(self, index):
+        embeddings = _random_embeddings(3)
+        index.add("a", embeddings[0], {})
+        index.add("b", embeddings[1], {})
+        index.add("a", embeddings[2], {})
+
+        assert index.size == 2
+        assert index.search(embeddings[2], top_k=1)[0][0]["name"] == "a"
+
+        assert index.remove("a") is True
+        assert index.remove("a") is False
+        assert index.size == 1
+        assert index.get("b") is not None
+
+    def test_empty_index_returns_no_matches(self, index):
+        assert index.search(_random_embeddings(2), top_k=5) == [[], []]
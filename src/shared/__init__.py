@@ -31,17 +31,24 @@ from .security import (
     verify_password,
 )
 from .service_client import (
+    DEADLINE_HEADER,
     CircuitBreakerConfig,
+    CircuitBreakerOpenError,
+    DeadlineExceededError,
+    DeadlineMiddleware,
     HTTPError,
     RetryConfig,
     ServiceClient,
     ServiceClientManager,
     ServiceUnavailableError,
     get_client_manager,
+    get_remaining_time,
     get_service_client,
+    request_deadline,
 )
 from .service_discovery import (
     LoadBalanceStrategy,
+    OutlierDetectionConfig,
     ServiceDiscovery,
     ServiceInstance,
     ServiceStatus,
@@ -65,6 +72,7 @@ __all__ = [
     "ServiceInstance",
     "ServiceStatus",
     "LoadBalanceStrategy",
+    "OutlierDetectionConfig",
     "get_service_discovery",
     "register_service",
     "get_service_url",
@@ -78,6 +86,12 @@ __all__ = [
     "get_client_manager",
     "ServiceUnavailableError",
     "HTTPError",
+    "CircuitBreakerOpenError",
+    "DeadlineExceededError",
+    "DeadlineMiddleware",
+    "DEADLINE_HEADER",
+    "get_remaining_time",
+    "request_deadline",
     # Security
     "SecurityConfig",
     "SecurityManager",
@@ -5,9 +5,13 @@ AI服務客戶端
 """
 
 import asyncio
+import json
 import logging
+import re
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 
 import httpx
@@ -25,16 +29,89 @@ class AIServiceResponse:
     timestamp: str = ""
 
 
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+class ParagraphBuffer:
+    """將串流輸入的文字切分為段落（以空行分隔）"""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """加入一段文字，返回已完整的段落"""
+        self._buffer += text
+        parts = _PARAGRAPH_BREAK.split(self._buffer)
+        self._buffer = parts.pop()
+        return [part.strip() for part in parts if part.strip()]
+
+    def flush(self) -> List[str]:
+        """返回剩餘的最後一個段落"""
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """將完整文字切分為段落"""
+    buffer = ParagraphBuffer()
+    return buffer.feed(text) + buffer.flush()
+
+
 class AIServiceClient:
-    """AI服務統一客戶端"""
+    """AI服務統一客戶端
+
+    所有呼叫共用一個長連線的 httpx.AsyncClient；相同的並發請求只會送出一次
+    （singleflight），結果由所有等待者共用。cache_ttl > 0 時，成功的生成
+    結果會在 TTL 內快取。
+    """
     
     def __init__(
         self, 
         ai_service_url: str = "http://localhost:8005",
-        timeout: int = 300  # 5分鐘超時
+        timeout: int = 300,  # 5分鐘超時
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        cache_ttl: float = 0,
+        cache_max_entries: int = 1024
     ):
         self.ai_service_url = ai_service_url.rstrip("/")
         self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.cache_ttl = cache_ttl
+        self.cache_max_entries = cache_max_entries
+
+        self._client: Optional[httpx.AsyncClient] = None
+        # 超過連線上限的請求在此排隊，避免 httpcore 連線池的排隊掃描成本
+        self._slots = asyncio.Semaphore(max_connections)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self._cache: "OrderedDict[str, Tuple[float, AIServiceResponse]]" = OrderedDict()
+        self.stats = {"requests": 0, "coalesced": 0, "cache_hits": 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """獲取共用的 HTTP 客戶端（首次使用時建立）"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def close(self):
+        """關閉共用的 HTTP 客戶端"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "AIServiceClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def clear_cache(self):
+        """清除回應快取"""
+        self._cache.clear()
         
     async def generate_script(
         self,
@@ -60,9 +137,79 @@ class AIServiceClient:
             "POST", 
             "/api/v1/generate/script", 
             request_data,
-            service_name="script_generation"
+            service_name="script_generation",
+            cacheable=True
         )
     
+    async def stream_script(
+        self,
+        topic: str,
+        platform: str = "youtube",
+        style: str = "educational",
+        duration: int = 60,
+        language: str = "zh-TW",
+        target_audience: str = "general"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """串流生成影片腳本
+
+        每完成一個段落產出 {"type": "paragraph", "index": i, "text": ...}，
+        最後產出 {"type": "done", "data": ...}（與 generate_script 的 data 相同）。
+        AI 服務沒有串流端點時退回 generate_script，一次產出所有段落。
+        生成失敗時拋出 Exception。
+        """
+        
+        request_data = {
+            "topic": topic,
+            "platform": platform,
+            "style": style,
+            "duration": duration,
+            "language": language,
+            "target_audience": target_audience
+        }
+        url = f"{self.ai_service_url}/api/v1/generate/script/stream"
+        
+        try:
+            async with self._slots, self._get_client().stream(
+                "POST", url, json=request_data
+            ) as response:
+                if response.status_code != 404:
+                    response.raise_for_status()
+                    logger.info(f"Streaming script from AI service: {url}")
+                    
+                    done = False
+                    # 讀取至串流結尾，連線才能放回連線池重用
+                    async for line in response.aiter_lines():
+                        if done or not line.strip():
+                            continue
+                        event = json.loads(line)
+                        if event.get("type") == "error":
+                            raise Exception(f"Script generation failed: {event.get('message')}")
+                        yield event
+                        done = event.get("type") == "done"
+                    
+                    if not done:
+                        raise Exception("Script generation failed: stream ended before completion")
+                    return
+        except httpx.HTTPError as e:
+            raise Exception(f"Script generation failed: {e}") from e
+        
+        # 不支援串流時退回一般生成
+        script_response = await self.generate_script(
+            topic=topic,
+            platform=platform,
+            style=style,
+            duration=duration,
+            language=language,
+            target_audience=target_audience
+        )
+        if not script_response.success:
+            raise Exception(f"Script generation failed: {script_response.error_message}")
+        
+        script_text = script_response.data.get("script", "")
+        for index, paragraph in enumerate(split_paragraphs(script_text)):
+            yield {"type": "paragraph", "index": index, "text": paragraph}
+        yield {"type": "done", "data": script_response.data}
+    
     async def generate_image(
         self,
         prompt: str,
@@ -83,7 +230,8 @@ class AIServiceClient:
             "POST", 
             "/api/v1/generate/image", 
             request_data,
-            service_name="image_generation"
+            service_name="image_generation",
+            cacheable=True
         )
     
     async def generate_music(
@@ -108,7 +256,8 @@ class AIServiceClient:
             "POST", 
             "/api/v1/generate/music", 
             request_data,
-            service_name="music_generation"
+            service_name="music_generation",
+            cacheable=True
         )
     
     async def generate_voice(
@@ -133,7 +282,8 @@ class AIServiceClient:
             "POST", 
             "/api/v1/generate/voice", 
             request_data,
-            service_name="voice_generation"
+            service_name="voice_generation",
+            cacheable=True
         )
     
     async def generate_batch(
@@ -160,7 +310,8 @@ class AIServiceClient:
             "POST", 
             "/api/v1/generate/batch", 
             request_data,
-            service_name="batch_generation"
+            service_name="batch_generation",
+            cacheable=True
         )
     
     async def check_health(self) -> AIServiceResponse:
@@ -174,45 +325,103 @@ class AIServiceClient:
         )
     
     async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict[str, Any]],
+        service_name: str,
+        cacheable: bool = False
+    ) -> AIServiceResponse:
+        """發送請求到AI服務（合併相同的並發請求，可選快取）
+
+        合併與快取的結果由所有呼叫者共用同一個 AIServiceResponse，呼叫者不應修改其內容。
+        """
+        
+        key = f"{method.upper()} {endpoint} {json.dumps(data, sort_keys=True, default=str)}"
+        use_cache = cacheable and self.cache_ttl > 0
+
+        if use_cache:
+            cached = self._cache.get(key)
+            if cached is not None:
+                expires_at, cached_response = cached
+                if expires_at > time.monotonic():
+                    self._cache.move_to_end(key)
+                    self.stats["cache_hits"] += 1
+                    return cached_response
+                del self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._send(method, endpoint, data, service_name))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+
+        # shield：單一呼叫者被取消時不影響其他等待同一請求的呼叫者；
+        # 所有呼叫者都取消時才取消實際請求
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            response = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1:
+                task.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+        if use_cache and response.success and key not in self._cache:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, response)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+        return response
+
+    async def _send(
         self,
         method: str,
         endpoint: str,
         data: Optional[Dict[str, Any]],
         service_name: str
     ) -> AIServiceResponse:
-        """發送請求到AI服務"""
+        """透過共用客戶端發送單一請求"""
         
         url = f"{self.ai_service_url}{endpoint}"
         timestamp = datetime.utcnow().isoformat()
+        self.stats["requests"] += 1
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                logger.info(f"Calling AI service: {method} {url}")
-                
-                if method.upper() == "GET":
-                    response = await client.get(url)
-                elif method.upper() == "POST":
-                    response = await client.post(url, json=data)
-                else:
-                    return AIServiceResponse(
-                        success=False,
-                        error_message=f"Unsupported HTTP method: {method}",
-                        service_name=service_name,
-                        timestamp=timestamp
-                    )
-                
-                response.raise_for_status()
-                result_data = response.json()
-                
-                logger.info(f"AI service response: {response.status_code}")
-                
+            client = self._get_client()
+            logger.info(f"Calling AI service: {method} {url}")
+            
+            if method.upper() not in ("GET", "POST"):
                 return AIServiceResponse(
-                    success=True,
-                    data=result_data.get("data"),
+                    success=False,
+                    error_message=f"Unsupported HTTP method: {method}",
                     service_name=service_name,
                     timestamp=timestamp
                 )
-                
+            
+            async with self._slots:
+                if method.upper() == "GET":
+                    response = await client.get(url)
+                else:
+                    response = await client.post(url, json=data)
+            
+            response.raise_for_status()
+            result_data = response.json()
+            
+            logger.info(f"AI service response: {response.status_code}")
+            
+            return AIServiceResponse(
+                success=True,
+                data=result_data.get("data"),
+                service_name=service_name,
+                timestamp=timestamp
+            )
+            
         except httpx.TimeoutException:
             logger.error(f"AI service timeout: {url}")
             return AIServiceResponse(
@@ -254,16 +463,28 @@ class AIServiceClient:
 _ai_client: Optional[AIServiceClient] = None
 
 
-def get_ai_client(ai_service_url: str = "http://localhost:8005") -> AIServiceClient:
-    """獲取AI服務客戶端單例"""
+def get_ai_client(
+    ai_service_url: str = "http://localhost:8005",
+    cache_ttl: float = 0
+) -> AIServiceClient:
+    """獲取AI服務客戶端單例（參數僅在首次建立時生效）"""
     global _ai_client
     
     if _ai_client is None:
-        _ai_client = AIServiceClient(ai_service_url)
+        _ai_client = AIServiceClient(ai_service_url, cache_ttl=cache_ttl)
     
     return _ai_client
 
 
+async def close_ai_client():
+    """關閉AI服務客戶端單例的連線池"""
+    global _ai_client
+    
+    if _ai_client is not None:
+        await _ai_client.close()
+        _ai_client = None
+
+
 # 便利函數
 async def generate_video_script(topic: str, **kwargs) -> Dict[str, Any]:
     """生成影片腳本的便利函數"""
@@ -316,86 +537,101 @@ async def generate_complete_video_content(
     style: str = "educational",
     duration: int = 60
 ) -> Dict[str, Any]:
-    """生成完整的影片內容（腳本+圖像+音樂+語音）"""
+    """生成完整的影片內容（腳本+圖像+音樂+語音）
+
+    圖像與音樂與腳本同時開始；腳本以串流輸出，每個段落完成後立即合成語音。
+    總耗時約為 max(腳本 + 最後一段語音, 圖像, 音樂)。腳本失敗或呼叫被取消時，
+    進行中的圖像、音樂與語音請求一併取消。
+    """
     
     client = get_ai_client()
     
     logger.info(f"Starting complete video content generation for topic: {topic}")
     
+    # 圖像與音樂只需要主題與風格，不必等待腳本
+    image_prompt = f"Visual content for {topic}, {style} style"
+    image_task = asyncio.ensure_future(client.generate_image(
+        prompt=image_prompt,
+        quantity=3,  # 生成3張圖片
+        resolution="1920x1080" if platform == "youtube" else "1080x1080"
+    ))
+    
+    music_prompt = f"Background music for {topic} video, {style} style"
+    music_task = asyncio.ensure_future(client.generate_music(
+        prompt=music_prompt,
+        duration=duration,
+        instrumental=True,
+        mood="upbeat" if style == "entertaining" else "calm"
+    ))
+    
+    # 腳本串流輸出時，每個段落立即開始語音合成
+    voice_tasks: List[asyncio.Future] = []
+    script_data: Optional[Dict[str, Any]] = None
+    
     try:
-        # 第一步：生成腳本
-        script_response = await client.generate_script(
+        async for event in client.stream_script(
             topic=topic,
             platform=platform,
             style=style,
             duration=duration
-        )
-        
-        if not script_response.success:
-            raise Exception(f"Script generation failed: {script_response.error_message}")
-        
-        script_data = script_response.data
-        script_text = script_data.get("script", "")
+        ):
+            if event["type"] == "paragraph":
+                voice_tasks.append(asyncio.ensure_future(client.generate_voice(
+                    text=event["text"],
+                    voice_id="female-1",
+                    speed=1.0,
+                    emotion="neutral"
+                )))
+            elif event["type"] == "done":
+                script_data = event["data"]
         
-        # 第二步：並行生成其他內容
-        tasks = []
+        if script_data is None:
+            raise Exception("Script generation failed: no script returned")
         
-        # 圖像生成
-        image_prompt = f"Visual content for {topic}, {style} style"
-        tasks.append(client.generate_image(
-            prompt=image_prompt,
-            quantity=3,  # 生成3張圖片
-            resolution="1920x1080" if platform == "youtube" else "1080x1080"
-        ))
-        
-        # 音樂生成
-        music_prompt = f"Background music for {topic} video, {style} style"
-        tasks.append(client.generate_music(
-            prompt=music_prompt,
-            duration=duration,
-            instrumental=True,
-            mood="upbeat" if style == "entertaining" else "calm"
-        ))
+        voice_responses = await asyncio.gather(*voice_tasks)
+        image_response, music_response = await asyncio.gather(image_task, music_task)
         
-        # 語音生成
-        tasks.append(client.generate_voice(
-            text=script_text,
-            voice_id="female-1",
-            speed=1.0,
-            emotion="neutral"
-        ))
-        
-        # 等待所有任務完成
-        image_response, music_response, voice_response = await asyncio.gather(*tasks)
-        
-        # 整合結果
-        result = {
-            "topic": topic,
-            "platform": platform,
-            "style": style,
-            "duration": duration,
-            "script": script_data,
-            "images": image_response.data if image_response.success else None,
-            "music": music_response.data if music_response.success else None,
-            "voice": voice_response.data if voice_response.success else None,
-            "errors": []
-        }
-        
-        # 收集錯誤
-        if not image_response.success:
-            result["errors"].append(f"Image generation: {image_response.error_message}")
-        if not music_response.success:
-            result["errors"].append(f"Music generation: {music_response.error_message}")
-        if not voice_response.success:
-            result["errors"].append(f"Voice generation: {voice_response.error_message}")
-        
-        logger.info(f"Complete video content generation finished. Errors: {len(result['errors'])}")
-        
-        return result
-        
-    except Exception as e:
-        logger.error(f"Complete video content generation failed: {e}")
+    except BaseException as e:
+        # 腳本失敗或呼叫者取消時，取消所有進行中的生成
+        pending = [image_task, music_task, *voice_tasks]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if isinstance(e, Exception):
+            logger.error(f"Complete video content generation failed: {e}")
         raise
+    
+    # 整合結果
+    result = {
+        "topic": topic,
+        "platform": platform,
+        "style": style,
+        "duration": duration,
+        "script": script_data,
+        "images": image_response.data if image_response.success else None,
+        "music": music_response.data if music_response.success else None,
+        # 每個腳本段落各自的語音（失敗的段落為 None）
+        "voice": [
+            response.data if response.success else None
+            for response in voice_responses
+        ],
+        "errors": []
+    }
+    
+    # 收集錯誤
+    if not image_response.success:
+        result["errors"].append(f"Image generation: {image_response.error_message}")
+    if not music_response.success:
+        result["errors"].append(f"Music generation: {music_response.error_message}")
+    for index, response in enumerate(voice_responses):
+        if not response.success:
+            result["errors"].append(
+                f"Voice generation (paragraph {index + 1}): {response.error_message}"
+            )
+    
+    logger.info(f"Complete video content generation finished. Errors: {len(result['errors'])}")
+    
+    return result
 
 
 if __name__ == "__main__":
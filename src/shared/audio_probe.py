@@ -0,0 +1,243 @@
+"""
+音頻中繼資料探測
+
+時長、取樣率與聲道數只讀取檔頭取得（soundfile，無法辨識的格式改用 ffprobe），
+不解碼整段音訊。內容檢查（靜音、削波、RMS）以固定大小的區塊串流讀取，
+並可限制抽樣的區塊數，使驗證時間與檔案長度無關。
+"""
+
+import io
+import json
+import logging
+import os
+import subprocess
+from dataclasses import asdict, dataclass
+from typing import Any, BinaryIO, Dict, Optional, Union
+
+import numpy as np
+
+try:
+    import soundfile as sf
+
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+AudioSource = Union[str, os.PathLike, bytes, BinaryIO]
+
+FFPROBE_TIMEOUT = 30
+BLOCK_SECONDS = 1.0
+# 以 50ms 為一個窗計算靜音比例
+SILENCE_WINDOW_SECONDS = 0.05
+SILENCE_THRESHOLD = 0.01
+CLIP_THRESHOLD = 0.999
+
+
+class AudioProbeError(Exception):
+    """無法讀取音頻檔頭或內容"""
+
+
+@dataclass
+class AudioInfo:
+    """由檔頭取得的音頻中繼資料"""
+
+    duration: float
+    sample_rate: int
+    channels: int
+    frames: Optional[int] = None
+    format: Optional[str] = None
+    codec: Optional[str] = None
+    bitrate: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class ContentStats:
+    """串流區塊分析的內容統計"""
+
+    rms_energy: float
+    peak: float
+    silence_ratio: float
+    clipping_ratio: float
+    zero_crossing_rate: float
+    analyzed_seconds: float
+    sampled: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _source_size(source: AudioSource) -> Optional[int]:
+    if isinstance(source, bytes):
+        return len(source)
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    return None
+
+
+def _open_source(source: AudioSource):
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def _probe_soundfile(source: AudioSource) -> AudioInfo:
+    info = sf.info(_open_source(source))
+    if info.samplerate <= 0:
+        raise AudioProbeError("Invalid sample rate in audio header")
+    return AudioInfo(
+        duration=info.frames / info.samplerate,
+        sample_rate=info.samplerate,
+        channels=info.channels,
+        frames=info.frames,
+        format=info.format.lower(),
+        codec=info.subtype.lower(),
+    )
+
+
+def _probe_ffprobe(source: AudioSource) -> AudioInfo:
+    cmd = ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", "-show_streams"]
+    if isinstance(source, (str, os.PathLike)):
+        cmd.append(os.fspath(source))
+        stdin = None
+    else:
+        cmd.append("pipe:0")
+        stdin = source if isinstance(source, bytes) else source.read()
+
+    try:
+        result = subprocess.run(cmd, input=stdin, capture_output=True, timeout=FFPROBE_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise AudioProbeError(f"ffprobe failed: {e}") from e
+    if result.returncode != 0:
+        raise AudioProbeError(f"ffprobe exited with {result.returncode}")
+
+    data = json.loads(result.stdout)
+    stream = next((s for s in data.get("streams", []) if s.get("codec_type") == "audio"), None)
+    if stream is None:
+        raise AudioProbeError("No audio stream found")
+
+    fmt = data.get("format", {})
+    bitrate = fmt.get("bit_rate") or stream.get("bit_rate")
+    return AudioInfo(
+        duration=float(fmt.get("duration") or stream.get("duration") or 0),
+        sample_rate=int(stream.get("sample_rate", 0)),
+        channels=int(stream.get("channels", 0)),
+        format=fmt.get("format_name"),
+        codec=stream.get("codec_name"),
+        bitrate=int(bitrate) if bitrate else None,
+    )
+
+
+def probe_audio(source: AudioSource) -> AudioInfo:
+    """只讀取檔頭取得音頻中繼資料
+
+    source 可以是路徑、bytes 或可 seek 的檔案物件。soundfile 無法辨識的格式
+    （例如 m4a/aac）改用 ffprobe。
+    """
+    errors = []
+    if SOUNDFILE_AVAILABLE:
+        try:
+            info = _probe_soundfile(source)
+        except Exception as e:
+            errors.append(f"soundfile: {e}")
+            if hasattr(source, "seek"):
+                source.seek(0)
+        else:
+            size = _source_size(source)
+            if size and info.duration > 0:
+                info.bitrate = int(size * 8 / info.duration)
+            return info
+
+    try:
+        return _probe_ffprobe(source)
+    except AudioProbeError as e:
+        errors.append(str(e))
+        raise AudioProbeError("; ".join(errors)) from e
+
+
+def analyze_content(
+    source: AudioSource,
+    block_seconds: float = BLOCK_SECONDS,
+    max_blocks: Optional[int] = None,
+    silence_threshold: float = SILENCE_THRESHOLD,
+    clip_threshold: float = CLIP_THRESHOLD,
+) -> ContentStats:
+    """以區塊串流計算 RMS、峰值、靜音與削波比例
+
+    記憶體用量只與區塊大小有關。指定 max_blocks 時，超過此數量的檔案改為
+    平均抽樣 max_blocks 個區塊，分析時間即與檔案長度無關。
+    """
+    if not SOUNDFILE_AVAILABLE:
+        raise AudioProbeError("soundfile is required for audio content analysis")
+
+    try:
+        f = sf.SoundFile(_open_source(source))
+    except Exception as e:
+        raise AudioProbeError(f"Unable to decode audio: {e}") from e
+
+    with f:
+        block_frames = max(1, int(block_seconds * f.samplerate))
+        window = max(1, int(SILENCE_WINDOW_SECONDS * f.samplerate))
+        total_blocks = -(-f.frames // block_frames) if f.frames > 0 else 0
+        sampled = bool(max_blocks) and f.seekable() and total_blocks > max_blocks
+
+        if sampled:
+            starts = np.linspace(0, f.frames - block_frames, max_blocks).astype(np.int64)
+        else:
+            starts = None
+
+        sum_squares = 0.0
+        peak = 0.0
+        samples = 0
+        clipped = 0
+        crossings = 0
+        silent_windows = 0
+        windows = 0
+
+        def blocks():
+            if starts is None:
+                yield from f.blocks(blocksize=block_frames, dtype="float32", always_2d=True)
+                return
+            for start in starts:
+                f.seek(int(start))
+                yield f.read(block_frames, dtype="float32", always_2d=True)
+
+        try:
+            for block in blocks():
+                if not len(block):
+                    continue
+                mono = block.mean(axis=1)
+                magnitude = np.abs(block)
+
+                sum_squares += float(np.dot(mono, mono))
+                samples += len(mono)
+                peak = max(peak, float(magnitude.max()))
+                clipped += int((magnitude.max(axis=1) >= clip_threshold).sum())
+                crossings += int(np.count_nonzero(np.diff(np.signbit(mono))))
+
+                # 區塊尾端不足一個窗的樣本不計入靜音比例
+                n_windows = len(mono) // window
+                if n_windows:
+                    framed = mono[: n_windows * window].reshape(n_windows, window)
+                else:
+                    framed = mono[None, :]
+                window_rms = np.sqrt((framed**2).mean(axis=1))
+                silent_windows += int((window_rms < silence_threshold).sum())
+                windows += len(window_rms)
+        except Exception as e:
+            raise AudioProbeError(f"Unable to decode audio: {e}") from e
+
+        if samples == 0:
+            raise AudioProbeError("Audio contains no samples")
+
+        return ContentStats(
+            rms_energy=float(np.sqrt(sum_squares / samples)),
+            peak=peak,
+            silence_ratio=silent_windows / windows,
+            clipping_ratio=clipped / samples,
+            zero_crossing_rate=crossings / samples,
+            analyzed_seconds=samples / f.samplerate,
+            sampled=sampled,
+        )
@@ -2,7 +2,15 @@
 資料庫模組 - 提供統一的資料庫連接和模型
 """
 
-from .connection import AsyncSessionLocal
+from .bulk import bulk_insert, bulk_upsert
+from .connection import (
+    AsyncSessionLocal,
+    PoolProfile,
+    get_async_read_db,
+    get_pool_profile,
+    get_pool_stats,
+    get_read_db,
+)
 from .connection import async_engine as engine
 from .models import (
     APIUsage,
@@ -21,6 +29,13 @@ from .models import (
     Video,
     VideoAsset,
 )
+from .pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+    keyset_paginate,
+)
 
 __all__ = [
     "Base",
@@ -40,4 +55,16 @@ __all__ = [
     "APIUsage",
     "engine",
     "AsyncSessionLocal",
+    "PoolProfile",
+    "get_pool_profile",
+    "get_pool_stats",
+    "get_read_db",
+    "get_async_read_db",
+    "bulk_insert",
+    "bulk_upsert",
+    "InvalidCursorError",
+    "encode_cursor",
+    "decode_cursor",
+    "keyset_paginate",
+    "keyset_page",
 ]
@@ -0,0 +1,201 @@
+"""
+批次寫入
+
+bulk_insert / bulk_upsert 依資料庫選擇最快的寫入方式：
+
+- PostgreSQL（asyncpg）且筆數達 copy_threshold：以 COPY 寫入；upsert 先 COPY
+  到暫存表，再以單一 INSERT ... SELECT ... ON CONFLICT 合併
+- 其他情況：INSERT（或 INSERT ... ON CONFLICT）以 executemany 分批執行，
+  SQLAlchemy 會將每批合併為多列 VALUES 語句；SQLite 同樣支援 ON CONFLICT
+
+可傳入 AsyncEngine（自行開啟交易並提交）或 AsyncConnection（沿用呼叫端的交易）。
+"""
+
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Union
+
+from sqlalchemy import Column, MetaData, Table, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+DEFAULT_BATCH_SIZE = 1000
+COPY_THRESHOLD = 1000
+
+Bind = Union[AsyncEngine, AsyncConnection]
+Rows = Sequence[Dict[str, Any]]
+
+
+@asynccontextmanager
+async def _connection(bind: Bind) -> AsyncIterator[AsyncConnection]:
+    if isinstance(bind, AsyncConnection):
+        yield bind
+    else:
+        async with bind.begin() as conn:
+            yield conn
+
+
+def _table(target: Any) -> Table:
+    """接受 ORM 模型或 Table"""
+    return getattr(target, "__table__", target)
+
+
+def _columns(table: Table, rows: Rows) -> List[str]:
+    """所有資料列須提供相同的欄位（未提供的欄位使用資料庫預設值）"""
+    columns = list(rows[0])
+    unknown = set(columns) - set(table.c.keys())
+    if unknown:
+        raise ValueError(f"Unknown columns for {table.name}: {sorted(unknown)}")
+    expected = set(columns)
+    for row in rows:
+        if row.keys() != expected:
+            raise ValueError(
+                f"All rows must have the same columns: expected {sorted(expected)}, "
+                f"got {sorted(row)}"
+            )
+    return columns
+
+
+def _deduplicate(rows: Rows, conflict_columns: Sequence[str]) -> List[Dict[str, Any]]:
+    """同一批次內重複的鍵只保留最後一筆（ON CONFLICT 不允許同一語句更新同一列兩次）"""
+    latest = {tuple(row[column] for column in conflict_columns): row for row in rows}
+    return list(latest.values())
+
+
+def _use_copy(conn: AsyncConnection, row_count: int, copy_threshold: int) -> bool:
+    return conn.dialect.driver == "asyncpg" and row_count >= copy_threshold
+
+
+async def _copy_records(
+    conn: AsyncConnection, table: Table, columns: List[str], rows: Rows
+) -> None:
+    """以 asyncpg COPY 寫入，值先經過各欄位型別的 bind processor（列舉、JSON 等）"""
+    dialect = conn.dialect
+    processors = [
+        table.c[name].type.dialect_impl(dialect).bind_processor(dialect) for name in columns
+    ]
+    records = [
+        tuple(
+            processor(row[name]) if processor else row[name]
+            for name, processor in zip(columns, processors)
+        )
+        for row in rows
+    ]
+
+    # 確保交易已開始，讓 COPY 與同一連接上的其他語句一起提交或回滾
+    await conn.execute(text("SELECT 1"))
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        table.name, records=records, columns=columns, schema_name=table.schema
+    )
+
+
+def _upsert_statement(
+    conn: AsyncConnection,
+    table: Table,
+    columns: List[str],
+    conflict_columns: Sequence[str],
+    update_columns: Optional[Sequence[str]],
+    source: Optional[Table] = None,
+):
+    dialect_name = conn.dialect.name
+    if dialect_name == "postgresql":
+        statement = postgresql.insert(table)
+    elif dialect_name == "sqlite":
+        statement = sqlite.insert(table)
+    else:
+        raise NotImplementedError(f"bulk_upsert is not supported for {dialect_name}")
+
+    if source is not None:
+        statement = statement.from_select(columns, select(*(source.c[name] for name in columns)))
+
+    if update_columns is None:
+        update_columns = [name for name in columns if name not in conflict_columns]
+    values = {name: statement.excluded[name] for name in update_columns}
+    # Core 語句不會觸發 ORM 的 onupdate（例如 updated_at），在此補上
+    for column in table.c:
+        onupdate = column.onupdate
+        if (
+            column.name not in values
+            and column.name not in conflict_columns
+            and onupdate is not None
+            and onupdate.is_clause_element
+        ):
+            values[column.name] = onupdate.arg
+
+    if not update_columns:
+        return statement.on_conflict_do_nothing(index_elements=list(conflict_columns))
+    return statement.on_conflict_do_update(index_elements=list(conflict_columns), set_=values)
+
+
+async def bulk_insert(
+    bind: Bind,
+    target: Any,
+    rows: Rows,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    copy_threshold: int = COPY_THRESHOLD,
+) -> int:
+    """批次新增資料列，回傳寫入筆數"""
+    if not rows:
+        return 0
+    table = _table(target)
+    columns = _columns(table, rows)
+
+    async with _connection(bind) as conn:
+        if _use_copy(conn, len(rows), copy_threshold):
+            await _copy_records(conn, table, columns, rows)
+        else:
+            statement = insert(table)
+            for start in range(0, len(rows), batch_size):
+                await conn.execute(statement, list(rows[start : start + batch_size]))
+    return len(rows)
+
+
+async def bulk_upsert(
+    bind: Bind,
+    target: Any,
+    rows: Rows,
+    conflict_columns: Sequence[str],
+    update_columns: Optional[Sequence[str]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    copy_threshold: int = COPY_THRESHOLD,
+) -> int:
+    """批次新增或更新資料列，回傳寫入筆數
+
+    conflict_columns 必須對應唯一索引；鍵已存在時更新 update_columns
+    （預設為 conflict_columns 以外提供的所有欄位），傳入空序列則略過已存在的列。
+    """
+    if not rows:
+        return 0
+    table = _table(target)
+    columns = _columns(table, rows)
+    missing = set(conflict_columns) - set(columns)
+    if missing:
+        raise ValueError(f"Rows must include conflict columns {sorted(missing)}")
+    rows = _deduplicate(rows, conflict_columns)
+
+    async with _connection(bind) as conn:
+        if _use_copy(conn, len(rows), copy_threshold):
+            # 暫存表只含寫入的欄位，型別與目標表相同，沒有索引與約束
+            staging = Table(
+                f"_bulk_{table.name}_{uuid.uuid4().hex[:8]}",
+                MetaData(),
+                *(Column(name, table.c[name].type) for name in columns),
+            )
+            preparer = conn.dialect.identifier_preparer
+            await conn.execute(
+                text(
+                    f"CREATE TEMPORARY TABLE {preparer.format_table(staging)} ON COMMIT DROP AS "
+                    f"SELECT {', '.join(preparer.quote(name) for name in columns)} "
+                    f"FROM {preparer.format_table(table)} WITH NO DATA"
+                )
+            )
+            await _copy_records(conn, staging, columns, rows)
+            await conn.execute(
+                _upsert_statement(conn, table, columns, conflict_columns, update_columns, staging)
+            )
+        else:
+            statement = _upsert_statement(conn, table, columns, conflict_columns, update_columns)
+            for start in range(0, len(rows), batch_size):
+                await conn.execute(statement, rows[start : start + batch_size])
+    return len(rows)
@@ -1,70 +1,222 @@
 """
 統一的資料庫連接管理
+
+連接池依服務的工作負載選擇設定檔（api / worker / batch），可再以環境變數
+個別覆寫；設定 DATABASE_READ_URLS 時，唯讀會話以輪詢方式分配到各個唯讀
+副本，寫入一律走主庫。各連接池的取得等待時間與持有時間可由
+get_pool_stats() 取得。
 """
 
+import itertools
 import os
-from typing import AsyncGenerator
+from dataclasses import dataclass, replace
+from typing import AsyncGenerator, Callable, Dict, Generic, List, Mapping, Optional, Tuple, TypeVar
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
+from ..db_optimization import get_pool_stats, instrument_engine, metered_pool_class
 from .models import Base
 
-# 從環境變數獲取資料庫連接字符串
-DATABASE_URL = os.getenv(
-    "DATABASE_URL", "sqlite:///./auto_video.db"  # 開發時使用SQLite，生產時使用PostgreSQL
-)
+T = TypeVar("T")
 
-# 轉換為異步連接字符串
-if DATABASE_URL.startswith("postgresql://"):
-    ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
-elif DATABASE_URL.startswith("sqlite"):
-    ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
-else:
-    ASYNC_DATABASE_URL = DATABASE_URL
 
-# 創建同步和異步引擎
-if DATABASE_URL.startswith("sqlite"):
-    # SQLite 特殊配置
-    sync_engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        echo=os.getenv("SQL_ECHO", "false").lower() == "true",
+@dataclass(frozen=True)
+class PoolProfile:
+    """連接池設定檔"""
+
+    pool_size: int = 5
+    max_overflow: int = 10
+    # 取得連接的最長等待秒數，逾時拋出 sqlalchemy.exc.TimeoutError
+    pool_timeout: float = 30.0
+    pool_recycle: int = 300
+    pool_pre_ping: bool = True
+    # SQLAlchemy 編譯後 SQL 的快取項目數
+    query_cache_size: int = 500
+    # asyncpg 每個連接的 prepared statement 快取；經 PgBouncer transaction 模式時需設為 0
+    statement_cache_size: int = 100
+
+
+POOL_PROFILES: Dict[str, PoolProfile] = {
+    # 請求路徑：連接較多，等待過久直接失敗，避免請求在池前堆積
+    "api": PoolProfile(pool_size=10, max_overflow=20, pool_timeout=5.0),
+    # 背景任務：少量長時間持有的連接
+    "worker": PoolProfile(pool_size=4, max_overflow=4, pool_timeout=30.0),
+    # 批次匯入：固定少量連接，語句種類少
+    "batch": PoolProfile(pool_size=2, max_overflow=0, pool_timeout=120.0, query_cache_size=100),
+}
+
+SERVICE_POOL_PROFILES: Dict[str, str] = {
+    "api-gateway": "api",
+    "auth-service": "api",
+    "data-service": "api",
+    "video-service": "worker",
+    "video-processing-service": "worker",
+    "scheduler-service": "worker",
+    "training-worker": "worker",
+    "data-ingestion": "batch",
+}
+
+# 環境變數覆寫：變數名稱 -> (欄位, 型別)
+POOL_ENV_OVERRIDES = {
+    "DATABASE_POOL_SIZE": ("pool_size", int),
+    "DATABASE_MAX_OVERFLOW": ("max_overflow", int),
+    "DATABASE_POOL_TIMEOUT": ("pool_timeout", float),
+    "DATABASE_POOL_RECYCLE": ("pool_recycle", int),
+    "DATABASE_QUERY_CACHE_SIZE": ("query_cache_size", int),
+    "DATABASE_STATEMENT_CACHE_SIZE": ("statement_cache_size", int),
+}
+
+# 同步與異步引擎各自使用對應的驅動（URL 可能已帶有異步驅動）
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def get_pool_profile(
+    service_name: Optional[str] = None, env: Mapping[str, str] = os.environ
+) -> PoolProfile:
+    """依 DATABASE_POOL_PROFILE 或服務名稱選擇設定檔，並套用環境變數覆寫"""
+    service_name = service_name or env.get("SERVICE_NAME", "")
+    profile_name = env.get("DATABASE_POOL_PROFILE") or SERVICE_POOL_PROFILES.get(
+        service_name, "api"
     )
-else:
-    # PostgreSQL 或其他資料庫配置
-    sync_engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=300,
-        echo=os.getenv("SQL_ECHO", "false").lower() == "true",
+    if profile_name not in POOL_PROFILES:
+        raise ValueError(
+            f"Unknown database pool profile {profile_name!r}, "
+            f"expected one of {sorted(POOL_PROFILES)}"
+        )
+
+    overrides = {
+        field: cast(env[name]) for name, (field, cast) in POOL_ENV_OVERRIDES.items() if name in env
+    }
+    return replace(POOL_PROFILES[profile_name], **overrides)
+
+
+def driver_urls(url: str) -> Tuple[str, str]:
+    """回傳 (同步 URL, 異步 URL)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return url, url
+
+    async_driver = f"{backend}+{ASYNC_DRIVERS[backend]}"
+    sync_url = url
+    if parsed.drivername == async_driver:
+        sync_url = parsed.set(drivername=backend).render_as_string(hide_password=False)
+    async_url = parsed.set(drivername=async_driver).render_as_string(hide_password=False)
+    return sync_url, async_url
+
+
+def build_engine(url: str, profile: PoolProfile, name: str, is_async: bool = False):
+    """依設定檔建立引擎；連接池以 name 記錄於連接池統計，查詢記錄於查詢統計"""
+    parsed = make_url(url)
+    poolclass = parsed.get_dialect().get_pool_class(parsed)
+    options = {
+        "poolclass": metered_pool_class(poolclass, name),
+        "pool_pre_ping": profile.pool_pre_ping,
+        "pool_recycle": profile.pool_recycle,
+        "query_cache_size": profile.query_cache_size,
+        "echo": os.getenv("SQL_ECHO", "false").lower() == "true",
+    }
+    # 記憶體 SQLite 等單一連接的池不接受大小設定
+    if issubclass(poolclass, QueuePool):
+        options.update(
+            pool_size=profile.pool_size,
+            max_overflow=profile.max_overflow,
+            pool_timeout=profile.pool_timeout,
+        )
+
+    connect_args = {}
+    if parsed.get_backend_name() == "sqlite" and not is_async:
+        connect_args["check_same_thread"] = False
+    if parsed.get_driver_name() == "asyncpg":
+        connect_args["prepared_statement_cache_size"] = profile.statement_cache_size
+        connect_args["statement_cache_size"] = profile.statement_cache_size
+    if connect_args:
+        options["connect_args"] = connect_args
+
+    engine = (create_async_engine if is_async else create_engine)(url, **options)
+    # 所有查詢自動記錄到查詢統計（延遲百分位、慢查詢）
+    instrument_engine(engine)
+    return engine
+
+
+class ReplicaRouter(Generic[T]):
+    """讀寫分流：寫入走主庫，唯讀以輪詢方式分配到副本，未設定副本時回到主庫"""
+
+    def __init__(self, primary: Callable[[], T], replicas: List[Callable[[], T]]):
+        self.primary = primary
+        self.replicas = replicas
+        self._cycle = itertools.cycle(replicas) if replicas else None
+
+    def read(self) -> T:
+        """建立唯讀會話"""
+        if self._cycle is None:
+            return self.primary()
+        return next(self._cycle)()
+
+    def write(self) -> T:
+        """建立讀寫會話（主庫）"""
+        return self.primary()
+
+
+def _session_factory(engine: Engine) -> sessionmaker:
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+def _async_session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
     )
 
-async_engine = create_async_engine(
-    ASYNC_DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=os.getenv("SQL_ECHO", "false").lower() == "true",
+
+# 從環境變數獲取資料庫連接字符串
+DATABASE_URL, ASYNC_DATABASE_URL = driver_urls(
+    os.getenv("DATABASE_URL", "sqlite:///./auto_video.db")  # 開發時使用SQLite，生產時使用PostgreSQL
 )
 
+# 唯讀副本（逗號分隔），相容單一副本的 DATABASE_READ_URL
+READ_DATABASE_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_READ_URLS", os.getenv("DATABASE_READ_URL") or "").split(",")
+    if url.strip()
+]
+
+POOL_PROFILE = get_pool_profile()
+
+# 創建同步和異步引擎
+sync_engine = build_engine(DATABASE_URL, POOL_PROFILE, "primary")
+async_engine = build_engine(ASYNC_DATABASE_URL, POOL_PROFILE, "primary_async", is_async=True)
+
+read_sync_engines: List[Engine] = []
+read_async_engines: List[AsyncEngine] = []
+for _index, _read_url in enumerate(READ_DATABASE_URLS, 1):
+    _read_sync_url, _read_async_url = driver_urls(_read_url)
+    read_sync_engines.append(build_engine(_read_sync_url, POOL_PROFILE, f"replica_{_index}"))
+    read_async_engines.append(
+        build_engine(_read_async_url, POOL_PROFILE, f"replica_{_index}_async", is_async=True)
+    )
+
 # 創建會話工廠
-SessionLocal = sessionmaker(
-    bind=sync_engine,
-    autocommit=False,
-    autoflush=False,
-)
+SessionLocal = _session_factory(sync_engine)
+AsyncSessionLocal = _async_session_factory(async_engine)
 
-AsyncSessionLocal = async_sessionmaker(
-    bind=async_engine,
-    class_=AsyncSession,
-    autocommit=False,
-    autoflush=False,
-    expire_on_commit=False,
+session_router = ReplicaRouter(
+    SessionLocal, [_session_factory(engine) for engine in read_sync_engines]
+)
+async_session_router = ReplicaRouter(
+    AsyncSessionLocal, [_async_session_factory(engine) for engine in read_async_engines]
 )
 
 
@@ -77,6 +229,15 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """同步唯讀資料庫會話依賴（讀取副本，資料可能略落後於主庫）"""
+    db = session_router.read()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     """異步資料庫會話依賴"""
     async with AsyncSessionLocal() as db:
@@ -86,6 +247,15 @@ async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
             await db.close()
 
 
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """異步唯讀資料庫會話依賴（讀取副本，資料可能略落後於主庫）"""
+    async with async_session_router.read() as db:
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
 async def create_tables():
     """創建所有資料表"""
     async with async_engine.begin() as conn:
@@ -12,6 +12,7 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -60,6 +61,11 @@ class TaskStatus(PyEnum):
     RETRY = "retry"
 
 
+# 已結束的影片狀態與待處理的任務狀態（部分索引的條件）
+VIDEO_FINISHED_STATUSES = [VideoStatus.COMPLETED, VideoStatus.FAILED]
+TASK_PENDING_STATUSES = [TaskStatus.QUEUED, TaskStatus.RETRY, TaskStatus.RUNNING]
+
+
 # ============================================================================
 # 核心業務模型
 # ============================================================================
@@ -191,6 +197,21 @@ class Video(Base):
     tasks = relationship("ProcessingTask", back_populates="video", cascade="all, delete-orphan")
     social_posts = relationship("SocialPost", back_populates="video", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # 影片列表：依用戶、建立時間倒序的 keyset 分頁
+        Index("ix_videos_user_created", user_id, created_at.desc(), id.desc()),
+        # 儀表板依狀態統計
+        Index("ix_videos_user_status", user_id, status),
+        # 只索引處理中的影片，供狀態輪詢使用
+        Index(
+            "ix_videos_in_progress",
+            status,
+            created_at,
+            postgresql_where=status.notin_(VIDEO_FINISHED_STATUSES),
+            sqlite_where=status.notin_(VIDEO_FINISHED_STATUSES),
+        ),
+    )
+
 
 class VideoAsset(Base):
     """影片資產模型 - 儲存影片生成過程中的各種資產"""
@@ -255,6 +276,19 @@ class ProcessingTask(Base):
     video = relationship("Video", back_populates="tasks")
     user = relationship("User")
 
+    __table_args__ = (
+        # 依影片列出任務
+        Index("ix_processing_tasks_video_created", video_id, created_at),
+        # 只索引待處理的任務，供 worker 依建立順序輪詢
+        Index(
+            "ix_processing_tasks_pending",
+            status,
+            created_at,
+            postgresql_where=status.in_(TASK_PENDING_STATUSES),
+            sqlite_where=status.in_(TASK_PENDING_STATUSES),
+        ),
+    )
+
 
 # ============================================================================
 # 社交媒體和發布相關模型
@@ -372,6 +406,11 @@ class TrendTopic(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # 同一平台的話題以標題去重，供批次 upsert 使用
+        Index("uq_trend_topics_category_title", category, title, unique=True),
+    )
+
 
 class UserAnalytics(Base):
     """用戶分析數據模型"""
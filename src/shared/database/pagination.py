@@ -0,0 +1,87 @@
+"""
+Keyset（游標）分頁
+
+以最後一筆資料的排序鍵作為游標，查詢條件為 (排序欄位...) < (游標值...)，
+配合相同順序的複合索引，任何頁數都只需讀取 limit 筆資料；OFFSET 分頁則需
+掃描並丟棄前面所有資料，頁數越深越慢。
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import literal, tuple_
+
+T = TypeVar("T")
+Q = TypeVar("Q")
+
+
+class InvalidCursorError(ValueError):
+    """無法解析的分頁游標"""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """將排序鍵編碼為不透明的游標字串"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """解析游標字串，格式錯誤時拋出 InvalidCursorError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list):
+            raise ValueError("cursor must encode a list")
+        return [_decode_value(value) for value in values]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid pagination cursor: {cursor!r}") from e
+
+
+def keyset_paginate(
+    query: Q,
+    columns: Sequence[Any],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+) -> Q:
+    """為查詢加上 keyset 分頁條件、排序與 limit
+
+    query 可為 ORM Query 或 select()。columns 必須能唯一決定順序（例如
+    建立時間加主鍵）。多取一筆用於判斷是否還有下一頁，交給 keyset_page 處理。
+    """
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise InvalidCursorError(f"Invalid pagination cursor: {cursor!r}")
+        key = tuple_(*columns)
+        after = tuple_(*(literal(value, column.type) for column, value in zip(columns, values)))
+        query = query.where(key < after if descending else key > after)
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return query.order_by(*order).limit(limit + 1)
+
+
+def keyset_page(
+    rows: Sequence[T], columns: Sequence[Any], limit: int
+) -> Tuple[List[T], Optional[str]]:
+    """切出本頁資料並產生下一頁的游標（沒有下一頁時為 None）"""
+    items = list(rows[:limit])
+    if len(rows) <= limit or not items:
+        return items, None
+
+    last = items[-1]
+    return items, encode_cursor([getattr(last, column.key) for column in columns])
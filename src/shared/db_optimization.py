@@ -3,72 +3,419 @@ Database Query Optimization System
 數據庫查詢優化系統 - 智能查詢優化和性能監控
 """
 
+import hashlib
+import heapq
+import math
+import random
+import re
 import time
+import weakref
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 from functools import wraps
 from typing import Any, Dict, List, Optional, Tuple
 
 import structlog
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event, exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.orm import selectinload, joinedload
 from sqlalchemy.sql import Select
 
 logger = structlog.get_logger()
 
 
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_LITERALS = re.compile(
+    r"'(?:[^']|'')*'"  # 字串常值
+    r"|\$\d+|%\(\w+\)s|%s|(?<![:\w]):\w+"  # 綁定參數
+    r"|\b\d+(?:\.\d+)?\b"  # 數值常值
+)
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize SQL so queries differing only in literals share one fingerprint"""
+    normalized = _COMMENTS.sub(" ", query)
+    normalized = _LITERALS.sub("?", normalized)
+    normalized = _IN_LIST.sub("(?)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def query_fingerprint(normalized_query: str) -> str:
+    """Short stable identifier for a normalized query"""
+    return hashlib.sha1(normalized_query.encode()).hexdigest()[:16]
+
+
+class LatencyHistogram:
+    """Log-bucketed (HDR style) latency histogram with fixed memory
+    
+    Bucket boundaries grow geometrically, so every recorded value is
+    reported within `precision` relative error regardless of magnitude.
+    """
+    
+    def __init__(
+        self,
+        min_value: float = 1e-5,
+        max_value: float = 3600.0,
+        precision: float = 0.02
+    ):
+        self.min_value = min_value
+        self.max_value = max_value
+        self._log_base = math.log1p(precision)
+        self.bucket_count = self._bucket(max_value) + 1
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.max_recorded = 0.0
+        
+    def _bucket(self, value: float) -> int:
+        value = min(max(value, self.min_value), self.max_value)
+        return int(math.log(value / self.min_value) / self._log_base)
+        
+    def record(self, value: float):
+        """Record one value"""
+        bucket = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+        self.max_recorded = max(self.max_recorded, value)
+        
+    def percentile(self, percent: float) -> float:
+        """Value at the given percentile (upper bound of its bucket, capped at the max)"""
+        if not self.total:
+            return 0.0
+            
+        rank = max(1, math.ceil(self.total * percent / 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                upper = self.min_value * math.exp((bucket + 1) * self._log_base)
+                return min(upper, self.max_recorded)
+        return self.max_recorded
+        
+    def percentiles(self) -> Dict[str, float]:
+        """p50/p95/p99"""
+        return {
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
+
+
+class StatementStats:
+    """Aggregated statistics for one query fingerprint"""
+    
+    def __init__(self, query: str, params_sample_size: int):
+        self.query = query
+        self.count = 0
+        self.total_duration = 0.0
+        self.min_duration = float("inf")
+        self.max_duration = 0.0
+        self.slow_count = 0
+        self.histogram = LatencyHistogram()
+        self.params_sample_size = params_sample_size
+        self.params_samples: List[Any] = []
+        
+    def add(self, duration: float, params: Any, is_slow: bool):
+        self.count += 1
+        self.total_duration += duration
+        self.min_duration = min(self.min_duration, duration)
+        self.max_duration = max(self.max_duration, duration)
+        self.slow_count += is_slow
+        self.histogram.record(duration)
+        
+        # Reservoir sampling keeps a uniform sample of parameters
+        if params is None or not self.params_sample_size:
+            return
+        if len(self.params_samples) < self.params_sample_size:
+            self.params_samples.append(_truncate_params(params))
+        else:
+            index = random.randrange(self.count)
+            if index < self.params_sample_size:
+                self.params_samples[index] = _truncate_params(params)
+                
+    def to_dict(self, fingerprint: str) -> Dict[str, Any]:
+        return {
+            "fingerprint": fingerprint,
+            "query": self.query,
+            "count": self.count,
+            "total_duration": self.total_duration,
+            "avg_duration": self.total_duration / self.count,
+            "min_duration": self.min_duration,
+            "max_duration": self.max_duration,
+            "slow_count": self.slow_count,
+            **self.histogram.percentiles(),
+            "params_samples": list(self.params_samples)
+        }
+
+
+def _truncate_params(params: Any, limit: int = 200) -> str:
+    text_value = repr(params)
+    return text_value[:limit] + "..." if len(text_value) > limit else text_value
+
+
 class QueryStats:
-    """Query performance statistics"""
+    """Query performance statistics
+    
+    Memory is bounded: durations go into per-fingerprint histograms
+    (at most `max_statements` fingerprints, least recently used evicted),
+    only the `top_k` slowest executions are kept, and parameters are
+    reservoir-sampled per fingerprint.
+    
+    Named operation timings (query_monitor / monitor_query) are kept in
+    `timers`, apart from the statement stats, so statements already
+    recorded by the engine listeners are not counted twice.
+    """
     
-    def __init__(self):
-        self.queries: List[Dict] = []
-        self.slow_query_threshold = 1.0  # seconds
+    def __init__(
+        self,
+        slow_query_threshold: float = 1.0,
+        max_statements: int = 1000,
+        top_k: int = 20,
+        params_sample_size: int = 5
+    ):
+        self.slow_query_threshold = slow_query_threshold  # seconds
+        self.max_statements = max_statements
+        self.top_k = top_k
+        self.params_sample_size = params_sample_size
+        
+        self.statements: "OrderedDict[str, StatementStats]" = OrderedDict()
+        self.timers: "OrderedDict[str, StatementStats]" = OrderedDict()
+        self.histogram = LatencyHistogram()
+        self.total_queries = 0
+        self.total_duration = 0.0
+        self.min_duration = float("inf")
+        self.max_duration = 0.0
+        self.slow_queries = 0
+        self.evicted_statements = 0
+        # Min-heap of (duration, sequence, record) holding the slowest executions
+        self._slowest: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._sequence = 0
         
     def add_query(self, query: str, duration: float, params: Optional[Dict] = None):
         """Add query execution record"""
-        self.queries.append({
+        normalized = normalize_query(query)
+        fingerprint = query_fingerprint(normalized)
+        is_slow = duration > self.slow_query_threshold
+        
+        statement = self.statements.get(fingerprint)
+        if statement is None:
+            statement = StatementStats(normalized, self.params_sample_size)
+            self.statements[fingerprint] = statement
+            if len(self.statements) > self.max_statements:
+                self.statements.popitem(last=False)
+                self.evicted_statements += 1
+        else:
+            self.statements.move_to_end(fingerprint)
+        statement.add(duration, params, is_slow)
+        
+        self.histogram.record(duration)
+        self.total_queries += 1
+        self.total_duration += duration
+        self.min_duration = min(self.min_duration, duration)
+        self.max_duration = max(self.max_duration, duration)
+        
+        if not is_slow:
+            return
+            
+        self.slow_queries += 1
+        self._sequence += 1
+        entry = (duration, self._sequence, {
+            "fingerprint": fingerprint,
             "query": query,
             "duration": duration,
-            "params": params,
+            "params": _truncate_params(params) if params is not None else None,
             "timestamp": time.time(),
-            "is_slow": duration > self.slow_query_threshold
+            "is_slow": True
         })
-        
+        if len(self._slowest) < self.top_k:
+            heapq.heappush(self._slowest, entry)
+        elif duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+            
         # Log slow queries
-        if duration > self.slow_query_threshold:
-            logger.warning(
-                "Slow query detected",
-                query=query[:200] + "..." if len(query) > 200 else query,
-                duration=duration,
-                params=params
-            )
+        logger.warning(
+            "Slow query detected",
+            query=query[:200] + "..." if len(query) > 200 else query,
+            fingerprint=fingerprint,
+            duration=duration,
+            params=params
+        )
             
+    def add_timing(self, name: str, duration: float):
+        """Record the duration of a named operation in `timers`"""
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = StatementStats(name, 0)
+            self.timers[name] = timer
+            if len(self.timers) > self.max_statements:
+                self.timers.popitem(last=False)
+        else:
+            self.timers.move_to_end(name)
+        timer.add(duration, None, duration > self.slow_query_threshold)
+        
+    def get_timers(self) -> Dict[str, Dict[str, Any]]:
+        """Named operation timings"""
+        return {
+            name: {
+                "count": timer.count,
+                "total_duration": timer.total_duration,
+                "avg_duration": timer.total_duration / timer.count,
+                "min_duration": timer.min_duration,
+                "max_duration": timer.max_duration,
+                "slow_count": timer.slow_count,
+                **timer.histogram.percentiles()
+            }
+            for name, timer in self.timers.items()
+        }
+        
     def get_stats(self) -> Dict[str, Any]:
         """Get query statistics"""
-        if not self.queries:
-            return {}
+        if not self.total_queries:
+            return {"timers": self.get_timers()} if self.timers else {}
             
-        durations = [q["duration"] for q in self.queries]
-        slow_queries = [q for q in self.queries if q["is_slow"]]
+        statements = sorted(
+            (stats.to_dict(fingerprint) for fingerprint, stats in self.statements.items()),
+            key=lambda item: item["total_duration"],
+            reverse=True
+        )
         
         return {
-            "total_queries": len(self.queries),
-            "slow_queries": len(slow_queries),
-            "avg_duration": sum(durations) / len(durations),
-            "max_duration": max(durations),
-            "min_duration": min(durations),
-            "slow_query_rate": len(slow_queries) / len(self.queries) * 100
+            "total_queries": self.total_queries,
+            "slow_queries": self.slow_queries,
+            "avg_duration": self.total_duration / self.total_queries,
+            "max_duration": self.max_duration,
+            "min_duration": self.min_duration,
+            "slow_query_rate": self.slow_queries / self.total_queries * 100,
+            **self.histogram.percentiles(),
+            "evicted_statements": self.evicted_statements,
+            "statements": statements,
+            "timers": self.get_timers()
         }
         
     def get_slow_queries(self) -> List[Dict]:
-        """Get list of slow queries"""
-        return [q for q in self.queries if q["is_slow"]]
+        """Get the slowest query executions (slowest first)"""
+        return [record for _, _, record in sorted(self._slowest, reverse=True)]
 
 
 # Global query stats instance
 query_stats = QueryStats()
 
 
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if start_times:
+        query_stats.add_query(statement, time.perf_counter() - start_times.pop(), parameters)
+
+
+def _handle_error(exception_context):
+    start_times = exception_context.connection.info.get("query_start_time") \
+        if exception_context.connection is not None else None
+    if start_times:
+        start_times.pop()
+
+
+def instrument_engine(engine):
+    """Record every query executed through `engine` in the global query stats"""
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return engine
+        
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+class PoolMetrics:
+    """Connection pool checkout statistics
+
+    `wait` is the time spent acquiring a connection (queueing for a free
+    slot plus opening a new connection), `hold` is how long callers keep
+    it before returning it. Together with the live pool counters these are
+    what pool_size / max_overflow / pool_timeout should be sized from.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait = LatencyHistogram(min_value=1e-6)
+        self.hold = LatencyHistogram()
+        self._pool = None
+
+    def record_wait(self, duration: float):
+        self.checkouts += 1
+        self.wait.record(duration)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters, wait/hold percentiles and the live pool state"""
+        pool = self._pool() if self._pool is not None else None
+        live = {}
+        if pool is not None:
+            for key in ("size", "checkedin", "checkedout", "overflow"):
+                method = getattr(pool, key, None)
+                if method is not None:
+                    live[key] = method()
+            live["timeout"] = getattr(pool, "_timeout", None)
+
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait": {**self.wait.percentiles(), "max": self.wait.max_recorded},
+            "hold": {**self.hold.percentiles(), "max": self.hold.max_recorded},
+            **live
+        }
+
+
+# Metrics for every pool created through metered_pool_class(), by name
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+class _MeteredPool:
+    """Mixin timing checkouts and checkins of a SQLAlchemy pool class"""
+
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Pool.recreate() (engine.dispose()) builds a new instance of the same class
+        self.metrics._pool = weakref.ref(self)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        record.info["checkout_time"] = time.perf_counter()
+        return record
+
+    def _do_return_conn(self, record):
+        checkout_time = record.info.pop("checkout_time", None)
+        if checkout_time is not None:
+            self.metrics.hold.record(time.perf_counter() - checkout_time)
+        super()._do_return_conn(record)
+
+
+def metered_pool_class(poolclass: type, name: str) -> type:
+    """Subclass of `poolclass` that records its checkouts under `name` in pool_metrics"""
+    metrics = pool_metrics.setdefault(name, PoolMetrics(name))
+    return type(f"Metered{poolclass.__name__}", (_MeteredPool, poolclass), {"metrics": metrics})
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistics of every metered connection pool"""
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
+
+
 @asynccontextmanager
 async def query_monitor(session: AsyncSession, query_name: str = "unknown"):
     """Context manager for monitoring query performance"""
@@ -78,7 +425,7 @@ async def query_monitor(session: AsyncSession, query_name: str = "unknown"):
         yield
     finally:
         duration = time.time() - start_time
-        query_stats.add_query(query_name, duration)
+        query_stats.add_timing(query_name, duration)
         
         if duration > query_stats.slow_query_threshold:
             logger.warning(
@@ -99,7 +446,7 @@ def monitor_query(func):
             return result
         finally:
             duration = time.time() - start_time
-            query_stats.add_query(func.__name__, duration)
+            query_stats.add_timing(func.__name__, duration)
             
     return wrapper
 
@@ -457,4 +804,9 @@ async def get_query_stats() -> Dict[str, Any]:
 async def reset_query_stats():
     """Reset global query statistics"""
     global query_stats
-    query_stats = QueryStats()
\ No newline at end of file
+    query_stats = QueryStats(
+        slow_query_threshold=query_stats.slow_query_threshold,
+        max_statements=query_stats.max_statements,
+        top_k=query_stats.top_k,
+        params_sample_size=query_stats.params_sample_size
+    )
\ No newline at end of file
@@ -0,0 +1,413 @@
+"""
+編碼器設定檔
+
+VideoProcessor、AdvancedVideoEngine 與 VideoComposer 共用的 x264 編碼設定。
+品質等級決定畫質目標（CRF）與預設解析度，平台決定解析度、碼率上限與時限。
+
+preset 預設使用靜態值；在本機執行校準（對候選 preset 量測編碼 fps 與輸出碼率）
+後，改為挑選同時符合碼率上限與時限的最快 preset。校準結果依主機特徵儲存，
+換到不同硬體時不會沿用。
+
+校準：python -m src.shared.encoder_profiles --platform tiktok --quality high
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform as host_platform
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# 由快到慢；越慢壓縮率越好
+X264_PRESETS = (
+    "ultrafast",
+    "superfast",
+    "veryfast",
+    "faster",
+    "fast",
+    "medium",
+    "slow",
+    "slower",
+    "veryslow",
+)
+CALIBRATION_PRESETS = ("ultrafast", "veryfast", "faster", "fast", "medium", "slow")
+CALIBRATION_SECONDS = 2.0
+CALIBRATION_TIMEOUT = 300
+
+
+class EncoderCalibrationError(RuntimeError):
+    """校準編碼失敗"""
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    """品質等級：畫質目標與未校準時使用的 preset"""
+
+    width: int
+    height: int
+    crf: int
+    preset: str
+    video_bitrate: str
+    audio_bitrate: str
+
+
+@dataclass(frozen=True)
+class PlatformTarget:
+    """平台輸出規格
+
+    min_speed 為時限，以即時倍速表示：0.5 代表渲染時間最多為影片長度的兩倍。
+    """
+
+    width: int
+    height: int
+    fps: int
+    max_bitrate: str
+    audio_bitrate: str
+    min_speed: float
+
+
+QUALITY_LEVELS: Dict[str, QualityLevel] = {
+    "low": QualityLevel(854, 480, 28, "fast", "500k", "64k"),
+    "medium": QualityLevel(1280, 720, 23, "medium", "1500k", "128k"),
+    "high": QualityLevel(1920, 1080, 20, "medium", "3000k", "192k"),
+    "ultra": QualityLevel(3840, 2160, 18, "slow", "8000k", "320k"),
+}
+
+PLATFORM_TARGETS: Dict[str, PlatformTarget] = {
+    "youtube": PlatformTarget(1920, 1080, 30, "5000k", "192k", 0.5),
+    "tiktok": PlatformTarget(1080, 1920, 30, "3000k", "128k", 1.0),
+    "instagram": PlatformTarget(1080, 1080, 30, "3500k", "160k", 1.0),
+}
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """解析後的編碼設定"""
+
+    quality: str
+    width: int
+    height: int
+    fps: int
+    crf: int
+    preset: str
+    video_bitrate: str
+    audio_bitrate: str
+    codec: str = "libx264"
+    calibrated: bool = False
+
+    @property
+    def resolution(self) -> str:
+        return f"{self.width}x{self.height}"
+
+    @property
+    def scale_filter(self) -> str:
+        return f"scale={self.width}:{self.height}"
+
+    def video_args(self) -> List[str]:
+        """FFmpeg 視訊編碼參數"""
+        return ["-c:v", self.codec, "-preset", self.preset, "-crf", str(self.crf)]
+
+
+@dataclass(frozen=True)
+class PresetMeasurement:
+    """單一 preset 的校準結果"""
+
+    preset: str
+    encode_fps: float
+    bitrate: int  # bits/s
+
+
+def parse_bitrate(value: str) -> int:
+    """'3000k' / '8M' -> bits/s"""
+    value = str(value).strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    if multiplier > 1:
+        value = value[:-1]
+    return int(float(value) * multiplier)
+
+
+def select_preset(
+    measurements: Sequence[PresetMeasurement],
+    fps: float,
+    max_bitrate: int,
+    min_speed: float,
+) -> Optional[PresetMeasurement]:
+    """挑選符合時限與碼率上限的最快 preset
+
+    無法同時符合時，在時限內挑碼率最低者；全部都太慢時挑最快者。
+    """
+    if not measurements:
+        return None
+    fast_enough = [m for m in measurements if m.encode_fps >= fps * min_speed]
+    within_budget = [m for m in fast_enough if m.bitrate <= max_bitrate]
+    if within_budget:
+        return max(within_budget, key=lambda m: m.encode_fps)
+    if fast_enough:
+        return min(fast_enough, key=lambda m: m.bitrate)
+    return max(measurements, key=lambda m: m.encode_fps)
+
+
+def host_fingerprint() -> str:
+    """校準結果只適用於相同的硬體"""
+    return "|".join(
+        [
+            host_platform.node(),
+            host_platform.machine(),
+            host_platform.processor(),
+            str(os.cpu_count()),
+        ]
+    )
+
+
+def _default_calibration_path() -> Path:
+    path = os.getenv("ENCODER_CALIBRATION_PATH")
+    if path:
+        return Path(path)
+    return Path.home() / ".cache" / "auto-video-generation" / "encoder_calibration.json"
+
+
+def _calibration_key(codec: str, width: int, height: int, fps: int, crf: int) -> str:
+    return f"{codec}:{width}x{height}@{fps}:crf{crf}"
+
+
+class EncoderRegistry:
+    """品質等級與平台規格到編碼設定的對應，並套用本機校準結果"""
+
+    def __init__(
+        self,
+        calibration_path: Optional[str] = None,
+        ffmpeg_path: Optional[str] = None,
+        codec: str = "libx264",
+    ):
+        self.calibration_path = (
+            Path(calibration_path) if calibration_path else _default_calibration_path()
+        )
+        self.ffmpeg_path = (
+            ffmpeg_path or os.getenv("FFMPEG_PATH") or shutil.which("ffmpeg") or "ffmpeg"
+        )
+        self.codec = codec
+        self._measurements: Optional[Dict[str, List[PresetMeasurement]]] = None
+
+    def profile(
+        self,
+        quality="high",
+        platform: Optional[str] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        fps: Optional[int] = None,
+        duration: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> EncoderProfile:
+        """
+        取得編碼設定
+
+        Args:
+            quality: 品質等級（字串或 VideoQuality），未知時使用 high
+            platform: 平台名稱，提供解析度、碼率上限與預設時限
+            width / height / fps: 覆寫輸出規格
+            duration / deadline: 影片長度與可用的渲染時間（秒），兩者皆提供時覆寫平台時限
+        """
+        quality = getattr(quality, "value", quality)
+        if quality not in QUALITY_LEVELS:
+            quality = "high"
+        level = QUALITY_LEVELS[quality]
+
+        if platform is not None and platform not in PLATFORM_TARGETS:
+            raise ValueError(f"Unknown platform: {platform}")
+        target = PLATFORM_TARGETS.get(platform)
+
+        profile = EncoderProfile(
+            quality=quality,
+            width=width or (target.width if target else level.width),
+            height=height or (target.height if target else level.height),
+            fps=fps or (target.fps if target else 30),
+            crf=level.crf,
+            preset=level.preset,
+            video_bitrate=target.max_bitrate if target else level.video_bitrate,
+            audio_bitrate=target.audio_bitrate if target else level.audio_bitrate,
+            codec=self.codec,
+        )
+
+        if duration and deadline:
+            min_speed = duration / deadline
+        else:
+            min_speed = target.min_speed if target else 0.0
+
+        measurements = self.measurements(profile.width, profile.height, profile.fps, profile.crf)
+        chosen = select_preset(
+            measurements, profile.fps, parse_bitrate(profile.video_bitrate), min_speed
+        )
+        if chosen is None:
+            return profile
+        return replace(profile, preset=chosen.preset, calibrated=True)
+
+    def measurements(self, width: int, height: int, fps: int, crf: int) -> List[PresetMeasurement]:
+        if self._measurements is None:
+            self._measurements = self._load()
+        return self._measurements.get(_calibration_key(self.codec, width, height, fps, crf), [])
+
+    def calibrate(
+        self,
+        quality="high",
+        platform: Optional[str] = None,
+        presets: Sequence[str] = CALIBRATION_PRESETS,
+        seconds: float = CALIBRATION_SECONDS,
+        sample: Optional[str] = None,
+    ) -> List[PresetMeasurement]:
+        """
+        在本機量測候選 preset 並儲存結果
+
+        Args:
+            quality / platform: 決定量測的解析度、fps 與 CRF
+            presets: 候選 preset
+            seconds: 每個 preset 編碼的影片長度
+            sample: 代表性的圖片或影片；未提供時使用 FFmpeg 內建測試畫面
+        """
+        base = self.profile(quality, platform)
+        results = [
+            self._benchmark(preset, base.width, base.height, base.fps, base.crf, seconds, sample)
+            for preset in presets
+        ]
+        for m in results:
+            logger.info(
+                f"Calibrated {m.preset} at {base.resolution}: "
+                f"{m.encode_fps:.1f} fps, {m.bitrate / 1000:.0f} kbit/s"
+            )
+
+        if self._measurements is None:
+            self._measurements = self._load()
+        key = _calibration_key(self.codec, base.width, base.height, base.fps, base.crf)
+        self._measurements[key] = results
+        self._save()
+        return results
+
+    def _benchmark(
+        self,
+        preset: str,
+        width: int,
+        height: int,
+        fps: int,
+        crf: int,
+        seconds: float,
+        sample: Optional[str],
+    ) -> PresetMeasurement:
+        if sample:
+            source = ["-loop", "1", "-framerate", str(fps), "-t", str(seconds), "-i", sample]
+        else:
+            source = [
+                "-f",
+                "lavfi",
+                "-i",
+                f"testsrc2=size={width}x{height}:rate={fps}:duration={seconds}",
+            ]
+
+        with tempfile.TemporaryDirectory(prefix="encoder_calibration_") as tmp:
+            output = Path(tmp) / f"{preset}.mp4"
+            cmd = [
+                self.ffmpeg_path,
+                "-y",
+                "-nostdin",
+                "-loglevel",
+                "error",
+                *source,
+                "-vf",
+                f"scale={width}:{height}",
+                "-c:v",
+                self.codec,
+                "-preset",
+                preset,
+                "-crf",
+                str(crf),
+                "-pix_fmt",
+                "yuv420p",
+                "-an",
+                str(output),
+            ]
+            started = time.perf_counter()
+            try:
+                result = subprocess.run(cmd, capture_output=True, timeout=CALIBRATION_TIMEOUT)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                raise EncoderCalibrationError(f"Calibration encode failed: {e}") from e
+            elapsed = time.perf_counter() - started
+            if result.returncode != 0 or not output.exists():
+                stderr = result.stderr.decode(errors="replace").strip()
+                raise EncoderCalibrationError(
+                    f"Calibration encode with preset {preset} failed: {stderr}"
+                )
+            size = output.stat().st_size
+
+        return PresetMeasurement(
+            preset=preset,
+            encode_fps=round(seconds * fps) / elapsed,
+            bitrate=int(size * 8 / seconds),
+        )
+
+    def _load(self) -> Dict[str, List[PresetMeasurement]]:
+        try:
+            data = json.loads(self.calibration_path.read_text())
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable encoder calibration {self.calibration_path}: {e}")
+            return {}
+
+        if data.get("host") != host_fingerprint():
+            logger.info("Encoder calibration was recorded on another host; using static presets")
+            return {}
+        return {
+            key: [PresetMeasurement(**m) for m in measurements]
+            for key, measurements in data.get("results", {}).items()
+        }
+
+    def _save(self):
+        self.calibration_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "host": host_fingerprint(),
+            "calibrated_at": time.time(),
+            "results": {
+                key: [asdict(m) for m in measurements]
+                for key, measurements in self._measurements.items()
+            },
+        }
+        tmp_path = self.calibration_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2))
+        os.replace(tmp_path, self.calibration_path)
+
+
+_registry: Optional[EncoderRegistry] = None
+
+
+def get_encoder_registry() -> EncoderRegistry:
+    """程序共用的編碼設定檔登錄"""
+    global _registry
+    if _registry is None:
+        _registry = EncoderRegistry()
+    return _registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate x264 presets on this host")
+    parser.add_argument("--quality", default="high", choices=sorted(QUALITY_LEVELS))
+    parser.add_argument("--platform", choices=sorted(PLATFORM_TARGETS))
+    parser.add_argument("--presets", nargs="+", default=list(CALIBRATION_PRESETS))
+    parser.add_argument("--seconds", type=float, default=CALIBRATION_SECONDS)
+    parser.add_argument("--sample", help="representative image or clip to encode")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    registry = get_encoder_registry()
+    registry.calibrate(args.quality, args.platform, args.presets, args.seconds, args.sample)
+    profile = registry.profile(args.quality, args.platform)
+    print(f"{args.platform or args.quality}: preset={profile.preset} crf={profile.crf}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,14 @@
 
 import asyncio
 import logging
+import random
 import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
 from urllib.parse import urljoin
 
 import aiohttp
@@ -17,6 +21,36 @@ from .service_discovery import ServiceInstance, get_service_discovery
 
 logger = logging.getLogger(__name__)
 
+# 請求剩餘時間（毫秒）；下游服務據此略過呼叫者已放棄的工作
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+# 目前請求的截止時間（time.monotonic()），巢狀的服務呼叫會繼承
+_request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def get_remaining_time() -> Optional[float]:
+    """目前請求剩餘的秒數，沒有截止時間時返回 None"""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextmanager
+def request_deadline(timeout: Optional[float]) -> Iterator[None]:
+    """在區塊內設定請求截止時間（不會延長已繼承的截止時間）"""
+    deadline = _request_deadline.get()
+    if timeout is not None:
+        new_deadline = time.monotonic() + timeout
+        if deadline is None or new_deadline < deadline:
+            deadline = new_deadline
+
+    token = _request_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
 
 class CircuitBreakerState(Enum):
     """熔斷器狀態"""
@@ -35,15 +69,21 @@ class RetryConfig:
     max_delay: float = 60.0
     exponential_base: float = 2.0
     jitter: bool = True
+    budget_ratio: float = 0.1  # 重試次數上限為視窗內成功請求數的比例
+    budget_min_retries: int = 3  # 低流量時視窗內至少允許的重試次數
+    budget_window: float = 10.0  # 重試預算的滑動視窗（秒）
 
 
 @dataclass
 class CircuitBreakerConfig:
     """熔斷器配置"""
 
-    failure_threshold: int = 5  # 失敗閾值
+    failure_threshold: int = 5  # 視窗內至少的失敗次數才會熔斷
     recovery_timeout: float = 60.0  # 恢復超時時間
     success_threshold: int = 3  # 半開狀態成功閾值
+    error_rate_threshold: float = 0.5  # 視窗內錯誤率閾值
+    window_seconds: float = 10.0  # 錯誤率滑動視窗（秒）
+    half_open_max_calls: int = 1  # 半開狀態同時允許的探測請求數
 
 
 @dataclass
@@ -55,63 +95,192 @@ class RequestMetrics:
     failed_requests: int = 0
     average_response_time: float = 0.0
     last_request_time: float = 0.0
+    retries: int = 0
+    retries_rejected: int = 0
+    deadline_exceeded: int = 0
+
+
+class SlidingWindowCounter:
+    """以固定寬度時間桶實作的滑動視窗計數器"""
+
+    def __init__(self, window_seconds: float, buckets: int = 10) -> None:
+        self.window_seconds = window_seconds
+        self.bucket_width = window_seconds / buckets
+        self._buckets: Deque[List[Any]] = deque()  # [桶起始時間, {名稱: 次數}]
+
+    def _expire(self, now: float) -> None:
+        while self._buckets and self._buckets[0][0] <= now - self.window_seconds:
+            self._buckets.popleft()
+
+    def add(self, name: str, count: int = 1) -> None:
+        """累加計數"""
+        now = time.monotonic()
+        self._expire(now)
+        start = now - now % self.bucket_width
+        if not self._buckets or self._buckets[-1][0] != start:
+            self._buckets.append([start, {}])
+        counts = self._buckets[-1][1]
+        counts[name] = counts.get(name, 0) + count
+
+    def get(self, name: str) -> int:
+        """視窗內的計數"""
+        self._expire(time.monotonic())
+        return sum(counts.get(name, 0) for _, counts in self._buckets)
+
+    def reset(self) -> None:
+        """清除所有計數"""
+        self._buckets.clear()
 
 
 class CircuitBreaker:
-    """熔斷器實現"""
+    """以滑動視窗錯誤率判斷的熔斷器
+
+    視窗內失敗次數達 failure_threshold 且錯誤率達 error_rate_threshold 時熔斷；
+    recovery_timeout 後進入半開狀態，只允許 half_open_max_calls 個並發探測請求，
+    連續 success_threshold 次成功後恢復，任一探測失敗則重新熔斷。
+    """
 
     def __init__(self, config: CircuitBreakerConfig) -> None:
         self.config = config
         self.state = CircuitBreakerState.CLOSED
+        self.window = SlidingWindowCounter(config.window_seconds)
         self.failure_count = 0
         self.success_count = 0
         self.last_failure_time = 0.0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+
+    @property
+    def error_rate(self) -> float:
+        """視窗內的錯誤率"""
+        failures = self.window.get("failure")
+        total = failures + self.window.get("success")
+        return failures / total if total else 0.0
 
     async def call(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
         """通過熔斷器調用函數"""
-        if self.state == CircuitBreakerState.OPEN:
-            if time.time() - self.last_failure_time > self.config.recovery_timeout:
-                self.state = CircuitBreakerState.HALF_OPEN
-                self.success_count = 0
-                logger.info("Circuit breaker state changed to HALF_OPEN")
-            else:
-                raise CircuitBreakerOpenError("Circuit breaker is OPEN")
-
+        probe = self._before_call()
         try:
             result = await func(*args, **kwargs)
-            await self._on_success()
-            return result
         except Exception as e:
-            await self._on_failure()
-            raise e
+            if is_service_failure(e):
+                await self._on_failure(probe)
+            else:
+                # 呼叫端錯誤（4xx）代表服務仍正常回應
+                await self._on_success(probe)
+            raise
+        except BaseException:
+            if probe:
+                self.half_open_calls -= 1
+            raise
+
+        await self._on_success(probe)
+        return result
+
+    def _before_call(self) -> bool:
+        """檢查是否允許請求，返回是否為半開狀態的探測請求"""
+        if self.state == CircuitBreakerState.OPEN:
+            if time.monotonic() - self.opened_at < self.config.recovery_timeout:
+                raise CircuitBreakerOpenError("Circuit breaker is OPEN")
+            self.state = CircuitBreakerState.HALF_OPEN
+            self.success_count = 0
+            self.half_open_calls = 0
+            logger.info("Circuit breaker state changed to HALF_OPEN")
+
+        if self.state == CircuitBreakerState.HALF_OPEN:
+            if self.half_open_calls >= self.config.half_open_max_calls:
+                raise CircuitBreakerOpenError("Circuit breaker is HALF_OPEN, probe in progress")
+            self.half_open_calls += 1
+            return True
 
-    async def _on_success(self) -> None:
+        return False
+
+    async def _on_success(self, probe: bool = False) -> None:
         """處理成功情況"""
+        if probe:
+            self.half_open_calls -= 1
         if self.state == CircuitBreakerState.HALF_OPEN:
             self.success_count += 1
             if self.success_count >= self.config.success_threshold:
                 self.state = CircuitBreakerState.CLOSED
                 self.failure_count = 0
+                self.window.reset()
                 logger.info("Circuit breaker state changed to CLOSED")
         else:
-            self.failure_count = 0
+            self.window.add("success")
 
-    async def _on_failure(self) -> None:
+    async def _on_failure(self, probe: bool = False) -> None:
         """處理失敗情況"""
-        self.failure_count += 1
+        if probe:
+            self.half_open_calls -= 1
         self.last_failure_time = time.time()
 
-        if self.failure_count >= self.config.failure_threshold:
-            self.state = CircuitBreakerState.OPEN
-            logger.warning(
-                f"Circuit breaker state changed to OPEN after {self.failure_count} failures"
-            )
+        if self.state == CircuitBreakerState.HALF_OPEN:
+            self._open()
+            return
+
+        self.window.add("failure")
+        self.failure_count = self.window.get("failure")
+        if (
+            self.state == CircuitBreakerState.CLOSED
+            and self.failure_count >= self.config.failure_threshold
+            and self.error_rate >= self.config.error_rate_threshold
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        error_rate = self.error_rate
+        self.state = CircuitBreakerState.OPEN
+        self.opened_at = time.monotonic()
+        logger.warning(
+            f"Circuit breaker state changed to OPEN "
+            f"({self.failure_count} failures, error rate {error_rate:.0%})"
+        )
+
+
+class RetryBudget:
+    """每個客戶端的重試預算
+
+    滑動視窗內的重試次數不超過 budget_min_retries + budget_ratio × 成功請求數，
+    避免服務部分中斷時重試放大下游負載。
+    """
+
+    def __init__(self, config: RetryConfig) -> None:
+        self.config = config
+        self.window = SlidingWindowCounter(config.budget_window)
+
+    def record_success(self) -> None:
+        """記錄一次成功請求"""
+        self.window.add("success")
+
+    def try_acquire(self) -> bool:
+        """嘗試取得一次重試額度"""
+        allowed = self.config.budget_min_retries + self.config.budget_ratio * self.window.get(
+            "success"
+        )
+        if self.window.get("retry") >= allowed:
+            return False
+        self.window.add("retry")
+        return True
 
 
 class CircuitBreakerOpenError(Exception):
     """熔斷器開啟異常"""
 
 
+class DeadlineExceededError(Exception):
+    """請求截止時間已過異常"""
+
+
+def is_service_failure(error: Exception) -> bool:
+    """判斷錯誤是否代表下游服務異常（計入熔斷並可重試）"""
+    if isinstance(error, (CircuitBreakerOpenError, DeadlineExceededError)):
+        return False
+    if isinstance(error, HTTPError):
+        return error.status_code >= 500 or error.status_code == 429
+    return True
+
+
 class ServiceClient:
     """服務間通訊客戶端"""
 
@@ -125,6 +294,7 @@ class ServiceClient:
         self.service_name = service_name
         self.retry_config = retry_config or RetryConfig()
         self.circuit_breaker = CircuitBreaker(circuit_breaker_config or CircuitBreakerConfig())
+        self.retry_budget = RetryBudget(self.retry_config)
         self.timeout = timeout
         self.metrics = RequestMetrics()
         self._session: Optional[aiohttp.ClientSession] = None
@@ -149,17 +319,14 @@ class ServiceClient:
         json_data: Optional[Dict[str, Any]] = None,
         data: Optional[Any] = None,
         params: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
-        """發送 HTTP 請求"""
-        return await self.circuit_breaker.call(
-            self._request_with_retry,
-            method,
-            path,
-            headers,
-            json_data,
-            data,
-            params,
-        )
+        """發送 HTTP 請求
+
+        timeout 為整個呼叫（含重試）的時限，與繼承的請求截止時間取較早者。
+        """
+        with request_deadline(timeout):
+            return await self._request_with_retry(method, path, headers, json_data, data, params)
 
     async def _request_with_retry(
         self,
@@ -170,68 +337,97 @@ class ServiceClient:
         data: Optional[Any] = None,
         params: Optional[Dict[str, str]] = None,
     ) -> Dict[str, Any]:
-        """帶重試的請求"""
-        last_exception = None
+        """帶重試的請求
+
+        每次嘗試都經過熔斷器；熔斷、截止時間已過、呼叫端錯誤（4xx）或
+        重試預算用盡時不再重試。
+        """
         delay = self.retry_config.initial_delay
 
         for attempt in range(self.retry_config.max_attempts):
+            start_time = time.time()
             try:
-                start_time = time.time()
-
-                # 獲取服務實例
-                discovery = await get_service_discovery()
-                instance = await discovery.get_service_instance(self.service_name)
-
-                if not instance:
-                    raise ServiceUnavailableError(
-                        f"No available instances for service: {self.service_name}"
-                    )
-
-                try:
-                    result = await self._make_request(
-                        instance,
-                        method,
-                        path,
-                        headers,
-                        json_data,
-                        data,
-                        params,
-                    )
-
-                    # 更新指標
-                    response_time = time.time() - start_time
-                    await self._update_metrics(True, response_time)
-
-                    return result
-
-                finally:
-                    # 釋放連接
-                    await discovery.release_connection(instance)
-
+                result = await self.circuit_breaker.call(
+                    self._attempt, method, path, headers, json_data, data, params
+                )
+            except CircuitBreakerOpenError:
+                raise
             except Exception as e:
-                last_exception = e
-                logger.warning(f"Request attempt {attempt + 1} failed for {self.service_name}: {e}")
+                await self._update_metrics(False, time.time() - start_time)
+                if isinstance(e, DeadlineExceededError):
+                    self.metrics.deadline_exceeded += 1
+                if not is_service_failure(e):
+                    raise
 
-                # 更新指標
-                response_time = time.time() - start_time
-                await self._update_metrics(False, response_time)
+                logger.warning(f"Request attempt {attempt + 1} failed for {self.service_name}: {e}")
 
-                if attempt < self.retry_config.max_attempts - 1:
-                    # 計算延遲時間
-                    if self.retry_config.jitter:
-                        import random
+                if attempt == self.retry_config.max_attempts - 1:
+                    raise
+                if not self.retry_budget.try_acquire():
+                    self.metrics.retries_rejected += 1
+                    logger.warning(f"Retry budget exhausted for {self.service_name}")
+                    raise
+
+                # 計算延遲時間
+                if self.retry_config.jitter:
+                    delay = delay * (0.5 + random.random() * 0.5)
+
+                remaining = get_remaining_time()
+                if remaining is not None and remaining <= delay:
+                    self.metrics.deadline_exceeded += 1
+                    raise DeadlineExceededError(
+                        f"Deadline exceeded before retry for service: {self.service_name}"
+                    ) from e
+
+                self.metrics.retries += 1
+                await asyncio.sleep(delay)
+                delay = min(
+                    delay * self.retry_config.exponential_base,
+                    self.retry_config.max_delay,
+                )
+            else:
+                self.retry_budget.record_success()
+                await self._update_metrics(True, time.time() - start_time)
+                return result
 
-                        delay = delay * (0.5 + random.random() * 0.5)
+        raise ServiceUnavailableError(f"All retry attempts failed for service: {self.service_name}")
 
-                    await asyncio.sleep(delay)
-                    delay = min(
-                        delay * self.retry_config.exponential_base,
-                        self.retry_config.max_delay,
-                    )
+    async def _attempt(
+        self,
+        method: str,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+        json_data: Optional[Dict[str, Any]] = None,
+        data: Optional[Any] = None,
+        params: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """選擇服務實例並發送單次請求"""
+        remaining = get_remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError(f"Deadline exceeded for service: {self.service_name}")
+
+        # 獲取服務實例
+        discovery = await get_service_discovery()
+        instance = await discovery.get_service_instance(self.service_name)
+
+        if not instance:
+            raise ServiceUnavailableError(
+                f"No available instances for service: {self.service_name}"
+            )
 
-        raise last_exception or ServiceUnavailableError(
-            f"All retry attempts failed for service: {self.service_name}"
-        )
+        try:
+            return await self._make_request(
+                instance,
+                method,
+                path,
+                headers,
+                json_data,
+                data,
+                params,
+            )
+        finally:
+            # 釋放連接
+            await discovery.release_connection(instance)
 
     async def _make_request(
         self,
@@ -255,32 +451,54 @@ class ServiceClient:
         if headers:
             request_headers.update(headers)
 
+        # 本次嘗試的時限：客戶端逾時與剩餘截止時間取較短者，並告知下游
+        # （不足 1 毫秒時傳 0，下游直接返回 504）
+        attempt_timeout = self.timeout
+        remaining = get_remaining_time()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceededError(f"Deadline exceeded for service: {self.service_name}")
+            attempt_timeout = min(attempt_timeout, remaining)
+        request_headers[DEADLINE_HEADER] = str(int(attempt_timeout * 1000))
+
         logger.debug(f"Making {method} request to {url}")
 
-        async with session.request(
-            method=method,
-            url=url,
-            headers=request_headers,
-            json=json_data,
-            data=data,
-            params=params,
-        ) as response:
-
-            if response.status >= 400:
-                error_text = await response.text()
-                raise HTTPError(
-                    status_code=response.status,
-                    message=f"HTTP {response.status}: {error_text}",
-                    response_text=error_text,
-                )
+        try:
+            async with session.request(
+                method=method,
+                url=url,
+                headers=request_headers,
+                json=json_data,
+                data=data,
+                params=params,
+                timeout=aiohttp.ClientTimeout(total=attempt_timeout),
+            ) as response:
+                return await self._read_response(response)
+        except asyncio.TimeoutError as e:
+            if remaining is not None and attempt_timeout >= remaining:
+                raise DeadlineExceededError(
+                    f"Deadline exceeded waiting for service: {self.service_name}"
+                ) from e
+            raise
+
+    async def _read_response(self, response: aiohttp.ClientResponse) -> Dict[str, Any]:
+        """解析 HTTP 響應"""
+
+        if response.status >= 400:
+            error_text = await response.text()
+            raise HTTPError(
+                status_code=response.status,
+                message=f"HTTP {response.status}: {error_text}",
+                response_text=error_text,
+            )
 
-            # 嘗試解析 JSON 響應
-            try:
-                return await response.json()
-            except Exception:
-                # 如果不是 JSON，返回文本
-                text = await response.text()
-                return {"data": text, "content_type": response.content_type}
+        # 嘗試解析 JSON 響應
+        try:
+            return await response.json()
+        except Exception:
+            # 如果不是 JSON，返回文本
+            text = await response.text()
+            return {"data": text, "content_type": response.content_type}
 
     async def _update_metrics(self, success: bool, response_time: float) -> None:
         """更新請求指標"""
@@ -307,9 +525,10 @@ class ServiceClient:
         path: str,
         headers: Optional[Dict[str, str]] = None,
         params: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
         """GET 請求"""
-        return await self.request("GET", path, headers=headers, params=params)
+        return await self.request("GET", path, headers=headers, params=params, timeout=timeout)
 
     async def post(
         self,
@@ -317,9 +536,12 @@ class ServiceClient:
         json_data: Optional[Dict[str, Any]] = None,
         headers: Optional[Dict[str, str]] = None,
         data: Optional[Any] = None,
+        timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
         """POST 請求"""
-        return await self.request("POST", path, headers=headers, json_data=json_data, data=data)
+        return await self.request(
+            "POST", path, headers=headers, json_data=json_data, data=data, timeout=timeout
+        )
 
     async def put(
         self,
@@ -327,13 +549,21 @@ class ServiceClient:
         json_data: Optional[Dict[str, Any]] = None,
         headers: Optional[Dict[str, str]] = None,
         data: Optional[Any] = None,
+        timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
         """PUT 請求"""
-        return await self.request("PUT", path, headers=headers, json_data=json_data, data=data)
+        return await self.request(
+            "PUT", path, headers=headers, json_data=json_data, data=data, timeout=timeout
+        )
 
-    async def delete(self, path: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    async def delete(
+        self,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
         """DELETE 請求"""
-        return await self.request("DELETE", path, headers=headers)
+        return await self.request("DELETE", path, headers=headers, timeout=timeout)
 
     def get_metrics(self) -> Dict[str, Any]:
         """獲取客戶端指標"""
@@ -350,6 +580,10 @@ class ServiceClient:
             "average_response_time": self.metrics.average_response_time,
             "last_request_time": self.metrics.last_request_time,
             "circuit_breaker_state": self.circuit_breaker.state.value,
+            "error_rate": self.circuit_breaker.error_rate,
+            "retries": self.metrics.retries,
+            "retries_rejected": self.metrics.retries_rejected,
+            "deadline_exceeded": self.metrics.deadline_exceeded,
         }
 
 
@@ -367,6 +601,46 @@ class HTTPError(Exception):
         super().__init__(message)
 
 
+class DeadlineMiddleware:
+    """請求截止時間中間件
+
+    讀取上游傳入的剩餘時間標頭並設定為目前請求的截止時間，巢狀的
+    ServiceClient 呼叫會自動繼承；抵達時已逾時的請求直接返回 504，不執行處理。
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = None
+        header_name = DEADLINE_HEADER.lower().encode()
+        for name, value in scope.get("headers", []):
+            if name == header_name:
+                try:
+                    timeout = int(value) / 1000
+                except ValueError:
+                    logger.warning(f"Invalid {DEADLINE_HEADER} header: {value!r}")
+                break
+
+        if timeout is not None and timeout <= 0:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 504,
+                    "headers": [(b"content-type", b"application/json")],
+                }
+            )
+            await send({"type": "http.response.body", "body": b'{"detail":"Deadline exceeded"}'})
+            return
+
+        with request_deadline(timeout):
+            await self.app(scope, receive, send)
+
+
 # 客戶端管理器
 class ServiceClientManager:
     """服務客戶端管理器"""
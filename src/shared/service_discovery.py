@@ -32,6 +32,17 @@ class LoadBalanceStrategy(Enum):
     RANDOM = "random"
     LEAST_CONNECTIONS = "least_connections"
     WEIGHTED_ROUND_ROBIN = "weighted_round_robin"
+    EWMA_LATENCY = "ewma_latency"
+
+
+@dataclass
+class OutlierDetectionConfig:
+    """被動異常檢測配置（依實際請求結果剔除實例）"""
+
+    consecutive_failures: int = 5  # 連續失敗（5xx 或逾時）次數達到後剔除
+    base_ejection_time: float = 30.0  # 剔除時間（秒），每次再被剔除時按次數遞增
+    max_ejection_time: float = 300.0
+    max_ejection_percent: int = 50  # 同一服務最多同時剔除的實例比例
 
 
 @dataclass
@@ -46,17 +57,31 @@ class ServiceInstance:
     last_health_check: float = field(default_factory=time.time)
     connections: int = 0
     metadata: Dict[str, Any] = field(default_factory=dict)
+    scheme: str = "http"
+    max_connections: int = 0  # 每個實例的並發上限，0 表示不限制
+    ewma_latency: float = 0.0  # 回應延遲的指數加權移動平均（秒）
+    consecutive_failures: int = 0
+    ejection_count: int = 0
+    ejected_until: float = 0.0
 
     @property
     def url(self) -> str:
         """獲取服務 URL"""
-        return f"http://{self.host}:{self.port}"
+        return f"{self.scheme}://{self.host}:{self.port}"
 
     @property
     def health_url(self) -> str:
         """獲取健康檢查 URL"""
         return urljoin(self.url, "/health")
 
+    def is_ejected(self, now: Optional[float] = None) -> bool:
+        """是否仍處於被動剔除期間"""
+        return self.ejected_until > (now if now is not None else time.time())
+
+    def has_capacity(self) -> bool:
+        """是否未達並發上限"""
+        return self.max_connections <= 0 or self.connections < self.max_connections
+
     def __hash__(self) -> int:
         return hash(f"{self.service_name}:{self.host}:{self.port}")
 
@@ -80,6 +105,7 @@ class ServiceRegistry:
                 # 更新現有實例
                 existing.weight = instance.weight
                 existing.metadata = instance.metadata
+                existing.max_connections = instance.max_connections
                 logger.info(
                     f"Updated service instance: {instance.service_name}@{instance.host}:{instance.port}"
                 )
@@ -223,6 +249,20 @@ class LoadBalancer:
             logger.warning("No healthy instances available, falling back to all instances")
             healthy_instances = instances
 
+        # 排除被動剔除中的實例；全部被剔除時仍使用全部實例
+        now = time.time()
+        active_instances = [
+            instance for instance in healthy_instances if not instance.is_ejected(now)
+        ]
+        if active_instances:
+            healthy_instances = active_instances
+
+        # 已達並發上限的實例不再分配請求
+        healthy_instances = [instance for instance in healthy_instances if instance.has_capacity()]
+        if not healthy_instances:
+            logger.warning("All instances are at their concurrency limit")
+            return None
+
         if self.strategy == LoadBalanceStrategy.ROUND_ROBIN:
             return self._round_robin_select(healthy_instances)
         elif self.strategy == LoadBalanceStrategy.RANDOM:
@@ -231,6 +271,8 @@ class LoadBalancer:
             return self._least_connections_select(healthy_instances)
         elif self.strategy == LoadBalanceStrategy.WEIGHTED_ROUND_ROBIN:
             return self._weighted_round_robin_select(healthy_instances)
+        elif self.strategy == LoadBalanceStrategy.EWMA_LATENCY:
+            return self._ewma_latency_select(healthy_instances)
         else:
             return healthy_instances[0]
 
@@ -250,6 +292,21 @@ class LoadBalancer:
         """最少連接選擇"""
         return min(instances, key=lambda x: x.connections)
 
+    def _ewma_latency_select(self, instances: List[ServiceInstance]) -> ServiceInstance:
+        """EWMA 延遲選擇
+
+        隨機取兩個實例，比較「EWMA 延遲 ×（進行中請求數 + 1）」取較小者；
+        尚無延遲記錄的實例分數為 0，會先被嘗試。
+        """
+        if len(instances) == 1:
+            return instances[0]
+
+        first, second = random.sample(instances, 2)
+        return min(
+            (first, second),
+            key=lambda x: x.ewma_latency * (x.connections + 1),
+        )
+
     def _weighted_round_robin_select(self, instances: List[ServiceInstance]) -> ServiceInstance:
         """加權輪詢選擇"""
         # 創建權重列表
@@ -273,10 +330,14 @@ class ServiceDiscovery:
     def __init__(
         self,
         load_balance_strategy: LoadBalanceStrategy = LoadBalanceStrategy.ROUND_ROBIN,
+        outlier_detection: Optional[OutlierDetectionConfig] = None,
+        latency_ewma_alpha: float = 0.3,
     ) -> None:
         self.registry = ServiceRegistry()
         self.health_checker = HealthChecker(self.registry)
         self.load_balancer = LoadBalancer(load_balance_strategy)
+        self.outlier_detection = outlier_detection or OutlierDetectionConfig()
+        self.latency_ewma_alpha = latency_ewma_alpha
         self._started = False
 
     async def start(self) -> None:
@@ -304,6 +365,7 @@ class ServiceDiscovery:
         port: int,
         weight: int = 1,
         metadata: Optional[Dict[str, Any]] = None,
+        max_connections: int = 0,
     ) -> bool:
         """註冊服務"""
         instance = ServiceInstance(
@@ -312,6 +374,7 @@ class ServiceDiscovery:
             port=port,
             weight=weight,
             metadata=metadata or {},
+            max_connections=max_connections,
         )
         return await self.registry.register(instance)
 
@@ -343,6 +406,58 @@ class ServiceDiscovery:
         if instance.connections > 0:
             instance.connections -= 1
 
+    async def report_result(
+        self,
+        instance: ServiceInstance,
+        success: bool,
+        latency: Optional[float] = None,
+    ) -> None:
+        """回報一次請求結果，更新 EWMA 延遲並進行被動異常檢測
+
+        success 為 False 表示 5xx 回應、逾時或連線錯誤。連續失敗達到閾值時，
+        實例在一段時間內不再被選取（同一服務被剔除的實例不超過設定比例）。
+        """
+        if latency is not None:
+            if instance.ewma_latency <= 0:
+                instance.ewma_latency = latency
+            else:
+                alpha = self.latency_ewma_alpha
+                instance.ewma_latency = alpha * latency + (1 - alpha) * instance.ewma_latency
+
+        if success:
+            instance.consecutive_failures = 0
+            return
+
+        instance.consecutive_failures += 1
+        config = self.outlier_detection
+        if instance.consecutive_failures < config.consecutive_failures:
+            return
+
+        now = time.time()
+        if instance.is_ejected(now):
+            return
+
+        instances = await self.registry.get_all_instances(instance.service_name)
+        ejected = sum(1 for i in instances if i.is_ejected(now))
+        if (ejected + 1) * 100 > config.max_ejection_percent * max(len(instances), 1):
+            logger.warning(
+                f"Not ejecting {instance.service_name}@{instance.host}:{instance.port}: "
+                f"max ejection percent reached"
+            )
+            return
+
+        instance.ejection_count += 1
+        ejection_time = min(
+            config.base_ejection_time * instance.ejection_count,
+            config.max_ejection_time,
+        )
+        instance.ejected_until = now + ejection_time
+        instance.consecutive_failures = 0
+        logger.warning(
+            f"Ejected {instance.service_name}@{instance.host}:{instance.port} "
+            f"for {ejection_time:.0f}s after consecutive failures"
+        )
+
     async def get_service_stats(self, service_name: str) -> Dict[str, Any]:
         """獲取服務統計信息"""
         instances = await self.registry.get_all_instances(service_name)
@@ -363,6 +478,8 @@ class ServiceDiscovery:
                     "connections": instance.connections,
                     "weight": instance.weight,
                     "last_health_check": instance.last_health_check,
+                    "ewma_latency_ms": round(instance.ewma_latency * 1000, 2),
+                    "ejected": instance.is_ejected(),
                 }
                 for instance in instances
             ],
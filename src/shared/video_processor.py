@@ -5,17 +5,25 @@
 """
 
 import os
+import re
+import uuid
 import asyncio
+import hashlib
+import inspect
 import logging
 import subprocess
 import tempfile
 import json
+import weakref
+from collections import OrderedDict, deque
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Union, Any
-from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Union, Any
+from dataclasses import dataclass, field
 from enum import Enum
 
+from .encoder_profiles import get_encoder_registry
+
 logger = logging.getLogger(__name__)
 
 
@@ -72,16 +80,387 @@ class VideoProject:
             self.assets = []
 
 
+class RenderError(RuntimeError):
+    """FFmpeg 渲染失敗"""
+
+
+class RenderCancelledError(RenderError):
+    """渲染被取消"""
+
+
+class RenderTimeoutError(RenderError):
+    """渲染超過時限"""
+
+
+@dataclass
+class RenderProgress:
+    """FFmpeg -progress 輸出的進度快照"""
+    frame: int = 0
+    fps: float = 0.0
+    out_time: float = 0.0  # 已輸出的影片時間（秒）
+    total_size: int = 0  # 已寫入的位元組數
+    speed: Optional[float] = None  # 相對即時的倍速
+    percent: Optional[float] = None  # 已知總時長時為 0-100
+    done: bool = False
+
+
+ProgressCallback = Callable[[RenderProgress], Optional[Awaitable[None]]]
+
+# 片段編碼參數或濾鏡改變時遞增，使舊的快取片段失效
+SEGMENT_CACHE_VERSION = 1
+# 片段快取預設的大小上限，可用 VIDEO_SEGMENT_CACHE_MAX_BYTES 覆寫
+DEFAULT_SEGMENT_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2 GB
+SLIDESHOW_FPS = 30
+
+
+def default_ffmpeg_concurrency() -> int:
+    """同時執行的 FFmpeg 數量上限
+
+    x264 本身會使用多個執行緒，因此預設為核心數的一半；可用 FFMPEG_MAX_CONCURRENCY 覆寫。
+    """
+    configured = os.getenv("FFMPEG_MAX_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+# 每個事件迴圈一個全域限流器，所有 RenderJob 共用
+_ffmpeg_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_ffmpeg_limiter() -> asyncio.Semaphore:
+    """取得目前事件迴圈的 FFmpeg 併發限流器"""
+    loop = asyncio.get_running_loop()
+    limiter = _ffmpeg_limiters.get(loop)
+    if limiter is None:
+        limiter = asyncio.Semaphore(default_ffmpeg_concurrency())
+        _ffmpeg_limiters[loop] = limiter
+    return limiter
+
+
+class RenderJob:
+    """單一 FFmpeg 渲染工作
+
+    以 -progress pipe:1 逐行解析進度，stderr 只保留最後幾行；支援取消與逾時，
+    並在全域限流器下執行。輸出先寫入 .partial 暫存檔，成功後才改名為正式檔名，
+    中斷的工作不會留下不完整的輸出，可直接重新執行。
+    """
+
+    STDERR_TAIL_LINES = 50
+    TERMINATE_GRACE_SECONDS = 5.0
+
+    def __init__(
+        self,
+        ffmpeg_path: str,
+        args: List[str],
+        output_path: Union[str, Path],
+        total_duration: Optional[float] = None,
+        timeout: Optional[float] = None,
+        description: str = "FFmpeg render",
+        cancel_event: Optional[asyncio.Event] = None,
+        limiter: Optional[asyncio.Semaphore] = None,
+    ):
+        """
+        Args:
+            ffmpeg_path: FFmpeg 執行檔
+            args: 輸入與編碼參數（不含執行檔與輸出路徑）
+            output_path: 輸出檔案路徑
+            total_duration: 輸出總時長（秒），用於計算百分比
+            timeout: 執行時限（秒），不含等待限流器的時間
+            description: 記錄與錯誤訊息使用的名稱
+            cancel_event: 設定後取消工作
+            limiter: 併發限流器，預設使用全域限流器
+        """
+        self.ffmpeg_path = ffmpeg_path
+        self.args = list(args)
+        self.output_path = Path(output_path)
+        self.partial_path = self.output_path.with_name(
+            f"{self.output_path.stem}.partial{self.output_path.suffix}"
+        )
+        self.total_duration = total_duration
+        self.timeout = timeout
+        self.description = description
+        self.cancel_event = cancel_event or asyncio.Event()
+        self.limiter = limiter
+        self.progress = RenderProgress()
+        self.stderr_tail: deque = deque(maxlen=self.STDERR_TAIL_LINES)
+        self.returncode: Optional[int] = None
+
+    @property
+    def command(self) -> List[str]:
+        return [
+            self.ffmpeg_path, "-y", "-nostdin", "-nostats", "-progress", "pipe:1",
+            *self.args, str(self.partial_path),
+        ]
+
+    def cancel(self) -> None:
+        """要求取消工作；執行中的 FFmpeg 會被終止"""
+        self.cancel_event.set()
+
+    async def run(self, on_progress: Optional[ProgressCallback] = None) -> str:
+        """執行渲染並回傳輸出路徑
+
+        on_progress 可為一般函數或協程函數，每個進度區塊呼叫一次。
+        """
+        limiter = self.limiter or get_ffmpeg_limiter()
+        async with limiter:
+            if self.cancel_event.is_set():
+                raise RenderCancelledError(f"{self.description} cancelled")
+            return await self._execute(on_progress)
+
+    def __aiter__(self):
+        return self._stream()
+
+    async def _stream(self):
+        """以非同步迭代取得進度；工作失敗時於迭代結束前拋出例外"""
+        queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(self.run(on_progress=queue.put_nowait))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                progress = await queue.get()
+                if progress is None:
+                    break
+                yield progress
+            await task
+        finally:
+            if not task.done():
+                task.cancel()
+
+    async def _execute(self, on_progress: Optional[ProgressCallback]) -> str:
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        logger.debug(f"FFmpeg command: {' '.join(self.command)}")
+
+        process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        readers = [
+            asyncio.create_task(self._read_progress(process.stdout, on_progress)),
+            asyncio.create_task(self._read_stderr(process.stderr)),
+        ]
+        cancelled = asyncio.create_task(self.cancel_event.wait())
+        finished = asyncio.create_task(process.wait())
+
+        try:
+            done, _ = await asyncio.wait(
+                {finished, cancelled}, timeout=self.timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if finished not in done:
+                await self._terminate(process)
+                if cancelled in done:
+                    raise RenderCancelledError(f"{self.description} cancelled")
+                raise RenderTimeoutError(f"{self.description} timed out after {self.timeout}s")
+
+            await asyncio.gather(*readers)
+            self.returncode = process.returncode
+            if process.returncode != 0:
+                error_msg = "\n".join(self.stderr_tail) or "Unknown FFmpeg error"
+                raise RenderError(f"{self.description} failed: {error_msg}")
+
+            os.replace(self.partial_path, self.output_path)
+            return str(self.output_path)
+        except BaseException:
+            # 任務被取消時同樣要結束 FFmpeg
+            if process.returncode is None:
+                await self._terminate(process)
+            self.partial_path.unlink(missing_ok=True)
+            raise
+        finally:
+            for task in (cancelled, finished, *readers):
+                if not task.done():
+                    task.cancel()
+
+    async def _terminate(self, process: asyncio.subprocess.Process) -> None:
+        try:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), self.TERMINATE_GRACE_SECONDS)
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    async def _read_stderr(self, stream: asyncio.StreamReader) -> None:
+        async for line in stream:
+            self.stderr_tail.append(line.decode(errors="replace").rstrip())
+
+    async def _read_progress(
+        self, stream: asyncio.StreamReader, on_progress: Optional[ProgressCallback]
+    ) -> None:
+        fields: Dict[str, str] = {}
+        async for line in stream:
+            key, sep, value = line.decode(errors="replace").strip().partition("=")
+            if not sep:
+                continue
+            if key != "progress":
+                fields[key] = value
+                continue
+
+            self.progress = self._parse_progress(fields, done=value == "end")
+            fields = {}
+            if on_progress:
+                result = on_progress(self.progress)
+                if inspect.isawaitable(result):
+                    await result
+
+    def _parse_progress(self, fields: Dict[str, str], done: bool) -> RenderProgress:
+        def number(key, cast=float, default=0):
+            try:
+                return cast(fields[key])
+            except (KeyError, ValueError):
+                return default
+
+        # out_time_us 為微秒；舊版 FFmpeg 的 out_time_ms 其實也是微秒
+        out_time = number("out_time_us", int, None)
+        if out_time is None:
+            out_time = number("out_time_ms", int, 0)
+        out_time = max(out_time, 0) / 1_000_000
+
+        speed = fields.get("speed", "").rstrip("x")
+        percent = None
+        if self.total_duration:
+            percent = 100.0 if done else min(100.0, out_time / self.total_duration * 100)
+
+        return RenderProgress(
+            frame=number("frame", int),
+            fps=number("fps"),
+            out_time=out_time,
+            total_size=number("total_size", int),
+            speed=float(speed) if re.fullmatch(r"[\d.]+", speed) else None,
+            percent=percent,
+            done=done,
+        )
+
+
+@dataclass
+class _SharedRender:
+    """多個呼叫者共用的進行中片段編碼
+
+    編碼使用自己的取消事件，只有所有等待者都取消時才停止；進度轉發給每個等待者。
+    """
+    task: Optional[asyncio.Future] = None
+    cancel_event: asyncio.Event = field(default_factory=asyncio.Event)
+    listeners: List[ProgressCallback] = field(default_factory=list)
+    waiters: int = 0
+    
+    async def publish(self, progress: RenderProgress):
+        for listener in list(self.listeners):
+            result = listener(progress)
+            if inspect.isawaitable(result):
+                await result
+
+
+class _SegmentCache:
+    """投影片片段快取的 LRU 索引
+
+    總大小超過 max_bytes 時刪除最久未使用的片段；使用中的片段（進行中的
+    影片仍需串接）不會被刪除。最近使用順序同步寫入檔案修改時間，重新啟動後
+    依修改時間重建索引。
+    """
+    
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Path, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._in_use: Dict[Path, int] = {}
+        self._loaded = False
+        self.evictions = 0
+        
+    def _load_index(self):
+        """由磁碟上已有的片段重建索引"""
+        self._loaded = True
+        files = []
+        for path in self.cache_dir.glob("*/*.mp4"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, str(path), stat.st_size))
+        
+        for _, path, size in sorted(files):
+            self._entries[Path(path)] = size
+            self._total_bytes += size
+        
+    def acquire(self, paths):
+        for path in paths:
+            self._in_use[path] = self._in_use.get(path, 0) + 1
+            
+    def release(self, paths):
+        for path in paths:
+            self._in_use[path] -= 1
+            if not self._in_use[path]:
+                del self._in_use[path]
+                
+    def touch(self, paths):
+        """記錄片段剛被使用（新編碼或命中快取），並淘汰超出上限的片段"""
+        if not self._loaded:
+            self._load_index()
+        for path in paths:
+            self._forget(path)
+            try:
+                size = path.stat().st_size
+                os.utime(path)
+            except OSError:
+                continue
+            self._entries[path] = size
+            self._total_bytes += size
+        self._evict()
+        
+    def _forget(self, path: Path):
+        size = self._entries.pop(path, None)
+        if size is not None:
+            self._total_bytes -= size
+            
+    def _evict(self):
+        for path in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if path in self._in_use:
+                continue
+            self._forget(path)
+            self.evictions += 1
+            try:
+                path.unlink()
+            except OSError:
+                pass
+                
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "total_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
 class VideoProcessor:
     """影片處理器"""
     
-    def __init__(self, output_dir: str = "./output", temp_dir: str = None):
+    def __init__(
+        self,
+        output_dir: str = "./output",
+        temp_dir: str = None,
+        render_timeout: Optional[float] = None,
+        segment_cache_dir: str = None,
+        segment_cache_max_bytes: Optional[int] = None
+    ):
         """
         初始化影片處理器
         
         Args:
             output_dir: 輸出目錄
             temp_dir: 暫存目錄
+            render_timeout: 單一 FFmpeg 工作的時限（秒），預設讀取 FFMPEG_RENDER_TIMEOUT
+            segment_cache_dir: 投影片片段快取目錄，預設讀取 VIDEO_SEGMENT_CACHE_DIR，
+                否則使用暫存目錄下的 segments
+            segment_cache_max_bytes: 片段快取的大小上限，超過時刪除最久未使用的片段，
+                預設讀取 VIDEO_SEGMENT_CACHE_MAX_BYTES（2 GB）
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -91,6 +470,22 @@ class VideoProcessor:
         
         self.ffmpeg_path = self._find_ffmpeg()
         
+        if render_timeout is None and os.getenv("FFMPEG_RENDER_TIMEOUT"):
+            render_timeout = float(os.getenv("FFMPEG_RENDER_TIMEOUT"))
+        self.render_timeout = render_timeout
+        
+        segment_cache_dir = segment_cache_dir or os.getenv("VIDEO_SEGMENT_CACHE_DIR")
+        self.segment_cache_dir = Path(segment_cache_dir) if segment_cache_dir else self.temp_dir / "segments"
+        if segment_cache_max_bytes is None:
+            segment_cache_max_bytes = int(
+                os.getenv("VIDEO_SEGMENT_CACHE_MAX_BYTES", DEFAULT_SEGMENT_CACHE_MAX_BYTES)
+            )
+        self.segment_cache = _SegmentCache(self.segment_cache_dir, segment_cache_max_bytes)
+        # (路徑, 修改時間, 大小) -> 圖片內容雜湊
+        self._image_hashes: Dict[tuple, str] = {}
+        # 片段路徑 -> 進行中的編碼，同一片段同時只編碼一次
+        self._segment_renders: Dict[Path, _SharedRender] = {}
+        
     def _find_ffmpeg(self) -> str:
         """查找FFmpeg執行檔"""
         # 首先嘗試從環境變數
@@ -173,38 +568,67 @@ class VideoProcessor:
             }
     
     def _get_quality_settings(self, quality: VideoQuality) -> Dict[str, str]:
-        """獲取品質設定參數"""
-        settings = {
-            VideoQuality.LOW: {
-                "video_bitrate": "500k",
-                "audio_bitrate": "64k",
-                "scale": "scale=854:480",
-                "preset": "fast",
-                "crf": "28"
-            },
-            VideoQuality.MEDIUM: {
-                "video_bitrate": "1500k", 
-                "audio_bitrate": "128k",
-                "scale": "scale=1280:720",
-                "preset": "medium",
-                "crf": "23"
-            },
-            VideoQuality.HIGH: {
-                "video_bitrate": "3000k",
-                "audio_bitrate": "192k", 
-                "scale": "scale=1920:1080",
-                "preset": "medium",
-                "crf": "20"
-            },
-            VideoQuality.ULTRA: {
-                "video_bitrate": "8000k",
-                "audio_bitrate": "320k",
-                "scale": "scale=3840:2160", 
-                "preset": "slow",
-                "crf": "18"
-            }
+        """獲取品質設定參數（來自共用的編碼器設定檔）"""
+        profile = get_encoder_registry().profile(quality)
+        return {
+            "video_bitrate": profile.video_bitrate,
+            "audio_bitrate": profile.audio_bitrate,
+            "scale": profile.scale_filter,
+            "preset": profile.preset,
+            "crf": str(profile.crf)
         }
-        return settings.get(quality, settings[VideoQuality.HIGH])
+    
+    async def render(
+        self,
+        args: List[str],
+        output_path: Union[str, Path],
+        total_duration: Optional[float] = None,
+        description: str = "FFmpeg render",
+        on_progress: Optional[ProgressCallback] = None,
+        cancel_event: Optional[asyncio.Event] = None
+    ) -> str:
+        """
+        以 RenderJob 執行 FFmpeg
+        
+        Args:
+            args: 輸入與編碼參數（不含執行檔與輸出路徑）
+            output_path: 輸出檔案路徑
+            total_duration: 輸出總時長，用於計算進度百分比
+            description: 記錄與錯誤訊息使用的名稱
+            on_progress: 渲染進度回呼
+            cancel_event: 設定後取消渲染
+            
+        Returns:
+            輸出檔案路徑
+        """
+        job = RenderJob(
+            self.ffmpeg_path,
+            args,
+            output_path,
+            total_duration=total_duration,
+            timeout=self.render_timeout,
+            description=description,
+            cancel_event=cancel_event,
+        )
+        try:
+            return await job.run(on_progress)
+        except RenderError as e:
+            logger.error(str(e))
+            raise
+    
+    async def _probe_duration(self, media_path: str) -> Optional[float]:
+        """只讀取檔頭取得媒體時長（不解碼）"""
+        process = await asyncio.create_subprocess_exec(
+            self.ffmpeg_path, "-hide_banner", "-nostdin", "-i", media_path,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+        match = re.search(r"Duration: (\d{2}):(\d{2}):(\d{2}(?:\.\d+)?)", stderr.decode(errors="replace"))
+        if not match:
+            return None
+        hours, minutes, seconds = match.groups()
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
     
     async def create_video_from_images(
         self,
@@ -213,7 +637,10 @@ class VideoProcessor:
         duration_per_image: float = 3.0,
         transition_duration: float = 0.5,
         background_music: Optional[str] = None,
-        quality: VideoQuality = VideoQuality.HIGH
+        quality: VideoQuality = VideoQuality.HIGH,
+        on_progress: Optional[ProgressCallback] = None,
+        cancel_event: Optional[asyncio.Event] = None,
+        mode: str = "segments"
     ) -> str:
         """
         從圖片序列創建影片
@@ -225,24 +652,33 @@ class VideoProcessor:
             transition_duration: 轉場時間
             background_music: 背景音樂檔案路徑
             quality: 影片品質
+            on_progress: 渲染進度回呼
+            cancel_event: 設定後取消渲染
+            mode: "segments" 將每張圖片各自編碼成含淡入淡出的快取片段後以串流複製串接；
+                "filter" 以單一 filter_complex 一次渲染所有圖片
             
         Returns:
             生成的影片檔案路徑
         """
         if not image_paths:
             raise ValueError("No images provided")
+        if mode not in ("segments", "filter"):
+            raise ValueError(f"Unknown slideshow mode: {mode}")
         
         output_path = self.output_dir / output_filename
         quality_settings = self._get_quality_settings(quality)
         
-        # 構建FFmpeg命令
-        cmd = [
-            self.ffmpeg_path,
-            "-y",  # 覆蓋輸出檔案
-        ]
+        if mode == "segments":
+            return await self._create_video_from_segments(
+                image_paths, output_path, duration_per_image + transition_duration,
+                background_music, quality, on_progress, cancel_event
+            )
+        
+        # 構建FFmpeg參數
+        cmd = []
         
         # 添加圖片輸入
-        total_duration = len(image_paths) * duration_per_image
+        total_duration = len(image_paths) * (duration_per_image + transition_duration)
         
         for i, image_path in enumerate(image_paths):
             cmd.extend([
@@ -294,26 +730,15 @@ class VideoProcessor:
             "-b:v", quality_settings["video_bitrate"],
             "-r", "30",  # 30fps
             "-pix_fmt", "yuv420p",
-            str(output_path)
         ])
         
         logger.info(f"Creating video from {len(image_paths)} images: {output_filename}")
-        logger.debug(f"FFmpeg command: {' '.join(cmd)}")
         
-        # 執行FFmpeg
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        await self.render(
+            cmd, output_path, total_duration=total_duration, description="Video creation",
+            on_progress=on_progress, cancel_event=cancel_event
         )
         
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode != 0:
-            error_msg = stderr.decode() if stderr else "Unknown FFmpeg error"
-            logger.error(f"FFmpeg failed: {error_msg}")
-            raise RuntimeError(f"Video creation failed: {error_msg}")
-        
         logger.info(f"Video created successfully: {output_path}")
         return str(output_path)
     
@@ -324,7 +749,9 @@ class VideoProcessor:
         output_filename: str,
         font_size: int = 24,
         font_color: str = "white",
-        background_color: str = "black@0.7"
+        background_color: str = "black@0.7",
+        on_progress: Optional[ProgressCallback] = None,
+        cancel_event: Optional[asyncio.Event] = None
     ) -> str:
         """
         為影片添加字幕
@@ -336,6 +763,8 @@ class VideoProcessor:
             font_size: 字體大小
             font_color: 字體顏色
             background_color: 背景顏色（含透明度）
+            on_progress: 渲染進度回呼
+            cancel_event: 設定後取消渲染
             
         Returns:
             生成的影片檔案路徑
@@ -349,29 +778,18 @@ class VideoProcessor:
         )
         
         cmd = [
-            self.ffmpeg_path,
-            "-y",
             "-i", video_path,
             "-vf", subtitle_filter,
             "-c:a", "copy",  # 保持音頻不變
-            str(output_path)
         ]
         
         logger.info(f"Adding subtitles to video: {video_path}")
         
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        await self.render(
+            cmd, output_path, total_duration=await self._probe_duration(video_path),
+            description="Subtitle addition", on_progress=on_progress, cancel_event=cancel_event
         )
         
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode != 0:
-            error_msg = stderr.decode() if stderr else "Unknown FFmpeg error"
-            logger.error(f"Subtitle addition failed: {error_msg}")
-            raise RuntimeError(f"Subtitle addition failed: {error_msg}")
-        
         logger.info(f"Subtitles added successfully: {output_path}")
         return str(output_path)
     
@@ -381,7 +799,9 @@ class VideoProcessor:
         audio_path: str,
         output_filename: str,
         video_volume: float = 0.5,
-        audio_volume: float = 1.0
+        audio_volume: float = 1.0,
+        on_progress: Optional[ProgressCallback] = None,
+        cancel_event: Optional[asyncio.Event] = None
     ) -> str:
         """
         合併影片和音頻
@@ -392,6 +812,8 @@ class VideoProcessor:
             output_filename: 輸出檔案名
             video_volume: 影片原音量比例
             audio_volume: 新增音頻音量比例
+            on_progress: 渲染進度回呼
+            cancel_event: 設定後取消渲染
             
         Returns:
             合併後的影片檔案路徑
@@ -399,8 +821,6 @@ class VideoProcessor:
         output_path = self.output_dir / output_filename
         
         cmd = [
-            self.ffmpeg_path,
-            "-y",
             "-i", video_path,
             "-i", audio_path,
             "-filter_complex", f"[0:a]volume={video_volume}[va];[1:a]volume={audio_volume}[aa];[va][aa]amix=inputs=2[audio]",
@@ -408,24 +828,15 @@ class VideoProcessor:
             "-map", "[audio]",
             "-shortest",  # 以最短流為準
             "-c:v", "copy",  # 保持影片編碼不變
-            str(output_path)
         ]
         
         logger.info(f"Merging audio with video: {video_path} + {audio_path}")
         
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        await self.render(
+            cmd, output_path, total_duration=await self._probe_duration(video_path),
+            description="Audio merge", on_progress=on_progress, cancel_event=cancel_event
         )
         
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode != 0:
-            error_msg = stderr.decode() if stderr else "Unknown FFmpeg error"
-            logger.error(f"Audio merge failed: {error_msg}")
-            raise RuntimeError(f"Audio merge failed: {error_msg}")
-        
         logger.info(f"Audio merged successfully: {output_path}")
         return str(output_path)
     
@@ -459,7 +870,6 @@ class VideoProcessor:
         }
         
         # 提取時長
-        import re
         duration_match = re.search(r"Duration: (\d{2}):(\d{2}):(\d{2}\.\d{2})", output)
         if duration_match:
             hours, minutes, seconds = duration_match.groups()
@@ -474,6 +884,208 @@ class VideoProcessor:
         
         return info
     
+    async def _create_video_from_segments(
+        self,
+        image_paths: List[str],
+        output_path: Path,
+        segment_duration: float,
+        background_music: Optional[str],
+        quality: VideoQuality,
+        on_progress: Optional[ProgressCallback],
+        cancel_event: Optional[asyncio.Event]
+    ) -> str:
+        """
+        每張圖片只解碼、縮放一次：先平行編碼成含淡入淡出的短片段並快取，
+        再以 concat demuxer 串流複製串接，只有背景音樂需要編碼
+        """
+        total_duration = len(image_paths) * segment_duration
+        segment_paths = [
+            self._segment_path(await self._image_hash(image_path), segment_duration, quality)
+            for image_path in image_paths
+        ]
+        
+        # 各片段已輸出的時間，用於彙總整體進度；片段編碼佔 95%，串接佔 5%
+        rendered: Dict[Path, float] = {path: segment_duration for path in segment_paths if path.exists()}
+        
+        async def report(percent: float, done: bool = False):
+            if on_progress:
+                result = on_progress(RenderProgress(
+                    out_time=sum(rendered.values()), percent=percent, done=done
+                ))
+                if inspect.isawaitable(result):
+                    await result
+        
+        def segment_progress(segment_path: Path):
+            async def update(progress: RenderProgress):
+                rendered[segment_path] = min(progress.out_time, segment_duration)
+                await report(95.0 * min(sum(rendered.values()) / total_duration, 1.0))
+            return update
+        
+        unique = dict(zip(segment_paths, image_paths))
+        cached = sum(1 for path in unique if path.exists())
+        logger.info(
+            f"Creating video from {len(image_paths)} images via segments: "
+            f"{len(unique) - cached} to encode, {cached} cached"
+        )
+        
+        # 串接完成前片段不會被快取淘汰
+        self.segment_cache.acquire(unique)
+        try:
+            await asyncio.gather(*(
+                self._render_segment(
+                    image_path, segment_path, segment_duration, quality,
+                    segment_progress(segment_path), cancel_event
+                )
+                for segment_path, image_path in unique.items()
+            ))
+            await self._concat_segments(
+                segment_paths, output_path, total_duration, background_music, quality,
+                report, cancel_event
+            )
+        finally:
+            self.segment_cache.release(unique)
+            self.segment_cache.touch(unique)
+        
+        await report(100.0, done=True)
+        logger.info(f"Video created successfully: {output_path}")
+        return str(output_path)
+    
+    async def _concat_segments(
+        self,
+        segment_paths: List[Path],
+        output_path: Path,
+        total_duration: float,
+        background_music: Optional[str],
+        quality: VideoQuality,
+        report: Callable[[float], Awaitable[None]],
+        cancel_event: Optional[asyncio.Event]
+    ):
+        """以 concat demuxer 串流複製串接片段，只有背景音樂需要編碼"""
+        list_path = self.temp_dir / f"concat_{uuid.uuid4().hex}.txt"
+        list_path.write_text("".join(
+            "file '{}'\n".format(str(path.resolve()).replace("'", "'\\''"))
+            for path in segment_paths
+        ))
+        
+        cmd = ["-f", "concat", "-safe", "0", "-i", str(list_path)]
+        if background_music and Path(background_music).exists():
+            cmd.extend([
+                "-i", background_music,
+                "-map", "0:v",
+                "-map", "1:a",
+                "-shortest",  # 以最短流為準
+                "-b:a", self._get_quality_settings(quality)["audio_bitrate"]
+            ])
+        cmd.extend(["-c:v", "copy"])
+        
+        async def concat_progress(progress: RenderProgress):
+            await report(95.0 + 5.0 * (progress.percent or 0.0) / 100)
+        
+        try:
+            await self.render(
+                cmd, output_path, total_duration=total_duration, description="Segment concat",
+                on_progress=concat_progress, cancel_event=cancel_event
+            )
+        finally:
+            list_path.unlink(missing_ok=True)
+    
+    async def _image_hash(self, image_path: str) -> str:
+        stat = os.stat(image_path)
+        key = (os.path.abspath(image_path), stat.st_mtime, stat.st_size)
+        if key not in self._image_hashes:
+            self._image_hashes[key] = await asyncio.to_thread(_file_sha256, image_path)
+        return self._image_hashes[key]
+    
+    def _segment_path(self, image_hash: str, duration: float, quality: VideoQuality) -> Path:
+        """片段以 (圖片內容雜湊, 時長, 品質, 編碼設定) 為鍵"""
+        settings = self._get_quality_settings(quality)
+        name = (
+            f"{image_hash}-{duration:g}s-{quality.value}-{settings['preset']}-crf{settings['crf']}"
+            f"-v{SEGMENT_CACHE_VERSION}.mp4"
+        )
+        return self.segment_cache_dir / image_hash[:2] / name
+    
+    async def _render_segment(
+        self,
+        image_path: str,
+        segment_path: Path,
+        duration: float,
+        quality: VideoQuality,
+        on_progress: Optional[ProgressCallback],
+        cancel_event: Optional[asyncio.Event]
+    ) -> str:
+        """編碼單張圖片的片段；已快取時直接回傳
+
+        同一片段同時只編碼一次，由所有需要它的呼叫者共用。單一呼叫者取消
+        （cancel_event 或任務取消）只會結束自己的等待，最後一個等待者取消時才停止編碼。
+        """
+        shared = self._segment_renders.get(segment_path)
+        while shared is not None and shared.cancel_event.is_set():
+            # 已放棄的編碼仍在結束中（共用同一個 .partial 檔），等它結束後再重新開始
+            await asyncio.wait({shared.task})
+            shared = self._segment_renders.get(segment_path)
+        
+        if segment_path.exists():
+            return str(segment_path)
+        
+        if shared is None:
+            shared = _SharedRender()
+            quality_settings = self._get_quality_settings(quality)
+            fade_frames = SLIDESHOW_FPS // 2
+            fade_out_start = int((duration - 0.5) * SLIDESHOW_FPS)
+            cmd = [
+                "-loop", "1",
+                "-framerate", str(SLIDESHOW_FPS),
+                "-t", str(duration),
+                "-i", image_path,
+                "-vf", (
+                    f"{quality_settings['scale']},fade=in:0:{fade_frames},"
+                    f"fade=out:{fade_out_start}:{fade_frames}"
+                ),
+                "-c:v", "libx264",
+                "-preset", quality_settings["preset"],
+                "-crf", quality_settings["crf"],
+                "-b:v", quality_settings["video_bitrate"],
+                "-r", str(SLIDESHOW_FPS),
+                "-pix_fmt", "yuv420p",
+                "-an",
+            ]
+            shared.task = asyncio.ensure_future(self.render(
+                cmd, segment_path, total_duration=duration, description="Segment encode",
+                on_progress=shared.publish, cancel_event=shared.cancel_event
+            ))
+            self._segment_renders[segment_path] = shared
+            
+            def finished(task: asyncio.Future):
+                if self._segment_renders.get(segment_path) is shared:
+                    del self._segment_renders[segment_path]
+                # 所有等待者都已離開時，取消造成的例外無人取用
+                if not task.cancelled():
+                    task.exception()
+            
+            shared.task.add_done_callback(finished)
+        
+        if on_progress:
+            shared.listeners.append(on_progress)
+        shared.waiters += 1
+        cancelled = asyncio.ensure_future(cancel_event.wait()) if cancel_event else None
+        try:
+            waits = {shared.task, cancelled} if cancelled else {shared.task}
+            done, _ = await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+            if shared.task not in done:
+                raise RenderCancelledError("Segment encode was cancelled")
+            return shared.task.result()
+        except (asyncio.CancelledError, RenderCancelledError):
+            if shared.waiters == 1 and not shared.task.done():
+                shared.cancel_event.set()
+            raise
+        finally:
+            shared.waiters -= 1
+            if on_progress:
+                shared.listeners.remove(on_progress)
+            if cancelled:
+                cancelled.cancel()
+    
     def cleanup_temp_files(self):
         """清理暫存檔案"""
         import shutil
@@ -486,6 +1098,15 @@ class VideoProcessor:
             logger.error(f"Failed to cleanup temp files: {e}")
 
 
+def _file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """檔案內容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 # 高階介面函數
 async def create_simple_video(
     images: List[str],
@@ -0,0 +1,56 @@
+"""
+批次寫入效能比較：bulk_upsert 與 ORM 逐筆新增
+
+預設不執行；設定 RUN_BENCHMARKS=1 開啟（BULK_BENCHMARK_ROWS 調整筆數）。
+"""
+
+import os
+import time
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.shared.database.bulk import bulk_upsert
+from src.shared.database.models import Base, TrendTopic
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run benchmarks"
+)
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_vs_orm_inserts(tmp_path):
+    """10 萬筆趨勢資料：bulk_upsert 與 ORM 逐筆 add 後一次提交的比較"""
+    total = int(os.getenv("BULK_BENCHMARK_ROWS", "100000"))
+    rows = [
+        {"category": "tiktok", "title": f"keyword {i}", "trending_score": 1.0, "keywords": ["a"]}
+        for i in range(total)
+    ]
+    timings = {}
+
+    for name in ("orm", "bulk"):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        started = time.perf_counter()
+        if name == "orm":
+            async with AsyncSession(engine) as session:
+                for row in rows:
+                    session.add(TrendTopic(**row))
+                await session.commit()
+        else:
+            await bulk_upsert(engine, TrendTopic, rows, ["category", "title"])
+        timings[name] = time.perf_counter() - started
+
+        async with engine.connect() as conn:
+            count = (await conn.execute(select(func.count(TrendTopic.id)))).scalar()
+        assert count == total
+        await engine.dispose()
+
+    print(
+        f"\n{total} trend rows: ORM {timings['orm']:.2f}s, bulk_upsert {timings['bulk']:.2f}s "
+        f"({timings['orm'] / timings['bulk']:.1f}x)"
+    )
+    assert timings["bulk"] * 4 < timings["orm"]
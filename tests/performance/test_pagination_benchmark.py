@@ -0,0 +1,78 @@
+"""
+深頁分頁效能比較：OFFSET 與 keyset
+
+預設不執行；設定 RUN_BENCHMARKS=1 開啟（PAGINATION_BENCHMARK_ROWS 調整筆數，預設 1M）。
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from src.shared.database.models import Base, Video, VideoStatus
+from src.shared.database.pagination import encode_cursor, keyset_paginate
+
+START = datetime(2026, 1, 1)
+SORT_COLUMNS = [Video.created_at, Video.id]
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run benchmarks"
+)
+
+
+def test_deep_page_offset_vs_keyset(tmp_path):
+    """在 1M 筆影片資料上比較深頁 OFFSET 與 keyset 分頁"""
+    total = int(os.getenv("PAGINATION_BENCHMARK_ROWS", "1000000"))
+    users, limit = 10, 20
+    engine = create_engine(f"sqlite:///{tmp_path / 'videos.db'}")
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as conn:
+        for start in range(0, total, 100_000):
+            rows = [
+                {
+                    "user_id": i % users + 1,
+                    "title": f"video {i}",
+                    "topic": "topic",
+                    "status": VideoStatus.COMPLETED,
+                    "created_at": START + timedelta(seconds=i),
+                }
+                for i in range(start, min(start + 100_000, total))
+            ]
+            conn.execute(insert(Video), rows)
+
+    depth = total // users - limit * 5  # 單一用戶的最後幾頁
+
+    def timed(fn, runs=5):
+        best = float("inf")
+        for _ in range(runs):
+            started = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - started)
+        return best, result
+
+    with Session(engine) as session:
+        base = session.query(Video.id, Video.created_at).filter(Video.user_id == 1)
+        offset_time, offset_rows = timed(
+            lambda: base.order_by(Video.created_at.desc(), Video.id.desc())
+            .offset(depth)
+            .limit(limit)
+            .all()
+        )
+
+        previous = base.order_by(Video.created_at.desc(), Video.id.desc()).offset(depth - 1).first()
+        cursor = encode_cursor([previous.created_at, previous.id])
+        keyset_time, keyset_rows = timed(
+            lambda: keyset_paginate(base, SORT_COLUMNS, cursor, limit).all()
+        )
+    engine.dispose()
+
+    print(
+        f"\n{total} rows, page at depth {depth}: OFFSET {offset_time * 1000:.1f}ms, "
+        f"keyset {keyset_time * 1000:.2f}ms"
+    )
+    assert [row.id for row in keyset_rows[:limit]] == [row.id for row in offset_rows]
+    assert keyset_time * 10 < offset_time
@@ -0,0 +1,396 @@
+"""
+AI 服務客戶端測試
+共用連線池、相同並發請求合併 (singleflight)、生成結果快取與推測式並行生成流程
+"""
+
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+import pytest
+
+from src.shared import ai_service_client
+from src.shared.ai_service_client import (
+    AIServiceClient,
+    AIServiceResponse,
+    ParagraphBuffer,
+    generate_complete_video_content,
+    split_paragraphs,
+)
+
+
+class FakeAIService:
+    """記錄每次呼叫的模擬 AI 服務"""
+
+    def __init__(self, latency: float = 0.0, status_code: int = 200):
+        self.latency = latency
+        self.status_code = status_code
+        self.calls = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request.url.path)
+        await asyncio.sleep(self.latency)
+        body = json.loads(request.content or b"{}")
+        return httpx.Response(self.status_code, json={"data": {"echo": body}})
+
+
+def _client(service: FakeAIService, **kwargs) -> AIServiceClient:
+    client = AIServiceClient("http://ai", **kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(service.handler))
+    return client
+
+
+class TestAIServiceClient:
+    @pytest.mark.asyncio
+    async def test_shared_client_is_reused(self):
+        client = AIServiceClient("http://ai")
+        pooled = client._get_client()
+        assert client._get_client() is pooled
+
+        await client.close()
+        assert pooled.is_closed
+        assert client._client is None
+
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_requests_are_coalesced(self):
+        service = FakeAIService(latency=0.02)
+        async with _client(service) as client:
+            responses = await asyncio.gather(*(client.generate_script("AI") for _ in range(10)))
+            different = await asyncio.gather(
+                client.generate_script("AI"), client.generate_script("AI", platform="tiktok")
+            )
+
+        assert all(response.success for response in responses)
+        assert responses[0].data["echo"]["topic"] == "AI"
+        assert service.calls.count("/api/v1/generate/script") == 3
+        assert client.stats["coalesced"] == 9
+        assert different[1].data["echo"]["platform"] == "tiktok"
+        assert client._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_shared_request(self):
+        service = FakeAIService(latency=0.05)
+        async with _client(service) as client:
+            first = asyncio.ensure_future(client.generate_voice("hello"))
+            second = asyncio.ensure_future(client.generate_voice("hello"))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            response = await second
+
+        assert first.cancelled()
+        assert response.success
+        assert len(service.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_response_cache_is_opt_in(self):
+        service = FakeAIService()
+        async with _client(service) as client:
+            await client.generate_image("cat")
+            await client.generate_image("cat")
+        assert len(service.calls) == 2
+
+        service = FakeAIService()
+        async with _client(service, cache_ttl=60) as client:
+            first = await client.generate_image("cat")
+            second = await client.generate_image("cat")
+            await client.check_health()
+            await client.check_health()
+
+        assert second is first
+        assert service.calls == ["/api/v1/generate/image", "/health", "/health"]
+        assert client.stats["cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failures_and_expired_entries_are_not_cached(self):
+        service = FakeAIService(status_code=503)
+        async with _client(service, cache_ttl=0.05) as client:
+            failed = await client.generate_music("calm")
+            await client.generate_music("calm")
+            assert not failed.success
+            assert len(service.calls) == 2
+
+            service.status_code = 200
+            await client.generate_music("calm")
+            await client.generate_music("calm")
+            assert len(service.calls) == 3
+
+            await asyncio.sleep(0.1)
+            await client.generate_music("calm")
+            assert len(service.calls) == 4
+
+
+PARAGRAPHS = ["First paragraph.", "Second paragraph.", "Third paragraph."]
+
+
+class _ScriptStream(httpx.AsyncByteStream):
+    """逐段延遲輸出 NDJSON 的腳本串流"""
+
+    def __init__(self, paragraphs, delay: float, fail_after=None):
+        self.paragraphs = paragraphs
+        self.delay = delay
+        self.fail_after = fail_after
+
+    async def __aiter__(self):
+        for index, text in enumerate(self.paragraphs):
+            await asyncio.sleep(self.delay)
+            if index == self.fail_after:
+                yield json.dumps({"type": "error", "message": "quota exceeded"}).encode() + b"\n"
+                return
+            yield json.dumps({"type": "paragraph", "index": index, "text": text}).encode() + b"\n"
+        script = "\n\n".join(self.paragraphs)
+        yield json.dumps({"type": "done", "data": {"script": script}}).encode() + b"\n"
+
+
+class PipelineAIService:
+    """各端點有不同延遲的模擬 AI 服務，記錄每個請求的開始、結束與取消時間"""
+
+    def __init__(
+        self,
+        paragraph_delay=0.05,
+        voice=0.05,
+        image=0.1,
+        music=0.1,
+        streaming=True,
+        fail_after=None,
+    ):
+        self.paragraph_delay = paragraph_delay
+        self.latency = {"voice": voice, "image": image, "music": music}
+        self.streaming = streaming
+        self.fail_after = fail_after
+        self.events = []
+        self.voice_texts = []
+        self.start = time.perf_counter()
+
+    def _log(self, event: str, name: str):
+        self.events.append((event, name, time.perf_counter() - self.start))
+
+    def at(self, event: str, name: str) -> float:
+        return next(t for e, n, t in self.events if e == event and n == name)
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/api/v1/generate/script/stream":
+            if not self.streaming:
+                return httpx.Response(404)
+            self._log("start", "script")
+            stream = _ScriptStream(PARAGRAPHS, self.paragraph_delay, self.fail_after)
+            return httpx.Response(200, stream=stream)
+        if path == "/api/v1/generate/script":
+            await asyncio.sleep(self.paragraph_delay * len(PARAGRAPHS))
+            return httpx.Response(200, json={"data": {"script": "\n\n".join(PARAGRAPHS)}})
+
+        name = path.rsplit("/", 1)[-1]
+        body = json.loads(request.content)
+        if name == "voice":
+            self.voice_texts.append(body["text"])
+        self._log("start", name)
+        try:
+            await asyncio.sleep(self.latency[name])
+        except asyncio.CancelledError:
+            self._log("cancel", name)
+            raise
+        self._log("end", name)
+        return httpx.Response(200, json={"data": {name: body}})
+
+
+async def _run_pipeline(service: PipelineAIService, monkeypatch):
+    client = AIServiceClient("http://ai")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(service.handler))
+    monkeypatch.setattr(ai_service_client, "_ai_client", client)
+    try:
+        return await generate_complete_video_content("AI")
+    finally:
+        await client.close()
+
+
+class TestParagraphSplitting:
+    def test_paragraphs_split_across_chunks(self):
+        buffer = ParagraphBuffer()
+        chunks = ["Intro line one\nline two\n", "\nSecond", " paragraph\n \n", "\nThird"]
+        paragraphs = [p for chunk in chunks for p in buffer.feed(chunk)]
+
+        assert paragraphs == ["Intro line one\nline two", "Second paragraph"]
+        assert buffer.flush() == ["Third"]
+        assert buffer.flush() == []
+
+    def test_split_paragraphs(self):
+        assert split_paragraphs("\n\nA\n\n\nB\n") == ["A", "B"]
+        assert split_paragraphs("") == []
+
+
+class TestSpeculativePipeline:
+    @pytest.mark.asyncio
+    async def test_media_and_voice_start_before_script_finishes(self, monkeypatch):
+        service = PipelineAIService()
+        result = await _run_pipeline(service, monkeypatch)
+
+        assert result["errors"] == []
+        assert result["script"] == {"script": "\n\n".join(PARAGRAPHS)}
+        assert [voice["voice"]["text"] for voice in result["voice"]] == PARAGRAPHS
+        assert result["images"]["image"]["quantity"] == 3
+
+        script_done = service.paragraph_delay * (len(PARAGRAPHS) + 1)
+        assert service.at("start", "image") < service.at("start", "script") + 0.02
+        assert service.at("start", "music") < service.at("start", "script") + 0.02
+        # 第一段語音在腳本完成前已開始合成
+        assert service.at("start", "voice") < script_done
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_non_streaming_endpoint(self, monkeypatch):
+        service = PipelineAIService(streaming=False)
+        result = await _run_pipeline(service, monkeypatch)
+
+        assert result["errors"] == []
+        assert sorted(service.voice_texts) == PARAGRAPHS
+        assert len(result["voice"]) == len(PARAGRAPHS)
+
+    @pytest.mark.asyncio
+    async def test_script_failure_cancels_inflight_generation(self, monkeypatch):
+        service = PipelineAIService(image=1.0, music=1.0, voice=1.0, fail_after=1)
+        start = time.perf_counter()
+        with pytest.raises(Exception, match="quota exceeded"):
+            await _run_pipeline(service, monkeypatch)
+
+        assert time.perf_counter() - start < 0.5
+        cancelled = sorted(name for event, name, _ in service.events if event == "cancel")
+        assert cancelled == ["image", "music", "voice"]
+        assert not any(event == "end" for event, _, _ in service.events)
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+async def test_speculative_pipeline_end_to_end_latency(monkeypatch):
+    """E2E ≈ max(腳本 + 最後一段語音, 圖像, 音樂)，而非 腳本 + max(圖像, 音樂, 全文語音)"""
+    paragraph_delay, voice, media = 0.05, 0.05, 0.15
+    service = PipelineAIService(
+        paragraph_delay=paragraph_delay, voice=voice, image=media, music=media
+    )
+    start = time.perf_counter()
+    result = await _run_pipeline(service, monkeypatch)
+    elapsed = time.perf_counter() - start
+
+    script = paragraph_delay * (len(PARAGRAPHS) + 1)
+    expected = max(script + voice, media)
+    sequential = script + media
+    print(
+        f"\nspeculative: {elapsed * 1000:.0f}ms (expected ~{expected * 1000:.0f}ms, "
+        f"script-then-parallel {sequential * 1000:.0f}ms)"
+    )
+
+    assert result["errors"] == []
+    assert elapsed < expected + 0.05
+    assert elapsed < sequential
+
+
+async def _keepalive_ai_server(latency: float):
+    """以 asyncio 實作的 HTTP/1.1 keep-alive AI 服務，記錄連線與請求數"""
+    counters = {"connections": 0, "requests": 0}
+    body = json.dumps({"data": {"script": "generated script", "items": []}}).encode()
+    stream_body = (
+        json.dumps({"type": "paragraph", "index": 0, "text": "generated script"})
+        + "\n"
+        + json.dumps({"type": "done", "data": {"script": "generated script"}})
+        + "\n"
+    ).encode()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        counters["connections"] += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                streaming = head.split(b" ", 2)[1].endswith(b"/script/stream")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                counters["requests"] += 1
+                await asyncio.sleep(latency)
+                content = stream_body if streaming else body
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(content)).encode() + b"\r\n\r\n" + content
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, counters
+
+
+class PerCallClient(AIServiceClient):
+    """舊行為：每次呼叫建立新的 httpx.AsyncClient，不合併、不快取"""
+
+    async def _make_request(self, method, endpoint, data, service_name, cacheable=False):
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(f"{self.ai_service_url}{endpoint}", json=data)
+            return AIServiceResponse(
+                success=True, data=response.json().get("data"), service_name=service_name
+            )
+
+    async def stream_script(self, topic, **kwargs):
+        # 舊流程：一次生成完整腳本
+        response = await self._make_request(
+            "POST", "/api/v1/generate/script", {"topic": topic, **kwargs}, "script"
+        )
+        for index, paragraph in enumerate(split_paragraphs(response.data["script"])):
+            yield {"type": "paragraph", "index": index, "text": paragraph}
+        yield {"type": "done", "data": response.data}
+
+
+@pytest.mark.performance
+@pytest.mark.asyncio
+async def test_complete_video_content_latency_under_concurrency(monkeypatch):
+    """100 個並發的 generate_complete_video_content：每次新建連線 vs. 共用連線池"""
+    server, counters = await _keepalive_ai_server(latency=0.005)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    runs = 100
+
+    async def measure(client: AIServiceClient, topics):
+        monkeypatch.setattr(ai_service_client, "_ai_client", client)
+        counters.update(connections=0, requests=0)
+
+        async def one(topic):
+            start = time.perf_counter()
+            result = await generate_complete_video_content(topic)
+            assert result["errors"] == []
+            return time.perf_counter() - start
+
+        latencies = sorted(await asyncio.gather(*(one(topic) for topic in topics)))
+        await client.close()
+        return {
+            "p50": statistics.median(latencies) * 1000,
+            "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+            **counters,
+        }
+
+    distinct = [f"topic-{i}" for i in range(runs)]
+    try:
+        per_call = await measure(PerCallClient(url), distinct)
+        pooled = await measure(AIServiceClient(url), distinct)
+        coalesced = await measure(AIServiceClient(url), ["same topic"] * runs)
+    finally:
+        server.close()
+        await server.wait_closed()
+
+    for name, stats in [("per-call", per_call), ("pooled", pooled), ("coalesced", coalesced)]:
+        print(
+            f"\n{name}: p50 {stats['p50']:.0f}ms, p95 {stats['p95']:.0f}ms, "
+            f"{stats['requests']} requests, {stats['connections']} connections"
+        )
+
+    assert per_call["connections"] == runs * 4
+    # 模擬服務回傳相同腳本，重疊的語音請求會被合併
+    assert runs * 3 < pooled["requests"] <= runs * 4
+    # 圖像、音樂與腳本同時送出，超過 keep-alive 上限的閒置連線會被關閉
+    assert pooled["connections"] < per_call["connections"]
+    assert pooled["p95"] < per_call["p95"]
+    # 腳本串流不合併，圖像、音樂與語音仍合併為各一次
+    assert coalesced["requests"] == runs + 3
+    assert coalesced["p95"] < pooled["p95"]
@@ -0,0 +1,139 @@
+"""
+音頻檔頭探測與串流內容檢查測試
+"""
+
+import json
+import subprocess
+import time
+
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+from src.shared import audio_probe
+from src.shared.audio_probe import AudioProbeError, analyze_content, probe_audio
+
+SR = 22050
+
+
+def _write(path, signal, channels=1, sr=SR, **kwargs):
+    data = np.stack([signal] * channels, axis=1) if channels > 1 else signal
+    sf.write(path, data.astype(np.float32), sr, **kwargs)
+    return str(path)
+
+
+def _tone(seconds, amplitude=0.5, sr=SR):
+    t = np.arange(int(seconds * sr)) / sr
+    return amplitude * np.sin(2 * np.pi * 440 * t)
+
+
+class TestProbeAudio:
+    @pytest.mark.parametrize("extension", ["wav", "flac", "ogg"])
+    def test_reads_header(self, tmp_path, extension):
+        path = _write(tmp_path / f"tone.{extension}", _tone(3.0), channels=2)
+        info = probe_audio(path)
+
+        assert info.duration == pytest.approx(3.0, abs=0.01)
+        assert (info.sample_rate, info.channels) == (SR, 2)
+        assert info.format == extension
+        assert info.bitrate > 0
+
+    def test_accepts_bytes(self, tmp_path):
+        path = _write(tmp_path / "tone.wav", _tone(2.0))
+        with open(path, "rb") as f:
+            info = probe_audio(f.read())
+        assert info.duration == pytest.approx(2.0)
+        assert info.bitrate == pytest.approx(SR * 16, rel=0.01)
+
+    def test_falls_back_to_ffprobe(self, tmp_path, monkeypatch):
+        path = tmp_path / "voice.m4a"
+        path.write_bytes(b"\x00" * 64)
+        output = {
+            "streams": [
+                {"codec_type": "video"},
+                {"codec_type": "audio", "codec_name": "aac", "sample_rate": "44100", "channels": 2},
+            ],
+            "format": {"duration": "12.5", "bit_rate": "128000", "format_name": "mov,mp4,m4a"},
+        }
+
+        def run(cmd, **kwargs):
+            assert cmd[0] == "ffprobe" and cmd[-1] == str(path)
+            return subprocess.CompletedProcess(cmd, 0, stdout=json.dumps(output))
+
+        monkeypatch.setattr(audio_probe.subprocess, "run", run)
+        info = probe_audio(path)
+
+        assert (info.duration, info.sample_rate, info.channels) == (12.5, 44100, 2)
+        assert (info.codec, info.bitrate) == ("aac", 128000)
+
+    def test_unreadable_file_raises(self, tmp_path, monkeypatch):
+        path = tmp_path / "junk.mp3"
+        path.write_bytes(b"not audio" * 100)
+        monkeypatch.setattr(
+            audio_probe.subprocess,
+            "run",
+            lambda cmd, **kwargs: subprocess.CompletedProcess(cmd, 1, stdout=""),
+        )
+        with pytest.raises(AudioProbeError):
+            probe_audio(path)
+
+
+class TestAnalyzeContent:
+    def test_tone_statistics(self, tmp_path):
+        stats = analyze_content(_write(tmp_path / "tone.wav", _tone(3.0)))
+
+        assert stats.rms_energy == pytest.approx(0.5 / np.sqrt(2), rel=0.01)
+        assert stats.peak == pytest.approx(0.5, abs=0.01)
+        assert stats.silence_ratio == 0
+        assert stats.clipping_ratio == 0
+        assert stats.zero_crossing_rate == pytest.approx(2 * 440 / SR, rel=0.02)
+        assert stats.analyzed_seconds == pytest.approx(3.0)
+        assert not stats.sampled
+
+    def test_silence_and_clipping(self, tmp_path):
+        signal = np.concatenate([np.zeros(3 * SR), np.clip(_tone(1.0, amplitude=2.0), -1, 1)])
+        stats = analyze_content(_write(tmp_path / "mixed.wav", signal, channels=2))
+
+        assert stats.silence_ratio == pytest.approx(0.75, abs=0.02)
+        assert 0.1 < stats.clipping_ratio < 0.25
+
+    def test_sampling_bounds_analyzed_audio(self, tmp_path):
+        path = _write(tmp_path / "long.wav", _tone(120.0))
+        stats = analyze_content(path, max_blocks=10)
+
+        assert stats.sampled
+        assert stats.analyzed_seconds == pytest.approx(10.0)
+        assert stats.rms_energy == pytest.approx(analyze_content(path).rms_energy, rel=0.01)
+
+    def test_undecodable_raises(self, tmp_path):
+        path = tmp_path / "junk.wav"
+        path.write_bytes(b"RIFF" + b"\x00" * 10)
+        with pytest.raises(AudioProbeError):
+            analyze_content(path)
+
+
+@pytest.mark.performance
+def test_validation_time_independent_of_length(tmp_path):
+    """10 秒與 10 分鐘檔案：檔頭探測加抽樣內容檢查 vs 原本的 librosa 完整解碼"""
+    timings = {}
+    for seconds in (10, 600):
+        path = _write(tmp_path / f"{seconds}.flac", _tone(seconds), channels=2)
+        if not timings:
+            librosa.load(path, sr=None)  # 預熱
+
+        started = time.perf_counter()
+        probe_audio(path)
+        analyze_content(path, max_blocks=30)
+        probed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        librosa.load(path, sr=None)
+        timings[seconds] = (probed, time.perf_counter() - started)
+
+    for seconds, (probed, decoded) in timings.items():
+        print(
+            f"\n{seconds}s: probe + sampled checks {probed * 1000:.1f}ms, librosa.load {decoded * 1000:.1f}ms"
+        )
+    assert timings[600][0] < timings[600][1] / 3
+    assert timings[600][0] < timings[10][0] * 5
@@ -0,0 +1,120 @@
+"""
+批次寫入測試：executemany 分批與 ON CONFLICT upsert
+"""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.shared.database.bulk import bulk_insert, bulk_upsert
+from src.shared.database.models import APIUsage, Base, TrendTopic
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bulk.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+def _topics(count, platform="tiktok", score=1.0):
+    return [
+        {
+            "category": platform,
+            "title": f"keyword {i}",
+            "trending_score": score,
+            "keywords": ["a", "b"],
+        }
+        for i in range(count)
+    ]
+
+
+async def _scalar(engine, statement):
+    async with engine.connect() as conn:
+        return (await conn.execute(statement)).scalar()
+
+
+class TestBulkInsert:
+    @pytest.mark.asyncio
+    async def test_inserts_in_batches(self, engine):
+        rows = [
+            {
+                "endpoint": f"/api/v1/videos/{i}",
+                "method": "GET",
+                "service_name": "api-gateway",
+                "status_code": 200,
+                "response_time_ms": i,
+            }
+            for i in range(2500)
+        ]
+        assert await bulk_insert(engine, APIUsage, rows, batch_size=1000) == 2500
+        assert await _scalar(engine, select(func.count(APIUsage.id))) == 2500
+        # 未提供的欄位使用資料庫預設值
+        assert await _scalar(engine, select(func.count(APIUsage.created_at))) == 2500
+
+    @pytest.mark.asyncio
+    async def test_rejects_inconsistent_rows(self, engine):
+        with pytest.raises(ValueError):
+            await bulk_insert(engine, TrendTopic, [{"title": "a"}, {"title": "b", "category": "x"}])
+        with pytest.raises(ValueError):
+            await bulk_insert(engine, TrendTopic, [{"title": "a", "missing": 1}])
+        assert await bulk_insert(engine, TrendTopic, []) == 0
+
+    @pytest.mark.asyncio
+    async def test_uses_callers_transaction(self, engine):
+        async with engine.connect() as conn:
+            await bulk_insert(conn, TrendTopic, _topics(10))
+            await conn.rollback()
+        assert await _scalar(engine, select(func.count(TrendTopic.id))) == 0
+
+
+class TestBulkUpsert:
+    @pytest.mark.asyncio
+    async def test_updates_existing_and_inserts_new(self, engine):
+        await bulk_upsert(engine, TrendTopic, _topics(100), ["category", "title"])
+        await bulk_upsert(
+            engine, TrendTopic, _topics(100, platform="youtube"), ["category", "title"]
+        )
+        written = await bulk_upsert(
+            engine, TrendTopic, _topics(150, score=9.0), ["category", "title"], batch_size=40
+        )
+
+        assert written == 150
+        assert await _scalar(engine, select(func.count(TrendTopic.id))) == 250
+        updated = select(func.count()).where(
+            TrendTopic.category == "tiktok", TrendTopic.trending_score == 9.0
+        )
+        assert await _scalar(engine, updated) == 150
+        # ORM 的 onupdate 只在更新時寫入 updated_at
+        assert await _scalar(engine, select(func.count(TrendTopic.updated_at))) == 100
+
+    @pytest.mark.asyncio
+    async def test_duplicate_keys_keep_last_row(self, engine):
+        rows = _topics(3) + _topics(3, score=5.0)
+        assert await bulk_upsert(engine, TrendTopic, rows, ["category", "title"]) == 3
+        scores = select(func.sum(TrendTopic.trending_score))
+        assert await _scalar(engine, scores) == 15.0
+
+    @pytest.mark.asyncio
+    async def test_update_columns_and_do_nothing(self, engine):
+        await bulk_upsert(engine, TrendTopic, _topics(5), ["category", "title"])
+        rows = [{**row, "keywords": ["c"], "trending_score": 2.0} for row in _topics(5)]
+
+        await bulk_upsert(engine, TrendTopic, rows, ["category", "title"], update_columns=[])
+        assert await _scalar(engine, select(func.sum(TrendTopic.trending_score))) == 5.0
+
+        await bulk_upsert(
+            engine, TrendTopic, rows, ["category", "title"], update_columns=["trending_score"]
+        )
+        async with AsyncSession(engine) as session:
+            topic = (await session.scalars(select(TrendTopic).limit(1))).one()
+        assert topic.trending_score == 2.0
+        assert topic.keywords == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_conflict_columns_required(self, engine):
+        with pytest.raises(ValueError):
+            await bulk_upsert(engine, TrendTopic, [{"title": "a"}], ["category", "title"])
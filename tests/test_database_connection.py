@@ -0,0 +1,160 @@
+"""
+資料庫連接池設定檔、讀寫分流與連接池統計測試
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.orm import sessionmaker
+
+from src.shared import db_optimization
+from src.shared.database.connection import (
+    POOL_PROFILES,
+    PoolProfile,
+    ReplicaRouter,
+    build_engine,
+    driver_urls,
+    get_pool_profile,
+)
+from src.shared.db_optimization import get_pool_stats
+
+
+@pytest.fixture(autouse=True)
+def isolated_pool_metrics(monkeypatch):
+    monkeypatch.setattr(db_optimization, "pool_metrics", {})
+
+
+class TestPoolProfile:
+    def test_profile_selected_by_service(self):
+        assert get_pool_profile("api-gateway", env={}) == POOL_PROFILES["api"]
+        assert get_pool_profile("data-ingestion", env={}) == POOL_PROFILES["batch"]
+        assert get_pool_profile(env={"SERVICE_NAME": "video-service"}) == POOL_PROFILES["worker"]
+        assert get_pool_profile("unknown", env={}) == POOL_PROFILES["api"]
+
+    def test_env_overrides(self):
+        profile = get_pool_profile(
+            "api-gateway",
+            env={
+                "DATABASE_POOL_PROFILE": "worker",
+                "DATABASE_POOL_SIZE": "7",
+                "DATABASE_POOL_TIMEOUT": "1.5",
+                "DATABASE_STATEMENT_CACHE_SIZE": "0",
+            },
+        )
+        assert profile.pool_size == 7
+        assert profile.pool_timeout == 1.5
+        assert profile.statement_cache_size == 0
+        assert profile.max_overflow == POOL_PROFILES["worker"].max_overflow
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError):
+            get_pool_profile(env={"DATABASE_POOL_PROFILE": "huge"})
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("sqlite:///./a.db", ("sqlite:///./a.db", "sqlite+aiosqlite:///./a.db")),
+        ("sqlite+aiosqlite:///./a.db", ("sqlite:///./a.db", "sqlite+aiosqlite:///./a.db")),
+        (
+            "postgresql://u:p@db/app",
+            ("postgresql://u:p@db/app", "postgresql+asyncpg://u:p@db/app"),
+        ),
+        (
+            "postgresql+asyncpg://u:p@db/app",
+            ("postgresql://u:p@db/app", "postgresql+asyncpg://u:p@db/app"),
+        ),
+        ("mysql://u:p@db/app", ("mysql://u:p@db/app", "mysql://u:p@db/app")),
+    ],
+)
+def test_driver_urls(url, expected):
+    assert driver_urls(url) == expected
+
+
+class TestPoolMetrics:
+    def test_wait_hold_and_timeouts(self, tmp_path):
+        profile = PoolProfile(pool_size=1, max_overflow=0, pool_timeout=0.5)
+        engine = build_engine(f"sqlite:///{tmp_path / 'pool.db'}", profile, "primary")
+
+        conn = engine.connect()
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+        # 另一執行緒等待約 0.2 秒後才拿到被歸還的連接
+        def checkout():
+            with engine.connect() as other:
+                other.execute(text("SELECT 1"))
+
+        thread = threading.Thread(target=checkout)
+        thread.start()
+        time.sleep(0.2)
+        conn.close()
+        thread.join()
+
+        stats = get_pool_stats()["primary"]
+        assert stats["timeouts"] == 1
+        assert stats["checkouts"] == 2
+        assert 0.15 <= stats["wait"]["max"] < 0.5
+        assert stats["hold"]["max"] >= 0.7
+        assert stats["size"] == 1
+        assert stats["checkedout"] == 0
+
+        engine.dispose()
+        with engine.connect():
+            assert get_pool_stats()["primary"]["checkedout"] == 1
+        assert get_pool_stats()["primary"]["checkouts"] == 3
+        engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_async_pool_wait(self, tmp_path):
+        profile = PoolProfile(pool_size=2, max_overflow=0)
+        engine = build_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", profile, "primary_async", is_async=True
+        )
+
+        async def query():
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(*(query() for _ in range(6)))
+        await engine.dispose()
+
+        stats = get_pool_stats()["primary_async"]
+        assert stats["checkouts"] == 6
+        # 6 個查詢共用 2 個連接，最後一批至少等待前兩批
+        assert stats["wait"]["max"] >= 0.09
+
+
+class TestReplicaRouter:
+    def test_reads_round_robin_and_writes_go_to_primary(self, tmp_path):
+        engines = []
+        for name in ("primary", "replica_1", "replica_2"):
+            engine = build_engine(f"sqlite:///{tmp_path / name}.db", POOL_PROFILES["api"], name)
+            with engine.begin() as conn:
+                conn.execute(text("CREATE TABLE node (name TEXT)"))
+                conn.execute(text("INSERT INTO node VALUES (:name)"), {"name": name})
+            engines.append(engine)
+
+        primary, *replicas = [sessionmaker(bind=engine) for engine in engines]
+        router = ReplicaRouter(primary, replicas)
+
+        def node(session):
+            with session:
+                return session.execute(text("SELECT name FROM node")).scalar()
+
+        assert [node(router.read()) for _ in range(4)] == [
+            "replica_1",
+            "replica_2",
+            "replica_1",
+            "replica_2",
+        ]
+        assert node(router.write()) == "primary"
+        assert node(ReplicaRouter(primary, []).read()) == "primary"
+        assert set(get_pool_stats()) == {"primary", "replica_1", "replica_2"}
+
+        for engine in engines:
+            engine.dispose()
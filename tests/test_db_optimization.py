@@ -0,0 +1,174 @@
+"""
+查詢統計測試
+固定記憶體的查詢指紋直方圖、慢查詢 Top-K、參數取樣與 SQLAlchemy 事件掛鉤
+"""
+
+import random
+import statistics
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.shared import db_optimization
+from src.shared.db_optimization import (
+    LatencyHistogram,
+    QueryStats,
+    get_query_stats,
+    instrument_engine,
+    monitor_query,
+    normalize_query,
+    query_fingerprint,
+)
+
+
+class TestNormalizeQuery:
+    def test_literals_and_parameters_share_fingerprint(self):
+        queries = [
+            "SELECT * FROM users WHERE id = 1 AND email = 'a@b.c'",
+            "select * from users  where id = 42\nAND email = 'it''s'",
+            "SELECT * FROM users WHERE id = :id AND email = :email -- lookup",
+            "SELECT * FROM users WHERE id = %(id)s AND email = %s",
+            "SELECT * FROM users WHERE id = $1 AND email = $2",
+        ]
+        normalized = {normalize_query(query) for query in queries[2:]}
+
+        assert normalized == {"SELECT * FROM users WHERE id = ? AND email = ?"}
+        assert normalize_query(queries[0]) == "SELECT * FROM users WHERE id = ? AND email = ?"
+
+    def test_in_lists_collapse_and_casts_are_kept(self):
+        assert normalize_query("SELECT a FROM t WHERE b IN (1, 2, 3)") == normalize_query(
+            "SELECT a FROM t WHERE b IN (4)"
+        )
+        assert (
+            normalize_query("SELECT x::text, t1.col2 FROM t1") == "SELECT x::text, t1.col2 FROM t1"
+        )
+
+
+class TestLatencyHistogram:
+    def test_percentiles_within_precision(self):
+        rng = random.Random(1)
+        values = [rng.lognormvariate(-5, 1.5) for _ in range(20000)]
+        histogram = LatencyHistogram(precision=0.02)
+        for value in values:
+            histogram.record(value)
+
+        ordered = sorted(values)
+        for percent in (50, 95, 99):
+            exact = ordered[int(len(ordered) * percent / 100) - 1]
+            assert histogram.percentile(percent) == pytest.approx(exact, rel=0.03)
+        assert histogram.percentile(100) == max(values)
+        assert len(histogram.counts) <= histogram.bucket_count
+
+    def test_empty(self):
+        assert LatencyHistogram().percentile(99) == 0.0
+
+
+class TestQueryStats:
+    def test_per_fingerprint_percentiles(self):
+        stats = QueryStats()
+        for i in range(100):
+            stats.add_query(f"SELECT * FROM videos WHERE id = {i}", 0.001 * (i + 1))
+        stats.add_query("SELECT count(*) FROM users", 0.5)
+
+        result = stats.get_stats()
+        videos, users = result["statements"]
+        assert result["total_queries"] == 101
+        assert videos["query"] == "SELECT * FROM videos WHERE id = ?"
+        assert videos["fingerprint"] == query_fingerprint(videos["query"])
+        assert videos["count"] == 100
+        assert videos["p50"] == pytest.approx(0.050, rel=0.03)
+        assert videos["p95"] == pytest.approx(0.095, rel=0.03)
+        assert videos["p99"] == pytest.approx(0.099, rel=0.03)
+        assert users["p99"] == pytest.approx(0.5)
+
+    def test_memory_is_bounded(self):
+        stats = QueryStats(max_statements=50, top_k=5, params_sample_size=3)
+        for i in range(4000):
+            stats.add_query(
+                f"SELECT * FROM table_{i // 20} WHERE id = {i}", 2.0 + i / 1000, {"id": i}
+            )
+
+        assert len(stats.statements) == 50
+        assert stats.evicted_statements == 150
+        assert all(len(s.params_samples) == 3 for s in stats.statements.values())
+
+        slowest = stats.get_slow_queries()
+        assert [q["duration"] for q in slowest] == [2.0 + i / 1000 for i in range(3999, 3994, -1)]
+        assert stats.get_stats()["slow_queries"] == 4000
+
+    def test_params_are_sampled_uniformly(self):
+        random.seed(0)
+        stats = QueryStats(params_sample_size=10)
+        for i in range(10000):
+            stats.add_query("SELECT 1 WHERE x = :x", 0.001, {"x": i})
+
+        sample = [
+            int(p.split(": ")[1].rstrip("}"))
+            for p in stats.get_stats()["statements"][0]["params_samples"]
+        ]
+        assert len(sample) == 10
+        # 均勻取樣應分散於整個範圍，而非只保留最早的參數
+        assert max(sample) > 5000
+
+    @pytest.mark.asyncio
+    async def test_engine_events_capture_every_query(self, monkeypatch):
+        monkeypatch.setattr(db_optimization, "query_stats", QueryStats())
+        engine = instrument_engine(create_engine("sqlite://"))
+        instrument_engine(engine)
+
+        with engine.connect() as conn:
+            conn.execute(text("CREATE TABLE items (id INTEGER, name TEXT)"))
+            for i in range(10):
+                conn.execute(text("INSERT INTO items VALUES (:id, :name)"), {"id": i, "name": "x"})
+            conn.execute(text("SELECT name FROM items WHERE id = 3"))
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT missing FROM items"))
+        engine.dispose()
+
+        result = await get_query_stats()
+        inserts = next(s for s in result["statements"] if s["query"].startswith("INSERT"))
+        assert result["total_queries"] == 12
+        assert inserts["count"] == 10
+        assert inserts["params_samples"][0] == repr((0, "x"))
+
+    @pytest.mark.asyncio
+    async def test_monitored_queries_are_not_double_counted(self, monkeypatch):
+        monkeypatch.setattr(db_optimization, "query_stats", QueryStats())
+        engine = instrument_engine(create_engine("sqlite://"))
+
+        @monitor_query
+        async def load_items():
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+        await load_items()
+        await load_items()
+        engine.dispose()
+
+        result = await get_query_stats()
+        # 語句只由 engine 事件記錄一次；具名計時另存於 timers
+        assert result["total_queries"] == 4
+        assert all(s["query"] != "load_items" for s in result["statements"])
+        assert result["timers"]["load_items"]["count"] == 2
+
+
+@pytest.mark.performance
+def test_get_stats_cost_does_not_grow_with_query_count():
+    """舊實作每次 get_stats 都重算整個查詢列表；新實作只與指紋數量有關"""
+    stats = QueryStats()
+    timings = []
+    for total in (10_000, 100_000):
+        while stats.total_queries < total:
+            stats.add_query(f"SELECT * FROM t{stats.total_queries % 20} WHERE id = 1", 0.001)
+        runs = []
+        for _ in range(20):
+            start = time.perf_counter()
+            stats.get_stats()
+            runs.append(time.perf_counter() - start)
+        timings.append(statistics.median(runs))
+
+    print(f"\nget_stats at 10k: {timings[0] * 1000:.2f}ms, at 100k: {timings[1] * 1000:.2f}ms")
+    assert timings[1] < timings[0] * 3
+    assert len(stats.statements) == 20
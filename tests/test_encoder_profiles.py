@@ -0,0 +1,143 @@
+"""
+編碼器設定檔與 preset 校準測試
+
+以假的 ffmpeg 腳本模擬各 preset 的編碼時間與輸出大小。
+"""
+
+import json
+import sys
+import textwrap
+
+import pytest
+
+from src.shared import encoder_profiles
+from src.shared.encoder_profiles import (
+    EncoderCalibrationError,
+    EncoderRegistry,
+    PresetMeasurement,
+    parse_bitrate,
+    select_preset,
+)
+from src.shared.video_processor import VideoProcessor, VideoQuality
+
+# 10 秒 30fps 的校準：越慢的 preset 編碼越久、檔案越小
+FAKE_FFMPEG = textwrap.dedent("""\
+    import sys, time
+
+    args = sys.argv[1:]
+    preset = args[args.index("-preset") + 1]
+    if preset == "placebo":
+        sys.stderr.write("Unknown preset\\n")
+        sys.exit(1)
+    seconds, size = {
+        "ultrafast": (0.0, 6_250_000),
+        "veryfast": (0.05, 5_000_000),
+        "fast": (0.6, 3_750_000),
+        "medium": (1.0, 3_125_000),
+    }[preset]
+    time.sleep(seconds)
+    with open(args[-1], "wb") as f:
+        f.write(b"\\0" * size)
+    """)
+
+PRESETS = ("ultrafast", "veryfast", "fast", "medium")
+
+
+@pytest.fixture
+def ffmpeg(tmp_path):
+    script = tmp_path / "ffmpeg"
+    script.write_text(f"#!{sys.executable}\n{FAKE_FFMPEG}")
+    script.chmod(0o755)
+    return str(script)
+
+
+@pytest.fixture
+def registry(tmp_path, ffmpeg):
+    return EncoderRegistry(calibration_path=str(tmp_path / "calibration.json"), ffmpeg_path=ffmpeg)
+
+
+def test_static_profiles_without_calibration(registry):
+    profile = registry.profile(VideoQuality.ULTRA)
+    assert (profile.resolution, profile.preset, profile.crf) == ("3840x2160", "slow", 18)
+    assert not profile.calibrated
+
+    tiktok = registry.profile("low", "tiktok")
+    assert (tiktok.resolution, tiktok.video_bitrate, tiktok.crf) == ("1080x1920", "3000k", 28)
+    # 所有渲染路徑使用相同的參數名稱（不再有 -cr）
+    assert tiktok.video_args() == ["-c:v", "libx264", "-preset", "fast", "-crf", "28"]
+
+    assert registry.profile("unknown").quality == "high"
+    with pytest.raises(ValueError):
+        registry.profile("high", "myspace")
+
+
+def test_select_fastest_preset_within_budget_and_deadline():
+    measurements = [
+        PresetMeasurement("ultrafast", 400.0, 6_000_000),
+        PresetMeasurement("veryfast", 200.0, 4_000_000),
+        PresetMeasurement("fast", 90.0, 3_000_000),
+        PresetMeasurement("medium", 40.0, 2_500_000),
+    ]
+    pick = lambda budget, speed: select_preset(measurements, 30, budget, speed).preset  # noqa: E731
+
+    assert pick(5_000_000, 1.0) == "veryfast"
+    assert pick(3_000_000, 1.0) == "fast"
+    assert pick(3_000_000, 2.0) == "fast"
+    # 時限內沒有符合碼率的 preset：改挑時限內碼率最低者
+    assert pick(3_000_000, 5.0) == "veryfast"
+    # 全部太慢時挑最快者
+    assert pick(3_000_000, 100.0) == "ultrafast"
+    assert select_preset([], 30, 1, 1.0) is None
+    assert parse_bitrate("3000k") == 3_000_000 and parse_bitrate("8M") == 8_000_000
+
+
+def test_calibration_selects_and_persists_per_host(registry, tmp_path, monkeypatch):
+    results = registry.calibrate("high", "tiktok", presets=PRESETS, seconds=10.0)
+
+    assert [m.preset for m in results] == list(PRESETS)
+    assert [m.bitrate for m in results] == [5_000_000, 4_000_000, 3_000_000, 2_500_000]
+    assert results[1].encode_fps > results[2].encode_fps > results[3].encode_fps
+
+    # tiktok 上限 3000k：最快的合格 preset 是 fast
+    profile = registry.profile("high", "tiktok")
+    assert (profile.preset, profile.crf, profile.calibrated) == ("fast", 20, True)
+    # 60 秒影片只有 2 秒可渲染（需要 900 fps）：只有 ultrafast/veryfast 夠快
+    assert registry.profile("high", "tiktok", duration=60, deadline=2).preset == "veryfast"
+    # 其他解析度尚未校準
+    assert not registry.profile("high", "youtube").calibrated
+
+    reloaded = EncoderRegistry(calibration_path=registry.calibration_path)
+    assert reloaded.profile("high", "tiktok").preset == "fast"
+
+    monkeypatch.setattr(encoder_profiles, "host_fingerprint", lambda: "other-host")
+    other_host = EncoderRegistry(calibration_path=registry.calibration_path)
+    assert other_host.profile("high", "tiktok").preset == "medium"
+
+    data = json.loads(registry.calibration_path.read_text())
+    assert list(data["results"]) == ["libx264:1080x1920@30:crf20"]
+
+
+def test_failed_calibration_encode_raises(registry):
+    with pytest.raises(EncoderCalibrationError, match="Unknown preset"):
+        registry.calibrate("high", presets=["placebo"])
+    assert not registry.calibration_path.exists()
+
+
+def test_video_processor_uses_shared_profiles(registry, ffmpeg, tmp_path, monkeypatch):
+    monkeypatch.setenv("FFMPEG_PATH", ffmpeg)
+    monkeypatch.setattr(encoder_profiles, "_registry", registry)
+    processor = VideoProcessor(output_dir=str(tmp_path / "out"), temp_dir=str(tmp_path / "tmp"))
+
+    assert processor._get_quality_settings(VideoQuality.HIGH) == {
+        "video_bitrate": "3000k",
+        "audio_bitrate": "192k",
+        "scale": "scale=1920:1080",
+        "preset": "medium",
+        "crf": "20",
+    }
+
+    registry.calibrate("high", presets=PRESETS, seconds=10.0)
+    assert processor._get_quality_settings(VideoQuality.HIGH)["preset"] == "fast"
+    registry.calibrate("low", presets=PRESETS, seconds=10.0)
+    # 480p 上限 500k：沒有 preset 符合，挑碼率最低者
+    assert processor._get_quality_settings(VideoQuality.LOW)["preset"] == "medium"
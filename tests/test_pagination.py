@@ -0,0 +1,145 @@
+"""
+Keyset 分頁與影片/任務查詢索引測試
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from src.shared.database.models import (
+    TASK_PENDING_STATUSES,
+    VIDEO_FINISHED_STATUSES,
+    Base,
+    ProcessingTask,
+    Video,
+    VideoStatus,
+)
+from src.shared.database.pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+    keyset_paginate,
+)
+
+START = datetime(2026, 1, 1)
+SORT_COLUMNS = [Video.created_at, Video.id]
+
+
+def _video_rows(count: int, users: int = 1, same_second: int = 1):
+    statuses = list(VideoStatus)
+    return [
+        {
+            "user_id": i % users + 1,
+            "title": f"video {i}",
+            "topic": "topic",
+            "status": statuses[i % len(statuses)],
+            # same_second 筆資料共用同一建立時間，驗證以 id 打破平手
+            "created_at": START + timedelta(seconds=i // same_second),
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def _list_all(session: Session, user_id: int, limit: int):
+    pages, cursor = [], None
+    while True:
+        query = session.query(Video).filter(Video.user_id == user_id)
+        rows = keyset_paginate(query, SORT_COLUMNS, cursor, limit).all()
+        videos, cursor = keyset_page(rows, SORT_COLUMNS, limit)
+        pages.append([video.id for video in videos])
+        if cursor is None:
+            return pages
+
+
+class TestKeysetPagination:
+    def test_walks_every_row_once_in_order(self, engine):
+        with Session(engine) as session:
+            session.execute(insert(Video), _video_rows(95, users=2, same_second=3))
+            session.commit()
+
+            pages = _list_all(session, user_id=1, limit=10)
+            expected = [
+                video.id
+                for video in session.query(Video)
+                .filter(Video.user_id == 1)
+                .order_by(Video.created_at.desc(), Video.id.desc())
+            ]
+
+        assert [len(page) for page in pages] == [10, 10, 10, 10, 8]
+        assert [video_id for page in pages for video_id in page] == expected
+
+    def test_works_with_select_statements(self, engine):
+        with Session(engine) as session:
+            session.execute(insert(Video), _video_rows(5))
+            session.commit()
+
+            statement = keyset_paginate(select(Video), SORT_COLUMNS, None, 2, descending=False)
+            rows = session.scalars(statement).all()
+            first, cursor = keyset_page(rows, SORT_COLUMNS, 2)
+            statement = keyset_paginate(select(Video), SORT_COLUMNS, cursor, 2, descending=False)
+            second, _ = keyset_page(session.scalars(statement).all(), SORT_COLUMNS, 2)
+
+        assert [video.id for video in first + second] == [1, 2, 3, 4]
+
+    def test_cursor_round_trip(self):
+        values = [datetime(2026, 5, 1, 12, 30, 15, 250), 42]
+        assert decode_cursor(encode_cursor(values)) == values
+
+    @pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor.__name__, "e30"])
+    def test_invalid_cursor(self, cursor):
+        with pytest.raises(InvalidCursorError):
+            keyset_paginate(select(Video), SORT_COLUMNS, cursor, 10)
+
+
+class TestQueryIndexes:
+    def _plan(self, engine, statement) -> str:
+        compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").fetchall()
+        return " | ".join(row[-1] for row in rows)
+
+    def test_hot_queries_use_indexes(self, engine):
+        listing = keyset_paginate(
+            select(Video).where(Video.user_id == 1),
+            SORT_COLUMNS,
+            encode_cursor([START, 10]),
+            20,
+        )
+        dashboard = select(Video.id).where(
+            Video.user_id == 1, Video.status == VideoStatus.COMPLETED
+        )
+        # 部分索引只在查詢包含相同條件時可用
+        in_progress = (
+            select(Video.id)
+            .where(Video.status.notin_(VIDEO_FINISHED_STATUSES))
+            .order_by(Video.created_at)
+        )
+        task_polling = (
+            select(ProcessingTask.id)
+            .where(ProcessingTask.status.in_(TASK_PENDING_STATUSES))
+            .order_by(ProcessingTask.created_at)
+            .limit(10)
+        )
+        video_tasks = (
+            select(ProcessingTask.id)
+            .where(ProcessingTask.video_id == 1)
+            .order_by(ProcessingTask.created_at)
+        )
+
+        assert "ix_videos_user_created" in self._plan(engine, listing)
+        assert "ix_videos_user_status" in self._plan(engine, dashboard)
+        assert "ix_videos_in_progress" in self._plan(engine, in_progress)
+        assert "ix_processing_tasks_pending" in self._plan(engine, task_polling)
+        assert "ix_processing_tasks_video_created" in self._plan(engine, video_tasks)
+        assert "TEMP B-TREE" not in self._plan(engine, listing)
@@ -0,0 +1,297 @@
+"""
+服務間通訊客戶端測試
+滑動視窗錯誤率熔斷器、半開探測並發上限、重試預算與截止時間傳遞
+"""
+
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from fastapi import FastAPI
+
+from src.shared import service_client, service_discovery
+from src.shared.service_client import (
+    DEADLINE_HEADER,
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitBreakerOpenError,
+    CircuitBreakerState,
+    DeadlineExceededError,
+    DeadlineMiddleware,
+    HTTPError,
+    RetryConfig,
+    ServiceClient,
+    get_remaining_time,
+    request_deadline,
+)
+from src.shared.service_discovery import ServiceDiscovery, ServiceStatus
+
+
+async def _succeed():
+    return "ok"
+
+
+async def _fail():
+    raise HTTPError(503, "HTTP 503: unavailable")
+
+
+async def _reject():
+    raise HTTPError(404, "HTTP 404: not found")
+
+
+async def _run(breaker: CircuitBreaker, func):
+    try:
+        return await breaker.call(func)
+    except (HTTPError, CircuitBreakerOpenError) as e:
+        return e
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_trips_on_error_rate_not_failure_count(self):
+        breaker = CircuitBreaker(CircuitBreakerConfig(failure_threshold=5))
+
+        # 40% 錯誤率：失敗次數雖超過閾值仍不熔斷
+        for _ in range(10):
+            for func in (_succeed, _fail, _succeed, _fail, _succeed):
+                await _run(breaker, func)
+        assert breaker.state == CircuitBreakerState.CLOSED
+        assert breaker.error_rate == pytest.approx(0.4)
+
+        for _ in range(20):
+            await _run(breaker, _fail)
+        assert breaker.state == CircuitBreakerState.OPEN
+        assert isinstance(await _run(breaker, _succeed), CircuitBreakerOpenError)
+
+    @pytest.mark.asyncio
+    async def test_client_errors_do_not_count(self):
+        breaker = CircuitBreaker(CircuitBreakerConfig(failure_threshold=3))
+        for _ in range(10):
+            assert isinstance(await _run(breaker, _reject), HTTPError)
+
+        assert breaker.state == CircuitBreakerState.CLOSED
+        assert breaker.error_rate == 0.0
+
+    @pytest.mark.asyncio
+    async def test_old_failures_leave_the_window(self):
+        breaker = CircuitBreaker(CircuitBreakerConfig(failure_threshold=3, window_seconds=0.1))
+        for _ in range(2):
+            await _run(breaker, _fail)
+        await asyncio.sleep(0.15)
+        await _run(breaker, _fail)
+
+        assert breaker.state == CircuitBreakerState.CLOSED
+        assert breaker.failure_count == 1
+
+    @pytest.mark.asyncio
+    async def test_half_open_limits_concurrent_probes(self):
+        config = CircuitBreakerConfig(
+            failure_threshold=1, recovery_timeout=0.05, success_threshold=2, half_open_max_calls=1
+        )
+        breaker = CircuitBreaker(config)
+        await _run(breaker, _fail)
+        assert breaker.state == CircuitBreakerState.OPEN
+        await asyncio.sleep(0.06)
+
+        calls = []
+
+        async def slow_probe():
+            calls.append("probe")
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        results = await asyncio.gather(*(_run(breaker, slow_probe) for _ in range(5)))
+        assert calls == ["probe"]
+        assert results.count("ok") == 1
+        assert breaker.state == CircuitBreakerState.HALF_OPEN
+
+        assert await _run(breaker, _succeed) == "ok"
+        assert breaker.state == CircuitBreakerState.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(CircuitBreakerConfig(failure_threshold=1, recovery_timeout=0.05))
+        await _run(breaker, _fail)
+        await asyncio.sleep(0.06)
+
+        await _run(breaker, _fail)
+        assert breaker.state == CircuitBreakerState.OPEN
+        assert breaker.half_open_calls == 0
+        assert isinstance(await _run(breaker, _succeed), CircuitBreakerOpenError)
+
+
+class FakeService:
+    """以 aiohttp 實作的下游服務，記錄每次請求收到的截止時間標頭"""
+
+    def __init__(self, status: int = 200, latency: float = 0.0):
+        self.status = status
+        self.latency = latency
+        self.deadlines = []
+
+    async def handler(self, request: web.Request) -> web.Response:
+        self.deadlines.append(request.headers.get(DEADLINE_HEADER))
+        await asyncio.sleep(self.latency)
+        return web.json_response({"status": self.status}, status=self.status)
+
+
+@pytest_asyncio.fixture
+async def fake_service(monkeypatch):
+    service = FakeService()
+    app = web.Application()
+    app.router.add_route("*", "/{path:.*}", service.handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    discovery = ServiceDiscovery()
+    await discovery.register_service("fake", "127.0.0.1", port)
+    for instance in discovery.registry._services["fake"]:
+        instance.status = ServiceStatus.HEALTHY
+    monkeypatch.setattr(service_discovery, "_service_discovery", discovery)
+
+    yield service
+    await runner.cleanup()
+
+
+def _service_client(**retry) -> ServiceClient:
+    return ServiceClient(
+        "fake",
+        retry_config=RetryConfig(initial_delay=0, jitter=False, **retry),
+        circuit_breaker_config=CircuitBreakerConfig(failure_threshold=1000),
+    )
+
+
+class TestServiceClient:
+    @pytest.mark.asyncio
+    async def test_retry_budget_caps_retries_during_outage(self, fake_service):
+        fake_service.status = 503
+        client = _service_client(max_attempts=3, budget_min_retries=3)
+        for _ in range(20):
+            with pytest.raises(HTTPError):
+                await client.get("/api")
+        await client.close()
+
+        # 沒有預算時會送出 60 個請求；預算只允許 3 次重試
+        assert len(fake_service.deadlines) == 23
+        metrics = client.get_metrics()
+        assert metrics["retries"] == 3
+        assert metrics["retries_rejected"] == 19
+
+    @pytest.mark.asyncio
+    async def test_retry_budget_grows_with_successful_traffic(self, fake_service):
+        client = _service_client(max_attempts=2, budget_min_retries=0, budget_ratio=0.1)
+        for _ in range(30):
+            await client.get("/api")
+
+        fake_service.status = 503
+        for _ in range(5):
+            with pytest.raises(HTTPError):
+                await client.get("/api")
+        await client.close()
+
+        assert client.get_metrics()["retries"] == 3
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self, fake_service):
+        fake_service.status = 404
+        client = _service_client()
+        with pytest.raises(HTTPError):
+            await client.get("/missing")
+        await client.close()
+
+        assert len(fake_service.deadlines) == 1
+        assert client.circuit_breaker.error_rate == 0.0
+
+    @pytest.mark.asyncio
+    async def test_deadline_header_is_propagated(self, fake_service):
+        client = ServiceClient("fake", timeout=30.0)
+        await client.get("/api")
+        await client.get("/api", timeout=2.0)
+        with request_deadline(1.0):
+            # 巢狀呼叫不能延長已繼承的截止時間
+            await client.get("/api", timeout=5.0)
+        await client.close()
+
+        first, second, nested = (int(value) for value in fake_service.deadlines)
+        assert first == 30000
+        assert 1900 < second <= 2000
+        assert 900 < nested <= 1000
+
+    @pytest.mark.asyncio
+    async def test_no_retry_after_deadline(self, fake_service):
+        fake_service.status = 503
+        client = ServiceClient(
+            "fake",
+            retry_config=RetryConfig(initial_delay=0.5, jitter=False),
+            circuit_breaker_config=CircuitBreakerConfig(failure_threshold=1000),
+        )
+        with pytest.raises(DeadlineExceededError):
+            await client.get("/api", timeout=0.2)
+
+        fake_service.status = 200
+        fake_service.latency = 0.5
+        with pytest.raises(DeadlineExceededError):
+            await client.get("/slow", timeout=0.1)
+        await client.close()
+
+        assert len(fake_service.deadlines) == 2
+        assert client.get_metrics()["deadline_exceeded"] == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_deadline_is_not_sent(self, fake_service, monkeypatch):
+        client = ServiceClient("fake")
+        real_remaining = service_client.get_remaining_time
+        # 選擇實例後才逾時：發送前再次檢查，不送出請求
+        calls = iter([1.0, 0.0])
+        monkeypatch.setattr(service_client, "get_remaining_time", lambda: next(calls))
+        with pytest.raises(DeadlineExceededError):
+            await client.get("/api")
+
+        monkeypatch.setattr(service_client, "get_remaining_time", real_remaining)
+        with request_deadline(0.5):
+            await client.get("/api")
+        await client.close()
+
+        # 下游只收到第二個請求
+        assert len(fake_service.deadlines) == 1
+        assert 0 < int(fake_service.deadlines[0]) <= 500
+
+
+def _deadline_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware)
+    app.state.calls = 0
+
+    @app.get("/work")
+    async def work():
+        app.state.calls += 1
+        return {"remaining": get_remaining_time()}
+
+    return app
+
+
+class TestDeadlineMiddleware:
+    @pytest.mark.asyncio
+    async def test_sets_request_deadline(self):
+        app = _deadline_app()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://service") as client:
+            with_deadline = await client.get("/work", headers={DEADLINE_HEADER: "1500"})
+            without = await client.get("/work")
+
+        assert 1.4 < with_deadline.json()["remaining"] <= 1.5
+        assert without.json()["remaining"] is None
+
+    @pytest.mark.asyncio
+    async def test_expired_request_is_skipped(self):
+        app = _deadline_app()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://service") as client:
+            response = await client.get("/work", headers={DEADLINE_HEADER: "0"})
+
+        assert response.status_code == 504
+        assert app.state.calls == 0
@@ -0,0 +1,371 @@
+"""
+FFmpeg 渲染工作測試：進度串流、取消、逾時與併發限制
+
+以假的 ffmpeg 腳本模擬 -progress pipe:1 輸出，透過 FFMPEG_PATH 注入。
+"""
+
+import asyncio
+import json
+import sys
+import textwrap
+import time
+
+import pytest
+
+from src.shared.video_processor import (
+    RenderCancelledError,
+    RenderError,
+    RenderJob,
+    RenderTimeoutError,
+    VideoProcessor,
+    VideoQuality,
+    get_ffmpeg_limiter,
+)
+
+FAKE_FFMPEG = textwrap.dedent("""\
+    import json, os, sys, time
+
+    args = sys.argv[1:]
+    mode = os.environ.get("FAKE_FFMPEG_MODE", "ok")
+    if "-progress" not in args:
+        # 探測時長：ffmpeg -i 沒有輸出檔時印出檔頭後以錯誤結束
+        sys.stderr.write("Input #0, mov,mp4\\n  Duration: 00:00:04.00, start: 0.000000\\n")
+        sys.exit(1)
+
+    args_log = os.environ.get("FAKE_FFMPEG_ARGS_LOG")
+    if args_log:
+        entry = {"args": args}
+        if "concat" in args:
+            with open(args[args.index("concat") + 4]) as f:
+                entry["concat"] = f.read()
+        with open(args_log, "a") as f:
+            f.write(json.dumps(entry) + "\\n")
+
+    log = os.environ.get("FAKE_FFMPEG_LOG")
+    if log:
+        with open(log, "a") as f:
+            f.write(f"start {time.monotonic()}\\n")
+
+    if mode == "fail":
+        for i in range(20000):
+            sys.stderr.write(f"[libx264] verbose line {i}\\n")
+        sys.stderr.write("Conversion failed!\\n")
+        sys.exit(1)
+
+    steps = int(os.environ.get("FAKE_FFMPEG_STEPS", "4"))
+    for step in range(1, steps + 1):
+        time.sleep(float(os.environ.get("FAKE_FFMPEG_STEP_SECONDS", "0.02")))
+        sys.stdout.write(
+            f"frame={step * 30}\\nfps=60.0\\ntotal_size={step * 1000}\\n"
+            f"out_time_us={step * 1_000_000}\\nout_time=00:00:0{step}.000000\\n"
+            f"speed={2.5 if step > 1 else 'N/A'}x\\n"
+            f"progress={'end' if step == steps and mode == 'ok' else 'continue'}\\n"
+        )
+        sys.stdout.flush()
+
+    if mode == "hang":
+        time.sleep(60)
+
+    with open(args[-1], "wb") as f:
+        f.write(b"video")
+    if log:
+        with open(log, "a") as f:
+            f.write(f"end {time.monotonic()}\\n")
+    """)
+
+
+@pytest.fixture
+def ffmpeg(tmp_path, monkeypatch):
+    script = tmp_path / "ffmpeg"
+    script.write_text(f"#!{sys.executable}\n{FAKE_FFMPEG}")
+    script.chmod(0o755)
+    monkeypatch.setenv("FFMPEG_PATH", str(script))
+    return str(script)
+
+
+@pytest.fixture
+def processor(ffmpeg, tmp_path):
+    return VideoProcessor(output_dir=str(tmp_path / "out"), temp_dir=str(tmp_path / "tmp"))
+
+
+@pytest.mark.asyncio
+async def test_progress_stream_and_atomic_output(ffmpeg, tmp_path):
+    output = tmp_path / "out.mp4"
+    job = RenderJob(ffmpeg, ["-i", "in.png"], output, total_duration=4.0)
+
+    updates = [progress async for progress in job]
+
+    assert [p.percent for p in updates] == [25.0, 50.0, 75.0, 100.0]
+    assert [p.frame for p in updates] == [30, 60, 90, 120]
+    assert updates[0].speed is None and updates[1].speed == 2.5
+    assert updates[-1].done and updates[-1].out_time == 4.0
+    assert output.read_bytes() == b"video"
+    assert not job.partial_path.exists()
+    assert job.command[-1] == str(job.partial_path)
+
+
+@pytest.mark.asyncio
+async def test_failure_keeps_only_stderr_tail(ffmpeg, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG_MODE", "fail")
+    job = RenderJob(ffmpeg, [], tmp_path / "out.mp4", description="Video creation")
+
+    with pytest.raises(RenderError, match="Conversion failed!") as excinfo:
+        await job.run()
+
+    assert len(job.stderr_tail) == RenderJob.STDERR_TAIL_LINES
+    assert "verbose line 19951" in str(excinfo.value)
+    assert "verbose line 100\n" not in str(excinfo.value)
+    assert job.returncode == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_terminates_ffmpeg(ffmpeg, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG_MODE", "hang")
+    output = tmp_path / "out.mp4"
+    job = RenderJob(ffmpeg, [], output, total_duration=4.0)
+
+    async def cancel_after_progress(progress):
+        if progress.frame >= 60:
+            job.cancel()
+
+    started = time.monotonic()
+    with pytest.raises(RenderCancelledError):
+        await job.run(on_progress=cancel_after_progress)
+
+    assert time.monotonic() - started < 5
+    assert job.progress.percent == 50.0
+    assert not output.exists() and not job.partial_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_timeout_and_task_cancellation(ffmpeg, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG_MODE", "hang")
+
+    with pytest.raises(RenderTimeoutError):
+        await RenderJob(ffmpeg, [], tmp_path / "a.mp4", timeout=0.3).run()
+
+    # 呼叫端取消任務時也會結束 FFmpeg
+    job = RenderJob(ffmpeg, [], tmp_path / "b.mp4")
+    task = asyncio.create_task(job.run())
+    await asyncio.sleep(0.3)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert not job.partial_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_global_limiter_bounds_concurrent_ffmpeg(ffmpeg, tmp_path, monkeypatch):
+    log = tmp_path / "ffmpeg.log"
+    monkeypatch.setenv("FAKE_FFMPEG_LOG", str(log))
+    monkeypatch.setenv("FAKE_FFMPEG_STEP_SECONDS", "0.05")
+    limiter = asyncio.Semaphore(2)
+
+    await asyncio.gather(
+        *(RenderJob(ffmpeg, [], tmp_path / f"{i}.mp4", limiter=limiter).run() for i in range(6))
+    )
+
+    assert _max_overlap(log) == 2
+    assert get_ffmpeg_limiter() is get_ffmpeg_limiter()
+
+
+@pytest.mark.asyncio
+async def test_processor_methods_report_progress(processor, tmp_path):
+    video = tmp_path / "in.mp4"
+    video.write_bytes(b"")
+    reports = []
+
+    output = await processor.add_subtitles(
+        str(video), "hello", "subtitled.mp4", on_progress=reports.append
+    )
+    assert output == str(processor.output_dir / "subtitled.mp4")
+    # 總時長由檔頭探測取得（4 秒）
+    assert [p.percent for p in reports] == [25.0, 50.0, 75.0, 100.0]
+
+    cancel = asyncio.Event()
+    cancel.set()
+    with pytest.raises(RenderCancelledError):
+        await processor.merge_audio_video(str(video), str(video), "merged.mp4", cancel_event=cancel)
+
+
+def _invocations(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def _max_overlap(log):
+    events = sorted(
+        (float(stamp), kind)
+        for kind, stamp in (line.split() for line in log.read_text().splitlines())
+    )
+    active = peak = 0
+    for _, kind in events:
+        active += 1 if kind == "start" else -1
+        peak = max(peak, active)
+    return peak
+
+
+class TestSegmentSlideshow:
+    @pytest.fixture
+    def images(self, tmp_path):
+        paths = {}
+        for name in "abc":
+            path = tmp_path / f"{name}.png"
+            path.write_bytes(f"image {name}".encode())
+            paths[name] = str(path)
+        return paths
+
+    @pytest.mark.asyncio
+    async def test_segments_are_cached_by_content(self, processor, images, tmp_path, monkeypatch):
+        args_log = tmp_path / "args.log"
+        monkeypatch.setenv("FAKE_FFMPEG_ARGS_LOG", str(args_log))
+        music = tmp_path / "music.mp3"
+        music.write_bytes(b"mp3")
+        reports = []
+
+        output = await processor.create_video_from_images(
+            [images["a"], images["b"], images["a"]],
+            "first.mp4",
+            background_music=str(music),
+            on_progress=reports.append,
+        )
+
+        assert output == str(processor.output_dir / "first.mp4")
+        encodes, concat = _invocations(args_log)[:-1], _invocations(args_log)[-1]
+        # 重複的圖片只編碼一次，淡入淡出直接編進片段
+        assert len(encodes) == 2
+        assert all("-filter_complex" not in e["args"] for e in encodes)
+        assert "fade=out:90:15" in encodes[0]["args"][encodes[0]["args"].index("-vf") + 1]
+        segments = [line.split("'")[1] for line in concat["concat"].splitlines()]
+        assert len(segments) == 3 and segments[0] == segments[2] != segments[1]
+        assert concat["args"][concat["args"].index("-c:v") + 1] == "copy"
+        assert str(music) in concat["args"]
+        assert reports[-1].done and reports[-1].percent == 100.0
+        assert max(r.percent for r in reports[:-1]) <= 100.0
+
+        # 另一支影片重用相同內容（即使路徑不同）不必重新編碼
+        copy = tmp_path / "copy_of_a.png"
+        copy.write_bytes(b"image a")
+        args_log.unlink()
+        await processor.create_video_from_images(
+            [str(copy), images["c"], images["b"]], "second.mp4"
+        )
+        encodes = _invocations(args_log)[:-1]
+        assert len(encodes) == 1 and images["c"] in encodes[0]["args"]
+
+        # 品質不同時片段分開快取
+        args_log.unlink()
+        await processor.create_video_from_images([images["a"]], "low.mp4", quality=VideoQuality.LOW)
+        assert len(_invocations(args_log)) == 2
+
+    @pytest.mark.asyncio
+    async def test_segment_cache_evicts_least_recently_used(self, ffmpeg, images, tmp_path):
+        def make_processor():
+            # 假 ffmpeg 每個片段寫入 5 bytes：上限 10 bytes 可保留兩個片段
+            return VideoProcessor(
+                output_dir=str(tmp_path / "out"),
+                temp_dir=str(tmp_path / "tmp"),
+                segment_cache_max_bytes=10,
+            )
+
+        def cached(processor):
+            return sorted(path.name[:8] for path in processor.segment_cache_dir.rglob("*.mp4"))
+
+        processor = make_processor()
+        hashes = {name: (await processor._image_hash(path))[:8] for name, path in images.items()}
+
+        # 單支影片的片段在串接完成前不會被淘汰，完成後才縮減到上限內
+        await processor.create_video_from_images(list(images.values()), "all.mp4")
+        assert cached(processor) == sorted([hashes["b"], hashes["c"]])
+        assert processor.segment_cache.get_stats()["evictions"] == 1
+
+        await processor.create_video_from_images([images["b"]], "b.mp4")
+        await processor.create_video_from_images([images["a"]], "a.mp4")
+        assert cached(processor) == sorted([hashes["a"], hashes["b"]])
+
+        # 重新啟動後依檔案修改時間還原最近使用順序
+        restarted = make_processor()
+        await restarted.create_video_from_images([images["c"]], "c.mp4")
+        assert cached(restarted) == sorted([hashes["a"], hashes["c"]])
+
+    @pytest.mark.asyncio
+    async def test_segments_encode_in_parallel(self, processor, images, tmp_path, monkeypatch):
+        log = tmp_path / "ffmpeg.log"
+        monkeypatch.setenv("FAKE_FFMPEG_LOG", str(log))
+        monkeypatch.setenv("FAKE_FFMPEG_STEP_SECONDS", "0.05")
+        monkeypatch.setenv("FFMPEG_MAX_CONCURRENCY", "3")
+
+        await processor.create_video_from_images(list(images.values()), "parallel.mp4")
+
+        assert _max_overlap(log) == 3
+
+    @pytest.mark.asyncio
+    async def test_filter_mode_renders_in_one_pass(self, processor, images, tmp_path, monkeypatch):
+        args_log = tmp_path / "args.log"
+        monkeypatch.setenv("FAKE_FFMPEG_ARGS_LOG", str(args_log))
+
+        await processor.create_video_from_images(list(images.values()), "legacy.mp4", mode="filter")
+
+        (invocation,) = _invocations(args_log)
+        assert "-filter_complex" in invocation["args"]
+        assert not processor.segment_cache_dir.exists()
+        with pytest.raises(ValueError):
+            await processor.create_video_from_images([images["a"]], "x.mp4", mode="gif")
+
+    @pytest.mark.asyncio
+    async def test_shared_segment_survives_one_caller_cancelling(
+        self, processor, images, tmp_path, monkeypatch
+    ):
+        monkeypatch.setenv("FAKE_FFMPEG_STEP_SECONDS", "0.1")
+        cancel_a = asyncio.Event()
+        reports_b = []
+
+        def progress_a(progress):
+            if progress.percent and not progress.done:
+                cancel_a.set()
+
+        video_a = asyncio.create_task(
+            processor.create_video_from_images(
+                [images["a"]], "a.mp4", on_progress=progress_a, cancel_event=cancel_a
+            )
+        )
+        await asyncio.sleep(0)
+        video_b = asyncio.create_task(
+            processor.create_video_from_images(
+                [images["a"]], "b.mp4", on_progress=reports_b.append, cancel_event=asyncio.Event()
+            )
+        )
+
+        with pytest.raises(RenderCancelledError):
+            await video_a
+        assert await video_b == str(processor.output_dir / "b.mp4")
+        # B 也收到共用片段的編碼進度
+        assert len([r for r in reports_b if 0 < r.percent < 95]) >= 3
+        assert reports_b[-1].done
+
+    @pytest.mark.asyncio
+    async def test_shared_segment_stops_when_every_caller_cancels(
+        self, processor, images, tmp_path, monkeypatch
+    ):
+        log = tmp_path / "ffmpeg.log"
+        monkeypatch.setenv("FAKE_FFMPEG_LOG", str(log))
+        monkeypatch.setenv("FAKE_FFMPEG_MODE", "hang")
+
+        videos = [
+            asyncio.create_task(processor.create_video_from_images([images["a"]], f"{i}.mp4"))
+            for i in range(2)
+        ]
+        while not log.exists():
+            await asyncio.sleep(0.02)
+        videos[0].cancel()
+        await asyncio.sleep(0.1)
+        assert processor._segment_renders  # 仍有 B 在等待
+
+        started = time.monotonic()
+        videos[1].cancel()
+        await asyncio.gather(*videos, return_exceptions=True)
+        while processor._segment_renders:
+            await asyncio.sleep(0.02)
+
+        assert time.monotonic() - started < 5
+        assert log.read_text().split()[0::2] == ["start"]
+        assert not list(processor.segment_cache_dir.rglob("*.mp4*"))